@@ -0,0 +1,6 @@
+"""
+Benchmarks for the performance sensitive parts of dhcpkit. They are not part of the test suite and are meant to be run
+by hand, for example:
+
+    python -m benchmarks.parse_pcaps
+"""
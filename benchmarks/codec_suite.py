@@ -0,0 +1,423 @@
+"""
+Benchmark the throughput of the message and option codecs. The messages in the captures that are included with the
+source and a synthetic corpus that covers the message types and options that don't occur in the captures are parsed,
+saved and parsed and saved again. The rates and the memory that parsing allocates are reported per message type and per
+option class, and can be written to a JSON file. A previous JSON file can be given to compare against, so that
+regressions between commits are easy to spot:
+
+    python -m benchmarks.codec_suite --output before.json
+    git checkout my-branch
+    python -m benchmarks.codec_suite --compare before.json
+"""
+import argparse
+import gc
+import itertools
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict
+from ipaddress import IPv6Address, IPv6Network
+
+from benchmarks.parse_pcaps import default_captures, load_payloads
+from dhcpkit.ipv6.duids import EnterpriseDUID, LinkLayerDUID, LinkLayerTimeDUID
+from dhcpkit.ipv6.extensions.dns import DomainSearchListOption, RecursiveNameServersOption
+from dhcpkit.ipv6.extensions.ntp import NTPMulticastAddressSubOption, NTPServerAddressSubOption, \
+    NTPServerFQDNSubOption, NTPServersOption
+from dhcpkit.ipv6.extensions.prefix_delegation import IAPDOption, IAPrefixOption
+from dhcpkit.ipv6.extensions.remote_id import RemoteIdOption
+from dhcpkit.ipv6.extensions.sol_max_rt import InfMaxRTOption, SolMaxRTOption
+from dhcpkit.ipv6.messages import AdvertiseMessage, ConfirmMessage, DeclineMessage, InformationRequestMessage, \
+    LazyOptionsMixin, Message, RebindMessage, ReconfigureMessage, RelayForwardMessage, RelayReplyMessage, \
+    RelayServerMessage, ReplyMessage, RequestMessage, SolicitMessage
+from dhcpkit.ipv6.options import AuthenticationOption, ClientIdOption, ElapsedTimeOption, IAAddressOption, \
+    IANAOption, IATAOption, InterfaceIdOption, Option, OptionRequestOption, PreferenceOption, RapidCommitOption, \
+    ReconfigureAcceptOption, ReconfigureMessageOption, RelayMessageOption, ServerIdOption, ServerUnicastOption, \
+    StatusCodeOption, UserClassOption, VendorClassOption, VendorSpecificInformationOption
+from dhcpkit.protocol_element import ProtocolElement, validation_policies
+
+# The metrics in the results where a higher value is better, the others are better when they are lower
+rate_metrics = ('parse', 'save', 'round_trip')
+memory_metrics = ('blocks', 'bytes')
+
+client_duid = LinkLayerTimeDUID(hardware_type=1, time=15, link_layer_address=bytes.fromhex('3431c43cb2f1'))
+server_duid = LinkLayerDUID(hardware_type=1, link_layer_address=bytes.fromhex('0024362ffe60'))
+
+
+def relayed(message: Message, hops: int = 1) -> RelayServerMessage:
+    """
+    Wrap a message in the given number of relay messages, of the type that matches the direction of the message
+
+    :param message: The message to wrap
+    :param hops: The number of relay messages
+    :return: The outermost relay message
+    """
+    relay_class = RelayForwardMessage if message.from_client_to_server else RelayReplyMessage
+    for hop in range(hops):
+        message = relay_class(hop_count=hop, link_address=IPv6Address('2001:db8:{}::1'.format(hop)),
+                              peer_address=IPv6Address('fe80::{}'.format(hop + 1)), options=[
+                                  InterfaceIdOption(interface_id='ge-0/0/{}.0'.format(hop).encode('ascii')),
+                                  RemoteIdOption(enterprise_number=9, remote_id=bytes.fromhex('020023000001000a')),
+                                  RelayMessageOption(relayed_message=message),
+                              ])
+    return message
+
+
+def synthetic_messages() -> [Message]:
+    """
+    Create messages with the message types and options that the captures don't contain
+
+    :return: The messages
+    """
+    client_id = ClientIdOption(duid=client_duid)
+    server_id = ServerIdOption(duid=server_duid)
+    ia_na = IANAOption(iaid=bytes.fromhex('c43cb2f1'), t1=1800, t2=2880, options=[
+        IAAddressOption(address=IPv6Address('2001:db8:1::1234'), preferred_lifetime=3600, valid_lifetime=7200),
+    ])
+    ia_pd = IAPDOption(iaid=bytes.fromhex('c43cb2f1'), t1=1800, t2=2880, options=[
+        IAPrefixOption(prefix=IPv6Network('2001:db8:ff00::/56'), preferred_lifetime=3600, valid_lifetime=7200),
+    ])
+    ia_ta = IATAOption(iaid=bytes.fromhex('c43cb2f2'), options=[
+        IAAddressOption(address=IPv6Address('2001:db8:1::abcd'), preferred_lifetime=600, valid_lifetime=900),
+    ])
+    information = [
+        RecursiveNameServersOption(dns_servers=[IPv6Address('2001:4860:4860::8888'),
+                                                IPv6Address('2001:4860:4860::8844')]),
+        DomainSearchListOption(search_list=['corp.example.com', 'example.com']),
+        NTPServersOption(options=[
+            NTPServerAddressSubOption(address=IPv6Address('2001:db8::123')),
+            NTPMulticastAddressSubOption(address=IPv6Address('ff05::101')),
+            NTPServerFQDNSubOption(fqdn='ntp.example.com'),
+        ]),
+    ]
+    client_options = [
+        ElapsedTimeOption(elapsed_time=100),
+        OptionRequestOption(requested_options=[23, 24, 21, 22, 31, 56, 82, 83]),
+        UserClassOption(user_classes=[b'office', b'building-3']),
+        VendorClassOption(enterprise_number=3561, vendor_classes=[b'dslforum.org']),
+        VendorSpecificInformationOption(enterprise_number=40208, vendor_options=[(1, b'model-x'), (2, b'1.2.3')]),
+        ReconfigureAcceptOption(),
+    ]
+
+    messages = [
+        SolicitMessage(b'\x01\x02\x03', [client_id] + client_options + [RapidCommitOption(), ia_na, ia_ta, ia_pd]),
+        AdvertiseMessage(b'\x01\x02\x03', [server_id, client_id, ia_na, ia_pd, PreferenceOption(preference=255),
+                                           SolMaxRTOption(sol_max_rt=3600)] + information[:2]),
+        RequestMessage(b'\x04\x05\x06', [client_id, server_id] + client_options + [ia_na, ia_pd]),
+        ConfirmMessage(b'\x07\x08\x09', [client_id, ElapsedTimeOption(elapsed_time=0), ia_na]),
+        RebindMessage(b'\x0a\x0b\x0c', [client_id, ElapsedTimeOption(elapsed_time=200), ia_na, ia_pd]),
+        DeclineMessage(b'\x0d\x0e\x0f', [client_id, server_id, ElapsedTimeOption(elapsed_time=0), ia_na]),
+        InformationRequestMessage(b'\x10\x11\x12', [
+            ClientIdOption(duid=EnterpriseDUID(enterprise_number=40208, identifier=b'office-printer-17')),
+            ElapsedTimeOption(elapsed_time=0),
+            OptionRequestOption(requested_options=[23, 24, 21, 22, 31, 56, 82]),
+        ]),
+        ReplyMessage(b'\x10\x11\x12', [server_id, client_id, StatusCodeOption(status_code=0, status_message='Done'),
+                                       ServerUnicastOption(server_address=IPv6Address('2001:db8::547')),
+                                       InfMaxRTOption(inf_max_rt=3600)] + information),
+        ReconfigureMessage(b'\x00\x00\x00', [server_id, client_id, ReconfigureMessageOption(message_type=5),
+                                             AuthenticationOption(protocol=3, algorithm=1, rdm=0,
+                                                                  replay_detection=bytes(7) + b'\x01',
+                                                                  auth_info=bytes(17))]),
+    ]
+
+    # The unrelayed messages, and the client messages after passing through one and two relays
+    return messages + [relayed(message, hops)
+                       for message in messages if message.from_client_to_server for hops in (1, 2)]
+
+
+def message_label(message: Message) -> str:
+    """
+    Name a message after its type and the types of the messages relayed in it
+
+    :param message: The message
+    :return: The label for reporting
+    """
+    names = []
+    while isinstance(message, RelayServerMessage):
+        names.append(type(message).__name__)
+        message = message.relayed_message
+    names.append(type(message).__name__)
+    return ' > '.join(names)
+
+
+def collect_options(options: [Option], samples: {str: OrderedDict}):
+    """
+    Collect the encoded options by class, including the options they contain but not the relayed messages
+
+    :param options: The options to collect
+    :param samples: The distinct encoded options per class, updated in place
+    """
+    for option in options:
+        if isinstance(option, RelayMessageOption):
+            collect_options(option.relayed_message.options, samples)
+            continue
+
+        samples.setdefault(type(option).__name__, OrderedDict())[bytes(option.save())] = None
+        sub_options = getattr(option, 'options', None)
+        if sub_options and all(isinstance(sub_option, Option) for sub_option in sub_options):
+            collect_options(sub_options, samples)
+
+
+def build_corpus(payloads: [bytes]) -> ({str: [bytes]}, {str: [bytes]}):
+    """
+    Group the payloads by message type, and collect the distinct options in them by option class
+
+    :param payloads: The payloads of the corpus
+    :return: The payloads per message label and the encoded options per option class
+    """
+    messages = {}
+    options = {}
+    for payload in payloads:
+        message = Message.parse(payload)[1]
+        messages.setdefault(message_label(message), []).append(payload)
+        collect_options(message.options, options)
+
+    return (OrderedDict(sorted(messages.items())),
+            OrderedDict((name, list(samples)) for name, samples in sorted(options.items())))
+
+
+def measure_each(function, items: list, duration: float, rounds: int = 5) -> float:
+    """
+    Call the function for each of the items over and over again for the given duration, and report the best rate of
+    several rounds to reduce the influence of other activity on the machine
+
+    :param function: The function to call
+    :param items: The arguments to call the function with
+    :param duration: The number of seconds to keep calling
+    :param rounds: The number of rounds to divide the duration in
+    :return: The number of calls per second
+    """
+    # Make sure that short lists still amortise the time it takes to check the clock
+    batch = items * max(1, 100 // len(items))
+
+    best = 0
+    for _ in range(rounds):
+        count = 0
+        start = time.perf_counter()
+        end = start + duration / rounds
+        now = start
+        while now < end:
+            for item in batch:
+                function(item)
+            count += len(batch)
+            now = time.perf_counter()
+
+        best = max(best, count / (now - start))
+
+    return best
+
+
+def measure_allocations(parser, buffers: [bytes], copies: int = 20) -> (float, float):
+    """
+    Parse every buffer a number of times and determine the memory that the parsed elements retain
+
+    :param parser: The function that parses a buffer
+    :param buffers: The buffers to parse
+    :param copies: How many times to parse each buffer
+    :return: The average number of memory blocks and bytes that each parsed element retains
+    """
+    # Allocate the list that holds the results before we start measuring
+    elements = [None] * (len(buffers) * copies)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        for index, buffer in enumerate(itertools.chain.from_iterable(itertools.repeat(buffers, copies))):
+            elements[index] = parser(buffer)
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    stats = after.compare_to(before, 'filename')
+    blocks = sum(stat.count_diff for stat in stats)
+    size = sum(stat.size_diff for stat in stats)
+
+    return blocks / len(elements), size / len(elements)
+
+
+def measure_codec(element_class: type, buffers: [bytes], duration: float) -> OrderedDict:
+    """
+    Measure the codec of a type of element
+
+    :param element_class: The base class to parse the buffers with
+    :param buffers: The encoded elements
+    :param duration: The number of seconds to run each measurement
+    :return: The measurements
+    """
+    buffers = [memoryview(buffer) for buffer in buffers]
+    elements = [element_class.parse(buffer)[1] for buffer in buffers]
+
+    def parse(buffer: bytes) -> ProtocolElement:
+        return element_class.parse(buffer)[1]
+
+    def save(element: ProtocolElement) -> bytes:
+        return element.save()
+
+    def round_trip(buffer: bytes) -> bytes:
+        return element_class.parse(buffer)[1].save()
+
+    blocks, size = measure_allocations(parse, buffers)
+
+    return OrderedDict([
+        ('corpus', len(buffers)),
+        ('parse', measure_each(parse, buffers, duration)),
+        ('save', measure_each(save, elements, duration)),
+        ('round_trip', measure_each(round_trip, buffers, duration)),
+        ('blocks', blocks),
+        ('bytes', size),
+    ])
+
+
+def current_commit() -> str or None:
+    """
+    Determine which commit is being benchmarked
+
+    :return: The commit hash, or None if it can't be determined
+    """
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(title: str, results: {str: OrderedDict}, baseline: {str: OrderedDict} = None):
+    """
+    Print the measurements, and the changes compared to the baseline if given
+
+    :param title: The name of the first column
+    :param results: The measurements per message type or option class
+    :param baseline: The measurements from the baseline
+    """
+    width = max(len(name) for name in itertools.chain([title], results))
+
+    print()
+    print("{:{}} {:>6} {:>10} {:>10} {:>10} {:>7} {:>8}".format(
+        title, width, "corpus", "parse/s", "save/s", "trip/s", "blocks", "bytes"))
+    for name, result in results.items():
+        print("{:{}} {:6} {:10.0f} {:10.0f} {:10.0f} {:7.1f} {:8.0f}".format(
+            name, width, result['corpus'], *(result[metric] for metric in rate_metrics + memory_metrics)))
+
+        if baseline and name in baseline:
+            changes = [100.0 * (result[metric] / baseline[name][metric] - 1) if baseline[name][metric] else 0.0
+                       for metric in rate_metrics + memory_metrics]
+            print("{:{}} {:6} {:+9.1f}% {:+9.1f}% {:+9.1f}% {:+6.1f}% {:+7.1f}%".format("", width, "", *changes))
+
+
+def find_regressions(results: dict, baseline: dict, threshold: float) -> [str]:
+    """
+    Find the measurements that got worse than the baseline by more than the threshold
+
+    :param results: The results of this run
+    :param baseline: The results of an earlier run
+    :param threshold: The allowed change, as a fraction
+    :return: Descriptions of the regressions
+    """
+    regressions = []
+    for section in ('messages', 'options'):
+        for name, result in results[section].items():
+            old_result = baseline.get(section, {}).get(name)
+            if not old_result:
+                continue
+
+            for metric in rate_metrics:
+                if result[metric] < old_result[metric] * (1 - threshold):
+                    regressions.append("{} {}: {:.0f}/s -> {:.0f}/s".format(
+                        name, metric, old_result[metric], result[metric]))
+
+            for metric in memory_metrics:
+                if result[metric] > old_result[metric] * (1 + threshold) + 0.5:
+                    regressions.append("{} {}: {:.1f} -> {:.1f}".format(
+                        name, metric, old_result[metric], result[metric]))
+
+    return regressions
+
+
+def main(args: [str] = None) -> int:
+    """
+    Run the benchmark
+
+    :param args: Command line arguments
+    :return: The exit code
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the message and option codecs")
+    parser.add_argument("captures", metavar="FILE", nargs='*', default=default_captures,
+                        help="the capture files to read DHCPv6 messages from")
+    parser.add_argument("-c", "--corpus", choices=('all', 'captures', 'synthetic'), default='all',
+                        help="which messages to benchmark")
+    parser.add_argument("-d", "--duration", type=float, default=0.3,
+                        help="the number of seconds to run each measurement")
+    parser.add_argument("-l", "--lazy", action="store_true",
+                        help="only decode options when they are accessed")
+    parser.add_argument("-v", "--validation", choices=validation_policies,
+                        default=ProtocolElement.validation_policy,
+                        help="the validation policy to use")
+    parser.add_argument("-o", "--output", metavar="FILE",
+                        help="write the results to this JSON file")
+    parser.add_argument("--compare", metavar="FILE",
+                        help="compare the results to those in this JSON file")
+    parser.add_argument("-t", "--threshold", type=float, default=10.0,
+                        help="the percentage that a result may be worse than the compared one")
+    args = parser.parse_args(args)
+
+    LazyOptionsMixin.lazy_option_decoding = args.lazy
+    ProtocolElement.validation_policy = args.validation
+
+    payloads = []
+    if args.corpus in ('all', 'captures'):
+        payloads.extend(load_payloads(args.captures))
+    if args.corpus in ('all', 'synthetic'):
+        payloads.extend(bytes(message.save()) for message in synthetic_messages())
+    if not payloads:
+        parser.error("No DHCPv6 messages found")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+
+    message_corpus, option_corpus = build_corpus(payloads)
+
+    results = OrderedDict([
+        ('commit', current_commit()),
+        ('python', platform.python_implementation() + ' ' + platform.python_version()),
+        ('settings', OrderedDict([
+            ('corpus', args.corpus),
+            ('duration', args.duration),
+            ('lazy', args.lazy),
+            ('validation', args.validation),
+        ])),
+        ('messages', OrderedDict((name, measure_codec(Message, buffers, args.duration))
+                                 for name, buffers in message_corpus.items())),
+        ('options', OrderedDict((name, measure_codec(Option, buffers, args.duration))
+                                for name, buffers in option_corpus.items())),
+    ])
+
+    print("{} messages, {} message types and {} option classes".format(
+        len(payloads), len(message_corpus), len(option_corpus)))
+    print_results("Message", results['messages'], baseline and baseline['messages'])
+    print_results("Option", results['options'], baseline and baseline['options'])
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if baseline:
+        if baseline.get('settings') != results['settings']:
+            print("\nWarning: the settings differ from those of the compared results")
+
+        regressions = find_regressions(results, baseline, args.threshold / 100)
+        if regressions:
+            print("\n{} regressions of more than {}%:".format(len(regressions), args.threshold))
+            for regression in regressions:
+                print("  " + regression)
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+Benchmark decoding large numbers of DHCPv6 messages into columns against parsing them into protocol elements one by
+one. The messages from the captures that are included with the source are repeated to get a large batch.
+"""
+import argparse
+import time
+
+from benchmarks.parse_pcaps import default_captures, load_payloads
+from dhcpkit.ipv6.columnar import decode_columns, numpy
+from dhcpkit.ipv6.messages import Message
+
+
+def measure_columns(payloads: [bytes]) -> float:
+    """
+    Decode the payloads into columns in one batch
+
+    :param payloads: The payloads to decode
+    :return: The number of decoded messages per second
+    """
+    start = time.perf_counter()
+    decode_columns(payloads)
+    return len(payloads) / (time.perf_counter() - start)
+
+
+def measure_objects(payloads: [bytes]) -> float:
+    """
+    Parse the payloads one by one
+
+    :param payloads: The payloads to parse
+    :return: The number of parsed messages per second
+    """
+    start = time.perf_counter()
+    for payload in payloads:
+        Message.parse(payload)
+    return len(payloads) / (time.perf_counter() - start)
+
+
+def main(args: [str] = None):
+    """
+    Run the benchmark
+
+    :param args: Command line arguments
+    """
+    parser = argparse.ArgumentParser(description="Benchmark decoding DHCPv6 messages into columns")
+    parser.add_argument("captures", metavar="FILE", nargs='*', default=default_captures,
+                        help="the capture files to read DHCPv6 messages from")
+    parser.add_argument("-n", "--messages", type=int, default=100000,
+                        help="the number of messages to decode in one batch")
+    parser.add_argument("-o", "--object-messages", type=int, default=5000,
+                        help="the number of messages to parse one by one")
+    args = parser.parse_args(args)
+
+    if numpy is None:
+        parser.error("NumPy is not installed")
+
+    payloads = load_payloads(args.captures)
+    if not payloads:
+        parser.error("No DHCPv6 messages found")
+
+    payloads = (payloads * (args.messages // len(payloads) + 1))[:args.messages]
+
+    print("{} messages from {} capture files".format(len(payloads), len(args.captures)))
+    print("Columns:   {:10.0f} messages/s".format(measure_columns(payloads)))
+    print("Objects:   {:10.0f} messages/s".format(measure_objects(payloads[:args.object_messages])))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark the domain name codec against the label-by-label implementation it replaced, using search lists like the
+ones that are configured in practice. The new codec is measured both with names that are never in the caches and with
+the names already in the caches, which is what a server sees when it sends the same search list to every client. The
+old implementation gets the same distinct names as the uncached measurement.
+"""
+import argparse
+import itertools
+
+from benchmarks.option_codecs import measure
+from dhcpkit.utils import parse_domain_list_bytes, encode_domain_list, domain_name_cache_size
+
+search_lists = [
+    ['example.com'],
+    ['corp.example.com', 'example.com', 'example.net'],
+    ['eng.ams.corp.example.com', 'ams.corp.example.com', 'corp.example.com', 'example.com',
+     'lab.eng.ams.corp.example.com', 'dc1.infra.example.net'],
+]
+
+
+def label_by_label_parse_domain_bytes(buffer: bytes, offset: int = 0, length: int = None) -> (int, str):
+    """
+    The original implementation of :func:`dhcpkit.utils.parse_domain_bytes`.
+    """
+    my_offset = 0
+    max_offset = length or (len(buffer) - offset)
+
+    current_labels = []
+    while max_offset > my_offset:
+        label_length = buffer[offset + my_offset]
+        my_offset += 1
+
+        if label_length == 0:
+            return my_offset, '.'.join(current_labels)
+
+        if label_length > 63:
+            raise ValueError('Domain List contains label with invalid length')
+
+        if my_offset + label_length > max_offset:
+            raise ValueError('Invalid encoded domain name, exceeds available buffer')
+
+        current_labels.append(str(buffer[offset + my_offset:offset + my_offset + label_length], 'ascii'))
+        my_offset += label_length
+
+    raise ValueError('Domain name must end with a 0-length label')
+
+
+def label_by_label_parse_domain_list_bytes(buffer: bytes, offset: int = 0, length: int = None) -> (int, list):
+    """
+    The original implementation of :func:`dhcpkit.utils.parse_domain_list_bytes`.
+    """
+    my_offset = 0
+    max_offset = length or (len(buffer) - offset)
+
+    domain_names = []
+    while max_offset > my_offset:
+        domain_name_len, domain_name = label_by_label_parse_domain_bytes(buffer, offset=offset + my_offset,
+                                                                         length=max_offset - my_offset)
+        domain_names.append(domain_name)
+        my_offset += domain_name_len
+
+    return my_offset, domain_names
+
+
+def label_by_label_encode_domain_list(domain_names: [str]) -> bytes:
+    """
+    The original implementation of :func:`dhcpkit.utils.encode_domain_list`.
+    """
+    buffer = bytearray()
+    for domain_name in domain_names:
+        for label in domain_name.rstrip('.').split('.'):
+            label_length = len(label)
+            if label_length < 1 or label_length > 63:
+                raise ValueError('Domain name contains label with invalid length')
+
+            buffer.append(label_length)
+            buffer.extend(label.encode('ascii'))
+
+        buffer.append(0)
+    return buffer
+
+
+def variants(search_list: [str]) -> [[str]]:
+    """
+    Create more variants of a search list than fit in the caches, so that cycling through them never hits the caches.
+
+    :param search_list: The search list
+    :return: The variants of the search list
+    """
+    return [['v{}.{}'.format(number, domain_name) for domain_name in search_list]
+            for number in range(2 * domain_name_cache_size)]
+
+
+def main(args: [str] = None):
+    """
+    Run the benchmark
+
+    :param args: Command line arguments
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the domain name codec")
+    parser.add_argument("-d", "--duration", type=float, default=1.0,
+                        help="the number of seconds to run each measurement")
+    args = parser.parse_args(args)
+
+    print("{:>6} {:>6} {:>8} {:>12} {:>12} {:>12}".format("Names", "Bytes", "", "old", "uncached", "cached"))
+
+    for search_list in search_lists:
+        encoded = bytes(encode_domain_list(search_list))
+
+        # All implementations must agree
+        assert bytes(label_by_label_encode_domain_list(search_list)) == encoded
+        assert label_by_label_parse_domain_list_bytes(encoded) == parse_domain_list_bytes(encoded)
+
+        uncached_lists = itertools.cycle(variants(search_list))
+        uncached_buffers = itertools.cycle([memoryview(encode_domain_list(variant))
+                                            for variant in variants(search_list)])
+
+        for name, old_function, new_function, argument, uncached_arguments in (
+                ("parse", label_by_label_parse_domain_list_bytes, parse_domain_list_bytes, memoryview(encoded),
+                 uncached_buffers),
+                ("encode", label_by_label_encode_domain_list, encode_domain_list, search_list, uncached_lists)):
+            old = measure(lambda: old_function(next(uncached_arguments)), args.duration)
+            cold = measure(lambda: new_function(next(uncached_arguments)), args.duration)
+            warm = measure(lambda: new_function(argument), args.duration)
+
+            print("{:6} {:6} {:>8} {:12.0f} {:12.0f} {:12.0f}".format(
+                len(search_list), len(encoded), name, old, cold, warm))
+
+
+if __name__ == '__main__':
+    main()
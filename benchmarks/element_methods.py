@@ -0,0 +1,232 @@
+"""
+Benchmark comparing, hashing and representing protocol elements. The implementations that inspected the signature of
+the constructor on every call are kept here in a mix-in, so they can be compared with the implementations that use the
+properties that are determined once per class.
+"""
+import argparse
+import inspect
+import json
+from inspect import Parameter
+from ipaddress import IPv6Address
+
+from benchmarks.option_codecs import measure
+from dhcpkit.ipv6.duids import LinkLayerDUID
+from dhcpkit.ipv6.messages import RequestMessage
+from dhcpkit.ipv6.options import ClientIdOption, ElapsedTimeOption, IANAOption, IAAddressOption, OptionRequestOption
+from dhcpkit.ipv6.transaction_bundle import TransactionBundle
+from dhcpkit.protocol_element import ProtocolElement, JSONProtocolElementEncoder
+
+
+class SignatureBasedMethods:
+    def __eq__(self, other: object) -> bool:
+        # Use strict comparison, one being a subclass of the other is not good enough
+        if type(self) is not type(other):
+            return NotImplemented
+
+        # Get the signature of the __init__ method to find the properties we need to compare
+        # This is why the object properties and __init__ parameters need to match, besides it being good practice for
+        # an object that represents a protocol element anyway...
+        signature = inspect.signature(self.__init__)
+
+        # Compare the discovered properties
+        for parameter in signature.parameters.values():
+            # Skip any potential *args and **kwargs in the method signature
+            if parameter.kind in (Parameter.VAR_POSITIONAL, Parameter.VAR_KEYWORD):
+                continue
+
+            if getattr(self, parameter.name) != getattr(other, parameter.name):
+                return False
+
+        # Amazing, all properties seem equal
+        return True
+
+    def __repr__(self):
+        # Get the signature of the __init__ method to find the properties we need to extract.
+        # This is why the object properties and __init__ parameters need to match, besides it being good practice for
+        # an object that represents a protocol element anyway...
+        signature = inspect.signature(self.__init__)
+
+        # Create a list of string with "parameter=value" for each parameter of __init__
+        options_repr = ['{}={}'.format(parameter.name, repr(getattr(self, parameter.name)))
+                        for parameter in signature.parameters.values()
+                        if parameter.kind not in (Parameter.VAR_POSITIONAL, Parameter.VAR_KEYWORD)]
+
+        # And construct a constructor call to show
+        return '{}({})'.format(self.__class__.__name__, ', '.join(options_repr))
+
+    def __str__(self):
+        # Use the same strategy as __repr__ but do nice indenting etc.
+        signature = inspect.signature(self.__init__)
+
+        parameter_names = [parameter.name
+                           for parameter in signature.parameters.values()
+                           if parameter.kind not in (Parameter.VAR_POSITIONAL, Parameter.VAR_KEYWORD)]
+
+        if len(parameter_names) == 0:
+            # No parameters: inline
+            return '{}()'.format(self.__class__.__name__)
+        elif len(parameter_names) == 1:
+            # One parameter: inline unless the parameter has a multi-line string output
+            parameter_name = parameter_names[0]
+            attr_value = getattr(self, parameter_name)
+            lines = str(attr_value).split('\n')
+
+            output = '{}('.format(self.__class__.__name__)
+
+            if len(lines) == 1:
+                output += '{}={}'.format(parameter_name, lines[0])
+            else:
+                output += '\n  {}='.format(parameter_name)
+                output += '{}\n'.format(lines[0])
+                for line in lines[1:-1]:
+                    output += '  {}\n'.format(line)
+                output += '  {}\n'.format(lines[-1])
+
+            output += ')'
+            return output
+
+        # Multiple parameters are shown one parameter per line
+        output = '{}(\n'.format(self.__class__.__name__)
+        for parameter_name in parameter_names:
+            attr_value = getattr(self, parameter_name)
+
+            if attr_value and isinstance(attr_value, str):
+                # Show strings with repr()
+                attr_value = repr(getattr(self, parameter_name))
+
+            if attr_value and isinstance(attr_value, list):
+                # Parameters containing lists show the list content indented
+                output += '  {}=[\n'.format(parameter_name)
+                for element in attr_value:
+                    lines = str(element).split('\n')
+                    for line in lines[:-1]:
+                        output += '    {}\n'.format(line)
+                    output += '    {},\n'.format(lines[-1])
+                output += '  ],\n'
+            else:
+                # Multi-line content is shown indented
+                output += '  {}='.format(parameter_name)
+                lines = str(attr_value).split('\n')
+                if len(lines) == 1:
+                    output += '{},\n'.format(lines[0])
+                else:
+                    output += '{}\n'.format(lines[0])
+                    for line in lines[1:-1]:
+                        output += '  {}\n'.format(line)
+                    output += '  {},\n'.format(lines[-1])
+
+        output += ')'
+
+        return output
+
+
+class SignatureBasedJSONEncoder(JSONProtocolElementEncoder):
+    def default(self, o):
+        if isinstance(o, ProtocolElement):
+            signature = inspect.signature(o.__init__)
+            options_repr = {parameter.name: getattr(o, parameter.name)
+                            for parameter in signature.parameters.values()
+                            if parameter.kind not in (Parameter.VAR_POSITIONAL, Parameter.VAR_KEYWORD)}
+            return {o.__class__.__name__: options_repr}
+
+        return super().default(o)
+
+
+signature_based_classes = {}
+
+
+def signature_based(value: object) -> object:
+    """
+    Make a copy of the value where all protocol elements use the signature based methods
+
+    :param value: A protocol element, a list or any other value
+    :return: The copied value
+    """
+    if isinstance(value, list):
+        return [signature_based(item) for item in value]
+
+    if not isinstance(value, ProtocolElement):
+        return value
+
+    element_class = type(value)
+    if element_class not in signature_based_classes:
+        signature_based_classes[element_class] = type(element_class.__name__, (SignatureBasedMethods, element_class),
+                                                      {'__hash__': None})
+
+    copy_class = signature_based_classes[element_class]
+    copy = copy_class.__new__(copy_class)
+    for name, item in zip(value._fields, value._field_values(value)):
+        object.__setattr__(copy, name, signature_based(item))
+    return copy
+
+
+def create_request() -> RequestMessage:
+    """
+    Create a request with a couple of IA options
+
+    :return: The request message
+    """
+    return RequestMessage(transaction_id=b'abc', options=[
+        ClientIdOption(LinkLayerDUID(hardware_type=1, link_layer_address=bytes.fromhex('3431c43cb2f1'))),
+        ElapsedTimeOption(0),
+        OptionRequestOption([23, 24, 31, 56, 82]),
+    ] + [
+        IANAOption(iaid.to_bytes(4, 'big'), options=[IAAddressOption(IPv6Address('2001:db8::{}'.format(iaid)))])
+        for iaid in range(8)
+    ])
+
+
+def mark_all_handled(request: RequestMessage):
+    """
+    Mark all IA options in the request as handled, and then look for the unanswered ones like the option handlers do
+
+    :param request: The request message
+    """
+    bundle = TransactionBundle(request, received_over_multicast=False)
+    for option in request.get_options_of_type(IANAOption):
+        # Use copies so that the lookups have to compare the options instead of finding the same object
+        bundle.mark_handled(type(option)(option.iaid, options=list(option.options)))
+    bundle.get_unanswered_iana_options()
+
+
+def main(args: [str] = None):
+    """
+    Run the benchmark
+
+    :param args: Command line arguments
+    """
+    parser = argparse.ArgumentParser(description="Benchmark comparing, hashing and representing protocol elements")
+    parser.add_argument("-d", "--duration", type=float, default=1.0,
+                        help="the number of seconds to run each measurement")
+    args = parser.parse_args(args)
+
+    request = create_request()
+    other_request = create_request()
+    old_request = signature_based(request)
+    old_other_request = signature_based(other_request)
+
+    # Both implementations must agree
+    assert request == other_request and old_request == old_other_request
+    assert repr(request) == repr(old_request) and str(request) == str(old_request)
+    assert json.dumps(request, cls=JSONProtocolElementEncoder) == json.dumps(old_request, cls=SignatureBasedJSONEncoder)
+
+    measurements = [
+        ("__eq__", lambda: request == other_request, lambda: old_request == old_other_request),
+        ("__repr__", lambda: repr(request), lambda: repr(old_request)),
+        ("__str__", lambda: str(request), lambda: str(old_request)),
+        ("JSON", lambda: json.dumps(request, cls=JSONProtocolElementEncoder),
+         lambda: json.dumps(old_request, cls=SignatureBasedJSONEncoder)),
+        ("mark_handled", lambda: mark_all_handled(request), lambda: mark_all_handled(old_request)),
+    ]
+
+    print("{:15} {:>12} {:>12} {:>8}".format("Request", "signature", "cached", "speedup"))
+    for name, new_function, old_function in measurements:
+        old_rate = measure(old_function, args.duration)
+        new_rate = measure(new_function, args.duration)
+        print("{:15} {:12.0f} {:12.0f} {:7.2f}x".format(name, old_rate, new_rate, new_rate / old_rate))
+
+    print("{:15} {:>12} {:12.0f}".format("__hash__", "-", measure(lambda: hash(request), args.duration)))
+
+
+if __name__ == '__main__':
+    main()
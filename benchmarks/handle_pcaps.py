@@ -0,0 +1,147 @@
+"""
+Benchmark the complete handling of the DHCPv6 requests in the captures that are included with the source: parsing the
+request, letting the standard message handler construct a reply and serialising the reply like the server would do
+before sending it. Each validation policy is measured separately.
+"""
+import argparse
+import logging
+import time
+from ipaddress import IPv6Address
+
+from benchmarks.parse_pcaps import default_captures, load_payloads
+from dhcpkit.ipv6.listening_socket import get_reply_buffer
+from dhcpkit.ipv6.message_handlers.standard import StandardMessageHandler
+from dhcpkit.ipv6.messages import Message, RelayForwardMessage, LazyOptionsMixin
+from dhcpkit.ipv6.options import InterfaceIdOption, RelayMessageOption
+from dhcpkit.ipv6.server import ServerConfigParser
+from dhcpkit.protocol_element import ProtocolElement, validation_policies
+
+config_template = '''
+[server]
+duid = 000300010024362ffe60
+
+[option RecursiveNameServers]
+dns-servers = 2001:4860:4860::8888 2001:4860:4860::8844
+
+[option DomainSearchList]
+domain-names = example.com example.net
+
+[option preference]
+preference = 255
+
+[option sol-max-rt]
+SOL_MAX_RT = 10
+
+[option inf-max-rt]
+INF_MAX_RT = 20
+'''
+
+
+def create_handler() -> StandardMessageHandler:
+    """
+    Create a standard message handler with a couple of static options
+
+    :return: The message handler
+    """
+    config = ServerConfigParser()
+    config.read_string(config_template)
+    return StandardMessageHandler(config)
+
+
+def load_requests(filenames: [str]) -> [bytes]:
+    """
+    Read the payloads of the messages that were sent towards the server from the given capture files
+
+    :param filenames: The capture files
+    :return: The payloads of the requests
+    """
+    requests = []
+    for payload in load_payloads(filenames):
+        message = Message.parse(payload)[1]
+        inner_message = message.inner_message if isinstance(message, RelayForwardMessage) else message
+        if inner_message and inner_message.from_client_to_server:
+            requests.append(payload)
+    return requests
+
+
+def handle(handler: StandardMessageHandler, payload: bytes) -> int:
+    """
+    Handle one request like the server would
+
+    :param handler: The message handler
+    :param payload: The received request
+    :return: The length of the serialised reply
+    """
+    received_message = Message.parse(payload)[1]
+    wrapped_message = RelayForwardMessage(hop_count=received_message.hop_count + 1,
+                                          link_address=IPv6Address('2001:db8::1'),
+                                          peer_address=IPv6Address('fe80::1'),
+                                          options=[
+                                              InterfaceIdOption(interface_id=b'eth0'),
+                                              RelayMessageOption(relayed_message=received_message),
+                                          ])
+
+    reply = handler.handle(wrapped_message, received_over_multicast=False)
+    if reply is None:
+        return 0
+
+    return reply.relayed_message.save_into(get_reply_buffer())
+
+
+def measure_rate(handler: StandardMessageHandler, payloads: [bytes], duration: float) -> float:
+    """
+    Handle the requests over and over again for the given duration
+
+    :param handler: The message handler
+    :param payloads: The requests to handle
+    :param duration: The number of seconds to keep handling requests
+    :return: The number of handled requests per second
+    """
+    count = 0
+    start = time.perf_counter()
+    end = start + duration
+    now = start
+    while now < end:
+        for payload in payloads:
+            handle(handler, payload)
+        count += len(payloads)
+        now = time.perf_counter()
+
+    return count / (now - start)
+
+
+def main(args: [str] = None):
+    """
+    Run the benchmark
+
+    :param args: Command line arguments
+    """
+    parser = argparse.ArgumentParser(description="Benchmark handling DHCPv6 requests from packet captures")
+    parser.add_argument("captures", metavar="FILE", nargs='*', default=default_captures,
+                        help="the capture files to read DHCPv6 requests from")
+    parser.add_argument("-d", "--duration", type=float, default=2.0,
+                        help="the number of seconds to run each measurement")
+    parser.add_argument("-l", "--lazy", action="store_true",
+                        help="only decode options when they are accessed")
+    args = parser.parse_args(args)
+
+    # The handler complains about the requests it can't answer, we don't want to see that here
+    logging.disable(logging.WARNING)
+
+    LazyOptionsMixin.lazy_option_decoding = args.lazy
+
+    payloads = load_requests(args.captures)
+    if not payloads:
+        parser.error("No DHCPv6 requests found")
+
+    handler = create_handler()
+
+    print("{} requests from {} capture files".format(len(payloads), len(args.captures)))
+    for validation_policy in validation_policies:
+        ProtocolElement.validation_policy = validation_policy
+        print("Validation {:8}  {:10.0f} requests/s".format(validation_policy + ':',
+                                                            measure_rate(handler, payloads, args.duration)))
+
+
+if __name__ == '__main__':
+    main()
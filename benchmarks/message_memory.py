@@ -0,0 +1,95 @@
+"""
+Benchmark the memory that parsed DHCPv6 messages occupy. The Solicit, Request and Renew messages in the captures that
+are included with the source are parsed many times and kept in memory, and the memory that they retain is reported per
+message type.
+"""
+import argparse
+import gc
+import tracemalloc
+
+from benchmarks.parse_pcaps import default_captures, load_payloads
+from dhcpkit.ipv6.messages import Message, LazyOptionsMixin, RelayServerMessage, SolicitMessage, RequestMessage, \
+    RenewMessage
+
+message_types = (SolicitMessage, RequestMessage, RenewMessage)
+
+
+def group_payloads(payloads: [bytes]) -> {type: [bytes]}:
+    """
+    Group the payloads by the type of the message from the client, looking inside relayed messages
+
+    :param payloads: The payloads to group
+    :return: The payloads per message type
+    """
+    groups = {message_type: [] for message_type in message_types}
+    for payload in payloads:
+        message = Message.parse(payload)[1]
+        inner_message = message.inner_message if isinstance(message, RelayServerMessage) else message
+        if type(inner_message) in groups:
+            groups[type(inner_message)].append(payload)
+    return groups
+
+
+def measure_memory(payloads: [bytes], copies: int) -> (float, float):
+    """
+    Parse every payload a number of times and keep the results in memory
+
+    :param payloads: The payloads to parse
+    :param copies: How many times to parse each payload
+    :return: The average number of bytes and memory blocks that each parsed message retains
+    """
+    # Allocate the list that holds the results before we start measuring
+    messages = [None] * (len(payloads) * copies)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        index = 0
+        for copy in range(copies):
+            for payload in payloads:
+                messages[index] = Message.parse(payload)[1]
+                index += 1
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    stats = after.compare_to(before, 'filename')
+    size = sum(stat.size_diff for stat in stats)
+    blocks = sum(stat.count_diff for stat in stats)
+
+    return size / len(messages), blocks / len(messages)
+
+
+def main(args: [str] = None):
+    """
+    Run the benchmark
+
+    :param args: Command line arguments
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the memory used by parsed DHCPv6 messages")
+    parser.add_argument("captures", metavar="FILE", nargs='*', default=default_captures,
+                        help="the capture files to read DHCPv6 messages from")
+    parser.add_argument("-c", "--copies", type=int, default=100,
+                        help="how many times to parse each message")
+    parser.add_argument("-l", "--lazy", action="store_true",
+                        help="only decode options when they are accessed")
+    args = parser.parse_args(args)
+
+    LazyOptionsMixin.lazy_option_decoding = args.lazy
+
+    groups = group_payloads(load_payloads(args.captures))
+    if not any(groups.values()):
+        parser.error("No Solicit, Request or Renew messages found")
+
+    for message_type, payloads in groups.items():
+        if not payloads:
+            continue
+
+        size, blocks = measure_memory(payloads, args.copies)
+        print("{:20} {:3} messages  {:8.0f} bytes  {:6.1f} blocks per message".format(
+            message_type.__name__ + ':', len(payloads), size, blocks))
+
+
+if __name__ == '__main__':
+    main()
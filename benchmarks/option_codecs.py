@@ -0,0 +1,255 @@
+"""
+Benchmark the generated option codecs against the hand-written implementations they replaced. The hand-written
+``load_from`` and ``save`` methods are kept here as subclasses of the current option classes, so both versions
+validate in exactly the same way and only the codecs differ.
+"""
+import argparse
+import time
+from ipaddress import IPv6Address
+from struct import unpack_from, pack
+
+from dhcpkit.ipv6.duids import DUID, LinkLayerDUID
+from dhcpkit.ipv6.options import Option, IANAOption, IAAddressOption, OptionRequestOption, ElapsedTimeOption, \
+    StatusCodeOption, ClientIdOption
+
+
+class HandWrittenClientIdOption(ClientIdOption):
+    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
+        my_offset, option_len = self.parse_option_header(buffer, offset, length)
+
+        duid_len, self.duid = DUID.parse(buffer, offset=offset + my_offset, length=option_len)
+        my_offset += duid_len
+
+        self.validate()
+
+        return my_offset
+
+    def save(self) -> bytes:
+        self.validate()
+
+        duid_buffer = self.duid.save()
+        return pack('!HH', self.option_type, len(duid_buffer)) + duid_buffer
+
+
+class HandWrittenIANAOption(IANAOption):
+    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
+        my_offset, option_len = self.parse_option_header(buffer, offset, length)
+        header_offset = my_offset
+
+        self.iaid = bytes(buffer[offset + my_offset:offset + my_offset + 4])
+        my_offset += 4
+
+        self.t1, self.t2 = unpack_from('!II', buffer, offset + my_offset)
+        my_offset += 8
+
+        # Parse the options
+        self.options = []
+        max_offset = option_len + header_offset  # The option_len field counts bytes *after* the header fields
+        while max_offset > my_offset:
+            used_buffer, option = Option.parse(buffer, offset=offset + my_offset)
+            self.options.append(option)
+            my_offset += used_buffer
+
+        if my_offset != max_offset:
+            raise ValueError('Option length does not match the combined length of the parsed options')
+
+        self.validate()
+
+        return my_offset
+
+    def save(self) -> bytes:
+        self.validate()
+
+        options_buffer = bytearray()
+        for option in self.options:
+            options_buffer.extend(option.save())
+
+        buffer = bytearray()
+        buffer.extend(pack('!HH4sII', self.option_type, len(options_buffer) + 12, self.iaid, self.t1, self.t2))
+        buffer.extend(options_buffer)
+        return buffer
+
+
+class HandWrittenIAAddressOption(IAAddressOption):
+    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
+        my_offset, option_len = self.parse_option_header(buffer, offset, length)
+        header_offset = my_offset
+
+        self.address = IPv6Address(bytes(buffer[offset + my_offset:offset + my_offset + 16]))
+        my_offset += 16
+
+        self.preferred_lifetime, self.valid_lifetime = unpack_from('!II', buffer, offset + my_offset)
+        my_offset += 8
+
+        # Parse the options
+        self.options = []
+        max_offset = option_len + header_offset  # The option_len field counts bytes *after* the header fields
+        while max_offset > my_offset:
+            used_buffer, option = Option.parse(buffer, offset=offset + my_offset)
+            self.options.append(option)
+            my_offset += used_buffer
+
+        if my_offset != max_offset:
+            raise ValueError('Option length does not match the combined length of the parsed options')
+
+        self.validate()
+
+        return my_offset
+
+    def save(self) -> bytes:
+        self.validate()
+
+        options_buffer = bytearray()
+        for option in self.options:
+            options_buffer.extend(option.save())
+
+        buffer = bytearray()
+        buffer.extend(pack('!HH', self.option_type, len(options_buffer) + 24))
+        buffer.extend(self.address.packed)
+        buffer.extend(pack('!II', self.preferred_lifetime, self.valid_lifetime))
+        buffer.extend(options_buffer)
+        return buffer
+
+
+class HandWrittenOptionRequestOption(OptionRequestOption):
+    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
+        my_offset, option_len = self.parse_option_header(buffer, offset, length)
+
+        if option_len % 2 != 0:
+            raise ValueError('Invalid option length')
+
+        self.requested_options = list(unpack_from('!{}H'.format(option_len // 2), buffer, offset + my_offset))
+        my_offset += option_len
+
+        self.validate()
+
+        return my_offset
+
+    def save(self) -> bytes:
+        self.validate()
+
+        buffer = bytearray()
+        buffer.extend(pack('!HH', self.option_type, len(self.requested_options) * 2))
+        buffer.extend(pack('!{}H'.format(len(self.requested_options)), *self.requested_options))
+        return buffer
+
+
+class HandWrittenElapsedTimeOption(ElapsedTimeOption):
+    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
+        my_offset, option_len = self.parse_option_header(buffer, offset, length)
+
+        if option_len != 2:
+            raise ValueError('Elapsed Time Options must have length 2')
+
+        self.elapsed_time = unpack_from('!H', buffer, offset=offset + my_offset)[0]
+        my_offset += 2
+
+        self.validate()
+
+        return my_offset
+
+    def save(self) -> bytes:
+        self.validate()
+        return pack('!HHH', self.option_type, 2, self.elapsed_time)
+
+
+class HandWrittenStatusCodeOption(StatusCodeOption):
+    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
+        my_offset, option_len = self.parse_option_header(buffer, offset, length)
+
+        self.status_code = unpack_from('!H', buffer, offset=offset + my_offset)[0]
+        my_offset += 2
+
+        message_length = option_len - 2
+        self.status_message = str(buffer[offset + my_offset:offset + my_offset + message_length], 'utf-8')
+        my_offset += message_length
+
+        self.validate()
+
+        return my_offset
+
+    def save(self) -> bytes:
+        self.validate()
+        message_bytes = self.status_message.encode('utf-8')
+
+        buffer = bytearray()
+        buffer.extend(pack('!HHH', self.option_type, len(message_bytes) + 2, self.status_code))
+        buffer.extend(message_bytes)
+        return buffer
+
+
+fixtures = [
+    (HandWrittenClientIdOption,
+     ClientIdOption(LinkLayerDUID(hardware_type=1, link_layer_address=bytes.fromhex('3431c43cb2f1')))),
+    (HandWrittenIANAOption,
+     IANAOption(b'\xc4\x3c\xb2\xf1', 3600, 5400, options=[IAAddressOption(IPv6Address('2001:db8::1'), 7200, 10800)])),
+    (HandWrittenIAAddressOption, IAAddressOption(IPv6Address('2001:db8::1'), 7200, 10800)),
+    (HandWrittenOptionRequestOption, OptionRequestOption([23, 24, 31, 56, 82])),
+    (HandWrittenElapsedTimeOption, ElapsedTimeOption(100)),
+    (HandWrittenStatusCodeOption, StatusCodeOption(2, 'No addresses available')),
+]
+
+
+def measure(function, duration: float, rounds: int = 5) -> float:
+    """
+    Call the function over and over again for the given duration, and report the best rate of several rounds to reduce
+    the influence of other activity on the machine
+
+    :param function: The function to call
+    :param duration: The number of seconds to keep calling
+    :param rounds: The number of rounds to divide the duration in
+    :return: The number of calls per second
+    """
+    best = 0
+    for _ in range(rounds):
+        count = 0
+        start = time.perf_counter()
+        end = start + duration / rounds
+        now = start
+        while now < end:
+            for _ in range(100):
+                function()
+            count += 100
+            now = time.perf_counter()
+
+        best = max(best, count / (now - start))
+
+    return best
+
+
+def main(args: [str] = None):
+    """
+    Run the benchmark
+
+    :param args: Command line arguments
+    """
+    parser = argparse.ArgumentParser(description="Benchmark generated option codecs against hand-written ones")
+    parser.add_argument("-d", "--duration", type=float, default=1.0,
+                        help="the number of seconds to run each measurement")
+    args = parser.parse_args(args)
+
+    print("{:30} {:>12} {:>12} {:>8} {:>12} {:>12} {:>8}".format(
+        "Option", "load (hand)", "load (gen)", "speedup", "save (hand)", "save (gen)", "speedup"))
+
+    for hand_written_class, option in fixtures:
+        generated_class = type(option)
+        option_bytes = bytes(option.save())
+
+        # Both implementations must agree
+        hand_written = hand_written_class()
+        hand_written.load_from(option_bytes)
+        assert bytes(hand_written.save()) == option_bytes
+
+        load_hand = measure(lambda: hand_written_class().load_from(option_bytes), args.duration)
+        load_generated = measure(lambda: generated_class().load_from(option_bytes), args.duration)
+        save_hand = measure(hand_written.save, args.duration)
+        save_generated = measure(option.save, args.duration)
+
+        print("{:30} {:12.0f} {:12.0f} {:7.2f}x {:12.0f} {:12.0f} {:7.2f}x".format(
+            generated_class.__name__,
+            load_hand, load_generated, load_generated / load_hand,
+            save_hand, save_generated, save_generated / save_hand))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark parsing the DHCPv6 messages in the captures that are included with the source. Both the parse rate and the
+number of memory blocks that are allocated per parsed message are reported.
+"""
+import argparse
+import glob
+import os
+import time
+import tracemalloc
+
+from dhcpkit.ipv6.messages import Message, LazyOptionsMixin, RelayServerMessage
+from dhcpkit.ipv6.options import ClientIdOption, OptionRequestOption
+from dhcpkit.pcap import read_dhcpv6_datagrams
+
+default_captures = sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'pcaps', '*')))
+
+
+def load_payloads(filenames: [str]) -> [bytes]:
+    """
+    Read the DHCPv6 payloads from the given capture files
+
+    :param filenames: The capture files
+    :return: The payloads of all DHCPv6 packets in them
+    """
+    payloads = []
+    for filename in filenames:
+        payloads.extend([datagram.payload for datagram in read_dhcpv6_datagrams(filename)])
+    return payloads
+
+
+def measure_rate(payloads: [bytes], duration: float) -> float:
+    """
+    Parse the payloads over and over again for the given duration
+
+    :param payloads: The payloads to parse
+    :param duration: The number of seconds to keep parsing
+    :return: The number of parsed messages per second
+    """
+    count = 0
+    start = time.perf_counter()
+    end = start + duration
+    now = start
+    while now < end:
+        for payload in payloads:
+            Message.parse(payload)
+        count += len(payloads)
+        now = time.perf_counter()
+
+    return count / (now - start)
+
+
+def measure_lookup_rate(payloads: [bytes], duration: float) -> float:
+    """
+    Parse the payloads over and over again for the given duration, and look up the options that every request handler
+    needs, like a server would
+
+    :param payloads: The payloads to parse
+    :param duration: The number of seconds to keep parsing
+    :return: The number of handled messages per second
+    """
+    count = 0
+    start = time.perf_counter()
+    end = start + duration
+    now = start
+    while now < end:
+        for payload in payloads:
+            message = Message.parse(payload)[1]
+            if isinstance(message, RelayServerMessage):
+                message = message.inner_message
+            message.get_option_of_type(ClientIdOption)
+            message.get_option_of_type(OptionRequestOption)
+        count += len(payloads)
+        now = time.perf_counter()
+
+    return count / (now - start)
+
+
+def measure_allocations(payloads: [bytes]) -> float:
+    """
+    Count the number of memory blocks that are allocated while parsing, including the ones that are freed again
+
+    :param payloads: The payloads to parse
+    :return: The average number of allocated blocks per message
+    """
+    tracemalloc.start()
+    try:
+        # Trace the blocks that are alive at the end, and track the peak to see temporary allocations
+        before = tracemalloc.take_snapshot()
+        messages = [Message.parse(payload)[1] for payload in payloads]
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    stats = after.compare_to(before, 'filename')
+    blocks = sum(stat.count_diff for stat in stats if stat.count_diff > 0)
+
+    # Don't count the list that holds the results
+    del messages
+    return (blocks - 1) / len(payloads)
+
+
+def main(args: [str] = None):
+    """
+    Run the benchmark
+
+    :param args: Command line arguments
+    """
+    parser = argparse.ArgumentParser(description="Benchmark parsing DHCPv6 messages from packet captures")
+    parser.add_argument("captures", metavar="FILE", nargs='*', default=default_captures,
+                        help="the capture files to read DHCPv6 messages from")
+    parser.add_argument("-d", "--duration", type=float, default=2.0,
+                        help="the number of seconds to run each measurement")
+    parser.add_argument("-l", "--lazy", action="store_true",
+                        help="only decode options when they are accessed")
+    args = parser.parse_args(args)
+
+    LazyOptionsMixin.lazy_option_decoding = args.lazy
+
+    payloads = load_payloads(args.captures)
+    if not payloads:
+        parser.error("No DHCPv6 messages found")
+
+    print("{} messages from {} capture files".format(len(payloads), len(args.captures)))
+    print("Parse rate:        {:10.0f} messages/s".format(measure_rate(payloads, args.duration)))
+    print("Parse and lookup:  {:10.0f} messages/s".format(measure_lookup_rate(payloads, args.duration)))
+    print("Retained blocks:   {:10.1f} per message".format(measure_allocations(payloads)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""
+Benchmark the server cores against each other: the selector loop with worker threads, with and without draining the
+sockets in batches, and the asyncio core with the message handler in an executor or inline. The server listens on ::1
+and a client in another thread sends Solicit and Information-Request messages, keeping a fixed number of requests
+outstanding, and counts the replies. The message handler is cheap, so this mostly measures the overhead of the server
+core itself.
+
+Because the server has to listen on the DHCPv6 server port this benchmark has to be run as root.
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+from benchmarks.codec_suite import synthetic_messages
+from benchmarks.handle_pcaps import create_handler
+from dhcpkit.ipv6 import CLIENT_PORT, SERVER_PORT
+from dhcpkit.ipv6.listening_socket import ListeningSocket
+from dhcpkit.ipv6.messages import InformationRequestMessage, SolicitMessage
+from dhcpkit.ipv6.server import ServerConfigParser, serve_with_threads
+
+core_config_template = '''
+[server]
+core = {core}
+handler-mode = {handler_mode}
+threads = {threads}
+batch-size = {batch_size}
+queue-limit-high = 1000
+queue-limit-low = 1000
+deadlines = yes
+exception-window = 1.0
+max-exceptions = 10
+'''
+
+# The name of each variant with its server core, handler mode and whether the sockets are drained in batches
+variants = {
+    'threads-unbatched': ('threads', 'executor', False),
+    'threads': ('threads', 'executor', True),
+    'asyncio-executor': ('asyncio', 'executor', True),
+    'asyncio-inline': ('asyncio', 'inline', True),
+}
+
+
+class Client(threading.Thread):
+    """
+    Send requests to the server and count the replies. The server is stopped when all requests are sent.
+
+    :param requests: The requests to send, in rotation
+    :param count: The number of requests to send
+    :param window: The number of requests to keep outstanding
+    """
+
+    def __init__(self, requests: [bytes], count: int, window: int):
+        super().__init__()
+        self.requests = requests
+        self.count = count
+        self.window = window
+
+        self.replies = 0
+        self.lost = 0
+        self.duration = None
+
+    def run(self):
+        """
+        Wait until the server answers, then send the requests and measure the time until the replies are in.
+        """
+        sock = socket.socket(socket.AF_INET6, socket.SOCK_DGRAM)
+        sock.bind(('::1', CLIENT_PORT))
+        server = ('::1', SERVER_PORT)
+        try:
+            # Wait for the server to be ready
+            sock.settimeout(0.1)
+            for attempt in range(50):
+                sock.sendto(self.requests[0], server)
+                try:
+                    sock.recv(65536)
+                    break
+                except socket.timeout:
+                    pass
+
+            sock.settimeout(1.0)
+            sent = 0
+            outstanding = 0
+            start = time.perf_counter()
+            while self.replies + self.lost < self.count:
+                while outstanding < self.window and sent < self.count:
+                    sock.sendto(self.requests[sent % len(self.requests)], server)
+                    sent += 1
+                    outstanding += 1
+
+                try:
+                    sock.recv(65536)
+                    self.replies += 1
+                    outstanding -= 1
+                except socket.timeout:
+                    # Whatever is still outstanding isn't going to be answered anymore
+                    self.lost += outstanding
+                    outstanding = 0
+
+            self.duration = time.perf_counter() - start
+        finally:
+            sock.close()
+
+            # Tell the server to stop
+            os.kill(os.getpid(), signal.SIGTERM)
+
+
+def run_variant(name: str, requests: [bytes], count: int, window: int, threads: int, batch_size: int) -> Client:
+    """
+    Start a server with the given variant of the server core and let a client send requests to it.
+
+    :param name: The name of the variant
+    :param requests: The requests to send
+    :param count: The number of requests to send
+    :param window: The number of requests to keep outstanding
+    :param threads: The number of worker threads
+    :param batch_size: The maximum number of packets to receive at once
+    :return: The client with the results
+    """
+    core, handler_mode, batched = variants[name]
+    config = ServerConfigParser()
+    config.read_string(core_config_template.format(core=core, handler_mode=handler_mode, threads=threads,
+                                                   batch_size=batch_size if batched else 1))
+
+    listen_socket = socket.socket(socket.AF_INET6, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    listen_socket.bind(('::1', SERVER_PORT))
+    sockets = [ListeningSocket('lo', listen_socket)]
+
+    client = Client(requests, count, window)
+    client.start()
+    try:
+        if core == 'asyncio':
+            from dhcpkit.ipv6.async_server import serve_with_asyncio
+            serve_with_asyncio(config, create_handler(), sockets)
+        else:
+            serve_with_threads(config, create_handler(), sockets)
+    finally:
+        client.join()
+        listen_socket.close()
+
+    return client
+
+
+def main(args: [str] = None) -> int:
+    """
+    Run the benchmark
+
+    :param args: Command line arguments
+    :return: The exit code
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the server cores against each other")
+    parser.add_argument("variants", metavar="VARIANT", nargs='*', default=list(variants),
+                        help="the server core variants to benchmark: {}".format(', '.join(variants)))
+    parser.add_argument("-n", "--count", type=int, default=20000,
+                        help="the number of requests to send to each variant")
+    parser.add_argument("-w", "--window", type=int, default=16,
+                        help="the number of requests to keep outstanding")
+    parser.add_argument("-t", "--threads", type=int, default=10,
+                        help="the number of worker threads")
+    parser.add_argument("-b", "--batch-size", type=int, default=32,
+                        help="the maximum number of packets the threads core receives at once")
+    args = parser.parse_args(args)
+
+    unknown_variants = [name for name in args.variants if name not in variants]
+    if unknown_variants:
+        parser.error("Unknown variants: {}".format(', '.join(unknown_variants)))
+
+    requests = [bytes(message.save()) for message in synthetic_messages()
+                if isinstance(message, (SolicitMessage, InformationRequestMessage))]
+
+    print("{:<18}  {:>10}  {:>8}".format('Variant', 'Replies/s', 'Lost'))
+    for name in args.variants:
+        client = run_variant(name, requests, args.count, args.window, args.threads, args.batch_size)
+        if client.duration is None:
+            print("{:<18}  failed".format(name))
+            continue
+
+        print("{:<18}  {:10.0f}  {:8d}".format(name, client.replies / client.duration, client.lost))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+Benchmark the cold start of the server for the example configurations in the ``etc`` directory. Every start is a new
+Python process that imports the server, reads the configuration and creates the message handler with all its option
+handlers, like ``ipv6-dhcpd`` does before it starts listening. Looking at the network interfaces and creating sockets
+depends on the machine, so that part is left out. The example configurations are copied to a temporary directory
+together with the assignments they refer to.
+
+The exit code is 1 when the median start of a configuration takes longer than the budget or fails, so this can be used
+to keep an eye on the startup time.
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+source_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+default_configs = sorted(glob.glob(os.path.join(source_root, 'etc', '*.ini')))
+
+# Modules that should only be imported when a configuration needs them
+optional_modules = ('dbm', 'netifaces', 'shelve', 'sqlite3')
+
+# The code that is run in each new Python process
+start_server_code = '''
+import json, os, sys
+from dhcpkit.startup_profiler import StartupProfiler
+
+profiler = StartupProfiler(measure_imports=False)
+with profiler.phase('import server'):
+    from dhcpkit.ipv6 import server
+
+with profiler.phase('load configuration'):
+    config = server.load_config(sys.argv[1])
+    os.chdir(config['server']['working-directory'])
+    config['server']['duid'] = '000300010024362ffe60'
+
+with profiler.phase('set up codecs'):
+    server.set_up_codecs(config)
+
+with profiler.phase('create message handler'):
+    server.get_handler(config)
+
+json.dump({
+    'phases': {name: duration for name, duration, new_modules in profiler.phases},
+    'modules': sorted(sys.modules),
+}, sys.stdout)
+'''
+
+
+def python_environment() -> dict:
+    """
+    The environment for the new Python processes. The server changes to the directory of the configuration, so the
+    source tree must be on the path explicitly for its entry points to be found when dhcpkit isn't installed.
+
+    :return: The environment variables
+    """
+    environment = dict(os.environ)
+    environment['PYTHONPATH'] = os.pathsep.join(filter(None, [source_root, environment.get('PYTHONPATH')]))
+    return environment
+
+
+def prepare_configs(configs: [str], directory: str) -> [str]:
+    """
+    Copy the configurations and the CSV files next to them to the directory, and create the shelf and SQLite
+    assignment files from the CSV files.
+
+    :param configs: The configuration files
+    :param directory: The directory to copy them to
+    :return: The names of the copied configuration files
+    """
+    copies = []
+    for config in configs:
+        copies.append(shutil.copy(config, directory))
+
+        for csv_filename in glob.glob(os.path.join(os.path.dirname(config), '*.csv')):
+            csv_copy = shutil.copy(csv_filename, directory)
+            base_name = os.path.splitext(os.path.basename(csv_filename))[0].rsplit('-', 1)[0]
+
+            for module, function, extension in (('shelf', 'create_shelf_from_csv', 'shelf'),
+                                                ('sqlite', 'create_sqlite_from_csv', 'sqlite')):
+                destination = os.path.join(directory, base_name + '.' + extension)
+                if os.path.exists(destination):
+                    continue
+
+                code = 'import sys\nfrom dhcpkit.ipv6.option_handlers.{} import {}\nsys.exit({}())'.format(
+                    module, function, function)
+                subprocess.run([sys.executable, '-c', code, csv_copy, destination], env=python_environment(),
+                               check=True)
+
+    return copies
+
+
+def start_server(config: str) -> (float, dict):
+    """
+    Start the server in a new Python process.
+
+    :param config: The configuration file
+    :return: The wall clock time in seconds and the result reported by the process
+    """
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, '-c', start_server_code, config],
+                             env=python_environment(), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                             universal_newlines=True)
+    duration = time.perf_counter() - start
+
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr.strip().splitlines()[-1] if process.stderr.strip() else
+                           "Exit code {}".format(process.returncode))
+
+    return duration, json.loads(process.stdout)
+
+
+def measure_config(config: str, runs: int) -> dict:
+    """
+    Start the server a number of times and summarise the results.
+
+    :param config: The configuration file
+    :param runs: The number of times to start
+    :return: The median durations in seconds and the optional modules that were imported
+    """
+    durations = []
+    phases = {}
+    modules = []
+    for run in range(runs):
+        duration, result = start_server(config)
+        durations.append(duration)
+        for name, phase_duration in result['phases'].items():
+            phases.setdefault(name, []).append(phase_duration)
+        modules = result['modules']
+
+    return {
+        'total': statistics.median(durations),
+        'phases': {name: statistics.median(phase_durations) for name, phase_durations in phases.items()},
+        'optional': [module for module in optional_modules if module in modules],
+    }
+
+
+def main(args: [str] = None) -> int:
+    """
+    Run the benchmark
+
+    :param args: Command line arguments
+    :return: The exit code
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the cold start of the server")
+    parser.add_argument("configs", metavar="FILE", nargs='*', default=default_configs,
+                        help="the configuration files to start the server with")
+    parser.add_argument("-n", "--runs", type=int, default=5,
+                        help="the number of times to start the server for each configuration")
+    parser.add_argument("-b", "--budget", type=float, default=500.0,
+                        help="the maximum median start time in milliseconds")
+    args = parser.parse_args(args)
+
+    over_budget = []
+    with tempfile.TemporaryDirectory() as directory:
+        configs = prepare_configs(args.configs, directory)
+
+        name_width = max(len(os.path.basename(config)) for config in configs)
+        print("{:<{width}}  {:>8}  {:>8}  {:>8}  {}".format('Config', 'Total', 'Import', 'Handler', 'Optional imports',
+                                                           width=name_width))
+        for config in configs:
+            name = os.path.basename(config)
+            try:
+                result = measure_config(config, args.runs)
+            except RuntimeError as e:
+                print("{:<{width}}  failed: {}".format(name, e, width=name_width))
+                over_budget.append(name)
+                continue
+
+            print("{:<{width}}  {:6.1f}ms  {:6.1f}ms  {:6.1f}ms  {}".format(
+                name, result['total'] * 1000, result['phases']['import server'] * 1000,
+                result['phases']['create message handler'] * 1000, ', '.join(result['optional']) or '-',
+                width=name_width))
+
+            if result['total'] * 1000 > args.budget:
+                over_budget.append(name)
+
+    if over_budget:
+        print("\nOver the budget of {}ms: {}".format(args.budget, ', '.join(over_budget)))
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
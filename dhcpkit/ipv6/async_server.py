@@ -0,0 +1,280 @@
+"""
+A server core based on :mod:`asyncio`, as an alternative to the selector loop and worker threads of the standard
+server core. Each listening socket becomes a datagram endpoint of the event loop, and requests are decoded as soon as
+the loop receives them. The message handler can be run in three ways:
+
+- ``inline``: in the event loop itself, which avoids a thread switch and a future per request. This is the fastest
+  option for handlers that don't block, but a slow request holds up all others.
+- ``executor``: in a pool of worker threads, like the standard server core does. Replies are sent from the event loop.
+- as a coroutine: if the ``handle`` method of the message handler is a coroutine function it is always run as a task
+  of the event loop, so it can wait for other things without blocking the server.
+"""
+import asyncio
+import concurrent.futures
+import configparser
+import logging
+import signal
+import time
+from functools import partial
+
+from dhcpkit.ipv6.exceptions import DroppedPacketError, InvalidPacketError
+from dhcpkit.ipv6.listening_socket import ListeningSocket
+from dhcpkit.ipv6.message_handlers import MessageHandler
+from dhcpkit.ipv6.messages import RelayForwardMessage
+from dhcpkit.ipv6.server import send_handler_reply
+
+logger = logging.getLogger(__name__)
+
+HANDLER_INLINE = 'inline'
+HANDLER_EXECUTOR = 'executor'
+
+handler_modes = (HANDLER_INLINE, HANDLER_EXECUTOR)
+
+
+class ListeningProtocol(asyncio.DatagramProtocol):
+    """
+    Datagram protocol that passes the packets received on a listening socket to the server.
+
+    :param server: The server that handles the requests
+    :param listening_socket: The listening socket that this protocol receives from
+    """
+
+    def __init__(self, server: 'AsyncServer', listening_socket: ListeningSocket):
+        self.server = server
+        self.listening_socket = listening_socket
+
+    def datagram_received(self, data: bytes, addr: tuple):
+        """
+        Pass the received packet to the server.
+
+        :param data: The received packet
+        :param addr: The address of the sender
+        """
+        self.server.request_received(self.listening_socket, data, addr)
+
+    def error_received(self, exc: OSError):
+        """
+        Log errors from the socket.
+
+        :param exc: The error
+        """
+        logger.error("Error on socket for {} on {}: {}".format(self.listening_socket.listen_address,
+                                                              self.listening_socket.interface_name, exc))
+
+
+class AsyncServer:
+    """
+    Handle requests from listening sockets with an asyncio event loop.
+
+    :param config: The configuration, given to the message handler when it is reloaded
+    :param handler: The message handler
+    :param sockets: The sockets to handle requests from
+    :param handler_mode: How to run the message handler if it isn't a coroutine, one of :data:`handler_modes`
+    :param workers: The number of worker threads when running the message handler in an executor
+    :param exception_window: The number of seconds in which exceptions are counted
+    :param max_exceptions: The number of exceptions in the window after which the server stops
+    """
+
+    def __init__(self, config: configparser.ConfigParser, handler: MessageHandler, sockets: [ListeningSocket],
+                 handler_mode: str = HANDLER_EXECUTOR, workers: int = 10,
+                 exception_window: float = 1.0, max_exceptions: int = 10):
+        if handler_mode not in handler_modes:
+            raise ValueError("Handler mode must be one of: {}".format(', '.join(handler_modes)))
+
+        self.config = config
+        self.handler = handler
+        self.sockets = sockets
+        self.handler_mode = handler_mode
+        self.workers = workers
+        self.exception_window = exception_window
+        self.max_exceptions = max_exceptions
+
+        self.handler_is_coroutine = asyncio.iscoroutinefunction(handler.handle)
+        """Whether the message handler is run as a task of the event loop"""
+
+        self.loop = None
+        self.executor = None
+        self.transports = []
+        self.pending = set()
+        self.exception_history = []
+        self.stopped = None
+
+    def request_received(self, listening_socket: ListeningSocket, data: bytes, sender: tuple):
+        """
+        Decode a received request and start handling it.
+
+        :param listening_socket: The listening socket the request was received on
+        :param data: The received packet
+        :param sender: The address of the sender
+        """
+        if self.stopped.is_set():
+            # Only finish the requests that are already being handled
+            return
+
+        # noinspection PyBroadException
+        try:
+            try:
+                msg_in = listening_socket.decode_request(data, sender)
+            except DroppedPacketError as e:
+                logger.debug("Ignoring message from {}: {}".format(e.sender[0], e.reason))
+                return
+            except InvalidPacketError as e:
+                logger.warning("Invalid message from {}: {}".format(e.sender[0], str(e)))
+                return
+            except ValueError as e:
+                logger.warning("Invalid incoming message: {}".format(str(e)))
+                return
+
+            received_over_multicast = listening_socket.listen_address.is_multicast
+
+            if self.handler_is_coroutine:
+                future = self.loop.create_task(self.handler.handle(msg_in, received_over_multicast))
+            elif self.handler_mode == HANDLER_INLINE:
+                self.handle_inline(listening_socket, msg_in, received_over_multicast)
+                return
+            else:
+                future = self.loop.run_in_executor(self.executor, self.handler.handle, msg_in,
+                                                   received_over_multicast)
+
+            self.pending.add(future)
+            future.add_done_callback(partial(self.handler_done, listening_socket))
+
+        except Exception as e:
+            self.exception_caught(e)
+
+    def handle_inline(self, listening_socket: ListeningSocket, msg_in: RelayForwardMessage,
+                      received_over_multicast: bool):
+        """
+        Let the message handler handle the request in the event loop and send the reply.
+
+        :param listening_socket: The listening socket the request was received on
+        :param msg_in: The received request
+        :param received_over_multicast: Whether the request was received over multicast
+        """
+        # noinspection PyBroadException
+        try:
+            send_handler_reply(listening_socket, self.handler.handle(msg_in, received_over_multicast))
+        except Exception as e:
+            # Like the standard server core a failing message handler only affects this request
+            logger.exception("Caught unexpected exception {!r}".format(e))
+
+    def handler_done(self, listening_socket: ListeningSocket, future: asyncio.Future):
+        """
+        Send the reply when the message handler is done.
+
+        :param listening_socket: The listening socket the request was received on
+        :param future: The future with the result of the message handler
+        """
+        self.pending.discard(future)
+
+        if future.cancelled():
+            return
+
+        # noinspection PyBroadException
+        try:
+            send_handler_reply(listening_socket, future.result())
+        except Exception as e:
+            logger.exception("Caught unexpected exception {!r}".format(e))
+
+    def exception_caught(self, exception: Exception):
+        """
+        Log an unexpected exception, and stop the server when there are too many of them shortly after each other.
+
+        :param exception: The exception
+        """
+        logger.exception("Caught unexpected exception {!r}".format(exception))
+
+        now = time.monotonic()
+        self.exception_history.append(now)
+
+        # Remove exceptions outside the window from the history
+        cutoff = now - self.exception_window
+        while self.exception_history and self.exception_history[0] < cutoff:
+            self.exception_history.pop(0)
+
+        if len(self.exception_history) > self.max_exceptions:
+            logger.critical("Received more than {} exceptions in {} seconds, exiting".format(self.max_exceptions,
+                                                                                             self.exception_window))
+            self.stop()
+
+    def reload(self):
+        """
+        Tell the message handler to reload.
+        """
+        logger.debug("Received reload request")
+        self.handler.reload(self.config)
+
+    def stop(self):
+        """
+        Stop handling requests.
+        """
+        if self.stopped and not self.stopped.is_set():
+            logger.debug("Received termination request")
+            self.stopped.set()
+
+    async def serve(self, handle_signals: bool = True):
+        """
+        Handle requests until the server is stopped. Requests that are being handled when the server stops are
+        finished first.
+
+        :param handle_signals: Whether to reload on SIGHUP and stop on SIGINT and SIGTERM
+        """
+        self.loop = asyncio.get_event_loop()
+        self.stopped = asyncio.Event()
+
+        if self.handler_mode == HANDLER_EXECUTOR and not self.handler_is_coroutine:
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers)
+
+        if handle_signals:
+            self.loop.add_signal_handler(signal.SIGHUP, self.reload)
+            self.loop.add_signal_handler(signal.SIGINT, self.stop)
+            self.loop.add_signal_handler(signal.SIGTERM, self.stop)
+
+        try:
+            for listening_socket in self.sockets:
+                transport, protocol = await self.loop.create_datagram_endpoint(
+                    partial(ListeningProtocol, self, listening_socket), sock=listening_socket.listen_socket)
+                self.transports.append(transport)
+
+            logger.info("Python DHCPv6 server is ready to handle requests using asyncio")
+
+            await self.stopped.wait()
+
+        finally:
+            # The sockets are still needed to send the replies to the last requests
+            if self.pending:
+                await asyncio.wait(self.pending)
+
+            for transport in self.transports:
+                transport.close()
+            self.transports = []
+
+            if self.executor:
+                self.executor.shutdown()
+                self.executor = None
+
+            if handle_signals:
+                for signal_nr in (signal.SIGHUP, signal.SIGINT, signal.SIGTERM):
+                    self.loop.remove_signal_handler(signal_nr)
+
+
+def serve_with_asyncio(config: configparser.ConfigParser, handler: MessageHandler, sockets: [ListeningSocket]):
+    """
+    Handle requests with an asyncio event loop until the server is told to stop. The handler mode must have been
+    checked already.
+
+    :param config: The configuration
+    :param handler: The message handler
+    :param sockets: The sockets to handle requests from
+    """
+    server = AsyncServer(config, handler, sockets,
+                         handler_mode=config['server']['handler-mode'].lower(),
+                         workers=max(1, config['server'].getint('threads')),
+                         exception_window=config['server'].getfloat('exception-window'),
+                         max_exceptions=config['server'].getint('max-exceptions'))
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(server.serve())
+    finally:
+        loop.close()
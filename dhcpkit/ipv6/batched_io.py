@@ -0,0 +1,380 @@
+"""
+Receive and send UDP packets in batches. On Linux the ``recvmmsg`` and ``sendmmsg`` system calls are used through
+:mod:`ctypes`, so a whole batch of packets only costs a single system call. Elsewhere, or when the C library doesn't
+provide them, the packets are received with a loop of non-blocking ``recvfrom`` calls and sent with a loop of
+``sendto`` calls, which still saves going back to the selector for every packet.
+
+Only IPv6 sockets are supported, and the addresses look exactly like the ones that :meth:`socket.socket.recvfrom`
+returns. Where the kernel supports ``SO_TIMESTAMPNS`` every received packet comes with the time at which the kernel
+received it, otherwise with the time at which it was read from the socket.
+"""
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import socket
+import struct
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+# Large enough for any UDP datagram
+RECEIVE_BUFFER_SIZE = 65536
+
+# Python doesn't provide this constant, the value is the one used on Linux for most architectures
+SO_TIMESTAMPNS = getattr(socket, 'SO_TIMESTAMPNS', 35 if sys.platform.startswith('linux') else None)
+SCM_TIMESTAMPNS = SO_TIMESTAMPNS
+
+
+class IOVec(ctypes.Structure):
+    """
+    The ``struct iovec`` of the C library
+    """
+    _fields_ = [
+        ('iov_base', ctypes.c_void_p),
+        ('iov_len', ctypes.c_size_t),
+    ]
+
+
+class TimeSpec(ctypes.Structure):
+    """
+    The ``struct timespec`` of the C library
+    """
+    _fields_ = [
+        ('tv_sec', ctypes.c_long),
+        ('tv_nsec', ctypes.c_long),
+    ]
+
+
+class CMsgHdr(ctypes.Structure):
+    """
+    The ``struct cmsghdr`` of the C library, which is followed by the data of the control message
+    """
+    _fields_ = [
+        ('cmsg_len', ctypes.c_size_t),
+        ('cmsg_level', ctypes.c_int),
+        ('cmsg_type', ctypes.c_int),
+    ]
+
+
+# Room for the arrival time of a packet
+CONTROL_BUFFER_SIZE = socket.CMSG_SPACE(ctypes.sizeof(TimeSpec))
+
+
+class MsgHdr(ctypes.Structure):
+    """
+    The ``struct msghdr`` of the C library
+    """
+    _fields_ = [
+        ('msg_name', ctypes.c_void_p),
+        ('msg_namelen', ctypes.c_uint32),
+        ('msg_iov', ctypes.POINTER(IOVec)),
+        ('msg_iovlen', ctypes.c_size_t),
+        ('msg_control', ctypes.c_void_p),
+        ('msg_controllen', ctypes.c_size_t),
+        ('msg_flags', ctypes.c_int),
+    ]
+
+
+class MMsgHdr(ctypes.Structure):
+    """
+    The ``struct mmsghdr`` of the C library
+    """
+    _fields_ = [
+        ('msg_hdr', MsgHdr),
+        ('msg_len', ctypes.c_uint),
+    ]
+
+
+class SockAddrIn6(ctypes.Structure):
+    """
+    The ``struct sockaddr_in6`` of Linux. The port and flow info are in network byte order.
+    """
+    _fields_ = [
+        ('sin6_family', ctypes.c_uint16),
+        ('sin6_port', ctypes.c_uint16),
+        ('sin6_flowinfo', ctypes.c_uint32),
+        ('sin6_addr', ctypes.c_ubyte * 16),
+        ('sin6_scope_id', ctypes.c_uint32),
+    ]
+
+
+def load_mmsg_functions() -> (object, object) or (None, None):
+    """
+    Find ``recvmmsg`` and ``sendmmsg`` in the C library. The structures above match the Linux ABI, so other platforms
+    use the fallback.
+
+    :return: The recvmmsg and sendmmsg functions, or None if they are not available
+    """
+    if not sys.platform.startswith('linux'):
+        return None, None
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        recvmmsg = libc.recvmmsg
+        sendmmsg = libc.sendmmsg
+    except (OSError, AttributeError):
+        return None, None
+
+    recvmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(MMsgHdr), ctypes.c_uint, ctypes.c_int, ctypes.c_void_p]
+    recvmmsg.restype = ctypes.c_int
+    sendmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(MMsgHdr), ctypes.c_uint, ctypes.c_int]
+    sendmmsg.restype = ctypes.c_int
+
+    return recvmmsg, sendmmsg
+
+
+libc_recvmmsg, libc_sendmmsg = load_mmsg_functions()
+
+
+def decode_sockaddr(sockaddr: SockAddrIn6) -> (str, int, int, int):
+    """
+    Convert a sockaddr_in6 to the tuple that Python uses for IPv6 addresses.
+
+    :param sockaddr: The address structure filled by the kernel
+    :return: The address, port, flow info and scope id
+    """
+    return (socket.inet_ntop(socket.AF_INET6, bytes(sockaddr.sin6_addr)), socket.ntohs(sockaddr.sin6_port),
+            socket.ntohl(sockaddr.sin6_flowinfo), sockaddr.sin6_scope_id)
+
+
+def encode_sockaddr(destination: tuple, sockaddr: SockAddrIn6):
+    """
+    Fill a sockaddr_in6 with a destination in the form that :meth:`socket.socket.sendto` accepts.
+
+    :param destination: The address, port, flow info and scope id
+    :param sockaddr: The address structure to fill
+    """
+    address, port = destination[:2]
+    sockaddr.sin6_family = socket.AF_INET6
+    sockaddr.sin6_addr[:] = socket.inet_pton(socket.AF_INET6, address.split('%')[0])
+    sockaddr.sin6_port = socket.htons(port)
+    sockaddr.sin6_flowinfo = socket.htonl(destination[2] if len(destination) > 2 else 0)
+    sockaddr.sin6_scope_id = destination[3] if len(destination) > 3 else 0
+
+
+def enable_timestamps(sock: socket.socket) -> bool:
+    """
+    Ask the kernel to record the arrival time of every packet received on this socket.
+
+    :param sock: The socket
+    :return: Whether the kernel will provide the arrival times
+    """
+    if SO_TIMESTAMPNS is None or not isinstance(sock, socket.socket):
+        return False
+
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+        return True
+    except OSError:
+        return False
+
+
+def find_timestamp(control: int, control_length: int) -> float or None:
+    """
+    Find the arrival time in the control messages that recvmmsg stored in a control buffer.
+
+    :param control: The address of the control buffer
+    :param control_length: The length of the control messages in the buffer
+    :return: The arrival time as a UNIX timestamp, if present
+    """
+    offset = 0
+    header_length = socket.CMSG_LEN(0)
+    while offset + header_length <= control_length:
+        header = CMsgHdr.from_address(control + offset)
+        if header.cmsg_len < header_length:
+            break
+
+        if header.cmsg_level == socket.SOL_SOCKET and header.cmsg_type == SCM_TIMESTAMPNS:
+            timestamp = TimeSpec.from_address(control + offset + header_length)
+            return timestamp.tv_sec + timestamp.tv_nsec / 1e9
+
+        offset += socket.CMSG_SPACE(header.cmsg_len - header_length)
+
+    return None
+
+
+def find_ancillary_timestamp(ancillary_data: [(int, int, bytes)]) -> float or None:
+    """
+    Find the arrival time in the ancillary data returned by :meth:`socket.socket.recvmsg`.
+
+    :param ancillary_data: The ancillary data
+    :return: The arrival time as a UNIX timestamp, if present
+    """
+    for level, message_type, data in ancillary_data:
+        if level == socket.SOL_SOCKET and message_type == SCM_TIMESTAMPNS:
+            seconds, nanoseconds = struct.unpack_from('@ll', data)
+            return seconds + nanoseconds / 1e9
+
+    return None
+
+
+class BatchReceiver:
+    """
+    Receive packets from a socket in batches without blocking. The buffers are allocated once, so a receiver should
+    only be used by one thread at a time. Creating a receiver enables ``SO_TIMESTAMPNS`` on the socket if possible.
+
+    :param sock: The socket to receive from
+    :param batch_size: The maximum number of packets to receive at once
+    """
+
+    def __init__(self, sock: socket.socket, batch_size: int = 32):
+        self.sock = sock
+        self.batch_size = batch_size
+
+        # Only real sockets have a file descriptor that the kernel understands
+        self.use_mmsg = libc_recvmmsg is not None and isinstance(sock, socket.socket)
+        self.timestamps = enable_timestamps(sock)
+
+        if self.use_mmsg:
+            self.buffers = [ctypes.create_string_buffer(RECEIVE_BUFFER_SIZE) for _ in range(batch_size)]
+            self.controls = [ctypes.create_string_buffer(CONTROL_BUFFER_SIZE) for _ in range(batch_size)]
+            self.addresses = (SockAddrIn6 * batch_size)()
+            self.iovecs = (IOVec * batch_size)()
+            self.headers = (MMsgHdr * batch_size)()
+
+            for index in range(batch_size):
+                self.iovecs[index].iov_base = ctypes.addressof(self.buffers[index])
+                self.iovecs[index].iov_len = RECEIVE_BUFFER_SIZE
+
+                header = self.headers[index].msg_hdr
+                header.msg_name = ctypes.addressof(self.addresses[index])
+                header.msg_iov = ctypes.pointer(self.iovecs[index])
+                header.msg_iovlen = 1
+                if self.timestamps:
+                    header.msg_control = ctypes.addressof(self.controls[index])
+
+    def receive(self) -> [(bytes, tuple, float)]:
+        """
+        Receive the packets that are waiting on the socket, up to the batch size.
+
+        :return: The packets, the addresses of their senders and their arrival times, which may be empty if nothing
+                 was waiting
+        """
+        if self.use_mmsg:
+            return self.receive_mmsg()
+
+        packets = []
+        try:
+            while len(packets) < self.batch_size:
+                if self.timestamps:
+                    pkt, ancillary_data, flags, sender = self.sock.recvmsg(RECEIVE_BUFFER_SIZE, CONTROL_BUFFER_SIZE,
+                                                                           socket.MSG_DONTWAIT)
+                    arrival = find_ancillary_timestamp(ancillary_data) or time.time()
+                else:
+                    pkt, sender = self.sock.recvfrom(RECEIVE_BUFFER_SIZE, socket.MSG_DONTWAIT)
+                    arrival = time.time()
+
+                packets.append((pkt, sender, arrival))
+        except BlockingIOError:
+            pass
+
+        return packets
+
+    def receive_mmsg(self) -> [(bytes, tuple, float)]:
+        """
+        Receive the waiting packets with a single recvmmsg call.
+
+        :return: The packets, the addresses of their senders and their arrival times
+        """
+        for index in range(self.batch_size):
+            header = self.headers[index].msg_hdr
+            header.msg_namelen = ctypes.sizeof(SockAddrIn6)
+            if self.timestamps:
+                header.msg_controllen = CONTROL_BUFFER_SIZE
+
+        count = libc_recvmmsg(self.sock.fileno(), self.headers, self.batch_size, socket.MSG_DONTWAIT, None)
+        if count < 0:
+            error = ctypes.get_errno()
+            if error in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return []
+            raise OSError(error, os.strerror(error))
+
+        now = time.time()
+        packets = []
+        for index in range(count):
+            header = self.headers[index]
+            arrival = None
+            if self.timestamps:
+                arrival = find_timestamp(ctypes.addressof(self.controls[index]), header.msg_hdr.msg_controllen)
+
+            packets.append((ctypes.string_at(self.buffers[index], header.msg_len),
+                            decode_sockaddr(self.addresses[index]),
+                            arrival or now))
+
+        return packets
+
+
+def packet_buffer(data: bytes or bytearray or memoryview) -> ctypes.Array:
+    """
+    Get a ctypes array for the data of a packet. Writable buffers, like the reply buffers, are used directly and only
+    read-only data is copied.
+
+    :param data: The data of the packet
+    :return: A ctypes array with the data
+    """
+    try:
+        return (ctypes.c_char * len(data)).from_buffer(data)
+    except TypeError:
+        # Read-only data, like bytes
+        return (ctypes.c_char * len(data)).from_buffer_copy(data)
+
+
+def send_batch(sock: socket.socket, packets: [(bytes, tuple)]) -> [int]:
+    """
+    Send a batch of packets from a socket.
+
+    :param sock: The socket to send from
+    :param packets: The packets and their destinations
+    :return: The number of bytes sent for each packet, or -1 for packets that could not be sent
+    """
+    if libc_sendmmsg is None or not isinstance(sock, socket.socket):
+        results = []
+        for data, destination in packets:
+            try:
+                results.append(sock.sendto(data, destination))
+            except OSError as e:
+                logger.error("Could not send packet to {}: {}".format(destination[0], e))
+                results.append(-1)
+
+        return results
+
+    count = len(packets)
+    if not count:
+        return []
+
+    # Keep references to the buffers until the packets are sent
+    buffers = [packet_buffer(data) for data, destination in packets]
+    addresses = (SockAddrIn6 * count)()
+    iovecs = (IOVec * count)()
+    headers = (MMsgHdr * count)()
+
+    for index, (data, destination) in enumerate(packets):
+        encode_sockaddr(destination, addresses[index])
+        iovecs[index].iov_base = ctypes.addressof(buffers[index])
+        iovecs[index].iov_len = len(data)
+
+        header = headers[index].msg_hdr
+        header.msg_name = ctypes.addressof(addresses[index])
+        header.msg_namelen = ctypes.sizeof(SockAddrIn6)
+        header.msg_iov = ctypes.pointer(iovecs[index])
+        header.msg_iovlen = 1
+
+    results = [-1] * count
+    start = 0
+    while start < count:
+        # The kernel stops at the first packet it can't send, so skip that one and send the rest
+        sent = libc_sendmmsg(sock.fileno(), ctypes.byref(headers[start]), count - start, 0)
+        if sent < 0:
+            error = ctypes.get_errno()
+            logger.error("Could not send packet to {}: {}".format(packets[start][1][0], os.strerror(error)))
+            start += 1
+            continue
+
+        for index in range(start, start + sent):
+            results[index] = headers[index].msg_len
+        start += sent
+
+    return results
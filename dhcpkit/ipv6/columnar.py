@@ -0,0 +1,408 @@
+"""
+Bulk decoding of DHCPv6 messages into columns of NumPy arrays, for offline analysis of large numbers of captured
+messages. Instead of building a tree of protocol elements for every message the headers and option lists of all
+messages are decoded at once with vectorised NumPy operations. Only the messages that the vectorised decoder doesn't
+understand, like messages of unknown types or with inconsistent lengths, are parsed with :meth:`Message.parse
+<dhcpkit.protocol_element.ProtocolElement.parse>`.
+
+The vectorised decoder only checks the structure of the messages. Unlike the object parser it doesn't validate the
+contents of the options.
+
+NumPy is only needed when using this module, it is not a requirement of DHCPKit itself.
+"""
+import struct
+
+from dhcpkit.ipv6 import HOP_COUNT_LIMIT
+from dhcpkit.ipv6.message_registry import message_registry
+from dhcpkit.ipv6.messages import Message, RelayServerMessage, ClientServerMessage, carries_iaid
+from dhcpkit.ipv6.option_registry import option_registry
+from dhcpkit.ipv6.options import OPTION_CLIENTID, OPTION_ORO, OPTION_RELAY_MSG, ClientIdOption, OptionRequestOption
+
+try:
+    # noinspection PyPackageRequirements
+    import numpy
+except ImportError:
+    numpy = None
+
+# The size of the fixed part of the messages
+RELAY_HEADER_LENGTH = 34
+CLIENT_SERVER_HEADER_LENGTH = 4
+
+
+def decode_columns(payloads: [bytes]) -> dict:
+    """
+    Decode a list of DHCPv6 messages into columns. Each column is a NumPy array with one row per message, except for
+    the IAIDs and the requested options of which there can be any number per message. Those are stored in one flat
+    array, and an offsets array with one more entry than there are messages indicates where the values of each
+    message are: the IAIDs of message ``n`` are ``iaids[iaid_offsets[n]:iaid_offsets[n + 1]]``.
+
+    - valid: whether the message could be decoded at all, the other columns are zero for messages that couldn't be
+    - message_type: the type of the message as it was received
+    - relay_depth: the number of relay messages around the client/server message
+    - hop_count: the hop count of the outermost relay message
+    - link_address, peer_address: the link and peer address of the innermost relay message, as 16 bytes per message
+    - inner_message_type: the type of the client/server message, possibly relayed
+    - transaction_id: the transaction id of the client/server message
+    - client_duid: the DUID from the client-id option as bytes, or None
+    - option_presence: a bitmap of 4 x 64 bits with the types of the options in the client/server message, see
+      :func:`has_option`
+    - iaid_offsets, iaid_option_types, iaids: the options of the client/server message that carry an IAID, as the
+      option type and the IAID as an unsigned 32 bit integer
+    - requested_option_offsets, requested_options: the option types from the option request option
+
+    :param payloads: The DHCPv6 messages as they were received
+    :return: A dictionary of column names and NumPy arrays
+    """
+    if numpy is None:
+        raise ImportError("Decoding messages into columns requires NumPy")
+
+    count = len(payloads)
+    joined = b''.join(payloads)
+    data = numpy.frombuffer(joined, dtype=numpy.uint8)
+
+    # Where each message starts and ends in the data, updated when descending into relayed messages
+    ends = numpy.cumsum(numpy.fromiter(map(len, payloads), dtype=numpy.int64, count=count))
+    positions = numpy.zeros(count, dtype=numpy.int64)
+    positions[1:] = ends[:-1]
+
+    columns = {
+        'valid': ends > positions,
+        'message_type': numpy.zeros(count, dtype=numpy.uint8),
+        'relay_depth': numpy.zeros(count, dtype=numpy.uint8),
+        'hop_count': numpy.zeros(count, dtype=numpy.uint8),
+        'link_address': numpy.zeros((count, 16), dtype=numpy.uint8),
+        'peer_address': numpy.zeros((count, 16), dtype=numpy.uint8),
+        'inner_message_type': numpy.zeros(count, dtype=numpy.uint8),
+        'transaction_id': numpy.zeros(count, dtype=numpy.uint32),
+        'client_duid': numpy.full(count, None, dtype=object),
+        'option_presence': numpy.zeros((count, 4), dtype=numpy.uint64),
+    }
+
+    # Messages that need to be parsed by the object parser
+    unusual = numpy.zeros(count, dtype=bool)
+
+    rows = numpy.flatnonzero(columns['valid'])
+    columns['message_type'][rows] = data[positions[rows]]
+
+    rows = _decode_relay_messages(data, rows, positions, ends, columns, unusual)
+
+    # What is left should be client/server messages
+    is_client_server = numpy.isin(data[positions[rows]], _message_types(ClientServerMessage))
+    unusual[rows[~is_client_server]] = True
+    rows = rows[is_client_server]
+
+    too_short = ends[rows] - positions[rows] < CLIENT_SERVER_HEADER_LENGTH
+    unusual[rows[too_short]] = True
+    rows = rows[~too_short]
+
+    columns['inner_message_type'][rows] = data[positions[rows]]
+    columns['transaction_id'][rows] = _read_uint(data, positions[rows] + 1, 3)
+
+    iaid_records, requested_option_records = _decode_client_server_options(joined, data, rows, positions, ends,
+                                                                           columns, unusual)
+
+    # Let the object parser handle the messages that we couldn't
+    parsed_iaid_records = []
+    parsed_requested_option_records = []
+    for row in numpy.flatnonzero(unusual):
+        _decode_message(payloads[row], row, columns, parsed_iaid_records, parsed_requested_option_records)
+
+    _store_lists(columns, 'iaid_offsets', ('iaid_option_types', 'iaids'), iaid_records, parsed_iaid_records,
+                 unusual, count)
+    _store_lists(columns, 'requested_option_offsets', ('requested_options',), requested_option_records,
+                 parsed_requested_option_records, unusual, count)
+
+    return columns
+
+
+def has_option(columns: dict, option_type: int) -> object:
+    """
+    Determine which of the decoded client/server messages contain an option of the given type.
+
+    :param columns: The columns as returned by :func:`decode_columns`
+    :param option_type: The option type to look for, must be lower than 256
+    :return: A NumPy array of booleans
+    """
+    if not 0 <= option_type < 256:
+        raise ValueError("Only the presence of option types below 256 is recorded")
+
+    bit = numpy.uint64(1 << (option_type & 63))
+    return (columns['option_presence'][:, option_type >> 6] & bit) != 0
+
+
+def _message_types(base_class: type) -> [int]:
+    """
+    Get the registered message types that are implemented by subclasses of the given class.
+
+    :param base_class: The base class of the messages
+    :return: The message types
+    """
+    return [message_type for message_type, message_class in message_registry.items()
+            if issubclass(message_class, base_class)]
+
+
+def _read_uint(data: object, positions: object, size: int) -> object:
+    """
+    Read a big-endian unsigned integer of the given size at each of the positions.
+
+    :param data: The data as a NumPy array of bytes
+    :param positions: The positions to read from
+    :param size: The number of bytes to read, at most 4
+    :return: The values
+    """
+    values = numpy.zeros(len(positions), dtype=numpy.uint32)
+    for index in range(size):
+        values = (values << 8) | data[positions + index]
+    return values
+
+
+def _walk_options(data: object, rows: object, positions: object, ends: object, unusual: object):
+    """
+    Walk through the options of many messages in lockstep: the first step yields the first option of every message,
+    the second step the second option of every message that has one etc. Messages with options that don't fit are
+    marked as unusual.
+
+    :param data: The data as a NumPy array of bytes
+    :param rows: The messages to walk through
+    :param positions: The position of the first option of every message
+    :param ends: The end of the options of every message
+    :param unusual: The messages that need to be parsed by the object parser
+    :return: A generator of (rows, option types, option data positions, option lengths) tuples
+    """
+    positions = positions.copy()
+    while rows.size:
+        remaining = ends[rows] - positions[rows]
+        rows = rows[remaining > 0]
+        truncated = remaining[remaining > 0] < 4
+        unusual[rows[truncated]] = True
+        rows = rows[~truncated]
+
+        option_positions = positions[rows]
+        option_types = _read_uint(data, option_positions, 2)
+        option_lengths = _read_uint(data, option_positions + 2, 2).astype(numpy.int64)
+        option_ends = option_positions + 4 + option_lengths
+
+        overflow = option_ends > ends[rows]
+        unusual[rows[overflow]] = True
+        rows = rows[~overflow]
+
+        yield rows, option_types[~overflow], option_positions[~overflow] + 4, option_lengths[~overflow]
+        positions[rows] = option_ends[~overflow]
+
+
+def _decode_relay_messages(data: object, rows: object, positions: object, ends: object, columns: dict,
+                           unusual: object) -> object:
+    """
+    Decode the relay messages and descend into the messages that they relay. The positions and ends are updated
+    so that they point to the relayed message.
+
+    :param data: The data as a NumPy array of bytes
+    :param rows: The messages to decode
+    :param positions: The position of every message
+    :param ends: The end of every message
+    :param columns: The columns to fill
+    :param unusual: The messages that need to be parsed by the object parser
+    :return: The messages that are not unusual
+    """
+    relay_types = _message_types(RelayServerMessage)
+    address_offsets = numpy.arange(16)
+
+    relayed = rows[numpy.isin(data[positions[rows]], relay_types)]
+    for depth in range(HOP_COUNT_LIMIT):
+        if not relayed.size:
+            break
+
+        too_short = ends[relayed] - positions[relayed] < RELAY_HEADER_LENGTH
+        unusual[relayed[too_short]] = True
+        relayed = relayed[~too_short]
+
+        relay_positions = positions[relayed]
+        if depth == 0:
+            columns['hop_count'][relayed] = data[relay_positions + 1]
+        columns['link_address'][relayed] = data[relay_positions[:, None] + 2 + address_offsets]
+        columns['peer_address'][relayed] = data[relay_positions[:, None] + 18 + address_offsets]
+        columns['relay_depth'][relayed] += 1
+
+        # Find the first relay message option
+        relayed_message_positions = numpy.full(len(positions), -1, dtype=numpy.int64)
+        relayed_message_ends = numpy.zeros(len(positions), dtype=numpy.int64)
+        for option_rows, option_types, option_positions, option_lengths in _walk_options(
+                data, relayed, positions + RELAY_HEADER_LENGTH, ends, unusual):
+            found = (option_types == OPTION_RELAY_MSG) & (relayed_message_positions[option_rows] < 0)
+            relayed_message_positions[option_rows[found]] = option_positions[found]
+            relayed_message_ends[option_rows[found]] = option_positions[found] + option_lengths[found]
+
+        # Relay messages without a relayed message are left to the object parser
+        found = (relayed_message_positions[relayed] >= 0) & \
+                (relayed_message_ends[relayed] > relayed_message_positions[relayed]) & ~unusual[relayed]
+        unusual[relayed[~found]] = True
+        relayed = relayed[found]
+
+        positions[relayed] = relayed_message_positions[relayed]
+        ends[relayed] = relayed_message_ends[relayed]
+        relayed = relayed[numpy.isin(data[positions[relayed]], relay_types)]
+    else:
+        # Nested deeper than any relay is allowed to
+        unusual[relayed] = True
+
+    return rows[~unusual[rows]]
+
+
+def _decode_client_server_options(joined: bytes, data: object, rows: object, positions: object, ends: object,
+                                  columns: dict, unusual: object) -> ([tuple], [tuple]):
+    """
+    Decode the options of client/server messages.
+
+    :param joined: The data as bytes
+    :param data: The data as a NumPy array of bytes
+    :param rows: The messages to decode
+    :param positions: The position of every message
+    :param ends: The end of every message
+    :param columns: The columns to fill
+    :param unusual: The messages that need to be parsed by the object parser
+    :return: Lists of (rows, option types, IAIDs) and of (rows, requested options) arrays
+    """
+    iaid_option_types = numpy.array([option_type for option_type, option_class in option_registry.items()
+                                     if carries_iaid(option_class)])
+    option_presence = columns['option_presence']
+    client_duid = columns['client_duid']
+
+    iaid_records = []
+    requested_option_records = []
+    for option_rows, option_types, option_positions, option_lengths in _walk_options(
+            data, rows, positions + CLIENT_SERVER_HEADER_LENGTH, ends, unusual):
+        # Every message occurs only once per step, so we can set the bits without worrying about duplicates
+        recorded = option_types < 256
+        words = option_types[recorded] >> 6
+        bits = numpy.left_shift(numpy.uint64(1), (option_types[recorded] & 63).astype(numpy.uint64))
+        option_presence[option_rows[recorded], words] |= bits
+
+        for row, start, length in zip(*[column[option_types == OPTION_CLIENTID]
+                                        for column in (option_rows, option_positions, option_lengths)]):
+            if client_duid[row] is None:
+                client_duid[row] = joined[start:start + length]
+
+        with_iaid = numpy.isin(option_types, iaid_option_types)
+        if with_iaid.any():
+            too_short = with_iaid & (option_lengths < 4)
+            unusual[option_rows[too_short]] = True
+            with_iaid &= ~too_short
+
+            iaid_records.append((option_rows[with_iaid], option_types[with_iaid].astype(numpy.uint16),
+                                 _read_uint(data, option_positions[with_iaid], 4)))
+
+        is_oro = option_types == OPTION_ORO
+        if is_oro.any():
+            odd = is_oro & (option_lengths % 2 == 1)
+            unusual[option_rows[odd]] = True
+            is_oro &= ~odd
+
+            # Expand every option request option to the positions of the option types in it
+            counts = option_lengths[is_oro] // 2
+            code_rows = numpy.repeat(option_rows[is_oro], counts)
+            code_indices = numpy.arange(counts.sum()) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+            code_positions = numpy.repeat(option_positions[is_oro], counts) + 2 * code_indices
+            requested_option_records.append((code_rows, _read_uint(data, code_positions, 2).astype(numpy.uint16)))
+
+    return iaid_records, requested_option_records
+
+
+def _decode_message(payload: bytes, row: int, columns: dict, iaid_records: [tuple], requested_option_records: [tuple]):
+    """
+    Decode a message with the object parser and store it in the columns.
+
+    :param payload: The message as it was received
+    :param row: The row of this message in the columns
+    :param columns: The columns to fill
+    :param iaid_records: The list of IAID records to add to
+    :param requested_option_records: The list of requested option records to add to
+    """
+    # Forget what the vectorised decoder found before it gave up
+    for name in ('valid', 'message_type', 'relay_depth', 'hop_count', 'link_address', 'peer_address',
+                 'inner_message_type', 'transaction_id', 'option_presence'):
+        columns[name][row] = 0
+    columns['client_duid'][row] = None
+
+    try:
+        message = Message.parse(payload)[1]
+    except (ValueError, struct.error):
+        return
+
+    columns['valid'][row] = True
+    columns['message_type'][row] = message.message_type
+
+    relay_depth = 0
+    while isinstance(message, RelayServerMessage):
+        if relay_depth == 0:
+            columns['hop_count'][row] = message.hop_count
+        columns['link_address'][row] = list(message.link_address.packed)
+        columns['peer_address'][row] = list(message.peer_address.packed)
+        relay_depth += 1
+        message = message.relayed_message
+
+    columns['relay_depth'][row] = relay_depth
+    if message is None:
+        return
+
+    columns['inner_message_type'][row] = message.message_type
+    if not isinstance(message, ClientServerMessage):
+        return
+
+    columns['transaction_id'][row] = int.from_bytes(message.transaction_id, 'big')
+
+    iaids = []
+    requested_options = []
+    for option in message.options:
+        if option.option_type < 256:
+            columns['option_presence'][row, option.option_type >> 6] |= numpy.uint64(1 << (option.option_type & 63))
+
+        if isinstance(option, ClientIdOption) and columns['client_duid'][row] is None:
+            columns['client_duid'][row] = option.duid.save()
+        elif isinstance(option, OptionRequestOption):
+            requested_options.extend(option.requested_options)
+        elif carries_iaid(type(option)):
+            iaids.append((option.option_type, int.from_bytes(option.iaid, 'big')))
+
+    if iaids:
+        option_types, iaid_values = zip(*iaids)
+        iaid_records.append((numpy.full(len(iaids), row), numpy.array(option_types, dtype=numpy.uint16),
+                             numpy.array(iaid_values, dtype=numpy.uint32)))
+
+    if requested_options:
+        requested_option_records.append((numpy.full(len(requested_options), row),
+                                         numpy.array(requested_options, dtype=numpy.uint16)))
+
+
+def _store_lists(columns: dict, offsets_name: str, value_names: (str,), records: [tuple], parsed_records: [tuple],
+                 unusual: object, count: int):
+    """
+    Combine the records that were collected while decoding into flat value arrays grouped by message, and an offsets
+    array that indicates where the values of each message are.
+
+    :param columns: The columns to fill
+    :param offsets_name: The name of the offsets column
+    :param value_names: The names of the value columns
+    :param records: The records from the vectorised decoder, each a tuple of an array of rows followed by an array for
+                    each value column
+    :param parsed_records: The records of the messages that were decoded by the object parser
+    :param unusual: The messages that were decoded by the object parser
+    :param count: The number of messages
+    """
+    # The vectorised decoder may have recorded values of unusual messages before it gave up on them
+    records = [tuple([column[~unusual[record[0]]] for column in record]) for record in records] + parsed_records
+
+    if records:
+        rows = numpy.concatenate([record[0] for record in records])
+        values = [numpy.concatenate([record[index + 1] for record in records]) for index in range(len(value_names))]
+    else:
+        rows = numpy.zeros(0, dtype=numpy.int64)
+        values = [numpy.zeros(0, dtype=numpy.uint16)] * len(value_names)
+
+    # A stable sort keeps the values of each message in the order in which they appeared
+    order = numpy.argsort(rows, kind='stable')
+    offsets = numpy.zeros(count + 1, dtype=numpy.int64)
+    offsets[1:] = numpy.cumsum(numpy.bincount(rows, minlength=count))
+
+    columns[offsets_name] = offsets
+    for name, value in zip(value_names, values):
+        columns[name] = value[order]
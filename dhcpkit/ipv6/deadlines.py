@@ -0,0 +1,165 @@
+"""
+Deadlines for handling requests. A client that doesn't get a reply in time sends the same request again, so a request
+that has been waiting for longer than the client's retransmission timeout has been superseded by a newer copy, and
+answering it is wasted work.
+
+The retransmission timeout of a client starts at the initial timeout for the message type and doubles with every
+retransmission, up to a maximum. The Elapsed Time option tells how long the client has been trying, which makes it
+possible to estimate when the client will send its next copy: the current timeout is the elapsed time plus the
+initial timeout. Clients randomise their timeouts by up to 10%, which is added as a safety margin.
+"""
+import logging
+import threading
+import time
+
+from dhcpkit.ipv6.messages import ConfirmMessage, DeclineMessage, InformationRequestMessage, RebindMessage, \
+    RelayForwardMessage, ReleaseMessage, RenewMessage, RequestMessage, SolicitMessage
+from dhcpkit.ipv6.options import ElapsedTimeOption
+
+logger = logging.getLogger(__name__)
+
+# The initial and maximum retransmission timeouts from RFC 3315 section 5.5, in seconds. Release and Decline have no
+# maximum timeout, only a maximum number of retransmissions.
+retransmission_timeouts = {
+    SolicitMessage: (1, 120),
+    RequestMessage: (1, 30),
+    ConfirmMessage: (1, 4),
+    RenewMessage: (10, 600),
+    RebindMessage: (10, 600),
+    InformationRequestMessage: (1, 120),
+    ReleaseMessage: (1, None),
+    DeclineMessage: (1, None),
+}
+
+# Clients randomise their retransmission timeouts by up to 10%
+RANDOMISATION_MARGIN = 1.1
+
+
+def request_deadline(message: RelayForwardMessage, arrival: float) -> float or None:
+    """
+    Determine until when a received request is worth handling.
+
+    :param message: The received request, wrapped like a relay would
+    :param arrival: The time at which the request was received
+    :return: The deadline as a UNIX timestamp, or None if the request doesn't expire
+    """
+    inner_message = message.inner_message
+    timeouts = retransmission_timeouts.get(type(inner_message))
+    if not timeouts:
+        return None
+
+    initial_timeout, max_timeout = timeouts
+
+    elapsed_time_option = inner_message.get_option_of_type(ElapsedTimeOption)
+    elapsed_time = elapsed_time_option.elapsed_time / 100 if elapsed_time_option else 0
+
+    timeout = elapsed_time + initial_timeout
+    if max_timeout is not None:
+        timeout = min(timeout, max_timeout)
+
+    return arrival + timeout * RANDOMISATION_MARGIN
+
+
+class DeadlineTracker:
+    """
+    Check the deadlines of requests, and keep statistics about expired requests and about how long requests wait
+    before a worker thread picks them up. It can be used from any thread.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+
+        self.expired_waiting = 0
+        """The number of requests that expired before a worker thread picked them up"""
+
+        self.expired_handling = 0
+        """The number of replies that were not sent because the request expired while it was being handled"""
+
+        self.waited = 0
+        """The number of requests that were picked up by a worker thread"""
+
+        self.total_wait = 0.0
+        """The total time that those requests waited, in seconds"""
+
+        self.max_wait = 0.0
+        """The longest time that a request waited, in seconds"""
+
+    def __str__(self):
+        average_wait = self.total_wait / self.waited if self.waited else 0.0
+        return "expired {} while waiting, {} while being handled; " \
+               "waited {:.1f} ms on average, {:.1f} ms at most".format(self.expired_waiting, self.expired_handling,
+                                                                       average_wait * 1000, self.max_wait * 1000)
+
+    def counts(self) -> dict:
+        """
+        The statistics of this tracker, so they can be passed on to another process.
+
+        :return: The counters and wait times
+        """
+        with self.lock:
+            return {
+                'expired-waiting': self.expired_waiting,
+                'expired-handling': self.expired_handling,
+                'waited': self.waited,
+                'total-wait': self.total_wait,
+                'max-wait': self.max_wait,
+            }
+
+    def add_counts(self, counts: dict):
+        """
+        Add the statistics of another tracker to the statistics of this one.
+
+        :param counts: The statistics as returned by :meth:`counts`
+        """
+        with self.lock:
+            self.expired_waiting += counts['expired-waiting']
+            self.expired_handling += counts['expired-handling']
+            self.waited += counts['waited']
+            self.total_wait += counts['total-wait']
+            self.max_wait = max(self.max_wait, counts['max-wait'])
+
+    def picked_up(self, arrival: float, deadline: float or None, now: float = None) -> bool:
+        """
+        Record that a worker thread picked up a request, and check whether it is still worth handling.
+
+        :param arrival: The time at which the request was received
+        :param deadline: The deadline of the request, if any
+        :param now: The current time, if already known
+        :return: Whether the request should still be handled
+        """
+        if now is None:
+            now = time.time()
+
+        wait = max(0.0, now - arrival)
+        expired = deadline is not None and now > deadline
+
+        with self.lock:
+            self.waited += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            if expired:
+                self.expired_waiting += 1
+
+        return not expired
+
+    def reply_ready(self, deadline: float or None, now: float = None) -> bool:
+        """
+        Check whether the reply to a request is still worth sending.
+
+        :param deadline: The deadline of the request, if any
+        :param now: The current time, if already known
+        :return: Whether the reply should be sent
+        """
+        if deadline is None:
+            return True
+
+        if now is None:
+            now = time.time()
+
+        if now <= deadline:
+            return True
+
+        with self.lock:
+            self.expired_handling += 1
+
+        return False
@@ -1,6 +1,10 @@
 """
 Classes and constants for the DUIDs defined in :rfc:`3315`
 """
+import codecs
+import struct
+import threading
+from collections import OrderedDict
 from struct import unpack_from, pack
 
 from dhcpkit.protocol_element import ProtocolElement
@@ -11,6 +15,13 @@ DUID_LLT = 1
 DUID_EN = 2
 DUID_LL = 3
 
+# The loaded entries of the DUID registry, bound when the first DUID is parsed. The registry loads the modules that
+# implement DUIDs, and those import this module, so it can't be loaded while this module is being imported.
+_registered_duids = None
+
+# The pool of interned DUIDs, see :func:`set_duid_pool_size`
+_duid_pool = None
+
 
 # This subclass remains abstract
 # noinspection PyAbstractClass
@@ -22,18 +33,158 @@ class DUID(ProtocolElement):
     order, followed by a variable number of octets that make up the
     actual identifier.  A DUID can be no more than 128 octets long (not
     including the type code).
+
+    DUIDs remember their canonical wire format and its hex representation once they have been determined. DUIDs
+    that are parsed get their wire format from the buffer they are parsed from, so hashing and comparing them and
+    building lookup keys from them doesn't require saving them again.
     """
 
+    # The cached wire format and hex representation, and whether this DUID is shared through the DUID pool
+    __slots__ = ('_saved', '_hex', '_interned')
+
     # This needs to be overwritten in subclasses
     duid_type = 0
 
+    def __new__(cls, *args, **kwargs):
+        """
+        Create a new DUID without a cached wire format.
+
+        :param args: The positional arguments for the constructor
+        :param kwargs: The keyword arguments for the constructor
+        :return: The new DUID
+        """
+        self = super().__new__(cls, *args, **kwargs)
+        object.__setattr__(self, '_saved', None)
+        object.__setattr__(self, '_hex', None)
+        object.__setattr__(self, '_interned', False)
+        return self
+
+    def __setattr__(self, name: str, value: object):
+        """
+        Assigning to a property invalidates the cached wire format. DUIDs from the DUID pool are shared between
+        messages, so they can't be modified.
+
+        :param name: The name of the property
+        :param value: The new value
+        """
+        if name[0] != '_':
+            if self._interned:
+                raise AttributeError("{} is shared through the DUID pool and can't be modified".format(
+                    self.__class__.__name__))
+
+            object.__setattr__(self, '_saved', None)
+            object.__setattr__(self, '_hex', None)
+
+        super().__setattr__(name, value)
+
+    def __reduce__(self):
+        """
+        Copies and pickles are created with the constructor, so that they can be modified even if this DUID is shared
+        through the DUID pool.
+
+        :return: The class and the arguments to create a copy of this DUID
+        """
+        return self.__class__, self._field_values(self)
+
+    def __eq__(self, other: object) -> bool:
+        """
+        Compare the wire format of DUIDs of the same class if both are known, and their properties otherwise.
+
+        :param other: The other object
+        :return: Whether this DUID is equal to the other one
+        """
+        if self is other:
+            return True
+
+        if type(self) is type(other) and self._saved is not None and other._saved is not None:
+            return self._saved == other._saved
+
+        return super().__eq__(other)
+
     def __hash__(self) -> int:
         """
-        Make DUIDs hashable.
+        Hash the class and the wire format of this DUID.
 
         :return: The hash value
         """
-        return hash(self.save())
+        try:
+            return hash((self.__class__, self.canonical_bytes()))
+        except (TypeError, ValueError, struct.error):
+            # This DUID can't be saved, so all DUIDs that are equal to it can't be saved either
+            return super().__hash__()
+
+    def canonical_bytes(self) -> bytes:
+        """
+        Get the wire format of this DUID, saving it only if it isn't known yet.
+
+        :return: The saved DUID
+        """
+        if self._saved is None:
+            self._saved = self.save()
+        return self._saved
+
+    def canonical_hex(self) -> str:
+        """
+        Get the wire format of this DUID as a hex string, like used in lookup keys of the fixed assignment handlers.
+
+        :return: The saved DUID as lower case hex characters
+        """
+        if self._hex is None:
+            self._hex = codecs.encode(self.canonical_bytes(), 'hex').decode('ascii')
+        return self._hex
+
+    def encoded_length(self) -> int:
+        """
+        Determine the number of bytes that the saved DUID takes.
+
+        :return: The length of the saved DUID in bytes
+        """
+        return len(self.canonical_bytes())
+
+    def save_into(self, buffer: bytearray, offset: int = 0) -> int:
+        """
+        Copy the wire format of this DUID into an existing buffer.
+
+        :param buffer: The buffer to write data to
+        :param offset: The offset in the buffer where to start writing
+        :return: The number of bytes written to the buffer
+        """
+        data = self.canonical_bytes()
+        data_length = len(data)
+        buffer[offset:offset + data_length] = data
+        return data_length
+
+    @classmethod
+    def parse(cls, buffer: bytes, offset: int = 0, length: int = None) -> (int, type):
+        """
+        Parse a DUID and remember the data it was parsed from as its wire format. When the DUID pool is enabled a
+        DUID that is already in the pool is returned instead of parsing the same DUID again.
+
+        :param buffer: The buffer to read data from
+        :param offset: The offset in the buffer where to start reading
+        :param length: The amount of data we are allowed to read from the buffer
+        :return: The number of bytes used from the buffer and the resulting DUID
+        """
+        if not length:
+            # Let the parser complain about it
+            return super().parse(buffer, offset=offset, length=length)
+
+        duid_bytes = bytes(buffer[offset:offset + length])
+
+        pool = _duid_pool
+        if pool is not None:
+            duid = pool.get(duid_bytes)
+            if isinstance(duid, cls):
+                return length, duid
+
+        length, duid = super().parse(buffer, offset=offset, length=length)
+        if len(duid_bytes) == length:
+            duid._saved = duid_bytes
+
+            if pool is not None:
+                pool.add(duid)
+
+        return length, duid
 
     @classmethod
     def determine_class(cls, buffer: bytes, offset: int = 0) -> type:
@@ -44,9 +195,18 @@ class DUID(ProtocolElement):
         :param offset: The offset in the buffer where to start reading
         :return: The best known class for this duid data
         """
-        from dhcpkit.ipv6.duid_registry import duid_registry
+        global _registered_duids
+        if _registered_duids is None:
+            from dhcpkit.ipv6.duid_registry import duid_registry
+            _registered_duids = duid_registry.data
+
         duid_type = unpack_from('!H', buffer, offset=offset)[0]
-        return duid_registry.get(duid_type, UnknownDUID)
+        element_class = _registered_duids.get(duid_type)
+        if element_class is None:
+            # The entry point of this type hasn't been loaded yet, or there is none
+            from dhcpkit.ipv6.duid_registry import duid_registry
+            element_class = duid_registry.get(duid_type, UnknownDUID)
+        return element_class
 
     def parse_duid_header(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
         """
@@ -69,11 +229,82 @@ class DUID(ProtocolElement):
         return my_offset
 
 
+class DUIDPool:
+    """
+    A bounded pool of parsed DUIDs, so that the messages from a client that sends many requests share one DUID object
+    instead of each having their own. The DUIDs are looked up by their wire format. When the pool is full the DUID that
+    was used least recently is removed from it.
+    """
+
+    def __init__(self, size: int):
+        """
+        Create an empty pool.
+
+        :param size: The maximum number of DUIDs in the pool
+        """
+        self.size = size
+        self.duids = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """
+        The number of DUIDs in the pool.
+
+        :return: The number of DUIDs
+        """
+        return len(self.duids)
+
+    def get(self, duid_bytes: bytes) -> DUID or None:
+        """
+        Get the DUID with the given wire format from the pool.
+
+        :param duid_bytes: The wire format of the DUID
+        :return: The DUID or None if it isn't in the pool
+        """
+        with self.lock:
+            duid = self.duids.get(duid_bytes)
+            if duid is not None:
+                self.duids.move_to_end(duid_bytes)
+            return duid
+
+    def add(self, duid: DUID):
+        """
+        Add a parsed DUID to the pool. It can't be modified anymore after this.
+
+        :param duid: The DUID to add
+        """
+        duid_bytes = duid.canonical_bytes()
+        object.__setattr__(duid, '_interned', True)
+
+        with self.lock:
+            self.duids[duid_bytes] = duid
+            self.duids.move_to_end(duid_bytes)
+            while len(self.duids) > self.size:
+                self.duids.popitem(last=False)
+
+
+def set_duid_pool_size(size: int):
+    """
+    Enable or disable the DUID pool. Parsed DUIDs are kept in the pool and reused when the same DUID is parsed again.
+    Changing the size starts a new, empty pool.
+
+    :param size: The maximum number of DUIDs in the pool, or 0 to disable the pool
+    """
+    global _duid_pool
+
+    if not isinstance(size, int) or size < 0:
+        raise ValueError("The DUID pool size must be a positive integer or 0")
+
+    _duid_pool = DUIDPool(size) if size else None
+
+
 class UnknownDUID(DUID):
     """
     Container for raw DUID content for cases where we don't know how to decode the DUID.
     """
 
+    __slots__ = ('duid_type', 'duid_data')
+
     def __init__(self, duid_type: int = 0, duid_data: bytes = b''):
         self.duid_type = duid_type
         self.duid_data = duid_data
@@ -92,7 +323,7 @@ class UnknownDUID(DUID):
         my_offset = self.parse_duid_header(buffer, offset, length)
 
         duid_len = length - my_offset
-        self.duid_data = buffer[offset + my_offset:offset + my_offset + duid_len]
+        self.duid_data = bytes(buffer[offset + my_offset:offset + my_offset + duid_len])
         my_offset += duid_len
 
         return my_offset
@@ -170,6 +401,8 @@ class LinkLayerTimeDUID(DUID):
     with a newly-generated DUID-LLT.
     """
 
+    __slots__ = ('hardware_type', 'time', 'link_layer_address')
+
     duid_type = DUID_LLT
 
     def __init__(self, hardware_type: int = 0, time: int = 0, link_layer_address: bytes = b''):
@@ -209,7 +442,7 @@ class LinkLayerTimeDUID(DUID):
         my_offset += 6
 
         ll_len = length - my_offset
-        self.link_layer_address = buffer[offset + my_offset:offset + my_offset + ll_len]
+        self.link_layer_address = bytes(buffer[offset + my_offset:offset + my_offset + ll_len])
         my_offset += ll_len
 
         return my_offset
@@ -267,6 +500,8 @@ class EnterpriseDUID(DUID):
     (0x0CC084D303000912).
     """
 
+    __slots__ = ('enterprise_number', 'identifier')
+
     duid_type = DUID_EN
 
     def __init__(self, enterprise_number: int = 0, identifier: bytes = b''):
@@ -302,7 +537,7 @@ class EnterpriseDUID(DUID):
         my_offset += 4
 
         identifier_len = length - my_offset
-        self.identifier = buffer[offset + my_offset:offset + my_offset + identifier_len]
+        self.identifier = bytes(buffer[offset + my_offset:offset + my_offset + identifier_len])
         my_offset += identifier_len
 
         return my_offset
@@ -358,6 +593,8 @@ class LinkLayerDUID(DUID):
     client is running.
     """
 
+    __slots__ = ('hardware_type', 'link_layer_address')
+
     duid_type = DUID_LL
 
     def __init__(self, hardware_type: int = 0, link_layer_address: bytes = b''):
@@ -393,7 +630,7 @@ class LinkLayerDUID(DUID):
         my_offset += 2
 
         ll_len = length - my_offset
-        self.link_layer_address = buffer[offset + my_offset:offset + my_offset + ll_len]
+        self.link_layer_address = bytes(buffer[offset + my_offset:offset + my_offset + ll_len])
         my_offset += ll_len
 
         return my_offset
@@ -40,3 +40,20 @@ class InvalidPacketError(Exception):
 
     def __str__(self):
         return "Invalid packet from {}".format(self.sender)
+
+
+class DroppedPacketError(Exception):
+    """
+    Signal that an incoming message was dropped before it was decoded
+
+    :type reason: str
+    :type sender: (str, int, int, int)
+    """
+
+    def __init__(self, reason: str, sender=None):
+        super().__init__(reason)
+        self.reason = reason
+        self.sender = sender
+
+    def __str__(self):
+        return "Dropped packet from {}: {}".format(self.sender, self.reason)
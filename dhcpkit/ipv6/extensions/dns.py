@@ -3,17 +3,17 @@ Implementation of DNS options as specified in :rfc:`3646`.
 """
 
 from ipaddress import IPv6Address
-from struct import pack
 
 from dhcpkit.ipv6.messages import SolicitMessage, AdvertiseMessage, RequestMessage, RenewMessage, RebindMessage, \
     InformationRequestMessage, ReplyMessage
+from dhcpkit.ipv6.option_fields import generate_codec, IPv6AddressListField, DomainListField
 from dhcpkit.ipv6.options import Option
-from dhcpkit.utils import parse_domain_list_bytes, encode_domain_list
 
 OPTION_DNS_SERVERS = 23
 OPTION_DOMAIN_LIST = 24
 
 
+@generate_codec(IPv6AddressListField('dns_servers'))
 class RecursiveNameServersOption(Option):
     """
     :rfc:`3646#section-3`
@@ -56,6 +56,8 @@ class RecursiveNameServersOption(Option):
     :type dns_servers: list[IPv6Address]
     """
 
+    __slots__ = ('dns_servers',)
+
     option_type = OPTION_DNS_SERVERS
 
     def __init__(self, dns_servers: [IPv6Address] = None):
@@ -73,54 +75,8 @@ class RecursiveNameServersOption(Option):
             if not isinstance(address, IPv6Address):
                 raise ValueError("DNS server must be an IPv6 address")
 
-    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
-        """
-        Load the internal state of this object from the given buffer. The buffer may
-        contain more data after the structured element is parsed. This data is ignored.
-
-        :param buffer: The buffer to read data from
-        :param offset: The offset in the buffer where to start reading
-        :param length: The amount of data we are allowed to read from the buffer
-        :return: The number of bytes used from the buffer
-        """
-        my_offset, option_len = self.parse_option_header(buffer, offset, length)
-        header_offset = my_offset
-
-        if option_len % 16 != 0:
-            raise ValueError('DNS Servers Option length must be a multiple of 16')
-
-        # Parse the addresses
-        self.dns_servers = []
-        max_offset = option_len + header_offset
-        while max_offset > my_offset:
-            address = IPv6Address(buffer[offset + my_offset:offset + my_offset + 16])
-            self.dns_servers.append(address)
-            my_offset += 16
-
-        if my_offset != max_offset:
-            raise ValueError('Option length does not match combined length '
-                             'of included addresses')
-
-        self.validate()
-
-        return my_offset
-
-    def save(self) -> bytes:
-        """
-        Save the internal state of this object as a buffer.
-
-        :return: The buffer with the data from this element
-        """
-        self.validate()
-
-        buffer = bytearray()
-        buffer.extend(pack('!HH', self.option_type, len(self.dns_servers) * 16))
-        for address in self.dns_servers:
-            buffer.extend(address.packed)
-
-        return buffer
-
 
+@generate_codec(DomainListField('search_list'))
 class DomainSearchListOption(Option):
     """
     :rfc:`3646#section-4`
@@ -156,6 +112,8 @@ class DomainSearchListOption(Option):
     :type search_list: list[str]
     """
 
+    __slots__ = ('search_list',)
+
     option_type = OPTION_DOMAIN_LIST
 
     def __init__(self, search_list: [str] = None):
@@ -173,46 +131,6 @@ class DomainSearchListOption(Option):
             if any([0 >= len(label) > 63 for label in domain_name.split('.')]):
                 raise ValueError("Domain labels must be 1 to 63 characters long")
 
-    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
-        """
-        Load the internal state of this object from the given buffer. The buffer may contain more data after the
-        structured element is parsed. This data is ignored.
-
-        :param buffer: The buffer to read data from
-        :param offset: The offset in the buffer where to start reading
-        :param length: The amount of data we are allowed to read from the buffer
-        :return: The number of bytes used from the buffer
-        """
-        my_offset, option_len = self.parse_option_header(buffer, offset, length)
-        header_offset = my_offset
-
-        # Parse the domain labels
-        max_offset = option_len + header_offset  # The option_len field counts bytes *after* the header fields
-        parsed_len, self.search_list = parse_domain_list_bytes(buffer, offset=offset + my_offset, length=option_len)
-        my_offset += parsed_len
-
-        if my_offset != max_offset:
-            raise ValueError('Option length does not match the combined length of the included search domains')
-
-        self.validate()
-
-        return my_offset
-
-    def save(self) -> bytes:
-        """
-        Save the internal state of this object as a buffer.
-
-        :return: The buffer with the data from this element
-        """
-        self.validate()
-
-        domain_buffer = encode_domain_list(self.search_list)
-
-        buffer = bytearray()
-        buffer.extend(pack('!HH', self.option_type, len(domain_buffer)))
-        buffer.extend(domain_buffer)
-        return buffer
-
 
 SolicitMessage.add_may_contain(RecursiveNameServersOption, 0, 1)
 AdvertiseMessage.add_may_contain(RecursiveNameServersOption, 0, 1)
@@ -7,6 +7,7 @@ from ipaddress import IPv6Address
 from struct import unpack_from, pack
 
 from dhcpkit.ipv6.messages import ClientServerMessage
+from dhcpkit.ipv6.option_fields import generate_codec, OptionsField
 from dhcpkit.ipv6.options import Option
 from dhcpkit.protocol_element import ProtocolElement
 from dhcpkit.utils import camelcase_to_dash, parse_domain_bytes, encode_domain
@@ -58,6 +59,8 @@ class NTPSubOption(ProtocolElement):
     :type suboption_type: int
     """
 
+    __slots__ = ()
+
     # This needs to be overwritten in subclasses
     suboption_type = 0
 
@@ -111,6 +114,8 @@ class UnknownNTPSubOption(NTPSubOption):
     :type suboption_data: bytes
     """
 
+    __slots__ = ('suboption_type', 'suboption_data')
+
     def __init__(self, suboption_type: int = 0, suboption_data: bytes = b''):
         self.suboption_type = suboption_type
         """Type code for this sub-option"""
@@ -147,7 +152,7 @@ class UnknownNTPSubOption(NTPSubOption):
         if my_offset + option_len > max_length:
             raise ValueError('This suboption is longer than the available buffer')
 
-        self.suboption_data = buffer[offset + my_offset:offset + my_offset + option_len]
+        self.suboption_data = bytes(buffer[offset + my_offset:offset + my_offset + option_len])
         my_offset += option_len
 
         return my_offset
@@ -194,6 +199,8 @@ class NTPServerAddressSubOption(NTPSubOption):
     :type address: IPv6Address
     """
 
+    __slots__ = ('address',)
+
     suboption_type = NTP_SUBOPTION_SRV_ADDR
 
     def __init__(self, address: IPv6Address = None):
@@ -237,7 +244,7 @@ class NTPServerAddressSubOption(NTPSubOption):
         if suboption_len != 16:
             raise ValueError('NTP Server Address SubOptions must have length 16')
 
-        self.address = IPv6Address(buffer[offset + my_offset:offset + my_offset + 16])
+        self.address = IPv6Address(bytes(buffer[offset + my_offset:offset + my_offset + 16]))
         my_offset += 16
 
         return my_offset
@@ -287,6 +294,8 @@ class NTPMulticastAddressSubOption(NTPSubOption):
     :type address: IPv6Address
     """
 
+    __slots__ = ('address',)
+
     suboption_type = NTP_SUBOPTION_MC_ADDR
 
     def __init__(self, address: IPv6Address = None):
@@ -329,7 +338,7 @@ class NTPMulticastAddressSubOption(NTPSubOption):
         if suboption_len != 16:
             raise ValueError('NTP Multicast Address SubOptions must have length 16')
 
-        self.address = IPv6Address(buffer[offset + my_offset:offset + my_offset + 16])
+        self.address = IPv6Address(bytes(buffer[offset + my_offset:offset + my_offset + 16]))
         my_offset += 16
 
         return my_offset
@@ -379,6 +388,8 @@ class NTPServerFQDNSubOption(NTPSubOption):
     :type fqdn: str
     """
 
+    __slots__ = ('fqdn',)
+
     suboption_type = NTP_SUBOPTION_SRV_FQDN
 
     def __init__(self, fqdn: str = ''):
@@ -444,6 +455,7 @@ class NTPServerFQDNSubOption(NTPSubOption):
         return buffer
 
 
+@generate_codec(OptionsField('options', NTPSubOption))
 class NTPServersOption(Option):
     """
     :rfc:`5908#section-4`
@@ -505,6 +517,8 @@ class NTPServersOption(Option):
     :type options: list[NTPSubOption]
     """
 
+    __slots__ = ('options',)
+
     option_type = OPTION_NTP_SERVER
 
     def __init__(self, options: [NTPSubOption] = None):
@@ -518,52 +532,7 @@ class NTPServersOption(Option):
         # Check if all options are allowed
         self.validate_contains(self.options)
         for option in self.options:
-            option.validate()
-
-    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
-        """
-        Load the internal state of this object from the given buffer. The buffer may contain more data after the
-        structured element is parsed. This data is ignored.
-
-        :param buffer: The buffer to read data from
-        :param offset: The offset in the buffer where to start reading
-        :param length: The amount of data we are allowed to read from the buffer
-        :return: The number of bytes used from the buffer
-        """
-        my_offset, option_len = self.parse_option_header(buffer, offset, length)
-        header_offset = my_offset
-
-        # Parse the options
-        self.options = []
-        max_offset = option_len + header_offset  # The option_len field counts bytes *after* the header fields
-        while max_offset > my_offset:
-            used_buffer, option = NTPSubOption.parse(buffer, offset=offset + my_offset)
-            self.options.append(option)
-            my_offset += used_buffer
-
-        if my_offset != max_offset:
-            raise ValueError('Option length does not match the combined length of the parsed suboptions')
-
-        self.validate()
-
-        return my_offset
-
-    def save(self) -> bytes:
-        """
-        Save the internal state of this object as a buffer.
-
-        :return: The buffer with the data from this element
-        """
-        self.validate()
-
-        options_buffer = bytearray()
-        for option in self.options:
-            options_buffer.extend(option.save())
-
-        buffer = bytearray()
-        buffer.extend(pack('!HH', self.option_type, len(options_buffer)))
-        buffer.extend(options_buffer)
-        return buffer
+            option.validate_once()
 
 
 # Register the classes in this file
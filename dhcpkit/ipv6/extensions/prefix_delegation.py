@@ -3,10 +3,12 @@ Implementation of Prefix Delegation options as specified in :rfc:`3633`.
 """
 
 from ipaddress import IPv6Address, IPv6Network
-from struct import unpack_from, pack
+from struct import unpack_from, pack, pack_into
 
 from dhcpkit.ipv6.messages import SolicitMessage, AdvertiseMessage, RequestMessage, RenewMessage, \
     RebindMessage, ReleaseMessage, ReplyMessage
+from dhcpkit.ipv6.option_fields import generate_codec, BytesField, UIntField, OptionsField
+from dhcpkit.ipv6.option_list import OptionListMixin
 from dhcpkit.ipv6.options import Option, StatusCodeOption
 
 OPTION_IA_PD = 25
@@ -15,7 +17,8 @@ OPTION_IAPREFIX = 26
 STATUS_NOPREFIXAVAIL = 6
 
 
-class IAPDOption(Option):
+@generate_codec(BytesField('iaid', 4), UIntField('t1', 4), UIntField('t2', 4), OptionsField('options', Option))
+class IAPDOption(OptionListMixin, Option):
     """
     :rfc:`3633#section-9`
 
@@ -117,6 +120,8 @@ class IAPDOption(Option):
     :type options: list[Option]
     """
 
+    __slots__ = ('iaid', 't1', 't2', '_options')
+
     option_type = OPTION_IA_PD
 
     def __init__(self, iaid: bytes = b'\x00\x00\x00\x00', t1: int = 0, t2: int = 0, options: [Option] = None):
@@ -148,83 +153,7 @@ class IAPDOption(Option):
         # Check if all options are allowed
         self.validate_contains(self.options)
         for option in self.options:
-            option.validate()
-
-    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
-        """
-        Load the internal state of this object from the given buffer. The buffer may contain more data after the
-        structured element is parsed. This data is ignored.
-
-        :param buffer: The buffer to read data from
-        :param offset: The offset in the buffer where to start reading
-        :param length: The amount of data we are allowed to read from the buffer
-        :return: The number of bytes used from the buffer
-        """
-        my_offset, option_len = self.parse_option_header(buffer, offset, length)
-        header_offset = my_offset
-
-        self.iaid = buffer[offset + my_offset:offset + my_offset + 4]
-        my_offset += 4
-
-        self.t1, self.t2 = unpack_from('!II', buffer, offset + my_offset)
-        my_offset += 8
-
-        # Parse the options
-        self.options = []
-        max_offset = option_len + header_offset  # The option_len field counts bytes *after* the header fields
-        while max_offset > my_offset:
-            used_buffer, option = Option.parse(buffer, offset=offset + my_offset)
-            self.options.append(option)
-            my_offset += used_buffer
-
-        if my_offset != max_offset:
-            raise ValueError('Option length does not match the combined length of the parsed options')
-
-        self.validate()
-
-        return my_offset
-
-    def save(self) -> bytes:
-        """
-        Save the internal state of this object as a buffer.
-
-        :return: The buffer with the data from this element
-        """
-        self.validate()
-        options_buffer = bytearray()
-        for option in self.options:
-            options_buffer.extend(option.save())
-
-        buffer = bytearray()
-        buffer.extend(pack('!HH4sII', self.option_type, len(options_buffer) + 12, self.iaid, self.t1, self.t2))
-        buffer.extend(options_buffer)
-        return buffer
-
-    def get_options_of_type(self, klass: type) -> list:
-        """
-        Get all options that are subclasses of the given class.
-
-        :param klass: The class to look for
-        :returns: The list of options
-
-        :type klass: T
-        :rtype: list[T()]
-        """
-        return [option for option in self.options if isinstance(option, klass)]
-
-    def get_option_of_type(self, klass: type) -> object or None:
-        """
-        Get the first option that is a subclass of the given class.
-
-        :param klass: The class to look for
-        :returns: The option or None
-
-        :type klass: T
-        :rtype: T()
-        """
-        for option in self.options:
-            if isinstance(option, klass):
-                return option
+            option.validate_once()
 
     def get_prefixes(self) -> [IPv6Network]:
         """
@@ -325,6 +254,8 @@ class IAPrefixOption(Option):
     :type options: list[Option]
     """
 
+    __slots__ = ('prefix', 'preferred_lifetime', 'valid_lifetime', 'options')
+
     option_type = OPTION_IAPREFIX
 
     def __init__(self, prefix: IPv6Network = None, preferred_lifetime: int = 0, valid_lifetime: int = 0,
@@ -358,7 +289,7 @@ class IAPrefixOption(Option):
         # Check if all options are allowed
         self.validate_contains(self.options)
         for option in self.options:
-            option.validate()
+            option.validate_once()
 
     def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
         """
@@ -379,7 +310,7 @@ class IAPrefixOption(Option):
         prefix_length = buffer[offset + my_offset]
         my_offset += 1
 
-        address = IPv6Address(buffer[offset + my_offset:offset + my_offset + 16])
+        address = IPv6Address(bytes(buffer[offset + my_offset:offset + my_offset + 16]))
         my_offset += 16
 
         # Combine address and prefix length into prefix
@@ -396,7 +327,7 @@ class IAPrefixOption(Option):
         if my_offset != max_offset:
             raise ValueError('Option length does not match the combined length of the parsed options')
 
-        self.validate()
+        self.validate_once()
 
         return my_offset
 
@@ -406,7 +337,7 @@ class IAPrefixOption(Option):
 
         :return: The buffer with the data from this element
         """
-        self.validate()
+        self.validate_before_save()
 
         options_buffer = bytearray()
         for option in self.options:
@@ -419,6 +350,34 @@ class IAPrefixOption(Option):
         buffer.extend(options_buffer)
         return buffer
 
+    def encoded_length(self) -> int:
+        """
+        Determine the number of bytes that :func:`save` and :func:`save_into` produce for this option.
+
+        :return: The length of the saved option in bytes
+        """
+        return 29 + sum([option.encoded_length() for option in self.options])
+
+    def save_into(self, buffer: bytearray, offset: int = 0) -> int:
+        """
+        Save the internal state of this object into an existing buffer.
+
+        :param buffer: The buffer to write data to
+        :param offset: The offset in the buffer where to start writing
+        :return: The number of bytes written to the buffer
+        """
+        self.validate_before_save()
+
+        # Save the options first so we know the option length when packing the header
+        my_offset = offset + 29
+        for option in self.options:
+            my_offset += option.save_into(buffer, my_offset)
+
+        pack_into('!HHIIB16s', buffer, offset, self.option_type, my_offset - offset - 4,
+                  self.preferred_lifetime, self.valid_lifetime, self.prefix.prefixlen,
+                  self.prefix.network_address.packed)
+        return my_offset - offset
+
 
 # Register where these options may occur
 SolicitMessage.add_may_contain(IAPDOption)
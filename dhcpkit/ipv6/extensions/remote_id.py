@@ -2,14 +2,14 @@
 Implementation of Remote-ID option as specified in :rfc:`4649`.
 """
 
-from struct import pack, unpack_from
-
 from dhcpkit.ipv6.messages import RelayForwardMessage, RelayReplyMessage
+from dhcpkit.ipv6.option_fields import generate_codec, UIntField, RemainingBytesField
 from dhcpkit.ipv6.options import Option
 
 OPTION_REMOTE_ID = 37
 
 
+@generate_codec(UIntField('enterprise_number', 4), RemainingBytesField('remote_id'))
 class RemoteIdOption(Option):
     """
     :rfc:`4649#section-3`
@@ -66,6 +66,8 @@ class RemoteIdOption(Option):
     :type remote_id: bytes
     """
 
+    __slots__ = ('enterprise_number', 'remote_id')
+
     option_type = OPTION_REMOTE_ID
 
     def __init__(self, enterprise_number: int = 0, remote_id: bytes = b''):
@@ -85,38 +87,6 @@ class RemoteIdOption(Option):
         if not isinstance(self.remote_id, bytes) or len(self.remote_id) >= 2 ** 16:
             raise ValueError("Remote-ID must be sequence of bytes")
 
-    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
-        """
-        Load the internal state of this object from the given buffer. The buffer may contain more data after the
-        structured element is parsed. This data is ignored.
-
-        :param buffer: The buffer to read data from
-        :param offset: The offset in the buffer where to start reading
-        :param length: The amount of data we are allowed to read from the buffer
-        :return: The number of bytes used from the buffer
-        """
-        my_offset, option_len = self.parse_option_header(buffer, offset, length)
-
-        self.enterprise_number = unpack_from('!I', buffer, offset=offset + my_offset)[0]
-        my_offset += 4
-
-        remote_id_length = option_len - 4
-        self.remote_id = buffer[offset + my_offset:offset + my_offset + remote_id_length]
-        my_offset += remote_id_length
-
-        self.validate()
-
-        return my_offset
-
-    def save(self) -> bytes:
-        """
-        Save the internal state of this object as a buffer.
-
-        :return: The buffer with the data from this element
-        """
-        self.validate()
-        return pack('!HHI', self.option_type, len(self.remote_id) + 4, self.enterprise_number) + self.remote_id
-
 
 RelayForwardMessage.add_may_contain(RemoteIdOption)
 
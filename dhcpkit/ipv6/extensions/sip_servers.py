@@ -3,15 +3,15 @@ Implementation of SIP options as specified in :rfc:`3319`.
 """
 
 from ipaddress import IPv6Address
-from struct import pack
 
+from dhcpkit.ipv6.option_fields import generate_codec, DomainListField, IPv6AddressListField
 from dhcpkit.ipv6.options import Option
-from dhcpkit.utils import parse_domain_list_bytes, encode_domain_list
 
 OPTION_SIP_SERVER_D = 21
 OPTION_SIP_SERVER_A = 22
 
 
+@generate_codec(DomainListField('domain_names'))
 class SIPServersDomainNameListOption(Option):
     """
     :rfc:`3319#section-3.1`
@@ -72,6 +72,8 @@ class SIPServersDomainNameListOption(Option):
     :type domain_names: list[str]
     """
 
+    __slots__ = ('domain_names',)
+
     option_type = OPTION_SIP_SERVER_D
 
     def __init__(self, domain_names: [str] = None):
@@ -89,47 +91,8 @@ class SIPServersDomainNameListOption(Option):
             if any([0 >= len(label) > 63 for label in domain_name.split('.')]):
                 raise ValueError("Domain labels must be 1 to 63 characters long")
 
-    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
-        """
-        Load the internal state of this object from the given buffer. The buffer may contain more data after the
-        structured element is parsed. This data is ignored.
-
-        :param buffer: The buffer to read data from
-        :param offset: The offset in the buffer where to start reading
-        :param length: The amount of data we are allowed to read from the buffer
-        :return: The number of bytes used from the buffer
-        """
-        my_offset, option_len = self.parse_option_header(buffer, offset, length)
-        header_offset = my_offset
-
-        # Parse the domain labels
-        max_offset = option_len + header_offset  # The option_len field counts bytes *after* the header fields
-        parsed_len, self.domain_names = parse_domain_list_bytes(buffer, offset=offset + my_offset, length=option_len)
-        my_offset += parsed_len
-
-        if my_offset != max_offset:
-            raise ValueError('Option length does not match the combined length of the included domain names')
-
-        self.validate()
-
-        return my_offset
-
-    def save(self) -> bytes:
-        """
-        Save the internal state of this object as a buffer.
-
-        :return: The buffer with the data from this element
-        """
-        self.validate()
-
-        domain_buffer = encode_domain_list(self.domain_names)
-
-        buffer = bytearray()
-        buffer.extend(pack('!HH', self.option_type, len(domain_buffer)))
-        buffer.extend(domain_buffer)
-        return buffer
-
 
+@generate_codec(IPv6AddressListField('sip_servers'))
 class SIPServersAddressListOption(Option):
     """
     :rfc:`3319#section-3.2`
@@ -166,6 +129,8 @@ class SIPServersAddressListOption(Option):
         by the client.
     """
 
+    __slots__ = ('sip_servers',)
+
     option_type = OPTION_SIP_SERVER_A
 
     def __init__(self, sip_servers: [IPv6Address] = None):
@@ -186,49 +151,3 @@ class SIPServersAddressListOption(Option):
                     address.is_multicast or \
                     address.is_unspecified:
                 raise ValueError("SIP servers must be a list of routable IPv6 addresses")
-
-    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
-        """
-        Load the internal state of this object from the given buffer. The buffer may contain more data after the
-        structured element is parsed. This data is ignored.
-
-        :param buffer: The buffer to read data from
-        :param offset: The offset in the buffer where to start reading
-        :param length: The amount of data we are allowed to read from the buffer
-        :return: The number of bytes used from the buffer
-        """
-        my_offset, option_len = self.parse_option_header(buffer, offset, length)
-        header_offset = my_offset
-
-        if option_len % 16 != 0:
-            raise ValueError('SIP Servers Option length must be a multiple of 16')
-
-        # Parse the addresses
-        self.sip_servers = []
-        max_offset = option_len + header_offset  # The option_len field counts bytes *after* the header fields
-        while max_offset > my_offset:
-            address = IPv6Address(buffer[offset + my_offset:offset + my_offset + 16])
-            self.sip_servers.append(address)
-            my_offset += 16
-
-        if my_offset != max_offset:
-            raise ValueError('Option length does not match the combined length of the included addresses')
-
-        self.validate()
-
-        return my_offset
-
-    def save(self) -> bytes:
-        """
-        Save the internal state of this object as a buffer.
-
-        :return: The buffer with the data from this element
-        """
-        self.validate()
-
-        buffer = bytearray()
-        buffer.extend(pack('!HH', self.option_type, len(self.sip_servers) * 16))
-        for address in self.sip_servers:
-            buffer.extend(address.packed)
-
-        return buffer
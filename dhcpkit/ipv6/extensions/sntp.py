@@ -3,13 +3,14 @@ Implementation of SNTP option as specified in :rfc:`4075`.
 """
 
 from ipaddress import IPv6Address
-from struct import pack
 
+from dhcpkit.ipv6.option_fields import generate_codec, IPv6AddressListField
 from dhcpkit.ipv6.options import Option
 
 OPTION_SNTP_SERVERS = 31
 
 
+@generate_codec(IPv6AddressListField('sntp_servers'))
 class SNTPServersOption(Option):
     """
     :rfc:`4075#section-4`
@@ -59,6 +60,8 @@ class SNTPServersOption(Option):
         IPv6 address of SNTP server.
     """
 
+    __slots__ = ('sntp_servers',)
+
     option_type = OPTION_SNTP_SERVERS
 
     def __init__(self, sntp_servers: [IPv6Address] = None):
@@ -79,49 +82,3 @@ class SNTPServersOption(Option):
                     address.is_multicast or \
                     address.is_unspecified:
                 raise ValueError("SNTP servers must be a list of routable IPv6 addresses")
-
-    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
-        """
-        Load the internal state of this object from the given buffer. The buffer may contain more data after the
-        structured element is parsed. This data is ignored.
-
-        :param buffer: The buffer to read data from
-        :param offset: The offset in the buffer where to start reading
-        :param length: The amount of data we are allowed to read from the buffer
-        :return: The number of bytes used from the buffer
-        """
-        my_offset, option_len = self.parse_option_header(buffer, offset, length)
-        header_offset = my_offset
-
-        if option_len % 16 != 0:
-            raise ValueError('SNTP Servers Option length must be a multiple of 16')
-
-        # Parse the addresses
-        self.sntp_servers = []
-        max_offset = option_len + header_offset  # The option_len field counts bytes *after* the header fields
-        while max_offset > my_offset:
-            address = IPv6Address(buffer[offset + my_offset:offset + my_offset + 16])
-            self.sntp_servers.append(address)
-            my_offset += 16
-
-        if my_offset != max_offset:
-            raise ValueError('Option length does not match the combined length of the included addresses')
-
-        self.validate()
-
-        return my_offset
-
-    def save(self) -> bytes:
-        """
-        Save the internal state of this object as a buffer.
-
-        :return: The buffer with the data from this element
-        """
-        self.validate()
-
-        buffer = bytearray()
-        buffer.extend(pack('!HH', self.option_type, len(self.sntp_servers) * 16))
-        for address in self.sntp_servers:
-            buffer.extend(address.packed)
-
-        return buffer
@@ -2,15 +2,15 @@
 Implementation of SOL-MAX-RT and INF-MAX-RT options as specified in :rfc:`7083`.
 """
 
-from struct import unpack_from, pack
-
 from dhcpkit.ipv6.messages import AdvertiseMessage, ReplyMessage
+from dhcpkit.ipv6.option_fields import generate_codec, UIntField
 from dhcpkit.ipv6.options import Option
 
 OPTION_SOL_MAX_RT = 82
 OPTION_INF_MAX_RT = 83
 
 
+@generate_codec(UIntField('sol_max_rt', 4))
 class SolMaxRTOption(Option):
     """
     :rfc:`7083#section-4`
@@ -44,6 +44,8 @@ class SolMaxRTOption(Option):
     :type sol_max_rt: int
     """
 
+    __slots__ = ('sol_max_rt',)
+
     option_type = OPTION_SOL_MAX_RT
 
     def __init__(self, sol_max_rt: int = 0):
@@ -57,38 +59,8 @@ class SolMaxRTOption(Option):
         if not isinstance(self.sol_max_rt, int) or not (0 <= self.sol_max_rt < 2 ** 32):
             raise ValueError("SOL_MAX_RT must be an unsigned 32 bit integer")
 
-    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
-        """
-        Load the internal state of this object from the given buffer. The buffer may contain more data after the
-        structured element is parsed. This data is ignored.
-
-        :param buffer: The buffer to read data from
-        :param offset: The offset in the buffer where to start reading
-        :param length: The amount of data we are allowed to read from the buffer
-        :return: The number of bytes used from the buffer
-        """
-        my_offset, option_len = self.parse_option_header(buffer, offset, length)
-
-        if option_len != 4:
-            raise ValueError('SOL_MAX_RT Options must have length 4')
-
-        self.sol_max_rt = unpack_from('!I', buffer, offset=offset + my_offset)
-        my_offset += 4
-
-        self.validate()
-
-        return my_offset
-
-    def save(self) -> bytes:
-        """
-        Save the internal state of this object as a buffer.
-
-        :return: The buffer with the data from this element
-        """
-        self.validate()
-        return pack('!HHI', self.option_type, 4, self.sol_max_rt)
-
 
+@generate_codec(UIntField('inf_max_rt', 4))
 class InfMaxRTOption(Option):
     """
     :rfc:`7083#section-5`
@@ -122,6 +94,8 @@ class InfMaxRTOption(Option):
     :type inf_max_rt: int
     """
 
+    __slots__ = ('inf_max_rt',)
+
     option_type = OPTION_INF_MAX_RT
 
     def __init__(self, inf_max_rt: int = 0):
@@ -135,37 +109,6 @@ class InfMaxRTOption(Option):
         if not isinstance(self.inf_max_rt, int) or not (0 <= self.inf_max_rt < 2 ** 32):
             raise ValueError("INF_MAX_RT must be an unsigned 32 bit integer")
 
-    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
-        """
-        Load the internal state of this object from the given buffer. The buffer may contain more data after the
-        structured element is parsed. This data is ignored.
-
-        :param buffer: The buffer to read data from
-        :param offset: The offset in the buffer where to start reading
-        :param length: The amount of data we are allowed to read from the buffer
-        :return: The number of bytes used from the buffer
-        """
-        my_offset, option_len = self.parse_option_header(buffer, offset, length)
-
-        if option_len != 4:
-            raise ValueError('INF_MAX_RT Options must have length 4')
-
-        self.inf_max_rt = unpack_from('!I', buffer, offset=offset + my_offset)
-        my_offset += 4
-
-        self.validate()
-
-        return my_offset
-
-    def save(self) -> bytes:
-        """
-        Save the internal state of this object as a buffer.
-
-        :return: The buffer with the data from this element
-        """
-        self.validate()
-        return pack('!HHI', self.option_type, 4, self.inf_max_rt)
-
 
 AdvertiseMessage.add_may_contain(SolMaxRTOption)
 AdvertiseMessage.add_may_contain(InfMaxRTOption)
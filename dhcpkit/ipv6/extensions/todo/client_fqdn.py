@@ -149,12 +149,12 @@ class ClientFQDNOption(Option):
         if my_offset != max_offset:
             raise ValueError('Option length does not match the combined length of the included search domains')
 
-        self.validate()
+        self.validate_once()
 
         return my_offset
 
     def save(self) -> bytes:
-        self.validate()
+        self.validate_before_save()
 
         domain_buffer = encode_domain_list(self.search_list)
 
@@ -5,15 +5,119 @@ together.
 """
 import logging
 import socket
+import struct
+import threading
 from ipaddress import IPv6Address
 
-from dhcpkit.ipv6 import SERVER_PORT, CLIENT_PORT
-from dhcpkit.ipv6.exceptions import ListeningSocketError, InvalidPacketError
-from dhcpkit.ipv6.messages import Message, RelayForwardMessage, RelayReplyMessage
+from dhcpkit.ipv6 import SERVER_PORT, CLIENT_PORT, HOP_COUNT_LIMIT
+from dhcpkit.ipv6.batched_io import BatchReceiver, send_batch
+from dhcpkit.ipv6.exceptions import ListeningSocketError, InvalidPacketError, DroppedPacketError
+from dhcpkit.ipv6.messages import Message, RelayForwardMessage, RelayReplyMessage, parse_relay_chain
 from dhcpkit.ipv6.options import RelayMessageOption, InterfaceIdOption
 
 logger = logging.getLogger(__name__)
 
+# The largest payload of a UDP datagram
+MAX_DATAGRAM_SIZE = 65535
+
+# Replies are sent from different threads, so each thread gets its own reply buffer
+reply_buffers = threading.local()
+
+
+def get_reply_buffer(slot: int = 0) -> bytearray:
+    """
+    Get a buffer that replies are serialised into by the current thread. The buffers are allocated once per thread and
+    are large enough to contain any reply that fits in a datagram. Replies that are sent together in one batch each
+    use their own slot, so that they don't overwrite each other.
+
+    :param slot: The number of the buffer within the batch
+    :return: The reply buffer of this thread
+    """
+    buffers = getattr(reply_buffers, 'buffers', None)
+    if buffers is None:
+        buffers = reply_buffers.buffers = []
+    while len(buffers) <= slot:
+        buffers.append(None)
+
+    buffer = buffers[slot]
+    if buffer is None or len(buffer) != MAX_DATAGRAM_SIZE:
+        buffer = buffers[slot] = bytearray(MAX_DATAGRAM_SIZE)
+    return buffer
+
+
+def wrap_message(message: Message, peer_address: IPv6Address, link_address: IPv6Address,
+                 interface_id: bytes) -> RelayForwardMessage:
+    """
+    Wrap a received message in a RelayForwardMessage like a relay would, so that the message handler gets the same
+    structure for messages that were received directly and for relayed ones.
+
+    :param message: The received message
+    :param peer_address: The address the message was received from
+    :param link_address: The global address of the interface the message was received on
+    :param interface_id: The interface-id of the interface the message was received on
+    :return: The wrapped message
+    """
+    # Determine the next hop count
+    if isinstance(message, RelayForwardMessage):
+        next_hop_count = message.hop_count + 1
+    else:
+        next_hop_count = 0
+
+    return RelayForwardMessage(hop_count=next_hop_count,
+                               link_address=link_address,
+                               peer_address=peer_address,
+                               options=[
+                                   InterfaceIdOption(interface_id=interface_id),
+                                   RelayMessageOption(relayed_message=message)
+                               ])
+
+
+def log_reply(reply: Message, destination: tuple, success: bool):
+    """
+    Log the result of sending a reply.
+
+    :param reply: The reply, without the RelayReplyMessage of the server itself
+    :param destination: The address the reply was sent to
+    :param success: Whether sending has succeeded
+    """
+    if isinstance(reply, RelayReplyMessage):
+        inner_relay_message = reply.inner_relay_message
+        inner_message = inner_relay_message.relayed_message
+
+        relay_interface_id_option = inner_relay_message.get_option_of_type(InterfaceIdOption)
+        if relay_interface_id_option:
+            interface_id = relay_interface_id_option.interface_id
+            try:
+                interface_id = interface_id.decode('ascii')
+            except ValueError:
+                pass
+
+            interface_id_str = '{} of '.format(interface_id)
+        else:
+            interface_id_str = ''
+
+        if success:
+            logger.debug("Sent {msg_type} to {client_addr} via {interface}relay {relay_addr}".format(
+                msg_type=type(inner_message).__name__,
+                client_addr=inner_relay_message.peer_address,
+                relay_addr=destination[0],
+                interface=interface_id_str))
+        else:
+            logger.error("{msg_type} to {client_addr} via {interface}relay {relay_addr} could not be sent".format(
+                msg_type=type(inner_message).__name__,
+                client_addr=inner_relay_message.peer_address,
+                relay_addr=destination[0],
+                interface=interface_id_str))
+    else:
+        if success:
+            logger.debug("Sent {msg_type} to {client_addr}".format(
+                msg_type=type(reply).__name__,
+                client_addr=destination[0]))
+        else:
+            logger.error("{msg_type} to {client_addr} could not be sent".format(
+                msg_type=type(reply).__name__,
+                client_addr=destination[0]))
+
 
 class ListeningSocket:
     """
@@ -32,8 +136,23 @@ class ListeningSocket:
     :type reply_socket: socket.socket
     :type reply_address: IPv6Address
     :type global_address: IPv6Address
+    :type pre_classifier: PreClassifier
+    :type shard: WorkerShard
+    :type receiver: BatchReceiver
     """
 
+    pre_classifier = None
+    """The :class:`.PreClassifier` that decides which packets are worth decoding, if any"""
+
+    shard = None
+    """The :class:`.WorkerShard` that decides which senders this worker process handles, if any"""
+
+    max_relay_depth = HOP_COUNT_LIMIT
+    """The maximum number of relay messages that a received request may be wrapped in"""
+
+    receiver = None
+    """The :class:`.BatchReceiver` used by :meth:`recv_packets`, created when it is first needed"""
+
     def __init__(self, interface_name: str, listen_socket: socket.socket, reply_socket: socket.socket = None,
                  global_address: IPv6Address = None):
         self.interface_name = interface_name
@@ -89,21 +208,37 @@ class ListeningSocket:
         :return: The address of the sender of the message and the received message
         """
         pkt, sender = self.listen_socket.recvfrom(65536)
+        return self.decode_request(pkt, sender)
+
+    def decode_request(self, pkt: bytes, sender: tuple) -> RelayForwardMessage:
+        """
+        Decode a message that was received on this socket, for callers that receive from the socket themselves.
+
+        :param pkt: The received packet
+        :param sender: The address of the sender as returned by recvfrom()
+        :return: The received message, wrapped like a relay would
+        """
+        if self.shard and not self.shard.owns(sender):
+            # Only imported here, in multi-process mode, so that a single server process doesn't have to
+            from dhcpkit.ipv6.workers import DROP_OTHER_WORKER
+            raise DroppedPacketError(DROP_OTHER_WORKER, sender=sender)
+
+        if self.pre_classifier:
+            reason = self.pre_classifier.classify(pkt)
+            if reason:
+                raise DroppedPacketError(reason, sender=sender)
+
         try:
-            length, msg_in = Message.parse(pkt)
-        except ValueError as e:
-            raise InvalidPacketError(str(e), sender=sender)
+            length, inner_message, relay_messages = parse_relay_chain(pkt, max_depth=self.max_relay_depth)
+        except (ValueError, struct.error, IndexError) as e:
+            # Truncated packets make the decoders read past the end of the buffer
+            raise InvalidPacketError(str(e) or 'Truncated packet', sender=sender)
 
-        # Determine the next hop count
-        if isinstance(msg_in, RelayForwardMessage):
-            next_hop_count = msg_in.hop_count + 1
-        else:
-            next_hop_count = 0
+        msg_in = relay_messages[-1] if relay_messages else inner_message
 
         # Construct useful log messages
         if isinstance(msg_in, RelayForwardMessage):
-            inner_relay_message = msg_in.inner_relay_message
-            inner_message = inner_relay_message.relayed_message
+            inner_relay_message = relay_messages[0]
 
             relay_interface_id_option = inner_relay_message.get_option_of_type(InterfaceIdOption)
             if relay_interface_id_option:
@@ -128,20 +263,29 @@ class ListeningSocket:
                 client_addr=sender[0]))
 
         # Pretend to be an internal relay and wrap the message like a relay would
-        return RelayForwardMessage(hop_count=next_hop_count,
-                                   link_address=self.global_address,
-                                   peer_address=IPv6Address(sender[0].split('%')[0]),
-                                   options=[
-                                       InterfaceIdOption(interface_id=self.interface_id),
-                                       RelayMessageOption(relayed_message=msg_in)
-                                   ])
+        return wrap_message(msg_in, IPv6Address(sender[0].split('%')[0]), self.global_address, self.interface_id)
 
-    def send_reply(self, message: RelayReplyMessage) -> bool:
+    def recv_packets(self, batch_size: int = 32) -> [(bytes, tuple, float)]:
         """
-        Send a reply using the information in the outer RelayReplyMessage
+        Receive the packets that are waiting on the listening socket in one batch, without blocking. The packets still
+        have to be decoded with :meth:`decode_request`. This must only be called from one thread at a time.
+
+        :param batch_size: The maximum number of packets to receive
+        :return: The packets, the addresses of their senders and the times at which the kernel received them
+        """
+        if not self.receiver or self.receiver.batch_size != batch_size:
+            self.receiver = BatchReceiver(self.listen_socket, batch_size)
+
+        return self.receiver.receive()
+
+    def encode_reply(self, message: RelayReplyMessage, slot: int = 0) -> (memoryview, tuple):
+        """
+        Serialise a reply using the information in the outer RelayReplyMessage. The reply is serialised into a reply
+        buffer of the current thread, so it is only valid until this thread encodes the next reply in the same slot.
 
         :param message: The message to reply with
-        :return: Whether sending has succeeded
+        :param slot: The reply buffer to use, see :func:`get_reply_buffer`
+        :return: The serialised reply and its destination
         """
 
         # Verify that the outer relay message makes sense
@@ -163,53 +307,73 @@ class ListeningSocket:
         # Down to network addresses and bytes
         port = isinstance(reply, RelayReplyMessage) and SERVER_PORT or CLIENT_PORT
         destination = (str(message.peer_address), port, 0, self.interface_index)
-        data = reply.save()
 
-        data_length = len(data)
-        sent_length = self.reply_socket.sendto(data, destination)
-        success = data_length == sent_length
+        # Serialise the whole reply, including any relay messages wrapped around it, into the preallocated buffer
+        buffer = get_reply_buffer(slot)
+        try:
+            data_length = reply.save_into(buffer)
+        except (struct.error, IndexError, BufferError):
+            # Something was written beyond the end of the buffer
+            data_length = None
 
-        # Construct useful log messages
-        if isinstance(reply, RelayReplyMessage):
-            inner_relay_message = reply.inner_relay_message
-            inner_message = inner_relay_message.relayed_message
+        # A reply that doesn't fit either fails while writing or makes the buffer grow, which get_reply_buffer undoes
+        if data_length is None or data_length > MAX_DATAGRAM_SIZE or len(buffer) != MAX_DATAGRAM_SIZE:
+            raise ValueError("The reply is too large to fit in a datagram")
 
-            relay_interface_id_option = inner_relay_message.get_option_of_type(InterfaceIdOption)
-            if relay_interface_id_option:
-                interface_id = relay_interface_id_option.interface_id
-                try:
-                    interface_id = interface_id.decode('ascii')
-                except ValueError:
-                    pass
+        return memoryview(buffer)[:data_length], destination
 
-                interface_id_str = '{} of '.format(interface_id)
-            else:
-                interface_id_str = ''
+    def send_reply(self, message: RelayReplyMessage) -> bool:
+        """
+        Send a reply using the information in the outer RelayReplyMessage
 
-            if success:
-                logger.debug("Sent {msg_type} to {client_addr} via {interface}relay {relay_addr}".format(
-                    msg_type=type(inner_message).__name__,
-                    client_addr=inner_relay_message.peer_address,
-                    relay_addr=destination[0],
-                    interface=interface_id_str))
-            else:
-                logger.error("{msg_type} to {client_addr} via {interface}relay {relay_addr} could not be sent".format(
-                    msg_type=type(inner_message).__name__,
-                    client_addr=inner_relay_message.peer_address,
-                    relay_addr=destination[0],
-                    interface=interface_id_str))
-        else:
-            if success:
-                logger.debug("Sent {msg_type} to {client_addr}".format(
-                    msg_type=type(reply).__name__,
-                    client_addr=destination[0]))
-            else:
-                logger.error("{msg_type} to {client_addr} could not be sent".format(
-                    msg_type=type(reply).__name__,
-                    client_addr=destination[0]))
+        :param message: The message to reply with
+        :return: Whether sending has succeeded
+        """
+        data, destination = self.encode_reply(message)
+        sent_length = self.reply_socket.sendto(data, destination)
+        success = len(data) == sent_length
 
+        log_reply(message.relayed_message, destination, success)
         return success
 
+    def send_replies(self, messages: [RelayReplyMessage]) -> [bool]:
+        """
+        Send a batch of replies, with a single system call where possible. Replies that are invalid are logged and
+        not sent.
+
+        :param messages: The messages to reply with
+        :return: Whether sending has succeeded, for each message
+        """
+        packets = []
+        replies = []
+        for message in messages:
+            try:
+                # Every reply in the batch gets its own reply buffer, so they can be sent without copying them
+                data, destination = self.encode_reply(message, slot=len(replies))
+            except ValueError as e:
+                logger.error("Not sending invalid reply: {}".format(e))
+                packets.append(None)
+                continue
+
+            packets.append((data, destination))
+            replies.append(message.relayed_message)
+
+        sent_lengths = iter(send_batch(self.reply_socket, [packet for packet in packets if packet]))
+        replies = iter(replies)
+
+        results = []
+        for packet in packets:
+            if packet is None:
+                results.append(False)
+                continue
+
+            data, destination = packet
+            success = len(data) == next(sent_lengths)
+            log_reply(next(replies), destination, success)
+            results.append(success)
+
+        return results
+
     def fileno(self) -> int:
         """
         The fileno of the listening socket, so this object can be used by select()
@@ -5,6 +5,9 @@ behaviour.
 
 import configparser
 import logging
+import threading
+from collections import OrderedDict
+from ipaddress import IPv6Address
 
 from dhcpkit.ipv6.duids import DUID
 from dhcpkit.ipv6.exceptions import CannotRespondError, UseMulticastError
@@ -12,15 +15,15 @@ from dhcpkit.ipv6.extensions.prefix_delegation import IAPDOption, IAPrefixOption
 from dhcpkit.ipv6.message_handlers import MessageHandler
 from dhcpkit.ipv6.messages import ClientServerMessage, ReplyMessage, AdvertiseMessage
 from dhcpkit.ipv6.messages import Message, RelayServerMessage, SolicitMessage, RequestMessage, ConfirmMessage, \
-    RenewMessage, RebindMessage, InformationRequestMessage, ReleaseMessage, DeclineMessage
-from dhcpkit.ipv6.option_handlers import OptionHandler
+    RenewMessage, RebindMessage, InformationRequestMessage, ReleaseMessage, DeclineMessage, RelayForwardMessage
+from dhcpkit.ipv6.option_handlers import OptionHandler, RelayOptionHandler
 from dhcpkit.ipv6.option_handlers.basic import ClientIdOptionHandler, ServerIdOptionHandler, \
     ConfirmStatusOptionHandler, ReleaseStatusOptionHandler, DeclineStatusOptionHandler
 from dhcpkit.ipv6.option_handlers.interface_id import InterfaceIdOptionHandler
-from dhcpkit.ipv6.option_handlers.rapid_commit import RapidCommitOptionHandler
 from dhcpkit.ipv6.option_handlers.unanswered import UnansweredIAPDOptionHandler, UnansweredIAOptionHandler
 from dhcpkit.ipv6.options import ClientIdOption, ServerIdOption, StatusCodeOption, STATUS_USEMULTICAST, \
-    IAAddressOption, IANAOption, IATAOption
+    IAAddressOption, IANAOption, IATAOption, OptionRequestOption, RelayMessageOption
+from dhcpkit.ipv6.reply_templates import ReplyTemplate
 from dhcpkit.ipv6.transaction_bundle import TransactionBundle
 from dhcpkit.utils import camelcase_to_underscore
 
@@ -32,16 +35,31 @@ class StandardMessageHandler(MessageHandler):
     This is the base class for standard handlers. It implements the standard handling of the DHCP protocol. Subclasses
     only need to provide the right addresses and options.
 
+    When all option handlers are :attr:`templatable <.OptionHandler.templatable>` the replies to Information-Request
+    messages are created from a :class:`.ReplyTemplate` for each combination of requested options and link, instead of
+    letting the option handlers construct every reply. The templates are shared by all threads that handle requests,
+    so they are kept in an :class:`~collections.OrderedDict` that is protected by its own lock, and when there are too
+    many the least recently used template is discarded.
+
     :type server_duid: DUID
     :type allow_rapid_commit: bool
     :type rapid_commit_rejections: bool
     :type option_handlers: list[OptionHandler]
+    :type relay_option_handlers: list[RelayOptionHandler]
+    :type reply_templates: OrderedDict or None
+    :type reply_templates_lock: threading.Lock or None
     """
 
     server_duid = None
     allow_rapid_commit = False
     rapid_commit_rejections = False
     option_handlers = None
+    relay_option_handlers = None
+    reply_templates = None
+    reply_templates_lock = None
+
+    # The maximum number of reply templates to keep, the least recently used one is discarded when there are more
+    max_reply_templates = 1024
 
     def handle_reload(self):
         """
@@ -61,6 +79,8 @@ class StandardMessageHandler(MessageHandler):
         self.option_handlers = []
 
         if self.allow_rapid_commit:
+            from dhcpkit.ipv6.option_handlers.rapid_commit import RapidCommitOptionHandler
+
             # Rapid commit happens as the first thing in the post() stage
             self.option_handlers.append(RapidCommitOptionHandler(self.rapid_commit_rejections))
 
@@ -95,6 +115,22 @@ class StandardMessageHandler(MessageHandler):
         self.option_handlers.append(ReleaseStatusOptionHandler())
         self.option_handlers.append(DeclineStatusOptionHandler())
 
+        self.init_reply_templates()
+
+    def init_reply_templates(self):
+        """
+        Start with an empty set of reply templates if all option handlers allow them. Subclasses that change the
+        option handlers after :meth:`handle_reload` must call this again.
+        """
+        self.relay_option_handlers = [option_handler for option_handler in self.option_handlers
+                                      if isinstance(option_handler, RelayOptionHandler)]
+        if all(option_handler.templatable for option_handler in self.option_handlers):
+            self.reply_templates = OrderedDict()
+            self.reply_templates_lock = threading.Lock()
+        else:
+            self.reply_templates = None
+            self.reply_templates_lock = None
+
     @staticmethod
     def determine_method_name(request: ClientServerMessage) -> str:
         """
@@ -163,6 +199,72 @@ class StandardMessageHandler(MessageHandler):
         # Build the plain chain of relay reply messages
         bundle.create_outgoing_relay_messages()
 
+    def build_reply_template(self, requested_options: frozenset or None, link_address: IPv6Address) -> ReplyTemplate:
+        """
+        Let the option handlers construct a reply to an Information-Request with the given requested options from the
+        given link, and turn that into a template.
+
+        :param requested_options: The requested options, or None if there is no OptionRequestOption
+        :param link_address: The link address of the request
+        :return: The template, or None if no template can be made
+        """
+        client_id = ClientIdOption(duid=self.server_duid)
+        options = [client_id]
+        if requested_options is not None:
+            options.append(OptionRequestOption(sorted(requested_options)))
+
+        request = InformationRequestMessage(options=options)
+        relay_message = RelayForwardMessage(link_address=link_address, peer_address=IPv6Address('::'),
+                                            options=[RelayMessageOption(relayed_message=request)])
+        bundle = TransactionBundle(incoming_message=relay_message, received_over_multicast=True)
+
+        try:
+            for option_handler in self.option_handlers:
+                option_handler.pre(bundle)
+
+            self.init_response(bundle)
+
+            for option_handler in self.option_handlers:
+                option_handler.handle(bundle)
+
+            for option_handler in self.option_handlers:
+                option_handler.post(bundle)
+        except (CannotRespondError, UseMulticastError):
+            return None
+
+        if bundle.response is None:
+            return None
+
+        return ReplyTemplate.from_response(bundle.response, client_id)
+
+    def get_reply_template(self, bundle: TransactionBundle) -> ReplyTemplate:
+        """
+        Get the template for the reply to the Information-Request in the bundle, building it if necessary.
+
+        :param bundle: The transaction bundle
+        :return: The template, or None if the reply has to be constructed by the option handlers
+        """
+        oro = bundle.request.get_option_of_type(OptionRequestOption)
+        key = (frozenset(oro.requested_options) if oro else None, bundle.get_link_address())
+
+        # Requests are handled by several threads at the same time, and they only hold the read lock of the handler
+        with self.reply_templates_lock:
+            try:
+                self.reply_templates.move_to_end(key)
+                return self.reply_templates[key]
+            except KeyError:
+                pass
+
+        # Build the template without holding the lock, in the worst case two threads build the same template
+        template = self.build_reply_template(*key)
+
+        with self.reply_templates_lock:
+            self.reply_templates[key] = template
+            while len(self.reply_templates) > self.max_reply_templates:
+                self.reply_templates.popitem(last=False)
+
+        return template
+
     def handle(self, received_message: RelayServerMessage, received_over_multicast: bool) -> Message or None:
         """
         The main dispatcher for incoming messages.
@@ -187,6 +289,19 @@ class StandardMessageHandler(MessageHandler):
                 for option_handler in self.option_handlers:
                     option_handler.pre(bundle)
 
+                # Information-Requests can often be answered from a template
+                if self.reply_templates is not None and isinstance(bundle.request, InformationRequestMessage):
+                    template = self.get_reply_template(bundle)
+                    if template is not None:
+                        bundle.response = template.create_reply(bundle.request)
+                        bundle.create_outgoing_relay_messages()
+
+                        # Only the relay messages still need to be handled
+                        for option_handler in self.relay_option_handlers:
+                            option_handler.handle(bundle)
+
+                        return bundle.outgoing_message
+
                 # Init the response
                 self.init_response(bundle)
 
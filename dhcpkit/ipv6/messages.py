@@ -1,9 +1,11 @@
 """
 Classes and constants for the message types defined in :rfc:`3315`
 """
-
 from ipaddress import IPv6Address
+from struct import unpack_from, Struct
 
+from dhcpkit.ipv6 import HOP_COUNT_LIMIT
+from dhcpkit.ipv6.option_list import OptionList
 from dhcpkit.protocol_element import ProtocolElement
 
 MSG_SOLICIT = 1
@@ -20,6 +22,12 @@ MSG_INFORMATION_REQUEST = 11
 MSG_RELAY_FORW = 12
 MSG_RELAY_REPL = 13
 
+relay_header = Struct('!BB16s16s')
+
+# The loaded entries of the message registry, bound when the first message is parsed. The registry loads the modules that
+# implement messages, and those import this module, so it can't be loaded while this module is being imported.
+_registered_messages = None
+
 
 # This subclass remains abstract
 # noinspection PyAbstractClass
@@ -31,6 +39,9 @@ class Message(ProtocolElement):
     :type from_client_to_server: bool
     :type from_server_to_client: bool
     """
+
+    __slots__ = ()
+
     # These needs to be overwritten in subclasses
     message_type = 0
     from_client_to_server = False
@@ -45,9 +56,18 @@ class Message(ProtocolElement):
         :param offset: The offset in the buffer where to start reading
         :return: The best known class for this message data
         """
-        from dhcpkit.ipv6.message_registry import message_registry
+        global _registered_messages
+        if _registered_messages is None:
+            from dhcpkit.ipv6.message_registry import message_registry
+            _registered_messages = message_registry.data
+
         message_type = buffer[offset]
-        return message_registry.get(message_type, UnknownMessage)
+        element_class = _registered_messages.get(message_type)
+        if element_class is None:
+            # The entry point of this type hasn't been loaded yet, or there is none
+            from dhcpkit.ipv6.message_registry import message_registry
+            element_class = message_registry.get(message_type, UnknownMessage)
+        return element_class
 
 
 class UnknownMessage(Message):
@@ -57,6 +77,8 @@ class UnknownMessage(Message):
     :type message_data: bytes
     """
 
+    __slots__ = ('message_type', 'message_data')
+
     def __init__(self, message_type: int = 0, message_data: bytes = b''):
         super().__init__()
         self.message_type = message_type
@@ -92,10 +114,10 @@ class UnknownMessage(Message):
 
         max_length = length or (len(buffer) - offset)
         message_data_len = max_length - my_offset
-        self.message_data = buffer[offset + my_offset:offset + my_offset + message_data_len]
+        self.message_data = bytes(buffer[offset + my_offset:offset + my_offset + message_data_len])
         my_offset += message_data_len
 
-        self.validate()
+        self.validate_once()
 
         return my_offset
 
@@ -105,7 +127,7 @@ class UnknownMessage(Message):
 
         :return: The buffer with the data from this element
         """
-        self.validate()
+        self.validate_before_save()
 
         buffer = bytearray()
         buffer.append(self.message_type)
@@ -113,7 +135,313 @@ class UnknownMessage(Message):
         return buffer
 
 
-class ClientServerMessage(Message):
+def carries_iaid(klass: type) -> bool:
+    """
+    Determine whether options of the given class carry an IAID, which is the case if the constructor accepts one.
+
+    :param klass: The option class
+    :return: Whether the option class has an IAID
+    """
+    return 'iaid' in klass._fields
+
+
+class LazyOptionsMixin:
+    """
+    Storage for the options of a message. Normally all options are decoded when the message is parsed. When
+    :attr:`lazy_option_decoding` is enabled only an index of the raw options is built while parsing. Each option is
+    then decoded the first time it is accessed through :meth:`get_option_of_type`, :meth:`get_options_of_type` or
+    :attr:`options`, and options that are never accessed are saved from their original bytes.
+
+    Options that are still raw are only validated as far as the message is concerned: whether they may occur in the
+    message, how often they occur and whether their IAIDs are unique. Their contents are validated when they are
+    decoded.
+
+    Once all options are decoded they are stored in an :class:`.OptionList`, so looking them up by type doesn't have to
+    look at every option.
+
+    :type lazy_option_decoding: bool
+    """
+
+    # Classes using this mixin must provide the _options and _raw_options slots. The option entries are either decoded
+    # options or (class, start, end) tuples that point into the raw data.
+    __slots__ = ()
+
+    # Set to True to decode options when they are first accessed instead of when the message is parsed
+    lazy_option_decoding = False
+
+    @property
+    def options(self) -> OptionList:
+        """
+        The list of options in this message. Accessing it decodes all options that haven't been decoded yet.
+
+        :return: The list of options
+        """
+        if self._raw_options is not None:
+            self._options = OptionList([self._decode_option(entry) if type(entry) is tuple else entry
+                                        for entry in self._options])
+            self._raw_options = None
+
+        return self._options
+
+    @options.setter
+    def options(self, options: list):
+        """
+        Replace the list of options in this message.
+
+        :param options: The new list of options
+        """
+        self._options = options if isinstance(options, OptionList) else OptionList(options)
+        self._raw_options = None
+
+    def list_contents(self) -> tuple:
+        """
+        The contents of the list properties of this message, without decoding any options. While options haven't been
+        decoded the list of options can only be changed by accessing :attr:`options`, which replaces the list.
+
+        :return: A tuple with the contents of each list property
+        """
+        if self._raw_options is not None:
+            return self._options,
+
+        return super().list_contents()
+
+    def sub_elements(self) -> list:
+        """
+        The sub-elements of this message, without decoding any options. Options that haven't been decoded can't have
+        been modified.
+
+        :return: The list of sub-elements
+        """
+        if self._raw_options is not None:
+            return [entry for entry in self._options if type(entry) is not tuple]
+
+        return super().sub_elements()
+
+    def _decode_option(self, entry: tuple) -> object:
+        """
+        Decode a raw option entry.
+
+        :param entry: The (class, start, end) tuple pointing into the raw option data
+        :return: The decoded option
+        """
+        option_class, start, end = entry
+        option = option_class()
+        option.load_from(self._raw_options, offset=start, length=end - start)
+        return option
+
+    def _option_entry_classes(self) -> list:
+        """
+        List the options in this message, where options that haven't been decoded are represented by their class.
+
+        :return: A list of options and option classes
+        """
+        if self._raw_options is None:
+            return self._options
+
+        return [entry[0] if type(entry) is tuple else entry for entry in self._options]
+
+    def _decoded_options(self) -> list:
+        """
+        List the options in this message that have been decoded.
+
+        :return: The list of decoded options
+        """
+        if self._raw_options is None:
+            return self._options
+
+        return [entry for entry in self._options if type(entry) is not tuple]
+
+    def _option_iaids(self) -> list:
+        """
+        List the IAIDs of the options in this message that carry one, without decoding the options. Like all IA
+        options defined for DHCPv6 the IAID of a raw option is read from the first four bytes of its option-data.
+
+        :return: A list of (class, IAID) tuples
+        """
+        iaids = []
+        for entry in self._options:
+            if type(entry) is tuple:
+                option_class, start, end = entry
+                if carries_iaid(option_class):
+                    iaids.append((option_class, bytes(self._raw_options[start + 4:start + 8])))
+            else:
+                iaid = getattr(entry, 'iaid', None)
+                if iaid:
+                    iaids.append((type(entry), iaid))
+
+        return iaids
+
+    def get_options_of_type(self, klass: type) -> list:
+        """
+        Get all options that are subclasses of the given class.
+
+        :param klass: The class to look for
+        :returns: The list of options
+
+        :type klass: T
+        :rtype: list[T()]
+        """
+        if self._raw_options is None:
+            return self._options.get_options_of_type(klass)
+
+        options = []
+        for index, entry in enumerate(self._options):
+            if type(entry) is tuple:
+                if not issubclass(entry[0], klass):
+                    continue
+
+                entry = self._options[index] = self._decode_option(entry)
+
+            elif not isinstance(entry, klass):
+                continue
+
+            options.append(entry)
+
+        return options
+
+    def get_option_of_type(self, klass: type) -> object or None:
+        """
+        Get the first option that is a subclass of the given class.
+
+        :param klass: The class to look for
+        :returns: The option or None
+
+        :type klass: T
+        :rtype: T() or None
+        """
+        if self._raw_options is None:
+            return self._options.get_option_of_type(klass)
+
+        for index, entry in enumerate(self._options):
+            if type(entry) is tuple:
+                if issubclass(entry[0], klass):
+                    option = self._options[index] = self._decode_option(entry)
+                    return option
+
+            elif isinstance(entry, klass):
+                return entry
+
+    def load_options_from(self, buffer: bytes, offset: int = 0, length: int = None,
+                          relayed_option: tuple = None) -> int:
+        """
+        Load the options of this message from the given buffer, either by decoding them or by indexing them.
+
+        :param buffer: The buffer to read data from
+        :param offset: The offset in the buffer where to start reading
+        :param length: The amount of data we are allowed to read from the buffer
+        :param relayed_option: A (start, end, option) tuple with an option that has already been decoded, used by
+                               :meth:`RelayServerMessage.load_chain_from` for the option that contains the relayed
+                               message
+        :return: The number of bytes used from the buffer
+        """
+        from dhcpkit.ipv6.options import Option
+
+        my_offset = 0
+        max_length = length or (len(buffer) - offset)
+        relayed_start, relayed_end, relayed = relayed_option or (None, None, None)
+
+        if not self.lazy_option_decoding:
+            options = []
+            while max_length > my_offset:
+                if my_offset == relayed_start:
+                    options.append(relayed)
+                    my_offset = relayed_end
+                    continue
+
+                used_buffer, option = Option.parse(buffer, offset=offset + my_offset)
+                options.append(option)
+                my_offset += used_buffer
+
+            self.options = options
+            return my_offset
+
+        # Keep the raw option data around: parsed elements may not refer to a buffer that might change
+        raw_options = buffer[offset:offset + max_length]
+        if not isinstance(raw_options, memoryview) or not isinstance(raw_options.obj, bytes):
+            raw_options = memoryview(bytes(raw_options))
+
+        entries = []
+        while max_length > my_offset:
+            if my_offset == relayed_start:
+                entries.append(relayed)
+                my_offset = relayed_end
+                continue
+
+            if my_offset + 4 > max_length:
+                raise ValueError('The option header is longer than the available buffer')
+
+            option_len = unpack_from('!H', raw_options, offset=my_offset + 2)[0] + 4
+            if my_offset + option_len > max_length:
+                raise ValueError('This option is longer than the available buffer')
+
+            entries.append((Option.determine_class(raw_options, offset=my_offset), my_offset, my_offset + option_len))
+            my_offset += option_len
+
+        self._options = entries
+        self._raw_options = raw_options
+        return my_offset
+
+    def set_option_entries(self, entries: list, raw_options: memoryview):
+        """
+        Use options that have already been indexed elsewhere, like the options of a reply template. The entries are
+        either decoded options or (class, start, end) tuples that point into the raw option data. Raw options are saved
+        from their original bytes until they are decoded, just like with :attr:`lazy_option_decoding`.
+
+        :param entries: The option entries
+        :param raw_options: The raw option data that the tuples point into, which must not change
+        """
+        self._options = entries
+        self._raw_options = raw_options
+
+    def save_options(self) -> bytes:
+        """
+        Save the options of this message, using the original bytes for options that haven't been decoded.
+
+        :return: The buffer with the options
+        """
+        buffer = bytearray()
+        for entry in self._options:
+            if type(entry) is tuple:
+                buffer.extend(self._raw_options[entry[1]:entry[2]])
+            else:
+                buffer.extend(entry.save())
+        return buffer
+
+    def options_encoded_length(self) -> int:
+        """
+        Determine the length of the saved options of this message.
+
+        :return: The length of the options in bytes
+        """
+        length = 0
+        for entry in self._options:
+            if type(entry) is tuple:
+                length += entry[2] - entry[1]
+            else:
+                length += entry.encoded_length()
+        return length
+
+    def save_options_into(self, buffer: bytearray, offset: int = 0) -> int:
+        """
+        Save the options of this message into an existing buffer, using the original bytes for options that haven't
+        been decoded.
+
+        :param buffer: The buffer to write data to
+        :param offset: The offset in the buffer where to start writing
+        :return: The number of bytes written to the buffer
+        """
+        my_offset = offset
+        for entry in self._options:
+            if type(entry) is tuple:
+                option_length = entry[2] - entry[1]
+                buffer[my_offset:my_offset + option_length] = self._raw_options[entry[1]:entry[2]]
+                my_offset += option_length
+            else:
+                my_offset += entry.save_into(buffer, my_offset)
+        return my_offset - offset
+
+
+class ClientServerMessage(LazyOptionsMixin, Message):
     """
     :rfc:`3315#section-6`
 
@@ -154,6 +482,8 @@ class ClientServerMessage(Message):
     :type options: list[Option]
     """
 
+    __slots__ = ('transaction_id', '_options', '_raw_options')
+
     def __init__(self, transaction_id: bytes = b'\x00\x00\x00', options: [] = None):
         super().__init__()
         self.transaction_id = transaction_id
@@ -168,46 +498,18 @@ class ClientServerMessage(Message):
             raise ValueError("Transaction-id must be 3 bytes")
 
         # Check if all options are allowed
-        self.validate_contains(self.options)
-        for option in self.options:
-            option.validate()
+        self.validate_contains(self._option_entry_classes())
+        for option in self._decoded_options():
+            option.validate_once()
 
         # Make sure that all IAIDs are unique for their type
         iaids = {}
-        for option in self.options:
-            iaid = getattr(option, 'iaid', None)
-            if iaid:
-                option_class = self.get_element_class(option)
-                existing = iaids.setdefault(option_class, [])
-                if iaid in existing:
-                    raise ValueError("IAID {} of {} is not unique".format(iaid, option_class.__name__))
-                existing.append(iaid)
-
-    def get_options_of_type(self, klass: type) -> list:
-        """
-        Get all options that are subclasses of the given class.
-
-        :param klass: The class to look for
-        :returns: The list of options
-
-        :type klass: T
-        :rtype: list[T()]
-        """
-        return [option for option in self.options if isinstance(option, klass)]
-
-    def get_option_of_type(self, klass: type) -> object or None:
-        """
-        Get the first option that is a subclass of the given class.
-
-        :param klass: The class to look for
-        :returns: The option or None
-
-        :type klass: T
-        :rtype: T() or None
-        """
-        for option in self.options:
-            if isinstance(option, klass):
-                return option
+        for option, iaid in self._option_iaids():
+            option_class = self.get_element_class(option)
+            existing = iaids.setdefault(option_class, [])
+            if iaid in existing:
+                raise ValueError("IAID {} of {} is not unique".format(iaid, option_class.__name__))
+            existing.append(iaid)
 
     def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
         """
@@ -228,20 +530,14 @@ class ClientServerMessage(Message):
         if message_type != self.message_type:
             raise ValueError('The provided buffer does not contain {} data'.format(self.__class__.__name__))
 
-        self.transaction_id = buffer[offset + my_offset:offset + my_offset + 3]
+        self.transaction_id = bytes(buffer[offset + my_offset:offset + my_offset + 3])
         my_offset += 3
 
         # Parse the options
-        from dhcpkit.ipv6.options import Option
-
         max_length = length or (len(buffer) - offset)
-        while max_length > my_offset:
-            used_buffer, option = Option.parse(buffer, offset=offset + my_offset)
+        my_offset += self.load_options_from(buffer, offset=offset + my_offset, length=max_length - my_offset)
 
-            self.options.append(option)
-            my_offset += used_buffer
-
-        self.validate()
+        self.validate_once()
 
         return my_offset
 
@@ -251,17 +547,38 @@ class ClientServerMessage(Message):
 
         :return: The buffer with the data from this element
         """
-        self.validate()
+        self.validate_before_save()
 
         buffer = bytearray()
         buffer.append(self.message_type)
         buffer.extend(self.transaction_id)
-        for option in self.options:
-            buffer.extend(option.save())
+        buffer.extend(self.save_options())
         return buffer
 
+    def encoded_length(self) -> int:
+        """
+        Determine the number of bytes that :func:`save` and :func:`save_into` produce for this message.
+
+        :return: The length of the saved message in bytes
+        """
+        return 4 + self.options_encoded_length()
+
+    def save_into(self, buffer: bytearray, offset: int = 0) -> int:
+        """
+        Save the internal state of this object into an existing buffer.
+
+        :param buffer: The buffer to write data to
+        :param offset: The offset in the buffer where to start writing
+        :return: The number of bytes written to the buffer
+        """
+        self.validate_before_save()
+
+        buffer[offset] = self.message_type
+        buffer[offset + 1:offset + 4] = self.transaction_id
+        return 4 + self.save_options_into(buffer, offset + 4)
 
-class RelayServerMessage(Message):
+
+class RelayServerMessage(LazyOptionsMixin, Message):
     """
     :rfc:`3315#section-7`
 
@@ -305,6 +622,8 @@ class RelayServerMessage(Message):
     :type options: list[Option]
     """
 
+    __slots__ = ('hop_count', 'link_address', 'peer_address', '_options', '_raw_options')
+
     def __init__(self, hop_count: int = 0, link_address: IPv6Address = None, peer_address: IPv6Address = None,
                  options: [] = None):
         super().__init__()
@@ -328,34 +647,9 @@ class RelayServerMessage(Message):
             raise ValueError("Peer-address must be a non-multicast IPv6 address")
 
         # Check if all options are allowed
-        self.validate_contains(self.options)
-        for option in self.options:
-            option.validate()
-
-    def get_options_of_type(self, klass: type) -> list:
-        """
-        Get all options that are subclasses of the given class.
-
-        :param klass: The class to look for
-        :returns: The list of options
-
-        :type klass: T
-        :rtype: list[T()]
-        """
-        return [option for option in self.options if isinstance(option, klass)]
-
-    def get_option_of_type(self, klass) -> object or None:
-        """
-        Get the first option that is a subclass of the given class.
-
-        :param klass: The class to look for
-        :type klass: type(T)
-        :returns: The option or None
-        :rtype: T
-        """
-        for option in self.options:
-            if isinstance(option, klass):
-                return option
+        self.validate_contains(self._option_entry_classes())
+        for option in self._decoded_options():
+            option.validate_once()
 
     @property
     def relayed_message(self) -> Message or None:
@@ -400,13 +694,13 @@ class RelayServerMessage(Message):
         """
         from dhcpkit.ipv6.options import RelayMessageOption
 
-        for option in self.options:
-            if isinstance(option, RelayMessageOption):
-                message = option.relayed_message
-                if isinstance(message, RelayServerMessage):
-                    return message.inner_message
-                else:
-                    return message
+        relay_message_option = self.get_option_of_type(RelayMessageOption)
+        if relay_message_option:
+            message = relay_message_option.relayed_message
+            if isinstance(message, RelayServerMessage):
+                return message.inner_message
+            else:
+                return message
 
         # No embedded message found
         return None
@@ -422,15 +716,15 @@ class RelayServerMessage(Message):
         """
         from dhcpkit.ipv6.options import RelayMessageOption
 
-        for option in self.options:
-            if isinstance(option, RelayMessageOption):
-                message = option.relayed_message
-                if isinstance(message, RelayServerMessage):
-                    # We contain a RelayServerMessage, so we are not the innermost: delegate
-                    return message.inner_relay_message
-                else:
-                    # We don't contain another RelayServerMessage so we are the innermost!
-                    return self
+        relay_message_option = self.get_option_of_type(RelayMessageOption)
+        if relay_message_option:
+            message = relay_message_option.relayed_message
+            if isinstance(message, RelayServerMessage):
+                # We contain a RelayServerMessage, so we are not the innermost: delegate
+                return message.inner_relay_message
+            else:
+                # We don't contain another RelayServerMessage so we are the innermost!
+                return self
 
         # No embedded message found
         return None
@@ -438,40 +732,121 @@ class RelayServerMessage(Message):
     def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
         """
         Load the internal state of this object from the given buffer. The buffer may contain more data after the
-        structured element is parsed. This data is ignored.
+        structured element is parsed. This data is ignored. Relay messages inside this one are loaded as well, see
+        :meth:`load_chain_from`.
 
         :param buffer: The buffer to read data from
         :param offset: The offset in the buffer where to start reading
         :param length: The amount of data we are allowed to read from the buffer
         :return: The number of bytes used from the buffer
         """
-        my_offset = 0
-
-        # These message types always begin with a message type, a hop count, the link address and the peer address
-        self.message_type = buffer[offset + my_offset]
-        my_offset += 1
+        return self.load_chain_from(buffer, offset=offset, length=length)[0]
 
-        self.hop_count = buffer[offset + my_offset]
-        my_offset += 1
-
-        self.link_address = IPv6Address(buffer[offset + my_offset:offset + my_offset + 16])
-        my_offset += 16
-
-        self.peer_address = IPv6Address(buffer[offset + my_offset:offset + my_offset + 16])
-        my_offset += 16
+    def load_chain_from(self, buffer: bytes, offset: int = 0, length: int = None,
+                        max_depth: int = HOP_COUNT_LIMIT) -> (int, Message, list):
+        """
+        Load this relay message and all relay messages nested inside it from the given buffer without recursion. The
+        headers and option headers of the whole chain are scanned first, so that chains with more than max_depth relay
+        messages are rejected before anything is decoded. Then the relay messages are decoded from the inside out, all
+        from the same buffer.
 
-        # Parse the options
-        from dhcpkit.ipv6.options import Option
+        :param buffer: The buffer to read data from
+        :param offset: The offset in the buffer where to start reading
+        :param length: The amount of data we are allowed to read from the buffer
+        :param max_depth: The maximum number of relay messages in the chain
+        :return: The number of bytes used from the buffer, the innermost relayed message and the chain of relay messages
+                 starting with the one closest to the client, like :meth:`.TransactionBundle.split_relay_chain`
+        """
+        from dhcpkit.ipv6.options import Option, RelayMessageOption
 
         max_length = length or (len(buffer) - offset)
-        while max_length > my_offset:
-            used_buffer, option = Option.parse(buffer, offset=offset + my_offset)
-            self.options.append(option)
-            my_offset += used_buffer
 
-        self.validate()
+        # Find the relay messages and the options that contain the next message in the chain
+        levels = []
+        message_class = type(self)
+        message_offset = offset
+        message_length = max_length
+        while issubclass(message_class, RelayServerMessage):
+            if len(levels) >= max_depth:
+                raise ValueError('Relay chain is deeper than {} relay messages'.format(max_depth))
+
+            if message_length < 34 or buffer[message_offset] != message_class.message_type:
+                raise ValueError('The provided buffer does not contain {} data'.format(message_class.__name__))
+
+            # The first RelayMessageOption contains the next message, any others are left for validation to reject
+            relayed_offset = None
+            options_end = message_offset + message_length
+            option_offset = message_offset + 34
+            while options_end > option_offset:
+                if option_offset + 4 > options_end:
+                    raise ValueError('The option header is longer than the available buffer')
+
+                option_len = unpack_from('!H', buffer, offset=option_offset + 2)[0] + 4
+                if option_offset + option_len > options_end:
+                    raise ValueError('This option is longer than the available buffer')
+
+                if relayed_offset is None and \
+                        issubclass(Option.determine_class(buffer, offset=option_offset), RelayMessageOption):
+                    relayed_offset = option_offset
+
+                option_offset += option_len
+
+            levels.append((message_class, message_offset, message_length, relayed_offset))
+            if relayed_offset is None:
+                break
+
+            message_offset = relayed_offset + 4
+            message_length = unpack_from('!H', buffer, offset=relayed_offset + 2)[0]
+            if message_length == 0:
+                raise ValueError('Option length does not match the length of the embedded Message')
+
+            message_class = Message.determine_class(buffer, offset=message_offset)
+
+        # Decode the innermost message, if the innermost relay message contains one
+        if levels[-1][3] is None:
+            message = None
+        else:
+            message = message_class()
+            if message.load_from(buffer, offset=message_offset, length=message_length) != message_length:
+                raise ValueError('Option length does not match the length of the embedded Message')
+
+        # And wrap it in the relay messages
+        relay_messages = []
+        relayed_message = message
+        for message_class, message_offset, message_length, relayed_offset in reversed(levels):
+            relay_message = self if message_offset == offset else message_class()
+            relay_message.load_relay_header_from(buffer, offset=message_offset)
+
+            # Decode the options around the relay message option, which gets the message that was decoded before
+            options_offset = message_offset + 34
+            options_end = message_offset + message_length
+            if relayed_offset is None:
+                relay_message.load_options_from(buffer, offset=options_offset, length=options_end - options_offset)
+            else:
+                relayed_end = relayed_offset + 4 + unpack_from('!H', buffer, offset=relayed_offset + 2)[0]
+                relay_message.load_options_from(buffer, offset=options_offset, length=options_end - options_offset,
+                                                relayed_option=(relayed_offset - options_offset,
+                                                                relayed_end - options_offset,
+                                                                RelayMessageOption(relayed_message=relayed_message)))
+
+            relay_messages.append(relay_message)
+            relayed_message = relay_message
+
+        # Validating the outermost relay message validates the whole chain
+        self.validate_once()
+
+        return max_length, message, relay_messages
+
+    def load_relay_header_from(self, buffer: bytes, offset: int = 0):
+        """
+        Load the hop count, link address and peer address from the header of a relay message.
 
-        return my_offset
+        :param buffer: The buffer to read data from
+        :param offset: The offset in the buffer where the relay message starts
+        """
+        message_type, self.hop_count, link_address, peer_address = relay_header.unpack_from(buffer, offset)
+        self.link_address = IPv6Address(link_address)
+        self.peer_address = IPv6Address(peer_address)
 
     def save(self) -> bytes:
         """
@@ -479,23 +854,48 @@ class RelayServerMessage(Message):
 
         :return: The buffer with the data from this element
         """
-        self.validate()
+        self.validate_before_save()
 
         buffer = bytearray()
         buffer.append(self.message_type)
         buffer.append(self.hop_count)
         buffer.extend(self.link_address.packed)
         buffer.extend(self.peer_address.packed)
-        for option in self.options:
-            buffer.extend(option.save())
+        buffer.extend(self.save_options())
         return buffer
 
+    def encoded_length(self) -> int:
+        """
+        Determine the number of bytes that :func:`save` and :func:`save_into` produce for this message.
+
+        :return: The length of the saved message in bytes
+        """
+        return 34 + self.options_encoded_length()
+
+    def save_into(self, buffer: bytearray, offset: int = 0) -> int:
+        """
+        Save the internal state of this object into an existing buffer. Relayed messages are saved into the same
+        buffer, so a whole chain of relay messages is serialised in one pass.
+
+        :param buffer: The buffer to write data to
+        :param offset: The offset in the buffer where to start writing
+        :return: The number of bytes written to the buffer
+        """
+        self.validate_before_save()
+
+        relay_header.pack_into(buffer, offset,
+                               self.message_type, self.hop_count, self.link_address.packed, self.peer_address.packed)
+        return 34 + self.save_options_into(buffer, offset + 34)
+
 
 class SolicitMessage(ClientServerMessage):
     """
     SOLICIT (1)
         A client sends a Solicit message to locate servers.
     """
+
+    __slots__ = ()
+
     message_type = MSG_SOLICIT
     from_client_to_server = True
 
@@ -505,6 +905,9 @@ class AdvertiseMessage(ClientServerMessage):
     A server sends an Advertise message to indicate that it is available for DHCP service, in response to a
     Solicit message received from a client.
     """
+
+    __slots__ = ()
+
     message_type = MSG_ADVERTISE
     from_server_to_client = True
 
@@ -514,6 +917,9 @@ class RequestMessage(ClientServerMessage):
     A client sends a Request message to request configuration parameters, including IP addresses, from a
     specific server.
     """
+
+    __slots__ = ()
+
     message_type = MSG_REQUEST
     from_client_to_server = True
 
@@ -523,6 +929,9 @@ class ConfirmMessage(ClientServerMessage):
     A client sends a Confirm message to any available server to determine whether the addresses it was assigned
     are still appropriate to the link to which the client is connected.
     """
+
+    __slots__ = ()
+
     message_type = MSG_CONFIRM
     from_client_to_server = True
 
@@ -533,6 +942,9 @@ class RenewMessage(ClientServerMessage):
     parameters to extend the lifetimes on the addresses assigned to the client and to update other configuration
     parameters.
     """
+
+    __slots__ = ()
+
     message_type = MSG_RENEW
     from_client_to_server = True
 
@@ -543,6 +955,9 @@ class RebindMessage(ClientServerMessage):
     the client and to update other configuration parameters; this message is sent after a client receives no
     response to a Renew message.
     """
+
+    __slots__ = ()
+
     message_type = MSG_REBIND
     from_client_to_server = True
 
@@ -556,6 +971,9 @@ class ReplyMessage(ClientServerMessage):
     to the link to which the client is connected.  A server sends a Reply message to acknowledge receipt of a
     Release or Decline message.
     """
+
+    __slots__ = ()
+
     message_type = MSG_REPLY
     from_server_to_client = True
 
@@ -565,6 +983,9 @@ class ReleaseMessage(ClientServerMessage):
     A client sends a Release message to the server that assigned addresses to the client to indicate that the
     client will no longer use one or more of the assigned addresses.
     """
+
+    __slots__ = ()
+
     message_type = MSG_RELEASE
     from_client_to_server = True
 
@@ -574,6 +995,9 @@ class DeclineMessage(ClientServerMessage):
     A client sends a Decline message to a server to indicate that the client has determined that one or more
     addresses assigned by the server are already in use on the link to which the client is connected.
     """
+
+    __slots__ = ()
+
     message_type = MSG_DECLINE
     from_client_to_server = True
 
@@ -584,6 +1008,9 @@ class ReconfigureMessage(ClientServerMessage):
     configuration parameters, and that the client is to initiate a Renew/Reply or Information-request/Reply
     transaction with the server in order to receive the updated information.
     """
+
+    __slots__ = ()
+
     message_type = MSG_RECONFIGURE
     from_server_to_client = True
 
@@ -593,6 +1020,9 @@ class InformationRequestMessage(ClientServerMessage):
     A client sends an Information-request message to a server to request configuration parameters without the
     assignment of any IP addresses to the client.
     """
+
+    __slots__ = ()
+
     message_type = MSG_INFORMATION_REQUEST
     from_client_to_server = True
 
@@ -603,6 +1033,9 @@ class RelayForwardMessage(RelayServerMessage):
     relay agent.  The received message, either a client message or a Relay-forward message from another relay
     agent, is encapsulated in an option in the Relay-forward message.
     """
+
+    __slots__ = ()
+
     message_type = MSG_RELAY_FORW
     from_client_to_server = True
 
@@ -641,5 +1074,32 @@ class RelayReplyMessage(RelayServerMessage):
     The server encapsulates the client message as an option in the Relay-reply message, which the relay agent
     extracts and relays to the client.
     """
+
+    __slots__ = ()
+
     message_type = MSG_RELAY_REPL
     from_server_to_client = True
+
+
+def parse_relay_chain(buffer: bytes, offset: int = 0, length: int = None,
+                      max_depth: int = HOP_COUNT_LIMIT) -> (int, Message, [RelayServerMessage]):
+    """
+    Parse a message that may be wrapped in relay messages, see :meth:`RelayServerMessage.load_chain_from`.
+
+    :param buffer: The buffer to read data from
+    :param offset: The offset in the buffer where to start reading
+    :param length: The amount of data we are allowed to read from the buffer
+    :param max_depth: The maximum number of relay messages in the chain
+    :return: The number of bytes used from the buffer, the innermost message and the chain of relay messages starting
+             with the one closest to the client, which is empty if the message isn't relayed
+    """
+    if not isinstance(buffer, memoryview):
+        buffer = memoryview(buffer)
+
+    message_class = Message.determine_class(buffer, offset=offset)
+    if issubclass(message_class, RelayServerMessage):
+        return message_class().load_chain_from(buffer, offset=offset, length=length, max_depth=max_depth)
+
+    message = message_class()
+    length = message.load_from(buffer, offset=offset, length=length)
+    return length, message, []
@@ -0,0 +1,595 @@
+"""
+Declarative description of the wire format of options. Instead of implementing :meth:`load_from`, :meth:`save`,
+:meth:`encoded_length` and :meth:`save_into` by hand an option class can describe its fields and let
+:func:`generate_codec` create those methods::
+
+    @generate_codec(BytesField('iaid', 4), UIntField('t1', 4), UIntField('t2', 4), OptionsField('options', Option))
+    class IANAOption(Option):
+        ...
+
+All fixed-size fields (integers, fixed-length bytes and IPv6 addresses) are combined with the option header into one
+precompiled :class:`struct.Struct`, and specialised methods are generated for each class when the module defining it is
+imported. The last field may have a variable length, in which case it uses the rest of the option data.
+
+The generated methods validate the option just like hand-written implementations do, following the validation policy
+of :class:`.ProtocolElement`, so validation stays the responsibility of the option class.
+
+Options that have been :meth:`frozen <.Option.freeze>` are saved by the generated methods by copying their remembered
+wire format.
+"""
+import struct
+from abc import ABCMeta, abstractmethod
+from ipaddress import IPv6Address
+
+from dhcpkit.protocol_element import ProtocolElement
+from dhcpkit.utils import parse_domain_list_bytes, encode_domain_list
+
+option_header = struct.Struct('!HH')
+
+
+class Field:
+    """
+    Base class for the description of a field.
+
+    :type name: str
+    """
+
+    # Fixed size fields are packed with a struct format, variable size fields decode and encode themselves
+    format = None
+
+    def __init__(self, name: str):
+        self.name = name
+        """The name of the property that holds the value of this field"""
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, self.name)
+
+
+class FixedField(Field):
+    """
+    Base class for fields with a fixed size. Subclasses provide the struct format and the expressions that convert
+    between the unpacked value and the property value.
+    """
+
+    # Expressions to convert the unpacked value to the property value and vice versa
+    load_expression = '{}'
+    save_expression = '{}'
+
+
+class UIntField(FixedField):
+    """
+    An unsigned integer of 1, 2 or 4 bytes.
+    """
+
+    formats = {1: 'B', 2: 'H', 4: 'I'}
+
+    def __init__(self, name: str, size: int):
+        super().__init__(name)
+        if size not in self.formats:
+            raise ValueError("Unsigned integer fields must be 1, 2 or 4 bytes long")
+
+        self.format = self.formats[size]
+
+
+class BytesField(FixedField):
+    """
+    A fixed number of bytes.
+    """
+
+    def __init__(self, name: str, size: int):
+        super().__init__(name)
+        self.format = '{}s'.format(size)
+
+
+class IPv6AddressField(FixedField):
+    """
+    An IPv6 address, stored as an :class:`ipaddress.IPv6Address`.
+    """
+
+    format = '16s'
+    load_expression = 'IPv6Address({})'
+    save_expression = '{}.packed'
+
+
+class VariableField(Field, metaclass=ABCMeta):
+    """
+    Base class for fields that use the rest of the option data.
+    """
+
+    @abstractmethod
+    def decode(self, buffer: bytes, offset: int, length: int) -> object:
+        """
+        Decode the value of this field from the given buffer.
+
+        :param buffer: The buffer to read data from
+        :param offset: The offset in the buffer where to start reading
+        :param length: The amount of data that belongs to this field
+        :return: The decoded value
+        """
+
+    @abstractmethod
+    def encode(self, value: object) -> bytes:
+        """
+        Encode the value of this field.
+
+        :param value: The value of the property
+        :return: The encoded value
+        """
+
+    def encoded_length(self, value: object) -> int:
+        """
+        Determine the length of the encoded value. Subclasses should override this if the length can be determined
+        without encoding the value.
+
+        :param value: The value of the property
+        :return: The length of the encoded value in bytes
+        """
+        return len(self.encode(value))
+
+    def save_into(self, value: object, buffer: bytearray, offset: int) -> int:
+        """
+        Encode the value of this field into an existing buffer.
+
+        :param value: The value of the property
+        :param buffer: The buffer to write data to
+        :param offset: The offset in the buffer where to start writing
+        :return: The number of bytes written to the buffer
+        """
+        data = self.encode(value)
+        data_length = len(data)
+        buffer[offset:offset + data_length] = data
+        return data_length
+
+
+class RemainingBytesField(VariableField):
+    """
+    All remaining bytes of the option.
+    """
+
+    def decode(self, buffer: bytes, offset: int, length: int) -> bytes:
+        """
+        Copy the bytes out of the buffer.
+        """
+        return bytes(buffer[offset:offset + length])
+
+    def encode(self, value: bytes) -> bytes:
+        """
+        The bytes are stored as they are.
+        """
+        return value
+
+    def encoded_length(self, value: bytes) -> int:
+        """
+        The length of the bytes.
+        """
+        return len(value)
+
+    def save_into(self, value: bytes, buffer: bytearray, offset: int) -> int:
+        """
+        Copy the bytes into the buffer.
+        """
+        value_length = len(value)
+        buffer[offset:offset + value_length] = value
+        return value_length
+
+
+class StringField(VariableField):
+    """
+    All remaining bytes of the option, decoded as a string.
+    """
+
+    def __init__(self, name: str, encoding: str = 'utf-8'):
+        super().__init__(name)
+        self.encoding = encoding
+
+    def decode(self, buffer: bytes, offset: int, length: int) -> str:
+        """
+        Decode the bytes to a string.
+        """
+        return str(buffer[offset:offset + length], self.encoding)
+
+    def encode(self, value: str) -> bytes:
+        """
+        Encode the string to bytes.
+        """
+        return value.encode(self.encoding)
+
+
+class UIntListField(VariableField):
+    """
+    A list of unsigned integers of 1, 2 or 4 bytes.
+    """
+
+    def __init__(self, name: str, size: int):
+        super().__init__(name)
+        if size not in UIntField.formats:
+            raise ValueError("Unsigned integer fields must be 1, 2 or 4 bytes long")
+
+        self.size = size
+        self.format = '!{}' + UIntField.formats[size]
+
+    def decode(self, buffer: bytes, offset: int, length: int) -> [int]:
+        """
+        Unpack all the integers at once.
+        """
+        if length % self.size != 0:
+            raise ValueError('Invalid option length')
+
+        return list(struct.unpack_from(self.format.format(length // self.size), buffer, offset))
+
+    def encode(self, value: [int]) -> bytes:
+        """
+        Pack all the integers at once.
+        """
+        return struct.pack(self.format.format(len(value)), *value)
+
+    def encoded_length(self, value: [int]) -> int:
+        """
+        Every integer has the same size.
+        """
+        return len(value) * self.size
+
+    def save_into(self, value: [int], buffer: bytearray, offset: int) -> int:
+        """
+        Pack all the integers directly into the buffer.
+        """
+        struct.pack_into(self.format.format(len(value)), buffer, offset, *value)
+        return len(value) * self.size
+
+
+class IPv6AddressListField(VariableField):
+    """
+    A list of IPv6 addresses.
+    """
+
+    def decode(self, buffer: bytes, offset: int, length: int) -> [IPv6Address]:
+        """
+        Extract the addresses.
+        """
+        if length % 16 != 0:
+            raise ValueError('Option length must be a multiple of 16')
+
+        return [IPv6Address(bytes(buffer[address_offset:address_offset + 16]))
+                for address_offset in range(offset, offset + length, 16)]
+
+    def encode(self, value: [IPv6Address]) -> bytes:
+        """
+        Concatenate the packed addresses.
+        """
+        return b''.join([address.packed for address in value])
+
+    def encoded_length(self, value: [IPv6Address]) -> int:
+        """
+        Every address is 16 bytes long.
+        """
+        return len(value) * 16
+
+
+class DomainListField(VariableField):
+    """
+    A list of domain names, encoded as described in :rfc:`1035#section-3.1`.
+    """
+
+    def decode(self, buffer: bytes, offset: int, length: int) -> [str]:
+        """
+        Parse the domain names.
+        """
+        if length == 0:
+            return []
+
+        parsed_len, domain_names = parse_domain_list_bytes(buffer, offset=offset, length=length)
+        if parsed_len != length:
+            raise ValueError('Option length does not match the combined length of the included domain names')
+
+        return domain_names
+
+    def encode(self, value: [str]) -> bytes:
+        """
+        Encode the domain names.
+        """
+        return bytes(encode_domain_list(value))
+
+
+class LengthPrefixedBytesListField(VariableField):
+    """
+    A list of byte strings, each preceded by its length as an unsigned 16 bit integer.
+    """
+
+    def decode(self, buffer: bytes, offset: int, length: int) -> [bytes]:
+        """
+        Extract the byte strings.
+        """
+        values = []
+        my_offset = offset
+        max_offset = offset + length
+        while max_offset > my_offset:
+            value_length = struct.unpack_from('!H', buffer, my_offset)[0]
+            my_offset += 2
+
+            values.append(bytes(buffer[my_offset:my_offset + value_length]))
+            my_offset += value_length
+
+        if my_offset != max_offset:
+            raise ValueError('Option length does not match the combined length of the included values')
+
+        return values
+
+    def encode(self, value: [bytes]) -> bytes:
+        """
+        Prefix each byte string with its length.
+        """
+        buffer = bytearray()
+        for item in value:
+            buffer.extend(struct.pack('!H', len(item)))
+            buffer.extend(item)
+        return bytes(buffer)
+
+    def encoded_length(self, value: [bytes]) -> int:
+        """
+        Every byte string is preceded by two length bytes.
+        """
+        return sum([2 + len(item) for item in value])
+
+
+class ElementField(VariableField):
+    """
+    A single embedded protocol element (like a DUID or a message) that uses all remaining bytes of the option.
+    """
+
+    def __init__(self, name: str, element_class: type):
+        super().__init__(name)
+        self.element_class = element_class
+
+    def decode(self, buffer: bytes, offset: int, length: int) -> ProtocolElement:
+        """
+        Let the element class parse the element.
+        """
+        element_len, element = self.element_class.parse(buffer, offset=offset, length=length)
+        if element_len != length:
+            raise ValueError('Option length does not match the length of the embedded {}'.format(
+                self.element_class.__name__))
+
+        return element
+
+    def encode(self, value: ProtocolElement) -> bytes:
+        """
+        Save the element.
+        """
+        return value.save()
+
+    def encoded_length(self, value: ProtocolElement) -> int:
+        """
+        Ask the element for its length.
+        """
+        return value.encoded_length()
+
+    def save_into(self, value: ProtocolElement, buffer: bytearray, offset: int) -> int:
+        """
+        Let the element save itself into the buffer.
+        """
+        return value.save_into(buffer, offset)
+
+
+class OptionsField(VariableField):
+    """
+    A list of options (or other elements in TLV format) that uses all remaining bytes of the option.
+    """
+
+    def __init__(self, name: str, element_class: type):
+        super().__init__(name)
+        self.element_class = element_class
+
+    def decode(self, buffer: bytes, offset: int, length: int) -> [ProtocolElement]:
+        """
+        Parse all the options.
+        """
+        options = []
+        my_offset = offset
+        max_offset = offset + length
+        while max_offset > my_offset:
+            used_buffer, option = self.element_class.parse(buffer, offset=my_offset, length=max_offset - my_offset)
+            options.append(option)
+            my_offset += used_buffer
+
+        if my_offset != max_offset:
+            raise ValueError('Option length does not match the combined length of the parsed options')
+
+        return options
+
+    def encode(self, value: [ProtocolElement]) -> bytes:
+        """
+        Concatenate the saved options.
+        """
+        return b''.join([option.save() for option in value])
+
+    def encoded_length(self, value: [ProtocolElement]) -> int:
+        """
+        Add up the lengths of the options.
+        """
+        return sum([option.encoded_length() for option in value])
+
+    def save_into(self, value: [ProtocolElement], buffer: bytearray, offset: int) -> int:
+        """
+        Let the options save themselves into the buffer one after the other.
+        """
+        my_offset = offset
+        for option in value:
+            my_offset += option.save_into(buffer, my_offset)
+        return my_offset - offset
+
+
+load_from_template = '''
+def load_from(self, buffer, offset=0, length=None):
+    option_type, option_len = unpack_header(buffer, offset)
+    if option_type != self.option_type:
+        raise ValueError('The provided buffer does not contain {{}} data'.format(self.__class__.__name__))
+
+    if option_len + 4 > (len(buffer) - offset if length is None else length):
+        raise ValueError('This option is longer than the available buffer')
+
+    if option_len {length_check}:
+        raise ValueError('{length_error}'.format(self.__class__.__name__))
+{load_fields}
+    self.validate_once()
+
+    return option_len + 4
+'''
+
+save_template = '''
+def save(self):
+    if self._saved is not None:
+        return self._saved
+
+    self.validate_before_save()
+{save_fields}
+'''
+
+encoded_length_template = '''
+def encoded_length(self):
+    if self._saved is not None:
+        return len(self._saved)
+
+{length_fields}
+'''
+
+save_into_template = '''
+def save_into(self, buffer, offset=0):
+    saved = self._saved
+    if saved is not None:
+        saved_length = len(saved)
+        buffer[offset:offset + saved_length] = saved
+        return saved_length
+
+    self.validate_before_save()
+{save_into_fields}
+'''
+
+
+def generate_codec(*fields: Field):
+    """
+    Class decorator that generates the :meth:`load_from`, :meth:`save`, :meth:`encoded_length` and :meth:`save_into`
+    methods of an option class from the given field descriptions. Fixed size fields must come before the variable size
+    field, and there can be at most one variable size field.
+
+    :param fields: The fields of the option, in the order in which they appear after the option header
+    :return: The class decorator
+    """
+    fixed_fields = [field for field in fields if isinstance(field, FixedField)]
+    variable_fields = [field for field in fields if isinstance(field, VariableField)]
+
+    if len(variable_fields) > 1 or (variable_fields and fields[-1] is not variable_fields[0]):
+        raise ValueError("Only the last field can have a variable size")
+
+    variable_field = variable_fields and variable_fields[0] or None
+
+    fields_struct = struct.Struct('!' + ''.join([field.format for field in fixed_fields]))
+    full_struct = struct.Struct('!HH' + ''.join([field.format for field in fixed_fields]))
+    fixed_size = fields_struct.size
+
+    # Build the code for loading the fields
+    load_lines = []
+    if fixed_fields:
+        value_names = ['value{}'.format(index) for index in range(len(fixed_fields))]
+        load_lines.append('    {}, = unpack_fields(buffer, offset + 4)'.format(', '.join(value_names)))
+        for field, value_name in zip(fixed_fields, value_names):
+            load_lines.append('    self.{} = {}'.format(field.name, field.load_expression.format(value_name)))
+
+    if variable_field:
+        load_lines.append('    self.{} = variable_field.decode(buffer, offset + {}, option_len - {})'.format(
+            variable_field.name, 4 + fixed_size, fixed_size))
+
+    if variable_field:
+        length_check = '< {}'.format(fixed_size)
+        length_error = 'Option length does not match, {{}} must have length of at least {}'.format(fixed_size)
+    else:
+        length_check = '!= {}'.format(fixed_size)
+        length_error = '{{}} must have length {}'.format(fixed_size)
+
+    load_from_source = load_from_template.format(
+        length_check=length_check,
+        length_error=length_error,
+        load_fields='\n'.join(load_lines),
+    )
+
+    # Build the code for saving the fields
+    pack_values = [field.save_expression.format('self.' + field.name) for field in fixed_fields]
+    if variable_field:
+        pack_values = ['self.option_type', '{} + len(variable_data)'.format(fixed_size)] + pack_values
+        save_lines = [
+            '    variable_data = variable_field.encode(self.{})'.format(variable_field.name),
+            '    return pack({}) + variable_data'.format(', '.join(pack_values)),
+        ]
+    else:
+        pack_values = ['self.option_type', str(fixed_size)] + pack_values
+        save_lines = [
+            '    return pack({})'.format(', '.join(pack_values)),
+        ]
+
+    save_source = save_template.format(save_fields='\n'.join(save_lines))
+
+    # Build the code for saving into an existing buffer: the variable data is written first so that its length is known
+    # when the header and the fixed fields are packed in front of it
+    pack_into_values = [field.save_expression.format('self.' + field.name) for field in fixed_fields]
+    if variable_field:
+        pack_into_values = ['self.option_type', '{} + variable_length'.format(fixed_size)] + pack_into_values
+        length_lines = [
+            '    return {} + variable_field.encoded_length(self.{})'.format(4 + fixed_size, variable_field.name),
+        ]
+        save_into_lines = [
+            '    variable_length = variable_field.save_into(self.{}, buffer, offset + {})'.format(
+                variable_field.name, 4 + fixed_size),
+            '    pack_into(buffer, offset, {})'.format(', '.join(pack_into_values)),
+            '    return {} + variable_length'.format(4 + fixed_size),
+        ]
+    else:
+        pack_into_values = ['self.option_type', str(fixed_size)] + pack_into_values
+        length_lines = [
+            '    return {}'.format(4 + fixed_size),
+        ]
+        save_into_lines = [
+            '    pack_into(buffer, offset, {})'.format(', '.join(pack_into_values)),
+            '    return {}'.format(4 + fixed_size),
+        ]
+
+    encoded_length_source = encoded_length_template.format(length_fields='\n'.join(length_lines))
+    save_into_source = save_into_template.format(save_into_fields='\n'.join(save_into_lines))
+
+    def decorator(cls: type) -> type:
+        """
+        Install the generated methods in the class.
+
+        :param cls: The option class
+        :return: The same class
+        """
+        namespace = {
+            'IPv6Address': IPv6Address,
+            'unpack_header': option_header.unpack_from,
+            'unpack_fields': fields_struct.unpack_from,
+            'pack': full_struct.pack,
+            'pack_into': full_struct.pack_into,
+            'variable_field': variable_field,
+        }
+
+        sources = [
+            ('load_from', load_from_source),
+            ('save', save_source),
+            ('encoded_length', encoded_length_source),
+            ('save_into', save_into_source),
+        ]
+        for method_name, source in sources:
+            exec(compile(source, '<generated {}.{}>'.format(cls.__name__, method_name), 'exec'), namespace)
+
+            method = namespace[method_name]
+            method.__qualname__ = '{}.{}'.format(cls.__qualname__, method_name)
+            method.__doc__ = getattr(ProtocolElement, method_name).__doc__
+            setattr(cls, method_name, method)
+
+        cls.codec_fields = fields
+        cls.codec_struct = full_struct
+
+        # The abstract methods are implemented now
+        cls.__abstractmethods__ = frozenset(cls.__abstractmethods__ - {'load_from', 'save'})
+
+        return cls
+
+    return decorator
@@ -17,6 +17,14 @@ class OptionHandler(metaclass=abc.ABCMeta):
     Base class for option handlers
     """
 
+    templatable = False
+    """
+    Whether replies to Information-Request messages may be created from a :class:`.ReplyTemplate` when this handler is
+    used. Handlers can only set this if what they add to such replies depends on nothing but the options requested by
+    the client, the link the request came from and the client-id options that are copied from the request. Their
+    :meth:`pre` method is still called for every request, and so is the :meth:`handle` method of relay option handlers.
+    """
+
     @classmethod
     def from_config(cls, section: configparser.SectionProxy, option_handler_id: str = None) -> object:
         """
@@ -99,14 +107,20 @@ class RelayOptionHandler(OptionHandler):
 
 class SimpleOptionHandler(OptionHandler):
     """
-    Standard handler for simple static options
+    Standard handler for simple static options. The option is frozen, so it is only validated and encoded once. The
+    option handlers are created again when the configuration is reloaded, which replaces the frozen option.
 
     :param option: The option instance to add to the response
     :param append: Always add, even if an option of this class already exists
     :param always_send: Always send this option, even if the OptionRequestOption doesn't ask for it
     """
 
+    # The option is static
+    templatable = True
+
     def __init__(self, option: Option, *, append: bool = False, always_send: bool = False):
+        option.freeze()
+
         self.option = option
         """The option instance to add to the response"""
 
@@ -152,16 +166,21 @@ class SimpleOptionHandler(OptionHandler):
 
 class OverwritingOptionHandler(OptionHandler):
     """
-    Overwriting handler for simple static options.
+    Overwriting handler for simple static options. Like with :class:`SimpleOptionHandler` the option is frozen.
 
     :param option: The option instance to use
     :param always_send: Always send this option, even if the OptionRequestOption doesn't ask for it
     """
 
+    # The option is static
+    templatable = True
+
     def __init__(self, option: object, *, always_send: bool = False):
         """
         :type option: Option
         """
+        option.freeze()
+
         self.option = option
         """The option to add to the response"""
 
@@ -244,6 +263,9 @@ class CopyRelayOptionHandler(RelayOptionHandler):
     :param option_class: The option class to copy
     """
 
+    # Only the relay messages are changed
+    templatable = True
+
     def __init__(self, option_class: object):
         """
         :type option_class: Option
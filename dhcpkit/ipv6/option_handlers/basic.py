@@ -23,6 +23,9 @@ class ClientIdOptionHandler(CopyOptionHandler):
     The handler for ClientIdOptions
     """
 
+    # The client-id is copied into replies created from a template
+    templatable = True
+
     def __init__(self):
         super().__init__(ClientIdOption, always_send=True)
 
@@ -127,6 +130,9 @@ class ConfirmStatusOptionHandler(OptionHandler):
     confirm their part.
     """
 
+    # Information-Requests aren't touched
+    templatable = True
+
     def handle(self, bundle: TransactionBundle):
         """
         Update the status of the reply to :class:`.ConfirmMessage`.
@@ -148,6 +154,9 @@ class ReleaseStatusOptionHandler(OptionHandler):
     confirm their part.
     """
 
+    # Information-Requests aren't touched
+    templatable = True
+
     def handle(self, bundle: TransactionBundle):
         """
         Update the status of the reply to :class:`.ReleaseMessage`.
@@ -170,6 +179,9 @@ class DeclineStatusOptionHandler(OptionHandler):
     confirm their part.
     """
 
+    # Information-Requests aren't touched
+    templatable = True
+
     def handle(self, bundle: TransactionBundle):
         """
         Update the status of the reply to :class:`.DeclineMessage`.
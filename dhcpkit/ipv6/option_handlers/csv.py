@@ -49,7 +49,7 @@ class CSVBasedFixedAssignmentOptionHandler(FixedAssignmentOptionHandler):
         """
         # Look up based on DUID
         duid_option = bundle.request.get_option_of_type(ClientIdOption)
-        duid = 'duid:' + codecs.encode(duid_option.duid.save(), 'hex').decode('ascii')
+        duid = 'duid:' + duid_option.duid.canonical_hex()
         if duid in self.mapping:
             return self.mapping[duid]
 
@@ -130,7 +130,7 @@ class CSVBasedFixedAssignmentOptionHandler(FixedAssignmentOptionHandler):
                         duid_hex = row_id.split(':', 1)[1]
                         duid_bytes = codecs.decode(duid_hex, 'hex')
                         length, duid = DUID.parse(duid_bytes, length=len(duid_bytes))
-                        duid_hex = codecs.encode(duid.save(), 'hex').decode('ascii')
+                        duid_hex = duid.canonical_hex()
                         row_id = 'duid:{}'.format(duid_hex)
 
                     elif row_id.startswith('interface-id:'):
@@ -22,6 +22,9 @@ class FixedAssignmentOptionHandler(OptionHandler, metaclass=ABCMeta):
     An option handler that gives a fixed address and/or prefix to clients
     """
 
+    # Information-Requests aren't touched
+    templatable = True
+
     def __init__(self, responsible_for_links: [IPv6Network],
                  address_preferred_lifetime: int, address_valid_lifetime: int,
                  prefix_preferred_lifetime: int, prefix_valid_lifetime: int):
@@ -14,6 +14,9 @@ class RapidCommitOptionHandler(OptionHandler):
     Upgrade AdvertiseMessage to ReplyMessage when client asks for rapid-commit
     """
 
+    # Information-Requests aren't touched
+    templatable = True
+
     def __init__(self, rapid_commit_rejections: bool):
         super().__init__()
 
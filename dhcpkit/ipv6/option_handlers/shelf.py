@@ -102,7 +102,7 @@ class ShelfBasedFixedAssignmentOptionHandler(FixedAssignmentOptionHandler):
         """
         # Look up based on DUID
         duid_option = bundle.request.get_option_of_type(ClientIdOption)
-        duid = 'duid:' + codecs.encode(duid_option.duid.save(), 'hex').decode('ascii')
+        duid = 'duid:' + duid_option.duid.canonical_hex()
         if duid in self.mapping:
             return self.mapping[duid]
 
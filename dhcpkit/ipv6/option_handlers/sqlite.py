@@ -142,7 +142,7 @@ class SqliteBasedFixedAssignmentOptionHandler(FixedAssignmentOptionHandler):
 
         # Look up based on DUID
         duid_option = bundle.request.get_option_of_type(ClientIdOption)
-        duid = 'duid:' + codecs.encode(duid_option.duid.save(), 'hex').decode('ascii')
+        duid = 'duid:' + duid_option.duid.canonical_hex()
         possible_ids.append(duid)
 
         # Look up based on Interface-ID
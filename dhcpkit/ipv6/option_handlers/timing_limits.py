@@ -24,6 +24,9 @@ class TimingLimitsOptionHandler(OptionHandler, metaclass=ABCMeta):
     :type factor_t2: float or None
     """
 
+    # Replies to Information-Requests don't contain IA options
+    templatable = True
+
     def __init__(self,
                  min_t1=0, max_t1=INFINITY, factor_t1=0.5,
                  min_t2=0, max_t2=INFINITY, factor_t2=0.8):
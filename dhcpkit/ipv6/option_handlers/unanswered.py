@@ -24,6 +24,9 @@ class UnansweredIAOptionHandler(OptionHandler):
     :param authoritative: Whether this handler is authorised to tell clients to stop using prefixes
     """
 
+    # Information-Requests don't contain IA options
+    templatable = True
+
     def __init__(self, authoritative: bool = True):
         self.authoritative = authoritative
 
@@ -157,6 +160,9 @@ class UnansweredIAPDOptionHandler(OptionHandler):
     :param authoritative: Whether this handler is authorised to tell clients to stop using prefixes
     """
 
+    # Information-Requests don't contain IA options
+    templatable = True
+
     def __init__(self, authoritative: bool = True):
         self.authoritative = authoritative
 
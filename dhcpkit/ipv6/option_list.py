@@ -0,0 +1,340 @@
+"""
+A list of options that can find the options of a certain type without looking at every option in the list, and
+read-only lists for the list properties of :meth:`frozen <.Option.freeze>` options.
+"""
+from itertools import islice
+
+
+class OptionList(list):
+    """
+    A list of options that keeps an index of its options by class. Every option is indexed under all the classes in
+    its MRO, so looking up the options of a class is a dictionary lookup that returns them in the order of the list.
+    The index is built the first time options are looked up, and after that it is kept up to date when options are
+    appended, inserted, removed or popped. Other changes to the list, like assigning to a slice, make it build the
+    index again on the next lookup.
+    """
+
+    __slots__ = ('_by_class',)
+
+    def __init__(self, options: [object] = ()):
+        super().__init__(options)
+
+        # The options in the list by every class in their MRO
+        self._by_class = None
+
+    def __reduce__(self):
+        """
+        Pickle and copy only the options, the index is built again when necessary.
+
+        :return: The class and the arguments to create a copy of this list
+        """
+        return self.__class__, (list(self),)
+
+    def _index(self) -> dict:
+        """
+        Get the index of options by class, building it if necessary.
+
+        :return: A dictionary with the options in the list per class
+        """
+        if self._by_class is None:
+            by_class = {}
+            for option in self:
+                for klass in type(option).__mro__:
+                    same_class = by_class.get(klass)
+                    if same_class is None:
+                        by_class[klass] = [option]
+                    else:
+                        same_class.append(option)
+
+            self._by_class = by_class
+
+        return self._by_class
+
+    def _forget_index(self):
+        """
+        Forget the index after a change that isn't tracked.
+        """
+        self._by_class = None
+
+    def _add_to_index(self, option: object, position: int):
+        """
+        Add an option that has been stored at the given position in the list to the index.
+
+        :param option: The option that was added
+        :param position: Its position in the list
+        """
+        appended = position == len(self) - 1
+        for klass in type(option).__mro__:
+            same_class = self._by_class.get(klass)
+            if same_class is None:
+                self._by_class[klass] = [option]
+            elif appended:
+                same_class.append(option)
+            else:
+                same_class.insert(sum([1 for existing in islice(self, position) if isinstance(existing, klass)]),
+                                  option)
+
+    def _remove_from_index(self, option: object):
+        """
+        Remove an option that has been removed from the list from the index.
+
+        :param option: The option that was removed
+        """
+        for klass in type(option).__mro__:
+            same_class = self._by_class[klass]
+            for position, existing in enumerate(same_class):
+                if existing is option:
+                    del same_class[position]
+                    break
+
+            if not same_class:
+                del self._by_class[klass]
+
+    def get_options_of_type(self, klass: type) -> list:
+        """
+        Get all options that are subclasses of the given class.
+
+        :param klass: The class to look for, or a tuple of classes like with isinstance
+        :returns: The list of options
+
+        :type klass: T
+        :rtype: list[T()]
+        """
+        if isinstance(klass, tuple):
+            # Options can match more than one class, so keep them in the order of the list
+            return [option for option in self if isinstance(option, klass)]
+
+        by_class = self._by_class if self._by_class is not None else self._index()
+        return list(by_class.get(klass, ()))
+
+    def get_option_of_type(self, klass: type) -> object or None:
+        """
+        Get the first option that is a subclass of the given class.
+
+        :param klass: The class to look for, or a tuple of classes like with isinstance
+        :returns: The option or None
+
+        :type klass: T
+        :rtype: T() or None
+        """
+        if isinstance(klass, tuple):
+            for option in self:
+                if isinstance(option, klass):
+                    return option
+            return None
+
+        by_class = self._by_class if self._by_class is not None else self._index()
+        same_class = by_class.get(klass)
+        return same_class[0] if same_class else None
+
+    def append(self, option: object):
+        """
+        Append an option and add it to the index.
+
+        :param option: The option to add
+        """
+        super().append(option)
+        if self._by_class is not None:
+            self._add_to_index(option, len(self) - 1)
+
+    def extend(self, options: [object]):
+        """
+        Append all given options and add them to the index.
+
+        :param options: The options to add
+        """
+        for option in options:
+            self.append(option)
+
+    def __iadd__(self, options: [object]) -> list:
+        """
+        Append all given options and add them to the index.
+
+        :param options: The options to add
+        :return: This list
+        """
+        self.extend(options)
+        return self
+
+    def insert(self, index: int, option: object):
+        """
+        Insert an option and add it to the index.
+
+        :param index: Where to insert the option
+        :param option: The option to insert
+        """
+        # Determine where it ends up in the same way as list.insert
+        position = min(max(index + len(self) if index < 0 else index, 0), len(self))
+        super().insert(index, option)
+        if self._by_class is not None:
+            self._add_to_index(option, position)
+
+    def remove(self, option: object):
+        """
+        Remove the first option that is equal to the given one, and remove it from the index.
+
+        :param option: The option to remove
+        """
+        del self[self.index(option)]
+
+    def pop(self, index: int = -1) -> object:
+        """
+        Remove the option at the given position, and remove it from the index.
+
+        :param index: The position of the option to remove
+        :return: The removed option
+        """
+        option = super().pop(index)
+        if self._by_class is not None:
+            self._remove_from_index(option)
+        return option
+
+    def __delitem__(self, index: int or slice):
+        """
+        Remove the option at the given position, and remove it from the index.
+
+        :param index: The position or slice of the option(s) to remove
+        """
+        if isinstance(index, slice):
+            super().__delitem__(index)
+            self._forget_index()
+        else:
+            self.pop(index)
+
+    def __setitem__(self, index: int or slice, value: object):
+        """
+        Replace one or more options.
+
+        :param index: The position or slice to replace
+        :param value: The new option(s)
+        """
+        super().__setitem__(index, value)
+        self._forget_index()
+
+    def __imul__(self, count: int) -> list:
+        """
+        Repeat the options in the list.
+
+        :param count: How many times to repeat the options
+        :return: This list
+        """
+        super().__imul__(count)
+        self._forget_index()
+        return self
+
+    def clear(self):
+        """
+        Remove all options.
+        """
+        super().clear()
+        self._forget_index()
+
+    def sort(self, *args, **kwargs):
+        """
+        Sort the options.
+
+        :param args: The positional arguments for list.sort
+        :param kwargs: The keyword arguments for list.sort
+        """
+        super().sort(*args, **kwargs)
+        self._forget_index()
+
+    def reverse(self):
+        """
+        Reverse the order of the options.
+        """
+        super().reverse()
+        self._forget_index()
+
+
+class ReadOnlyListMixin:
+    """
+    Refuses every change to a list. Used for the list properties of frozen options, which must not be modified because
+    they are saved from their remembered wire format.
+    """
+
+    __slots__ = ()
+
+    def _refuse(self, *args, **kwargs):
+        """
+        Refuse a change to the list.
+        """
+        raise AttributeError("This list belongs to a frozen option and can't be modified")
+
+    append = extend = insert = remove = pop = clear = sort = reverse = _refuse
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _refuse
+
+    def __reduce__(self):
+        """
+        Pickle and copy only the items, without going through the refused methods.
+
+        :return: The class and the arguments to create a copy of this list
+        """
+        return self.__class__, (list(self),)
+
+
+class ReadOnlyList(ReadOnlyListMixin, list):
+    """
+    A list that can't be modified.
+    """
+
+    __slots__ = ()
+
+
+class ReadOnlyOptionList(ReadOnlyListMixin, OptionList):
+    """
+    An :class:`OptionList` that can't be modified.
+    """
+
+    __slots__ = ()
+
+
+class OptionListMixin:
+    """
+    Storage for the options of an element that contains options, in an :class:`OptionList`. The class using this mixin
+    must provide the _options slot.
+    """
+
+    __slots__ = ()
+
+    @property
+    def options(self) -> OptionList:
+        """
+        The list of options in this element.
+
+        :return: The list of options
+        """
+        return self._options
+
+    @options.setter
+    def options(self, options: [object]):
+        """
+        Replace the list of options in this element.
+
+        :param options: The new list of options
+        """
+        self._options = options if isinstance(options, OptionList) else OptionList(options)
+
+    def get_options_of_type(self, klass: type) -> list:
+        """
+        Get all options that are subclasses of the given class.
+
+        :param klass: The class to look for
+        :returns: The list of options
+
+        :type klass: T
+        :rtype: list[T()]
+        """
+        return self._options.get_options_of_type(klass)
+
+    def get_option_of_type(self, klass: type) -> object or None:
+        """
+        Get the first option that is a subclass of the given class.
+
+        :param klass: The class to look for
+        :returns: The option or None
+
+        :type klass: T
+        :rtype: T() or None
+        """
+        return self._options.get_option_of_type(klass)
@@ -9,6 +9,9 @@ from dhcpkit.ipv6.duids import DUID
 from dhcpkit.ipv6.messages import Message, SolicitMessage, AdvertiseMessage, RequestMessage, ConfirmMessage, \
     RenewMessage, RebindMessage, DeclineMessage, ReleaseMessage, ReplyMessage, ReconfigureMessage, \
     InformationRequestMessage, RelayForwardMessage, RelayReplyMessage
+from dhcpkit.ipv6.option_fields import generate_codec, BytesField, UIntField, IPv6AddressField, RemainingBytesField, \
+    StringField, UIntListField, LengthPrefixedBytesListField, ElementField, OptionsField
+from dhcpkit.ipv6.option_list import OptionList, OptionListMixin, ReadOnlyList, ReadOnlyListMixin, ReadOnlyOptionList
 from dhcpkit.protocol_element import ProtocolElement
 
 OPTION_CLIENTID = 1
@@ -60,6 +63,10 @@ STATUS_NOBINDING = 3
 STATUS_NOTONLINK = 4
 STATUS_USEMULTICAST = 5
 
+# The loaded entries of the option registry, bound when the first option is parsed. The registry loads the modules that
+# implement options, and those import this module, so it can't be loaded while this module is being imported.
+_registered_options = None
+
 
 # This subclass remains abstract
 # noinspection PyAbstractClass
@@ -92,12 +99,73 @@ class Option(ProtocolElement):
     specific to the addresses within an IA.  These latter two cases are
     discussed in sections 22.4 and 22.6.
 
+    Options that are sent in many messages, like the ones from the server configuration, can be :meth:`frozen
+    <freeze>`. A frozen option remembers its wire format and can't be modified anymore.
+
     :type option_type: int
     """
 
+    # The wire format of frozen options
+    __slots__ = ('_saved',)
+
     # This needs to be overwritten in subclasses
     option_type = 0
 
+    def __new__(cls, *args, **kwargs):
+        """
+        Create a new option that isn't frozen.
+
+        :param args: The positional arguments for the constructor
+        :param kwargs: The keyword arguments for the constructor
+        :return: The new option
+        """
+        self = super().__new__(cls, *args, **kwargs)
+        object.__setattr__(self, '_saved', None)
+        return self
+
+    def freeze(self):
+        """
+        Validate this option, save it once and make it immutable. Saving a frozen option copies the remembered wire
+        format instead of validating and encoding the option again. The options inside a frozen option are frozen as
+        well, and its lists are replaced by lists that can't be modified.
+        """
+        if self._saved is not None:
+            return
+
+        self.validate()
+
+        for name, value in zip(self._fields, self._field_values(self)):
+            if isinstance(value, Option):
+                value.freeze()
+            elif isinstance(value, list):
+                for element in value:
+                    if isinstance(element, Option):
+                        element.freeze()
+
+                if not isinstance(value, ReadOnlyListMixin):
+                    setattr(self, name, ReadOnlyOptionList(value) if isinstance(value, OptionList)
+                            else ReadOnlyList(value))
+
+        self._validated = True
+        self._saved = bytes(self.save())
+
+    def is_validated(self) -> bool:
+        """
+        Frozen options and their sub-options can't be modified, so they don't need to be checked.
+
+        :return: Whether the option doesn't need to be validated again
+        """
+        return self._saved is not None or super().is_validated()
+
+    def forget_validation(self):
+        """
+        Frozen options can't be modified.
+        """
+        if self._saved is not None:
+            raise AttributeError("{} is frozen and can't be modified".format(self.__class__.__name__))
+
+        super().forget_validation()
+
     @classmethod
     def determine_class(cls, buffer: bytes, offset: int = 0) -> type:
         """
@@ -107,9 +175,18 @@ class Option(ProtocolElement):
         :param offset: The offset in the buffer where to start reading
         :return: The best known class for this option data
         """
-        from dhcpkit.ipv6.option_registry import option_registry
+        global _registered_options
+        if _registered_options is None:
+            from dhcpkit.ipv6.option_registry import option_registry
+            _registered_options = option_registry.data
+
         option_type = unpack_from('!H', buffer, offset=offset)[0]
-        return option_registry.get(option_type, UnknownOption)
+        element_class = _registered_options.get(option_type)
+        if element_class is None:
+            # The entry point of this type hasn't been loaded yet, or there is none
+            from dhcpkit.ipv6.option_registry import option_registry
+            element_class = option_registry.get(option_type, UnknownOption)
+        return element_class
 
     def parse_option_header(self, buffer: bytes, offset: int = 0, length: int = None) -> (int, int):
         """
@@ -139,6 +216,8 @@ class UnknownOption(Option):
     :type option_data: bytes
     """
 
+    __slots__ = ('option_type', 'option_data')
+
     def __init__(self, option_type: int = 0, option_data: bytes = b''):
         self.option_type = option_type
         """The type number of this option"""
@@ -178,10 +257,10 @@ class UnknownOption(Option):
         if my_offset + option_len > max_length:
             raise ValueError('This option is longer than the available buffer')
 
-        self.option_data = buffer[offset + my_offset:offset + my_offset + option_len]
+        self.option_data = bytes(buffer[offset + my_offset:offset + my_offset + option_len])
         my_offset += option_len
 
-        self.validate()
+        self.validate_once()
 
         return my_offset
 
@@ -191,11 +270,12 @@ class UnknownOption(Option):
 
         :return: The buffer with the data from this element
         """
-        self.validate()
+        self.validate_before_save()
 
         return pack('!HH', self.option_type, len(self.option_data)) + self.option_data
 
 
+@generate_codec(ElementField('duid', DUID))
 class ClientIdOption(Option):
     """
     :rfc:`3315#section-22.2`
@@ -227,6 +307,8 @@ class ClientIdOption(Option):
     :type duid: DUID
     """
 
+    __slots__ = ('duid',)
+
     option_type = OPTION_CLIENTID
 
     def __init__(self, duid: DUID = None):
@@ -240,39 +322,10 @@ class ClientIdOption(Option):
         if not isinstance(self.duid, DUID):
             raise ValueError("DUID is not a DUID object")
 
-        self.duid.validate()
-
-    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
-        """
-        Load the internal state of this object from the given buffer. The buffer may contain more data after the
-        structured element is parsed. This data is ignored.
-
-        :param buffer: The buffer to read data from
-        :param offset: The offset in the buffer where to start reading
-        :param length: The amount of data we are allowed to read from the buffer
-        :return: The number of bytes used from the buffer
-        """
-        my_offset, option_len = self.parse_option_header(buffer, offset, length)
-
-        duid_len, self.duid = DUID.parse(buffer, offset=offset + my_offset, length=option_len)
-        my_offset += duid_len
-
-        self.validate()
-
-        return my_offset
-
-    def save(self) -> bytes:
-        """
-        Save the internal state of this object as a buffer.
-
-        :return: The buffer with the data from this element
-        """
-        self.validate()
-
-        duid_buffer = self.duid.save()
-        return pack('!HH', self.option_type, len(duid_buffer)) + duid_buffer
+        self.duid.validate_once()
 
 
+@generate_codec(ElementField('duid', DUID))
 class ServerIdOption(Option):
     """
     :rfc:`3315#section-22.3`
@@ -304,6 +357,8 @@ class ServerIdOption(Option):
     :type duid: DUID
     """
 
+    __slots__ = ('duid',)
+
     option_type = OPTION_SERVERID
 
     def __init__(self, duid: DUID = None):
@@ -317,41 +372,12 @@ class ServerIdOption(Option):
         if not isinstance(self.duid, DUID):
             raise ValueError("DUID is not a DUID object")
 
-        self.duid.validate()
-
-    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
-        """
-        Load the internal state of this object from the given buffer. The buffer may contain more data after the
-        structured element is parsed. This data is ignored.
-
-        :param buffer: The buffer to read data from
-        :param offset: The offset in the buffer where to start reading
-        :param length: The amount of data we are allowed to read from the buffer
-        :return: The number of bytes used from the buffer
-        """
-        my_offset, option_len = self.parse_option_header(buffer, offset, length)
-
-        duid_len, self.duid = DUID.parse(buffer, offset=offset + my_offset, length=option_len)
-        my_offset += duid_len
-
-        self.validate()
-
-        return my_offset
-
-    def save(self) -> bytes:
-        """
-        Save the internal state of this object as a buffer.
-
-        :return: The buffer with the data from this element
-        """
-        self.validate()
-
-        duid_buffer = self.duid.save()
-        return pack('!HH', self.option_type, len(duid_buffer)) + duid_buffer
+        self.duid.validate_once()
 
 
 @total_ordering
-class IANAOption(Option):
+@generate_codec(BytesField('iaid', 4), UIntField('t1', 4), UIntField('t2', 4), OptionsField('options', Option))
+class IANAOption(OptionListMixin, Option):
     """
     :rfc:`3315#section-22.4`
 
@@ -460,6 +486,8 @@ class IANAOption(Option):
     :type options: list[Option]
     """
 
+    __slots__ = ('iaid', 't1', 't2', '_options')
+
     option_type = OPTION_IA_NA
 
     def __init__(self, iaid: bytes = b'\x00\x00\x00\x00', t1: int = 0, t2: int = 0, options: [Option] = None):
@@ -498,84 +526,7 @@ class IANAOption(Option):
         # Check if all options are allowed
         self.validate_contains(self.options)
         for option in self.options:
-            option.validate()
-
-    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
-        """
-        Load the internal state of this object from the given buffer. The buffer may contain more data after the
-        structured element is parsed. This data is ignored.
-
-        :param buffer: The buffer to read data from
-        :param offset: The offset in the buffer where to start reading
-        :param length: The amount of data we are allowed to read from the buffer
-        :return: The number of bytes used from the buffer
-        """
-        my_offset, option_len = self.parse_option_header(buffer, offset, length)
-        header_offset = my_offset
-
-        self.iaid = buffer[offset + my_offset:offset + my_offset + 4]
-        my_offset += 4
-
-        self.t1, self.t2 = unpack_from('!II', buffer, offset + my_offset)
-        my_offset += 8
-
-        # Parse the options
-        self.options = []
-        max_offset = option_len + header_offset  # The option_len field counts bytes *after* the header fields
-        while max_offset > my_offset:
-            used_buffer, option = Option.parse(buffer, offset=offset + my_offset)
-            self.options.append(option)
-            my_offset += used_buffer
-
-        if my_offset != max_offset:
-            raise ValueError('Option length does not match the combined length of the parsed options')
-
-        self.validate()
-
-        return my_offset
-
-    def save(self) -> bytes:
-        """
-        Save the internal state of this object as a buffer.
-
-        :return: The buffer with the data from this element
-        """
-        self.validate()
-
-        options_buffer = bytearray()
-        for option in self.options:
-            options_buffer.extend(option.save())
-
-        buffer = bytearray()
-        buffer.extend(pack('!HH4sII', self.option_type, len(options_buffer) + 12, self.iaid, self.t1, self.t2))
-        buffer.extend(options_buffer)
-        return buffer
-
-    def get_options_of_type(self, klass: type) -> list:
-        """
-        Get all options that are subclasses of the given class.
-
-        :param klass: The class to look for
-        :returns: The list of options
-
-        :type klass: T
-        :rtype: list[T()]
-        """
-        return [option for option in self.options if isinstance(option, klass)]
-
-    def get_option_of_type(self, klass: type) -> object or None:
-        """
-        Get the first option that is a subclass of the given class.
-
-        :param klass: The class to look for
-        :returns: The option or None
-
-        :type klass: T
-        :rtype: T() or None
-        """
-        for option in self.options:
-            if isinstance(option, klass):
-                return option
+            option.validate_once()
 
     def get_addresses(self) -> [IPv6Address]:
         """
@@ -587,7 +538,8 @@ class IANAOption(Option):
 
 
 @total_ordering
-class IATAOption(Option):
+@generate_codec(BytesField('iaid', 4), OptionsField('options', Option))
+class IATAOption(OptionListMixin, Option):
     """
     :rfc:`3315#section-22.5`
 
@@ -669,6 +621,8 @@ class IATAOption(Option):
     :type options: list[Option]
     """
 
+    __slots__ = ('iaid', '_options')
+
     option_type = OPTION_IA_TA
 
     def __init__(self, iaid: bytes = b'\x00\x00\x00\x00', options: [Option] = None):
@@ -695,81 +649,7 @@ class IATAOption(Option):
         # Check if all options are allowed
         self.validate_contains(self.options)
         for option in self.options:
-            option.validate()
-
-    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
-        """
-        Load the internal state of this object from the given buffer. The buffer may contain more data after the
-        structured element is parsed. This data is ignored.
-
-        :param buffer: The buffer to read data from
-        :param offset: The offset in the buffer where to start reading
-        :param length: The amount of data we are allowed to read from the buffer
-        :return: The number of bytes used from the buffer
-        """
-        my_offset, option_len = self.parse_option_header(buffer, offset, length)
-        header_offset = my_offset
-
-        self.iaid = buffer[offset + my_offset:offset + my_offset + 4]
-        my_offset += 4
-
-        # Parse the options
-        self.options = []
-        max_offset = option_len + header_offset  # The option_len field counts bytes *after* the header fields
-        while max_offset > my_offset:
-            used_buffer, option = Option.parse(buffer, offset=offset + my_offset)
-            self.options.append(option)
-            my_offset += used_buffer
-
-        if my_offset != max_offset:
-            raise ValueError('Option length does not match the combined length of the parsed options')
-
-        self.validate()
-
-        return my_offset
-
-    def save(self) -> bytes:
-        """
-        Save the internal state of this object as a buffer.
-
-        :return: The buffer with the data from this element
-        """
-        self.validate()
-
-        options_buffer = bytearray()
-        for option in self.options:
-            options_buffer.extend(option.save())
-
-        buffer = bytearray()
-        buffer.extend(pack('!HH4s', self.option_type, len(options_buffer) + 4, self.iaid))
-        buffer.extend(options_buffer)
-        return buffer
-
-    def get_options_of_type(self, klass: type) -> list:
-        """
-        Get all options that are subclasses of the given class.
-
-        :param klass: The class to look for
-        :returns: The list of options
-
-        :type klass: T
-        :rtype: list[T()]
-        """
-        return [option for option in self.options if isinstance(option, klass)]
-
-    def get_option_of_type(self, klass: type) -> object or None:
-        """
-        Get the first option that is a subclass of the given class.
-
-        :param klass: The class to look for
-        :returns: The option or None
-
-        :type klass: T
-        :rtype: T() or None
-        """
-        for option in self.options:
-            if isinstance(option, klass):
-                return option
+            option.validate_once()
 
     def get_addresses(self) -> [IPv6Address]:
         """
@@ -780,6 +660,8 @@ class IATAOption(Option):
         return [suboption.address for suboption in self.get_options_of_type(IAAddressOption)]
 
 
+@generate_codec(IPv6AddressField('address'), UIntField('preferred_lifetime', 4), UIntField('valid_lifetime', 4),
+                OptionsField('options', Option))
 class IAAddressOption(Option):
     """
     :rfc:`3315#section-22.6`
@@ -861,6 +743,8 @@ class IAAddressOption(Option):
     :type options: list[Option]
     """
 
+    __slots__ = ('address', 'preferred_lifetime', 'valid_lifetime', 'options')
+
     option_type = OPTION_IAADDR
 
     def __init__(self, address: IPv6Address = None, preferred_lifetime: int = 0, valid_lifetime: int = 0,
@@ -894,62 +778,10 @@ class IAAddressOption(Option):
         # Check if all options are allowed
         self.validate_contains(self.options)
         for option in self.options:
-            option.validate()
-
-    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
-        """
-        Load the internal state of this object from the given buffer. The buffer may contain more data after the
-        structured element is parsed. This data is ignored.
-
-        :param buffer: The buffer to read data from
-        :param offset: The offset in the buffer where to start reading
-        :param length: The amount of data we are allowed to read from the buffer
-        :return: The number of bytes used from the buffer
-        """
-        my_offset, option_len = self.parse_option_header(buffer, offset, length)
-        header_offset = my_offset
-
-        self.address = IPv6Address(buffer[offset + my_offset:offset + my_offset + 16])
-        my_offset += 16
-
-        self.preferred_lifetime, self.valid_lifetime = unpack_from('!II', buffer, offset + my_offset)
-        my_offset += 8
-
-        # Parse the options
-        self.options = []
-        max_offset = option_len + header_offset  # The option_len field counts bytes *after* the header fields
-        while max_offset > my_offset:
-            used_buffer, option = Option.parse(buffer, offset=offset + my_offset)
-            self.options.append(option)
-            my_offset += used_buffer
-
-        if my_offset != max_offset:
-            raise ValueError('Option length does not match the combined length of the parsed options')
-
-        self.validate()
-
-        return my_offset
-
-    def save(self) -> bytes:
-        """
-        Save the internal state of this object as a buffer.
-
-        :return: The buffer with the data from this element
-        """
-        self.validate()
-
-        options_buffer = bytearray()
-        for option in self.options:
-            options_buffer.extend(option.save())
-
-        buffer = bytearray()
-        buffer.extend(pack('!HH', self.option_type, len(options_buffer) + 24))
-        buffer.extend(self.address.packed)
-        buffer.extend(pack('!II', self.preferred_lifetime, self.valid_lifetime))
-        buffer.extend(options_buffer)
-        return buffer
+            option.validate_once()
 
 
+@generate_codec(UIntListField('requested_options', 2))
 class OptionRequestOption(Option):
     """
     :rfc:`3315#section-22.7`
@@ -987,6 +819,8 @@ class OptionRequestOption(Option):
     :type requested_options: list[int]
     """
 
+    __slots__ = ('requested_options',)
+
     option_type = OPTION_ORO
 
     def __init__(self, requested_options: [int] = None):
@@ -1004,42 +838,8 @@ class OptionRequestOption(Option):
             if not isinstance(option_code, int) or not (0 <= option_code < 2 ** 16):
                 raise ValueError("Requested options must be a list of unsigned 16 bit integers")
 
-    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
-        """
-        Load the internal state of this object from the given buffer. The buffer may contain more data after the
-        structured element is parsed. This data is ignored.
-
-        :param buffer: The buffer to read data from
-        :param offset: The offset in the buffer where to start reading
-        :param length: The amount of data we are allowed to read from the buffer
-        :return: The number of bytes used from the buffer
-        """
-        my_offset, option_len = self.parse_option_header(buffer, offset, length)
-
-        if option_len % 2 != 0:
-            raise ValueError('Invalid option length')
-
-        self.requested_options = list(unpack_from('!{}H'.format(option_len // 2), buffer, offset + my_offset))
-        my_offset += option_len
-
-        self.validate()
-
-        return my_offset
-
-    def save(self) -> bytes:
-        """
-        Save the internal state of this object as a buffer.
-
-        :return: The buffer with the data from this element
-        """
-        self.validate()
-
-        buffer = bytearray()
-        buffer.extend(pack('!HH', self.option_type, len(self.requested_options) * 2))
-        buffer.extend(pack('!{}H'.format(len(self.requested_options)), *self.requested_options))
-        return buffer
-
 
+@generate_codec(UIntField('preference', 1))
 class PreferenceOption(Option):
     """
     :rfc:`3315#section-22.8`
@@ -1074,6 +874,8 @@ class PreferenceOption(Option):
     :type preference: int
     """
 
+    __slots__ = ('preference',)
+
     option_type = OPTION_PREFERENCE
 
     def __init__(self, preference: int = 0):
@@ -1087,38 +889,8 @@ class PreferenceOption(Option):
         if not isinstance(self.preference, int) or not (0 <= self.preference < 2 ** 8):
             raise ValueError("Preference must be an unsigned 8 bit integer")
 
-    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
-        """
-        Load the internal state of this object from the given buffer. The buffer may contain more data after the
-        structured element is parsed. This data is ignored.
-
-        :param buffer: The buffer to read data from
-        :param offset: The offset in the buffer where to start reading
-        :param length: The amount of data we are allowed to read from the buffer
-        :return: The number of bytes used from the buffer
-        """
-        my_offset, option_len = self.parse_option_header(buffer, offset, length)
-
-        if option_len != 1:
-            raise ValueError('Preference Options must have length 1')
-
-        self.preference = buffer[offset + my_offset]
-        my_offset += 1
-
-        self.validate()
-
-        return my_offset
-
-    def save(self) -> bytes:
-        """
-        Save the internal state of this object as a buffer.
-
-        :return: The buffer with the data from this element
-        """
-        self.validate()
-        return pack('!HHB', self.option_type, 1, self.preference)
-
 
+@generate_codec(UIntField('elapsed_time', 2))
 class ElapsedTimeOption(Option):
     """
     :rfc:`3315#section-22.9`
@@ -1160,6 +932,8 @@ class ElapsedTimeOption(Option):
     :type elapsed_time: int
     """
 
+    __slots__ = ('elapsed_time',)
+
     option_type = OPTION_ELAPSED_TIME
 
     def __init__(self, elapsed_time: int = 0):
@@ -1173,38 +947,8 @@ class ElapsedTimeOption(Option):
         if not isinstance(self.elapsed_time, int) or not (0 <= self.elapsed_time < 2 ** 16):
             raise ValueError("Elapsed time must be an unsigned 16 bit integer")
 
-    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
-        """
-        Load the internal state of this object from the given buffer. The buffer may contain more data after the
-        structured element is parsed. This data is ignored.
-
-        :param buffer: The buffer to read data from
-        :param offset: The offset in the buffer where to start reading
-        :param length: The amount of data we are allowed to read from the buffer
-        :return: The number of bytes used from the buffer
-        """
-        my_offset, option_len = self.parse_option_header(buffer, offset, length)
-
-        if option_len != 2:
-            raise ValueError('Elapsed Time Options must have length 2')
-
-        self.elapsed_time = unpack_from('!H', buffer, offset=offset + my_offset)[0]
-        my_offset += 2
-
-        self.validate()
-
-        return my_offset
-
-    def save(self) -> bytes:
-        """
-        Save the internal state of this object as a buffer.
-
-        :return: The buffer with the data from this element
-        """
-        self.validate()
-        return pack('!HHH', self.option_type, 2, self.elapsed_time)
-
 
+@generate_codec(ElementField('relayed_message', Message))
 class RelayMessageOption(Option):
     """
     :rfc:`3315#section-22.10`
@@ -1239,6 +983,8 @@ class RelayMessageOption(Option):
     :type relayed_message: Message
     """
 
+    __slots__ = ('relayed_message',)
+
     option_type = OPTION_RELAY_MSG
 
     def __init__(self, relayed_message: Message = None):
@@ -1256,47 +1002,11 @@ class RelayMessageOption(Option):
             raise ValueError("{} cannot contain {}".format(self.__class__.__name__,
                                                            self.relayed_message.__class__.__name__))
 
-        self.relayed_message.validate()
-
-    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
-        """
-        Load the internal state of this object from the given buffer. The buffer may contain more data after the
-        structured element is parsed. This data is ignored.
-
-        :param buffer: The buffer to read data from
-        :param offset: The offset in the buffer where to start reading
-        :param length: The amount of data we are allowed to read from the buffer
-        :return: The number of bytes used from the buffer
-        """
-        my_offset, option_len = self.parse_option_header(buffer, offset, length)
-
-        message_len, self.relayed_message = Message.parse(buffer, offset=offset + my_offset, length=option_len)
-        my_offset += option_len
-
-        if message_len != option_len:
-            raise ValueError('The embedded message has a different length than the Relay Message Option', message_len,
-                             option_len)
-
-        self.validate()
-
-        return my_offset
-
-    def save(self) -> bytes:
-        """
-        Save the internal state of this object as a buffer.
-
-        :return: The buffer with the data from this element
-        """
-        self.validate()
-
-        message = self.relayed_message.save()
-
-        buffer = bytearray()
-        buffer.extend(pack('!HH', self.option_type, len(message)))
-        buffer.extend(message)
-        return buffer
+        self.relayed_message.validate_once()
 
 
+@generate_codec(UIntField('protocol', 1), UIntField('algorithm', 1), UIntField('rdm', 1),
+                BytesField('replay_detection', 8), RemainingBytesField('auth_info'))
 class AuthenticationOption(Option):
     """
     :rfc:`3315#section-22.11`
@@ -1349,6 +1059,8 @@ class AuthenticationOption(Option):
     :type auth_info: bytes
     """
 
+    __slots__ = ('protocol', 'algorithm', 'rdm', 'replay_detection', 'auth_info')
+
     option_type = OPTION_AUTH
 
     def __init__(self, protocol: int = 0, algorithm: int = 0, rdm: int = 0,
@@ -1378,50 +1090,8 @@ class AuthenticationOption(Option):
         if not isinstance(self.auth_info, bytes):
             raise ValueError("Authentication info must contain bytes")
 
-    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
-        """
-        Load the internal state of this object from the given buffer. The buffer may contain more data after the
-        structured element is parsed. This data is ignored.
-
-        :param buffer: The buffer to read data from
-        :param offset: The offset in the buffer where to start reading
-        :param length: The amount of data we are allowed to read from the buffer
-        :return: The number of bytes used from the buffer
-        """
-        my_offset, option_len = self.parse_option_header(buffer, offset, length)
-
-        self.protocol = buffer[offset + my_offset]
-        self.algorithm = buffer[offset + my_offset + 1]
-        self.rdm = buffer[offset + my_offset + 2]
-        my_offset += 3
-
-        self.replay_detection = buffer[offset + my_offset:offset + my_offset + 8]
-        my_offset += 8
-
-        auth_data_length = option_len - 11
-        self.auth_info = buffer[offset + my_offset:offset + my_offset + auth_data_length]
-        my_offset += auth_data_length
-
-        self.validate()
-
-        return my_offset
-
-    def save(self) -> bytes:
-        """
-        Save the internal state of this object as a buffer.
-
-        :return: The buffer with the data from this element
-        """
-        self.validate()
-
-        buffer = bytearray()
-        buffer.extend(pack('!HHBBB', self.option_type, len(self.auth_info) + 11,
-                           self.protocol, self.algorithm, self.rdm))
-        buffer.extend(self.replay_detection)
-        buffer.extend(self.auth_info)
-        return buffer
-
 
+@generate_codec(IPv6AddressField('server_address'))
 class ServerUnicastOption(Option):
     """
     :rfc:`3315#section-22.12`
@@ -1471,6 +1141,8 @@ class ServerUnicastOption(Option):
     :type server_address: IPv6Address
     """
 
+    __slots__ = ('server_address',)
+
     option_type = OPTION_UNICAST
 
     def __init__(self, server_address: IPv6Address = None):
@@ -1485,42 +1157,8 @@ class ServerUnicastOption(Option):
                 or self.server_address.is_multicast or self.server_address.is_unspecified:
             raise ValueError("Server address must be a valid IPv6 address")
 
-    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
-        """
-        Load the internal state of this object from the given buffer. The buffer may contain more data after the
-        structured element is parsed. This data is ignored.
-
-        :param buffer: The buffer to read data from
-        :param offset: The offset in the buffer where to start reading
-        :param length: The amount of data we are allowed to read from the buffer
-        :return: The number of bytes used from the buffer
-        """
-        my_offset, option_len = self.parse_option_header(buffer, offset, length)
-
-        if option_len != 16:
-            raise ValueError('Server Unicast Options must have length 16')
-
-        self.server_address = IPv6Address(buffer[offset + my_offset:offset + my_offset + 16])
-        my_offset += 16
-
-        self.validate()
-
-        return my_offset
-
-    def save(self) -> bytes:
-        """
-        Save the internal state of this object as a buffer.
-
-        :return: The buffer with the data from this element
-        """
-        self.validate()
-
-        buffer = bytearray()
-        buffer.extend(pack('!HH', self.option_type, 16))
-        buffer.extend(self.server_address.packed)
-        return buffer
-
 
+@generate_codec(UIntField('status_code', 2), StringField('status_message'))
 class StatusCodeOption(Option):
     """
     :rfc:`3315#section-22.13`
@@ -1562,6 +1200,8 @@ class StatusCodeOption(Option):
     :type status_message: str
     """
 
+    __slots__ = ('status_code', 'status_message')
+
     option_type = OPTION_STATUS_CODE
 
     def __init__(self, status_code: int = 0, status_message: str = ''):
@@ -1581,44 +1221,8 @@ class StatusCodeOption(Option):
         if not isinstance(self.status_message, str):
             raise ValueError("Status message must be a string")
 
-    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
-        """
-        Load the internal state of this object from the given buffer. The buffer may contain more data after the
-        structured element is parsed. This data is ignored.
-
-        :param buffer: The buffer to read data from
-        :param offset: The offset in the buffer where to start reading
-        :param length: The amount of data we are allowed to read from the buffer
-        :return: The number of bytes used from the buffer
-        """
-        my_offset, option_len = self.parse_option_header(buffer, offset, length)
-
-        self.status_code = unpack_from('!H', buffer, offset=offset + my_offset)[0]
-        my_offset += 2
-
-        message_length = option_len - 2
-        self.status_message = buffer[offset + my_offset:offset + my_offset + message_length].decode('utf-8')
-        my_offset += message_length
-
-        self.validate()
-
-        return my_offset
-
-    def save(self) -> bytes:
-        """
-        Save the internal state of this object as a buffer.
-
-        :return: The buffer with the data from this element
-        """
-        self.validate()
-        message_bytes = self.status_message.encode('utf-8')
-
-        buffer = bytearray()
-        buffer.extend(pack('!HHH', self.option_type, len(message_bytes) + 2, self.status_code))
-        buffer.extend(message_bytes)
-        return buffer
-
 
+@generate_codec()
 class RapidCommitOption(Option):
     """
     :rfc:`3315#section-22.14`
@@ -1663,34 +1267,12 @@ class RapidCommitOption(Option):
     addresses.
     """
 
-    option_type = OPTION_RAPID_COMMIT
-
-    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
-        """
-        Load the internal state of this object from the given buffer. The buffer may contain more data after the
-        structured element is parsed. This data is ignored.
+    __slots__ = ()
 
-        :param buffer: The buffer to read data from
-        :param offset: The offset in the buffer where to start reading
-        :param length: The amount of data we are allowed to read from the buffer
-        :return: The number of bytes used from the buffer
-        """
-        my_offset, option_len = self.parse_option_header(buffer, offset, length)
-
-        if option_len != 0:
-            raise ValueError('Rapid Commit Options must have length 0')
-
-        return my_offset
-
-    def save(self) -> bytes:
-        """
-        Save the internal state of this object as a buffer.
-
-        :return: The buffer with the data from this element
-        """
-        return pack('!HH', self.option_type, 0)
+    option_type = OPTION_RAPID_COMMIT
 
 
+@generate_codec(LengthPrefixedBytesListField('user_classes'))
 class UserClassOption(Option):
     """
     :rfc:`3315#section-22.15`
@@ -1752,6 +1334,8 @@ class UserClassOption(Option):
     :type user_classes: list[bytes]
     """
 
+    __slots__ = ('user_classes',)
+
     option_type = OPTION_USER_CLASS
 
     def __init__(self, user_classes: [bytes] = None):
@@ -1769,54 +1353,8 @@ class UserClassOption(Option):
             if not isinstance(user_class, bytes) or len(user_class) >= 2 ** 16:
                 raise ValueError("User classes must be a list of bytes")
 
-    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
-        """
-        Load the internal state of this object from the given buffer. The buffer may contain more data after the
-        structured element is parsed. This data is ignored.
-
-        :param buffer: The buffer to read data from
-        :param offset: The offset in the buffer where to start reading
-        :param length: The amount of data we are allowed to read from the buffer
-        :return: The number of bytes used from the buffer
-        """
-        my_offset, option_len = self.parse_option_header(buffer, offset, length)
-        header_offset = my_offset
-
-        # Parse the user classes
-        self.user_classes = []
-        max_offset = option_len + header_offset  # The option_len field counts bytes *after* the header fields
-        while max_offset > my_offset:
-            user_class_length = unpack_from('!H', buffer, offset=offset + my_offset)[0]
-            user_class = buffer[offset + my_offset:offset + my_offset + user_class_length]
-            self.user_classes.append(user_class)
-            my_offset += user_class_length
-
-        if my_offset != max_offset:
-            raise ValueError('Option length does not match the combined length of the parsed user classes')
-
-        self.validate()
-
-        return my_offset
-
-    def save(self) -> bytes:
-        """
-        Save the internal state of this object as a buffer.
-
-        :return: The buffer with the data from this element
-        """
-        self.validate()
-
-        user_classes_bytes = bytearray()
-        for user_class in self.user_classes:
-            user_classes_bytes.extend(pack('!H', len(user_class)))
-            user_classes_bytes.extend(user_class)
-
-        buffer = bytearray()
-        buffer.extend(pack('!HH', self.option_type, len(user_classes_bytes)))
-        buffer.extend(user_classes_bytes)
-        return buffer
-
 
+@generate_codec(UIntField('enterprise_number', 4), LengthPrefixedBytesListField('vendor_classes'))
 class VendorClassOption(Option):
     """
     :rfc:`3315#section-22.16`
@@ -1869,6 +1407,8 @@ class VendorClassOption(Option):
     :type vendor_classes: list[bytes]
     """
 
+    __slots__ = ('enterprise_number', 'vendor_classes')
+
     option_type = OPTION_VENDOR_CLASS
 
     def __init__(self, enterprise_number: int = 0, vendor_classes: [bytes] = None):
@@ -1892,59 +1432,6 @@ class VendorClassOption(Option):
             if not isinstance(vendor_class, bytes) or len(vendor_class) >= 2 ** 16:
                 raise ValueError("Vendor classes must be a list of bytes")
 
-    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
-        """
-        Load the internal state of this object from the given buffer. The buffer may contain more data after the
-        structured element is parsed. This data is ignored.
-
-        :param buffer: The buffer to read data from
-        :param offset: The offset in the buffer where to start reading
-        :param length: The amount of data we are allowed to read from the buffer
-        :return: The number of bytes used from the buffer
-        """
-        my_offset, option_len = self.parse_option_header(buffer, offset, length)
-        header_offset = my_offset
-
-        self.enterprise_number = unpack_from('!I', buffer, offset=offset + my_offset)[0]
-        my_offset += 4
-
-        # Parse the vendor classes
-        self.vendor_classes = []
-        max_offset = option_len + header_offset  # The option_len field counts bytes *after* the header fields
-        while max_offset > my_offset:
-            vendor_class_length = unpack_from('!H', buffer, offset=offset + my_offset)[0]
-            my_offset += 2
-
-            vendor_class = buffer[offset + my_offset:offset + my_offset + vendor_class_length]
-            my_offset += vendor_class_length
-
-            self.vendor_classes.append(vendor_class)
-
-        if my_offset != max_offset:
-            raise ValueError('Option length does not match the combined length of the parsed vendor classes')
-
-        self.validate()
-
-        return my_offset
-
-    def save(self) -> bytes:
-        """
-        Save the internal state of this object as a buffer.
-
-        :return: The buffer with the data from this element
-        """
-        self.validate()
-
-        vendor_classes_bytes = bytearray()
-        for vendor_class in self.vendor_classes:
-            vendor_classes_bytes.extend(pack('!H', len(vendor_class)))
-            vendor_classes_bytes.extend(vendor_class)
-
-        buffer = bytearray()
-        buffer.extend(pack('!HHI', self.option_type, len(vendor_classes_bytes) + 4, self.enterprise_number))
-        buffer.extend(vendor_classes_bytes)
-        return buffer
-
 
 class VendorSpecificInformationOption(Option):
     """
@@ -2019,6 +1506,8 @@ class VendorSpecificInformationOption(Option):
     :type vendor_options: list[(int, bytes)]
     """
 
+    __slots__ = ('enterprise_number', 'vendor_options')
+
     option_type = OPTION_VENDOR_OPTS
 
     def __init__(self, enterprise_number: int = 0, vendor_options: [(int, bytes)] = None):
@@ -2067,7 +1556,7 @@ class VendorSpecificInformationOption(Option):
             vendor_option_code, vendor_option_length = unpack_from('!HH', buffer, offset=offset + my_offset)
             my_offset += 4
 
-            vendor_option = buffer[offset + my_offset:offset + my_offset + vendor_option_length]
+            vendor_option = bytes(buffer[offset + my_offset:offset + my_offset + vendor_option_length])
             my_offset += vendor_option_length
 
             self.vendor_options.append((vendor_option_code, vendor_option))
@@ -2075,7 +1564,7 @@ class VendorSpecificInformationOption(Option):
         if my_offset != max_offset:
             raise ValueError('Option length does not match the combined length of the parsed vendor options')
 
-        self.validate()
+        self.validate_once()
 
         return my_offset
 
@@ -2085,7 +1574,7 @@ class VendorSpecificInformationOption(Option):
 
         :return: The buffer with the data from this element
         """
-        self.validate()
+        self.validate_before_save()
 
         vendor_options_bytes = bytearray()
         for vendor_option_code, vendor_option in self.vendor_options:
@@ -2098,6 +1587,7 @@ class VendorSpecificInformationOption(Option):
         return buffer
 
 
+@generate_codec(RemainingBytesField('interface_id'))
 class InterfaceIdOption(Option):
     """
     :rfc:`3315#section-22.18`
@@ -2146,6 +1636,8 @@ class InterfaceIdOption(Option):
     :type interface_id: bytes
     """
 
+    __slots__ = ('interface_id',)
+
     option_type = OPTION_INTERFACE_ID
 
     def __init__(self, interface_id: bytes = b''):
@@ -2159,36 +1651,8 @@ class InterfaceIdOption(Option):
         if not isinstance(self.interface_id, bytes) or len(self.interface_id) >= 2 ** 16:
             raise ValueError("Interface-ID must be sequence of bytes")
 
-    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
-        """
-        Load the internal state of this object from the given buffer. The buffer may contain more data after the
-        structured element is parsed. This data is ignored.
-
-        :param buffer: The buffer to read data from
-        :param offset: The offset in the buffer where to start reading
-        :param length: The amount of data we are allowed to read from the buffer
-        :return: The number of bytes used from the buffer
-        """
-        my_offset, option_len = self.parse_option_header(buffer, offset, length)
-
-        self.interface_id = buffer[offset + my_offset:offset + my_offset + option_len]
-        my_offset += option_len
-
-        self.validate()
-
-        return my_offset
-
-    def save(self) -> bytes:
-        """
-        Save the internal state of this object as a buffer.
-
-        :return: The buffer with the data from this element
-        """
-        self.validate()
-
-        return pack('!HH', self.option_type, len(self.interface_id)) + self.interface_id
-
 
+@generate_codec(UIntField('message_type', 1))
 class ReconfigureMessageOption(Option):
     """
     :rfc:`3315#section-22.19`
@@ -2221,6 +1685,8 @@ class ReconfigureMessageOption(Option):
     :type message_type: int
     """
 
+    __slots__ = ('message_type',)
+
     option_type = OPTION_RECONF_MSG
 
     def __init__(self, message_type: int = 0):
@@ -2234,36 +1700,8 @@ class ReconfigureMessageOption(Option):
         if self.message_type not in (5, 11):
             raise ValueError("Message type must be 5 (MSG_RENEW) or 11 (MSG_INFORMATION_REQUEST)")
 
-    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
-        """
-        Load the internal state of this object from the given buffer. The buffer may contain more data after the
-        structured element is parsed. This data is ignored.
-
-        :param buffer: The buffer to read data from
-        :param offset: The offset in the buffer where to start reading
-        :param length: The amount of data we are allowed to read from the buffer
-        :return: The number of bytes used from the buffer
-        """
-        my_offset, option_len = self.parse_option_header(buffer, offset, length)
-
-        self.message_type = buffer[offset + my_offset]
-        my_offset += 1
-
-        self.validate()
-
-        return my_offset
-
-    def save(self) -> bytes:
-        """
-        Save the internal state of this object as a buffer.
-
-        :return: The buffer with the data from this element
-        """
-        self.validate()
-
-        return pack('!HHB', self.option_type, 1, self.message_type)
-
 
+@generate_codec()
 class ReconfigureAcceptOption(Option):
     """
     :rfc:`3315#section-22.20`
@@ -2290,32 +1728,9 @@ class ReconfigureAcceptOption(Option):
         0.
     """
 
-    option_type = OPTION_RECONF_ACCEPT
+    __slots__ = ()
 
-    def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
-        """
-        Load the internal state of this object from the given buffer. The buffer may contain more data after the
-        structured element is parsed. This data is ignored.
-
-        :param buffer: The buffer to read data from
-        :param offset: The offset in the buffer where to start reading
-        :param length: The amount of data we are allowed to read from the buffer
-        :return: The number of bytes used from the buffer
-        """
-        my_offset, option_len = self.parse_option_header(buffer, offset, length)
-
-        if option_len != 0:
-            raise ValueError('Reconfigure Accept Options must have length 0')
-
-        return my_offset
-
-    def save(self) -> bytes:
-        """
-        Save the internal state of this object as a buffer.
-
-        :return: The buffer with the data from this element
-        """
-        return pack('!HH', self.option_type, 0)
+    option_type = OPTION_RECONF_ACCEPT
 
 
 # Specify which class may occur where
@@ -0,0 +1,148 @@
+"""
+Classification of incoming packets by looking only at the message headers and option headers. Many packets that a
+server receives are dropped anyway: messages that only servers send, requests for other servers and relay messages that
+have travelled too far. Recognising those before the packet is decoded makes them almost free, which matters when
+multiple servers share a link and most Request and Renew messages are meant for another server.
+"""
+from struct import unpack_from
+
+from dhcpkit.ipv6 import HOP_COUNT_LIMIT
+from dhcpkit.ipv6.messages import Message, MSG_RELAY_FORW, UnknownMessage
+from dhcpkit.ipv6.options import OPTION_RELAY_MSG, OPTION_SERVERID
+
+DROP_UNKNOWN_MESSAGE = 'unknown-message'
+DROP_SERVER_TO_CLIENT = 'server-to-client'
+DROP_OTHER_SERVER = 'other-server'
+DROP_HOP_LIMIT = 'hop-limit'
+
+drop_reasons = (DROP_UNKNOWN_MESSAGE, DROP_SERVER_TO_CLIENT, DROP_OTHER_SERVER, DROP_HOP_LIMIT)
+
+
+def find_option(buffer: bytes, offset: int, end: int, option_type: int) -> (int, int) or None:
+    """
+    Find the first option of the given type by walking the option headers between offset and end.
+
+    :param buffer: The buffer containing the options
+    :param offset: The offset of the first option
+    :param end: The offset where the options end
+    :param option_type: The option type to look for
+    :return: The offsets where the data of the option starts and ends, or None if the option is not present
+    """
+    while end - offset >= 4:
+        found_type, option_len = unpack_from('!HH', buffer, offset)
+        offset += 4
+        if offset + option_len > end:
+            raise ValueError('This option is longer than the available buffer')
+
+        if found_type == option_type:
+            return offset, offset + option_len
+
+        offset += option_len
+
+    return None
+
+
+class PreClassifier:
+    """
+    Decide whether incoming packets are worth decoding, based on the message headers and option headers only. Relay
+    messages are followed to the message of the client. Packets that are dropped are counted per drop reason. Packets
+    that are damaged are never dropped here, so that decoding them reports what is wrong with them.
+
+    :param server_duid: The DUID of this server, as it appears in a ServerIdOption
+    :param max_relay_depth: The maximum number of relay messages that a packet may be wrapped in
+    """
+
+    def __init__(self, server_duid: bytes, max_relay_depth: int = HOP_COUNT_LIMIT):
+        self.server_duid = bytes(server_duid)
+        """The wire format of the DUID of this server"""
+
+        self.max_relay_depth = max_relay_depth
+        """The maximum number of relay messages that a packet may be wrapped in"""
+
+        self.accepted = 0
+        """The number of packets that were passed on to be decoded"""
+
+        self.dropped = {reason: 0 for reason in drop_reasons}
+        """The number of packets that were dropped, per drop reason"""
+
+    def __str__(self):
+        dropped = ', '.join('{} {}'.format(count, reason) for reason, count in self.dropped.items() if count)
+        return "accepted {}, dropped {}".format(self.accepted, dropped or 'none')
+
+    def counts(self) -> dict:
+        """
+        The counters of this pre-classifier, so they can be passed on to another process.
+
+        :return: The number of accepted packets and the number of dropped packets per drop reason
+        """
+        return {'accepted': self.accepted, 'dropped': dict(self.dropped)}
+
+    def add_counts(self, counts: dict):
+        """
+        Add the counters of another pre-classifier to the counters of this one.
+
+        :param counts: The counters as returned by :meth:`counts`
+        """
+        self.accepted += counts['accepted']
+        for reason, count in counts['dropped'].items():
+            self.dropped[reason] = self.dropped.get(reason, 0) + count
+
+    def drop_reason(self, buffer: bytes) -> str or None:
+        """
+        Determine why the packet in the buffer should be dropped, without counting it.
+
+        :param buffer: The received packet
+        :return: The drop reason, or None if the packet should be decoded
+        """
+        offset = 0
+        end = len(buffer)
+        depth = 0
+        try:
+            while end > offset and buffer[offset] == MSG_RELAY_FORW:
+                if end - offset < 34:
+                    return None
+
+                # Relay agents discard messages that reached the hop count limit, only the outermost one counts
+                depth += 1
+                if (depth == 1 and buffer[offset + 1] > HOP_COUNT_LIMIT) or depth > self.max_relay_depth:
+                    return DROP_HOP_LIMIT
+
+                relayed_message = find_option(buffer, offset + 34, end, OPTION_RELAY_MSG)
+                if relayed_message is None:
+                    return None
+
+                offset, end = relayed_message
+
+            if end - offset < 4:
+                return None
+
+            message_class = Message.determine_class(buffer, offset=offset)
+            if issubclass(message_class, UnknownMessage):
+                return DROP_UNKNOWN_MESSAGE
+
+            if not message_class.from_client_to_server:
+                return DROP_SERVER_TO_CLIENT
+
+            server_id = find_option(buffer, offset + 4, end, OPTION_SERVERID)
+            if server_id and buffer[server_id[0]:server_id[1]] != self.server_duid:
+                return DROP_OTHER_SERVER
+
+        except ValueError:
+            # Let the decoder complain about this one
+            return None
+
+        return None
+
+    def classify(self, buffer: bytes) -> str or None:
+        """
+        Determine why the packet in the buffer should be dropped, and count the result.
+
+        :param buffer: The received packet
+        :return: The drop reason, or None if the packet should be decoded
+        """
+        reason = self.drop_reason(buffer)
+        if reason is None:
+            self.accepted += 1
+        else:
+            self.dropped[reason] += 1
+        return reason
@@ -0,0 +1,383 @@
+"""
+Replay the DHCPv6 requests from packet captures through the message handler of a server configuration, without using
+the network. Every request is wrapped like :meth:`.ListeningSocket.recv_request` does before it is given to the handler,
+and the reply is serialised like :meth:`.ListeningSocket.send_reply` does. The throughput and latency are reported per
+message type, and the replies can be compared to the replies in the captures.
+"""
+import argparse
+import logging
+import sys
+import time
+from collections import OrderedDict, deque
+from ipaddress import IPv6Address
+
+from dhcpkit.ipv6 import HOP_COUNT_LIMIT, SERVER_PORT
+from dhcpkit.ipv6.listening_socket import get_reply_buffer, wrap_message
+from dhcpkit.ipv6.message_handlers import MessageHandler
+from dhcpkit.ipv6.messages import ClientServerMessage, Message, RelayServerMessage, parse_relay_chain
+from dhcpkit.ipv6.options import ServerIdOption
+from dhcpkit.ipv6.pre_classification import PreClassifier
+from dhcpkit.pcap import UDPDatagram, read_dhcpv6_datagrams
+
+logger = logging.getLogger()
+
+
+class MessageTypeStatistics:
+    """
+    The results of replaying the requests of one message type
+    """
+
+    def __init__(self):
+        self.latencies = []
+        """The time it took to handle each request, in seconds"""
+
+        self.replies = 0
+        """The number of requests that the handler replied to"""
+
+        self.errors = 0
+        """The number of requests that couldn't be decoded or that made the handler raise an exception"""
+
+        self.matching = 0
+        """The number of replies that match the reply in the capture"""
+
+        self.different = 0
+        """The number of replies that don't match the reply in the capture"""
+
+
+def get_inner_message(message: Message) -> Message:
+    """
+    Get the message inside the relay messages, if any.
+
+    :param message: The message
+    :return: The innermost message
+    """
+    while isinstance(message, RelayServerMessage):
+        message = message.relayed_message
+    return message
+
+
+def describe_reply(message: Message or None) -> (str, [str]):
+    """
+    Describe a reply in a way that doesn't depend on the values that differ for every transaction, so that replies from
+    the handler can be compared to the replies in the capture.
+
+    :param message: The reply to the client, without relay messages
+    :return: The message type and the sorted option types in the reply
+    """
+    if message is None:
+        return 'no reply', []
+
+    option_names = []
+    if isinstance(message, ClientServerMessage):
+        option_names = sorted(type(option).__name__ for option in message.options)
+
+    return type(message).__name__, option_names
+
+
+def find_server_duid(datagrams: [UDPDatagram]) -> bytes or None:
+    """
+    Find the DUID of the server that sent the replies in the capture.
+
+    :param datagrams: The captured datagrams
+    :return: The DUID, or None if there are no replies with a server-id
+    """
+    for datagram in datagrams:
+        if datagram.source_port != SERVER_PORT:
+            continue
+
+        try:
+            message = get_inner_message(Message.parse(datagram.payload)[1])
+        except ValueError:
+            continue
+
+        if message.from_server_to_client and isinstance(message, ClientServerMessage):
+            server_id = message.get_option_of_type(ServerIdOption)
+            if server_id:
+                return bytes(server_id.duid.save())
+
+    return None
+
+
+def split_datagrams(datagrams: [UDPDatagram]) -> ([UDPDatagram], {bytes: deque}):
+    """
+    Split the captured datagrams into the requests to the server and the replies to the clients, which are indexed by
+    transaction-id.
+
+    :param datagrams: The captured datagrams
+    :return: The requests and the captured replies per transaction-id
+    """
+    requests = []
+    replies = {}
+    for datagram in datagrams:
+        if datagram.destination_port == SERVER_PORT:
+            message_type = datagram.payload[0] if datagram.payload else 0
+            if message_type != 13:
+                requests.append(datagram)
+                continue
+
+        try:
+            message = get_inner_message(Message.parse(datagram.payload)[1])
+        except ValueError:
+            continue
+
+        if message.from_server_to_client and isinstance(message, ClientServerMessage):
+            replies.setdefault(message.transaction_id, deque()).append(message)
+
+    return requests, replies
+
+
+def percentile(sorted_values: [float], fraction: float) -> float:
+    """
+    Get the value below which the given fraction of the values lie, using the nearest rank.
+
+    :param sorted_values: The values, sorted from low to high
+    :param fraction: The fraction, between 0 and 1
+    :return: The percentile
+    """
+    if not sorted_values:
+        return 0.0
+
+    rank = max(1, int(fraction * len(sorted_values) + 0.999999))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Replayer:
+    """
+    Feed captured requests to a message handler and keep statistics per message type.
+
+    :param handler: The message handler
+    :param interface_id: The interface-id that the server puts in the internal relay message
+    :param link_address: The link address of the internal relay message for requests that were sent to a multicast or
+                         link-local address, other requests use the address they were sent to
+    :param pre_classifier: The classifier that drops requests before decoding, if any
+    :param max_relay_depth: The maximum number of relay messages that a request may be wrapped in
+    """
+
+    def __init__(self, handler: MessageHandler, interface_id: bytes, link_address: IPv6Address,
+                 pre_classifier: PreClassifier = None, max_relay_depth: int = HOP_COUNT_LIMIT):
+        self.handler = handler
+        self.interface_id = interface_id
+        self.link_address = link_address
+        self.pre_classifier = pre_classifier
+        self.max_relay_depth = max_relay_depth
+
+        self.statistics = OrderedDict()
+        """The :class:`MessageTypeStatistics` per message type"""
+
+        self.captured_replies = {}
+        """The captured replies to compare against, per transaction-id"""
+
+        self.differences = []
+        """A description of each reply that didn't match the captured one"""
+
+    def replay(self, datagram: UDPDatagram):
+        """
+        Handle one request like the server would.
+
+        :param datagram: The captured request
+        """
+        start = time.perf_counter()
+
+        if self.pre_classifier:
+            reason = self.pre_classifier.classify(datagram.payload)
+            if reason:
+                self.record('Dropped: ' + reason, start)
+                return
+
+        try:
+            length, inner_message, relay_messages = parse_relay_chain(datagram.payload, max_depth=self.max_relay_depth)
+        except ValueError:
+            self.record('Invalid', start, error=True)
+            return
+
+        message_type = type(inner_message).__name__ if inner_message else 'Empty'
+        msg_in = relay_messages[-1] if relay_messages else inner_message
+
+        destination = IPv6Address(datagram.destination)
+        link_address = self.link_address if destination.is_multicast or destination.is_link_local else destination
+        try:
+            reply = self.handler.handle(wrap_message(msg_in, IPv6Address(datagram.source), link_address,
+                                                     self.interface_id),
+                                        received_over_multicast=destination.is_multicast)
+            if reply is not None:
+                reply.relayed_message.save_into(get_reply_buffer())
+        except Exception as e:
+            logger.debug("Handler raised {!r}".format(e))
+            self.record(message_type, start, error=True)
+            return
+
+        statistics = self.record(message_type, start, replied=reply is not None)
+
+        # Compare to the capture if possible
+        if inner_message is not None and isinstance(inner_message, ClientServerMessage):
+            captured_replies = self.captured_replies.get(inner_message.transaction_id)
+            if captured_replies:
+                captured = describe_reply(captured_replies.popleft())
+                produced = describe_reply(get_inner_message(reply.relayed_message) if reply else None)
+                if captured == produced:
+                    statistics.matching += 1
+                else:
+                    statistics.different += 1
+                    self.differences.append("{} {}: captured {} {}, handler {} {}".format(
+                        message_type, inner_message.transaction_id.hex(),
+                        captured[0], ', '.join(captured[1]), produced[0], ', '.join(produced[1])))
+
+    def record(self, message_type: str, start: float, replied: bool = False, error: bool = False) -> \
+            MessageTypeStatistics:
+        """
+        Record the result of handling a request.
+
+        :param message_type: The name of the message type
+        :param start: The time when handling started
+        :param replied: Whether there was a reply
+        :param error: Whether the request couldn't be handled
+        :return: The statistics of this message type
+        """
+        latency = time.perf_counter() - start
+
+        statistics = self.statistics.get(message_type)
+        if statistics is None:
+            statistics = self.statistics[message_type] = MessageTypeStatistics()
+
+        statistics.latencies.append(latency)
+        statistics.replies += replied
+        statistics.errors += error
+        return statistics
+
+
+def print_report(replayer: Replayer, duration: float, compare: bool):
+    """
+    Print the throughput and latency per message type.
+
+    :param replayer: The replayer with the statistics
+    :param duration: The time that replaying took in seconds
+    :param compare: Whether to show the comparison with the captured replies
+    """
+    print("{:30} {:>8} {:>8} {:>7} {:>10} {:>9} {:>9} {:>9} {:>9}".format(
+        "Message type", "count", "replies", "errors", "handled/s", "p50 us", "p90 us", "p99 us", "max us"))
+
+    total = 0
+    for message_type, statistics in sorted(replayer.statistics.items()):
+        latencies = sorted(statistics.latencies)
+        total += len(latencies)
+        print("{:30} {:8} {:8} {:7} {:10.0f} {:9.1f} {:9.1f} {:9.1f} {:9.1f}".format(
+            message_type, len(latencies), statistics.replies, statistics.errors,
+            len(latencies) / sum(latencies) if sum(latencies) else 0.0,
+            percentile(latencies, 0.5) * 1e6, percentile(latencies, 0.9) * 1e6,
+            percentile(latencies, 0.99) * 1e6, latencies[-1] * 1e6))
+
+    print()
+    print("Replayed {} requests in {:.3f} seconds: {:.0f} requests/s".format(
+        total, duration, total / duration if duration else 0.0))
+
+    if compare:
+        print()
+        for message_type, statistics in sorted(replayer.statistics.items()):
+            if statistics.matching or statistics.different:
+                print("{:30} {:8} matching {:8} different".format(
+                    message_type, statistics.matching, statistics.different))
+
+        for difference in replayer.differences:
+            logger.info(difference)
+
+
+def set_up_logger(verbosity: int):
+    """
+    Log to the standard output, depending on the verbosity.
+
+    :param verbosity: The verbosity level given as command line argument
+    """
+    # Don't filter on level in the root logger
+    logger.setLevel(logging.NOTSET)
+
+    stdout_handler = logging.StreamHandler(stream=sys.stdout)
+    if verbosity >= 3:
+        stdout_handler.setLevel(logging.DEBUG)
+    elif verbosity == 2:
+        stdout_handler.setLevel(logging.INFO)
+    elif verbosity >= 1:
+        stdout_handler.setLevel(logging.WARNING)
+    else:
+        stdout_handler.setLevel(logging.CRITICAL)
+
+    logger.addHandler(stdout_handler)
+
+
+def run() -> int:
+    """
+    Function to be called from the command line to replay captured requests through a message handler.
+
+    :return: exit code
+    """
+    from dhcpkit.ipv6.server import load_config, get_handler, set_up_codecs
+
+    parser = argparse.ArgumentParser(
+        description="Replay DHCPv6 requests from packet captures through the message handler of a server "
+                    "configuration, without using the network.",
+    )
+
+    parser.add_argument("config", help="the configuration file")
+    parser.add_argument("captures", metavar="capture", nargs='+', help="the pcap or pcapng files to replay")
+    parser.add_argument("-r", "--rate", type=float, default=0.0,
+                        help="the number of requests per second to replay, the default is as fast as possible")
+    parser.add_argument("-n", "--repeat", type=int, default=1, help="how many times to replay the captures")
+    parser.add_argument("-i", "--interface-id", default='replay',
+                        help="the interface-id of the interface that the requests are received on")
+    parser.add_argument("-l", "--link-address", type=IPv6Address, default=IPv6Address('::'),
+                        help="the link address for requests that were sent to a multicast or link-local address")
+    parser.add_argument("-c", "--compare", action="store_true",
+                        help="compare the replies to the replies in the captures")
+    parser.add_argument("-v", "--verbosity", action="count", default=0, help="increase output verbosity")
+
+    args = parser.parse_args()
+
+    set_up_logger(args.verbosity)
+
+    datagrams = []
+    for filename in args.captures:
+        datagrams.extend(read_dhcpv6_datagrams(filename))
+
+    requests, captured_replies = split_datagrams(datagrams)
+    if not requests:
+        logger.critical("No DHCPv6 requests found in the captures")
+        return 1
+
+    config = load_config(args.config)
+
+    # The server would determine its DUID from the interfaces, use the one from the capture instead
+    if config['server']['duid'].lower() in ('', 'auto'):
+        server_duid = find_server_duid(datagrams)
+        if not server_duid:
+            logger.critical("The configuration doesn't specify a server DUID and the captures don't contain one")
+            return 1
+
+        config['server']['duid'] = server_duid.hex()
+
+    set_up_codecs(config)
+
+    max_relay_depth = config['server'].getint('max-relay-depth')
+
+    pre_classifier = None
+    if config['server'].getboolean('pre-classify'):
+        pre_classifier = PreClassifier(bytes.fromhex(config['server']['duid']), max_relay_depth=max_relay_depth)
+
+    replayer = Replayer(get_handler(config), args.interface_id.encode('utf-8'), args.link_address, pre_classifier,
+                        max_relay_depth)
+
+    start = time.perf_counter()
+    for iteration in range(max(1, args.repeat)):
+        # Only compare the first time, every captured reply is used once
+        replayer.captured_replies = captured_replies if args.compare and iteration == 0 else {}
+
+        for index, datagram in enumerate(requests):
+            if args.rate > 0:
+                # Wait until it's time for this request
+                delay = start + (iteration * len(requests) + index) / args.rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+            replayer.replay(datagram)
+
+    print_report(replayer, time.perf_counter() - start, args.compare)
+
+    return 0
@@ -0,0 +1,76 @@
+"""
+Templates for replies to Information-Request messages. When all option handlers only add options that depend on the
+options requested by the client and the link the request came from, the reply to an Information-Request is the same for
+every client on that link apart from the transaction-id, the client-id and the relay messages around it. A template
+keeps the wire format of all the other options so that they don't have to be added and saved for every request.
+"""
+from dhcpkit.ipv6.messages import ClientServerMessage, InformationRequestMessage
+from dhcpkit.ipv6.options import ClientIdOption, Option
+
+
+class ReplyTemplate:
+    """
+    The pre-saved options of a reply to an Information-Request. The client-id options of the request are placed
+    between the options before and after them, in the same place where the option handlers put them.
+
+    :param message_class: The class of the reply
+    :param options_before: The options before the client-id options
+    :param options_after: The options after the client-id options
+    """
+
+    def __init__(self, message_class: type, options_before: [Option], options_after: [Option]):
+        self.message_class = message_class
+        """The class of the reply"""
+
+        raw_options = bytearray()
+        entries = []
+        for option in options_before + options_after:
+            option_bytes = option.save()
+            entries.append((type(option), len(raw_options), len(raw_options) + len(option_bytes)))
+            raw_options.extend(option_bytes)
+
+        self.raw_options = memoryview(bytes(raw_options))
+        """The wire format of the options"""
+
+        self.entries_before = entries[:len(options_before)]
+        """The entries pointing to the options before the client-id options in :attr:`raw_options`"""
+
+        self.entries_after = entries[len(options_before):]
+        """The entries pointing to the options after the client-id options in :attr:`raw_options`"""
+
+    @classmethod
+    def from_response(cls, response: ClientServerMessage, client_id: ClientIdOption) -> object:
+        """
+        Create a template from a response that was constructed for a request with the given client-id option.
+
+        :param response: The constructed response
+        :param client_id: The client-id option of the request that the response was constructed for
+        :return: The template, or None if the response contains client-id options that don't come from the request
+        :rtype: ReplyTemplate
+        """
+        options = list(response.options)
+
+        positions = [position for position, option in enumerate(options) if option is client_id]
+        if not positions:
+            # The client-id isn't copied to the response, which must then be the same for all clients
+            if response.get_option_of_type(ClientIdOption):
+                return None
+
+            return cls(type(response), options, [])
+
+        if len(positions) > 1 or len(response.get_options_of_type(ClientIdOption)) > 1:
+            return None
+
+        return cls(type(response), options[:positions[0]], options[positions[0] + 1:])
+
+    def create_reply(self, request: InformationRequestMessage) -> ClientServerMessage:
+        """
+        Create the reply to a request from this template.
+
+        :param request: The incoming request
+        :return: The reply, with the transaction-id and client-id options of the request
+        """
+        reply = self.message_class(request.transaction_id)
+        reply.set_option_entries(self.entries_before + request.get_options_of_type(ClientIdOption) +
+                                 self.entries_after, self.raw_options)
+        return reply
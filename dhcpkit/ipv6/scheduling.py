@@ -0,0 +1,183 @@
+"""
+A bounded queue for the requests that are waiting for a worker thread, with a separate limit per priority class. When
+many clients start at the same time, for example after a power outage, the server can receive far more Solicit messages
+than it can handle. Without a limit they pile up in memory, and the Renew messages of clients that already have
+addresses wait behind them until the clients give up.
+
+Requests from clients that already have or are about to get addresses are handled first. Each priority class has its
+own limit, and the queue as a whole has a total limit that can be lower than all class limits together. When the queue
+as a whole is full, the oldest waiting request of a lower priority class is dropped to make room for a new one. That
+way it is the Solicit and Information-Request messages that are dropped when the server can't keep up. Clients
+retransmit those anyway.
+"""
+import collections
+import logging
+import threading
+from collections import namedtuple
+
+from dhcpkit.ipv6.messages import ConfirmMessage, DeclineMessage, RebindMessage, RelayForwardMessage, \
+    ReleaseMessage, RenewMessage, RequestMessage
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_HIGH = 'high'
+PRIORITY_LOW = 'low'
+
+# From the highest to the lowest priority
+priorities = (PRIORITY_HIGH, PRIORITY_LOW)
+
+# Messages from clients that already have addresses, or that are about to get the ones they were offered
+high_priority_message_types = (RequestMessage, ConfirmMessage, RenewMessage, RebindMessage, ReleaseMessage,
+                               DeclineMessage)
+
+QueuedRequest = namedtuple('QueuedRequest', ['listening_socket', 'message', 'received_over_multicast', 'arrival',
+                                             'deadline'])
+QueuedRequest.__doc__ = 'A received request that is waiting for a worker thread'
+
+
+def request_priority(message: RelayForwardMessage) -> str:
+    """
+    Determine the priority class of a received request.
+
+    :param message: The received request, wrapped like a relay would
+    :return: The priority class
+    """
+    if isinstance(message.inner_message, high_priority_message_types):
+        return PRIORITY_HIGH
+    else:
+        return PRIORITY_LOW
+
+
+class RequestScheduler:
+    """
+    A queue with a separate limit for each priority class and a total limit. Requests are taken from the queue with the
+    highest priority first. A request that arrives when the queue of its class is full is dropped. A request that
+    arrives when the queue as a whole is full pushes out the oldest request of the lowest priority class that has any
+    waiting below its own, and is dropped if there is none. The counters can be read from any thread.
+
+    :param limits: The maximum number of waiting requests for each priority class
+    :param capacity: The maximum number of waiting requests in total, by default all limits together
+    """
+
+    def __init__(self, limits: dict, capacity: int = None):
+        self.limits = dict(limits)
+        self.capacity = sum(self.limits.values()) if capacity is None else capacity
+        self.queues = {priority: collections.deque() for priority in priorities}
+        self.condition = threading.Condition()
+        self.closed = False
+
+        self.accepted = 0
+        """The number of requests that were admitted to the queue"""
+
+        self.dropped = {priority: 0 for priority in priorities}
+        """The number of requests that were dropped or pushed out because the queue was full, per priority class"""
+
+        self.shedding = set()
+        """The priority classes that requests have been dropped from since the queue was last empty"""
+
+    def __len__(self):
+        return sum(len(queue) for queue in self.queues.values())
+
+    def __str__(self):
+        dropped = ', '.join('{} {} priority'.format(count, priority)
+                            for priority, count in self.dropped.items() if count)
+        return "accepted {}, dropped {}".format(self.accepted, dropped or 'none')
+
+    def counts(self) -> dict:
+        """
+        The counters of this scheduler, so they can be passed on to another process.
+
+        :return: The number of accepted requests and the number of dropped requests per priority class
+        """
+        with self.condition:
+            return {'accepted': self.accepted, 'dropped': dict(self.dropped)}
+
+    def add_counts(self, counts: dict):
+        """
+        Add the counters of another scheduler to the counters of this one.
+
+        :param counts: The counters as returned by :meth:`counts`
+        """
+        with self.condition:
+            self.accepted += counts['accepted']
+            for priority, count in counts['dropped'].items():
+                self.dropped[priority] = self.dropped.get(priority, 0) + count
+
+    def drop(self, priority: str):
+        """
+        Count a dropped request, and warn when a priority class starts losing requests. The caller must hold the
+        condition.
+
+        :param priority: The priority class of the dropped request
+        """
+        self.dropped[priority] += 1
+        if priority not in self.shedding:
+            self.shedding.add(priority)
+            logger.warning("Request queue is full, dropping {} priority requests".format(priority))
+
+    def put(self, item, priority: str) -> bool:
+        """
+        Add a request to the queue of its priority class. When that queue is full the request is dropped. When the
+        queue as a whole is full a waiting request with a lower priority is dropped to make room, and if there is none
+        the new request is dropped.
+
+        :param item: The request
+        :param priority: The priority class of the request
+        :return: Whether the request was admitted
+        """
+        with self.condition:
+            if self.closed:
+                return False
+
+            queue = self.queues[priority]
+            if len(queue) >= self.limits[priority]:
+                self.drop(priority)
+                return False
+
+            if len(self) >= self.capacity:
+                # Push out the oldest request of the lowest priority class below this one that has any waiting
+                lower_priorities = priorities[priorities.index(priority) + 1:]
+                victim_priority = next((lower_priority for lower_priority in reversed(lower_priorities)
+                                        if self.queues[lower_priority]), None)
+                if victim_priority is None:
+                    self.drop(priority)
+                    return False
+
+                self.queues[victim_priority].popleft()
+                self.drop(victim_priority)
+
+            queue.append(item)
+            self.accepted += 1
+            self.condition.notify()
+            return True
+
+    def get(self, max_count: int = 1) -> list:
+        """
+        Take the waiting requests with the highest priority from the queue, waiting until there are any.
+
+        :param max_count: The maximum number of requests to take
+        :return: The requests, or an empty list when the queue is closed and there is nothing left
+        """
+        with self.condition:
+            while not self.closed and not any(self.queues.values()):
+                self.condition.wait()
+
+            items = []
+            for priority in priorities:
+                queue = self.queues[priority]
+                while queue and len(items) < max_count:
+                    items.append(queue.popleft())
+
+            if self.shedding and not any(self.queues.values()):
+                self.shedding.clear()
+                logger.info("Request queue has drained, no longer dropping requests")
+
+            return items
+
+    def close(self):
+        """
+        Stop accepting requests. The requests that are still waiting can still be taken from the queue.
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
@@ -4,14 +4,13 @@ The main IPv6 DHCPd
 
 import argparse
 import codecs
-import concurrent.futures
+import collections
 import configparser
 import fcntl
 import grp
 import importlib
 import logging
 import logging.handlers
-import netifaces
 import os
 import pwd
 import re
@@ -19,23 +18,30 @@ import selectors
 import signal
 import socket
 import sys
+import threading
 import time
-import types
+from contextlib import contextmanager
+from functools import partial
 from ipaddress import IPv6Address, AddressValueError
 from logging import StreamHandler, Formatter
 from logging.handlers import SysLogHandler
 from struct import pack
 
 import dhcpkit
-from dhcpkit.ipv6.duids import DUID, LinkLayerDUID
-from dhcpkit.ipv6.exceptions import InvalidPacketError, ListeningSocketError
+from dhcpkit.ipv6 import HOP_COUNT_LIMIT
+from dhcpkit.ipv6.duids import DUID, LinkLayerDUID, set_duid_pool_size
+from dhcpkit.ipv6.exceptions import InvalidPacketError, ListeningSocketError, DroppedPacketError
 from dhcpkit.ipv6.listening_socket import ListeningSocket
 from dhcpkit.ipv6.message_handlers import MessageHandler
-from dhcpkit.ipv6.messages import RelayReplyMessage
+from dhcpkit.ipv6.messages import Message, RelayReplyMessage, LazyOptionsMixin
+from dhcpkit.protocol_element import ProtocolElement, validation_policies
 from dhcpkit.utils import camelcase_to_dash
 
 logger = logging.getLogger()
 
+# The ways the server can wait for and handle requests
+server_cores = ('threads', 'asyncio')
+
 
 class ServerConfigParser(configparser.ConfigParser):
     """
@@ -147,6 +153,8 @@ def handle_args():
     parser.add_argument("config", help="the configuration file")
     parser.add_argument("-C", "--show-config", action="store_true", help="show the active configuration")
     parser.add_argument("-v", "--verbosity", action="count", default=0, help="increase output verbosity")
+    parser.add_argument("-P", "--profile-startup", action="store_true",
+                        help="show how long each part of starting the server and each import takes, and exit")
 
     args = parser.parse_args()
 
@@ -177,6 +185,19 @@ def load_config(config_filename: str) -> configparser.ConfigParser:
     config['server']['exception-window'] = '1.0'
     config['server']['max-exceptions'] = '10'
     config['server']['threads'] = '10'
+    config['server']['lazy-option-decoding'] = 'no'
+    config['server']['validation'] = 'strict'
+    config['server']['duid-pool-size'] = '0'
+    config['server']['max-relay-depth'] = str(HOP_COUNT_LIMIT)
+    config['server']['pre-classify'] = 'yes'
+    config['server']['core'] = 'threads'
+    config['server']['handler-mode'] = 'executor'
+    config['server']['processes'] = '1'
+    config['server']['batch-size'] = '32'
+    config['server']['queue-limit'] = '1000'
+    config['server']['queue-limit-high'] = '1000'
+    config['server']['queue-limit-low'] = '500'
+    config['server']['deadlines'] = 'yes'
     config['server']['working-directory'] = os.path.dirname(config_filename)
 
     try:
@@ -313,6 +334,9 @@ def determine_interface_configs(config: configparser.ConfigParser):
     :param config: the config parser object
     :return: the list of configured interface names
     """
+    # Only needed when starting the server, not for tools that import this module
+    import netifaces
+
     interface_names = netifaces.interfaces()
 
     # Check the interface sections
@@ -490,6 +514,8 @@ def determine_server_duid(config: configparser.ConfigParser):
 
     :param config: The configuration
     """
+    import netifaces
+
     # Try to get the server DUID from the configuration
     config_duid = config['server']['duid']
     if config_duid.lower() not in ('', 'auto'):
@@ -543,13 +569,29 @@ def determine_server_duid(config: configparser.ConfigParser):
     sys.exit(1)
 
 
-def get_sockets(config: configparser.ConfigParser) -> [ListeningSocket]:
+def create_udp_socket(reuse_port: bool = False) -> socket.socket:
+    """
+    Create an IPv6 UDP socket.
+
+    :param reuse_port: Whether other processes may bind sockets to the same address and port
+    :return: The socket
+    """
+    sock = socket.socket(socket.AF_INET6, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    return sock
+
+
+def get_sockets(config: configparser.ConfigParser, reuse_port: bool = False) -> [ListeningSocket]:
     """
     Set up the network sockets.
 
     :param config: The configuration
+    :param reuse_port: Whether to let the sockets of multiple worker processes listen on the same addresses
     :return: The list of sockets
     """
+    import netifaces
+
     logger.debug("Creating sockets")
 
     mc_address = dhcpkit.ipv6.All_DHCP_Relay_Agents_and_Servers
@@ -578,7 +620,7 @@ def get_sockets(config: configparser.ConfigParser) -> [ListeningSocket]:
                 address = IPv6Address(address_str)
                 logger.debug("- Creating socket for {} on {}".format(address, interface_name))
 
-                sock = socket.socket(socket.AF_INET6, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+                sock = create_udp_socket(reuse_port)
                 sock.bind((str(address), port))
                 sockets.append(ListeningSocket(interface_name, sock))
 
@@ -607,7 +649,7 @@ def get_sockets(config: configparser.ConfigParser) -> [ListeningSocket]:
                 address = IPv6Address(address_str)
                 logger.debug("- Creating socket for {} on {}".format(address, interface_name))
 
-                sock = socket.socket(socket.AF_INET6, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+                sock = create_udp_socket(reuse_port)
                 sock.bind((str(address), port, 0, interface_index))
                 link_local_sockets.append((address, sock))
                 sockets.append(ListeningSocket(interface_name, sock, global_address=first_global))
@@ -619,7 +661,7 @@ def get_sockets(config: configparser.ConfigParser) -> [ListeningSocket]:
                 logger.debug("- Creating socket for {} with {} "
                              "as reply-from address on {} ".format(address, reply_from[0], interface_name))
 
-                sock = socket.socket(socket.AF_INET6, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+                sock = create_udp_socket(reuse_port)
                 sock.bind((address, port, 0, interface_index))
 
                 if section.getboolean('listen-to-self'):
@@ -638,6 +680,11 @@ def get_sockets(config: configparser.ConfigParser) -> [ListeningSocket]:
         logger.critical(str(e))
         sys.exit(1)
 
+    # Limit how deeply received requests may be wrapped in relay messages
+    max_relay_depth = config['server'].getint('max-relay-depth')
+    for sock in sockets:
+        sock.max_relay_depth = max_relay_depth
+
     return sockets
 
 
@@ -702,76 +749,177 @@ def drop_privileges(uid_name: str or int, gid_name: str or int or None):
     logger.debug("Dropped privileges to {}/{}".format(uid_name, gid_name))
 
 
-def create_handler_callback(listening_socket: ListeningSocket) -> types.FunctionType:
+def set_up_codecs(config: configparser.ConfigParser):
     """
-    Create a callback for the handler method that still knows the listening socket and the sender
+    Decide how messages are decoded and validated, based on the information in the configuration.
 
-    :param listening_socket: The listening socket to remember
-    :return: A callback function with the listening socket and sender enclosed
-    :rtype: (concurrent.futures.Future) -> None
+    :param config: The configuration
     """
+    # Decide how to parse incoming messages
+    LazyOptionsMixin.lazy_option_decoding = config['server'].getboolean('lazy-option-decoding')
 
-    def callback(future: concurrent.futures.Future):
-        """
-        A callback that handles the result of a handler
+    # Decide how to validate messages
+    validation_policy = config['server']['validation'].lower()
+    if validation_policy not in validation_policies:
+        logger.critical("Invalid validation policy: {}".format(validation_policy))
+        sys.exit(1)
 
-        :param future: The future object with the completed result
-        """
-        try:
-            # Get the result
-            reply = future.result()
+    ProtocolElement.validation_policy = validation_policy
 
-            if reply is None:
-                # No reply: we're done with this request
-                return
+    # Decide whether to share the DUIDs of clients between their messages
+    try:
+        set_duid_pool_size(config['server'].getint('duid-pool-size'))
+    except ValueError:
+        logger.critical("Invalid DUID pool size: {}".format(config['server']['duid-pool-size']))
+        sys.exit(1)
 
-            if not isinstance(reply, RelayReplyMessage):
-                logger.error("Handler returned invalid result, not sending a reply")
-                return
 
-            try:
-                listening_socket.send_reply(reply)
-            except ValueError as e:
-                logger.error("Handler returned invalid message: {}".format(e))
-                return
+def send_handler_reply(listening_socket: ListeningSocket, reply: Message or None):
+    """
+    Send the reply that the message handler returned, if it returned a valid one.
+
+    :param listening_socket: The listening socket that the request was received on
+    :param reply: The result of the message handler
+    """
+    if reply is None:
+        # No reply: we're done with this request
+        return
 
-        except concurrent.futures.CancelledError:
-            pass
+    if not isinstance(reply, RelayReplyMessage):
+        logger.error("Handler returned invalid result, not sending a reply")
+        return
+
+    try:
+        listening_socket.send_reply(reply)
+    except ValueError as e:
+        logger.error("Handler returned invalid message: {}".format(e))
+
+
+def handle_batch(handler: MessageHandler, requests: ['QueuedRequest'], deadline_tracker: 'DeadlineTracker'):
+    """
+    Let the message handler handle a batch of requests, and send the replies for each listening socket together.
+    Requests that expire before they are handled, and replies to requests that expire while they are being handled, are
+    discarded.
 
+    :param handler: The message handler
+    :param requests: The requests
+    :param deadline_tracker: The tracker that checks the deadlines and keeps the statistics
+    """
+    replies = collections.OrderedDict()
+    for request in requests:
+        if not deadline_tracker.picked_up(request.arrival, request.deadline):
+            logger.debug("Discarding {} from {}, the client has sent a new one by now".format(
+                type(request.message.inner_message).__name__, request.message.peer_address))
+            continue
+
+        # noinspection PyBroadException
+        try:
+            reply = handler.handle(request.message, request.received_over_multicast)
         except Exception as e:
-            # Catch-all exception handler
+            # A failing request doesn't affect the rest of the batch
             logger.exception("Caught unexpected exception {!r}".format(e))
+            continue
 
-    return callback
+        if reply is None:
+            # No reply: we're done with this request
+            continue
 
+        if not isinstance(reply, RelayReplyMessage):
+            logger.error("Handler returned invalid result, not sending a reply")
+            continue
 
-def main() -> int:
+        if not deadline_tracker.reply_ready(request.deadline):
+            logger.debug("Discarding reply to {} from {}, the client has sent a new one by now".format(
+                type(request.message.inner_message).__name__, request.message.peer_address))
+            continue
+
+        replies.setdefault(request.listening_socket, []).append(reply)
+
+    for listening_socket, socket_replies in replies.items():
+        listening_socket.send_replies(socket_replies)
+
+
+def handle_requests(handler: MessageHandler, scheduler: 'RequestScheduler', deadline_tracker: 'DeadlineTracker',
+                    batch_size: int):
     """
-    The main program loop
+    The loop of a worker thread: handle the waiting requests with the highest priority, until the scheduler is closed
+    and all requests are handled.
 
-    :return: The program exit code
+    :param handler: The message handler
+    :param scheduler: The scheduler to take the requests from
+    :param deadline_tracker: The tracker that checks the deadlines and keeps the statistics
+    :param batch_size: The maximum number of requests to take at once
     """
-    args = handle_args()
-    config = load_config(args.config)
+    while True:
+        requests = scheduler.get(batch_size)
+        if not requests:
+            return
+
+        # noinspection PyBroadException
+        try:
+            handle_batch(handler, requests, deadline_tracker)
+        except Exception as e:
+            # Catch-all exception handler, the worker thread must keep running
+            logger.exception("Caught unexpected exception {!r}".format(e))
 
-    # Go to the working directory
-    os.chdir(config['server']['working-directory'])
 
-    set_up_logger(config, args.verbosity)
+def queue_packets(listening_socket: ListeningSocket, packets: [(bytes, tuple, float)],
+                  scheduler: 'RequestScheduler', use_deadlines: bool) -> int:
+    """
+    Decode a batch of received packets and queue the requests for the worker threads. Every packet is decoded on its
+    own, so a packet that can't be decoded doesn't take the rest of the batch down with it.
+
+    :param listening_socket: The socket that the packets were received on
+    :param packets: The packets, senders and arrival times as returned by :meth:`.ListeningSocket.recv_packets`
+    :param scheduler: The scheduler to queue the requests in
+    :param use_deadlines: Whether to give the requests a deadline
+    :return: The number of packets that caused an unexpected exception
+    """
+    from dhcpkit.ipv6.deadlines import request_deadline
+    from dhcpkit.ipv6.scheduling import QueuedRequest, request_priority
 
-    logger.info("Starting Python DHCPv6 server v{}".format(dhcpkit.__version__))
+    received_over_multicast = listening_socket.listen_address.is_multicast
+    failures = 0
+    for pkt, sender, arrival in packets:
+        # noinspection PyBroadException
+        try:
+            msg_in = listening_socket.decode_request(pkt, sender)
+        except DroppedPacketError as e:
+            logger.debug("Ignoring message from {}: {}".format(e.sender[0], e.reason))
+            continue
+        except InvalidPacketError as e:
+            logging.warning("Invalid message from {}: {}".format(e.sender[0], str(e)))
+            continue
+        except ValueError as e:
+            logging.warning("Invalid incoming message: {}".format(str(e)))
+            continue
+        except Exception as e:
+            logger.exception("Caught unexpected exception {!r}".format(e))
+            failures += 1
+            continue
 
-    determine_interface_configs(config)
-    determine_server_duid(config)
+        # Queue the request for the worker threads, unless the server is overloaded
+        deadline = request_deadline(msg_in, arrival) if use_deadlines else None
+        scheduler.put(QueuedRequest(listening_socket, msg_in, received_over_multicast, arrival, deadline),
+                      request_priority(msg_in))
 
-    if args.show_config:
-        config.write(sys.stdout)
-        sys.exit(0)
+    return failures
 
-    sockets = get_sockets(config)
-    drop_privileges(config['server']['user'], config['server']['group'])
 
-    handler = get_handler(config)
+def serve_with_threads(config: configparser.ConfigParser, handler: MessageHandler,
+                       sockets: [ListeningSocket]) -> dict:
+    """
+    Handle requests until the server is told to stop. The sockets are watched with a selector and the requests are
+    queued for a pool of worker threads, which also send the replies. The queue has a limit per priority class, and
+    requests that don't fit are dropped.
+
+    :param config: The configuration
+    :param handler: The message handler
+    :param sockets: The sockets to handle requests from
+    :return: The statistics of the request queue and the deadlines
+    """
+    from dhcpkit.ipv6.deadlines import DeadlineTracker
+    from dhcpkit.ipv6.scheduling import RequestScheduler, priorities
 
     sel = selectors.DefaultSelector()
     for sock in sockets:
@@ -793,12 +941,51 @@ def main() -> int:
     # Excessive exception catcher
     exception_history = []
 
-    logger.info("Python DHCPv6 server is ready to handle requests")
+    logger.info("Python DHCPv6 server is ready to handle requests using threads")
 
     exception_window = config['server'].getfloat('exception-window')
     max_exceptions = config['server'].getint('max-exceptions')
     workers = max(1, config['server'].getint('threads'))
-    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+    batch_size = config['server'].getint('batch-size')
+
+    use_deadlines = config['server'].getboolean('deadlines')
+
+    def register_exception() -> bool:
+        """
+        Add an unexpected exception to the history and determine whether there have been too many of them.
+
+        :return: Whether the server should stop
+        """
+        now = time.monotonic()
+
+        # Add new exception time to the history
+        exception_history.append(now)
+
+        # Remove exceptions outside the window from the history
+        cutoff = now - exception_window
+        while exception_history and exception_history[0] < cutoff:
+            exception_history.pop(0)
+
+        # Did we receive too many exceptions shortly after each other?
+        if len(exception_history) > max_exceptions:
+            logger.critical("Received more than {} exceptions in {} seconds, exiting".format(max_exceptions,
+                                                                                             exception_window))
+            return True
+
+        return False
+
+    # The worker threads take the requests from a bounded queue, the most urgent ones first
+    scheduler = RequestScheduler({priority: config['server'].getint('queue-limit-' + priority)
+                                  for priority in priorities},
+                                 capacity=config['server'].getint('queue-limit'))
+    deadline_tracker = DeadlineTracker()
+    worker_threads = [threading.Thread(target=handle_requests, args=(handler, scheduler, deadline_tracker, batch_size),
+                                       name='Worker-{}'.format(number + 1))
+                      for number in range(workers)]
+    for worker_thread in worker_threads:
+        worker_thread.start()
+
+    try:
         stopping = False
         while not stopping:
             # noinspection PyBroadException
@@ -821,42 +1008,288 @@ def main() -> int:
                         # Unknown signal: ignore
                         continue
                     elif isinstance(key.fileobj, ListeningSocket):
-                        try:
-                            msg_in = key.fileobj.recv_request()
-                        except InvalidPacketError as e:
-                            logging.warning("Invalid message from {}: {}".format(e.sender[0], str(e)))
-                            continue
-                        except ValueError as e:
-                            logging.warning("Invalid incoming message: {}".format(str(e)))
-                            continue
-
-                        # Submit this request to the worker pool
-                        received_over_multicast = key.fileobj.listen_address.is_multicast
-                        future = executor.submit(handler.handle, msg_in, received_over_multicast)
-
-                        # Create the callback
-                        callback = create_handler_callback(key.fileobj)
-                        future.add_done_callback(callback)
+                        # Drain the socket in batches instead of going back to the selector for every packet
+                        packets = key.fileobj.recv_packets(batch_size)
+                        for _ in range(queue_packets(key.fileobj, packets, scheduler, use_deadlines)):
+                            stopping = register_exception() or stopping
 
             except Exception as e:
                 # Catch-all exception handler
                 logger.exception("Caught unexpected exception {!r}".format(e))
+                stopping = register_exception() or stopping
+
+    finally:
+        # Let the worker threads handle the requests that are still waiting
+        scheduler.close()
+        for worker_thread in worker_threads:
+            worker_thread.join()
+
+    logger.info("Request queue {}".format(scheduler))
+    logger.info("Request deadlines {}".format(deadline_tracker))
 
-                now = time.monotonic()
+    return {
+        'queue': scheduler.counts(),
+        'deadlines': deadline_tracker.counts(),
+    }
+
+
+def set_up_pre_classifier(config: configparser.ConfigParser, sockets: [ListeningSocket]) -> 'PreClassifier' or None:
+    """
+    Decide whether to drop irrelevant packets before decoding them, based on the information in the configuration.
+
+    :param config: The configuration
+    :param sockets: The sockets that should use the pre-classifier
+    :return: The pre-classifier, if enabled
+    """
+    if not config['server'].getboolean('pre-classify'):
+        return None
+
+    from dhcpkit.ipv6.pre_classification import PreClassifier
+    pre_classifier = PreClassifier(bytes.fromhex(config['server']['duid']),
+                                   max_relay_depth=config['server'].getint('max-relay-depth'))
+    for sock in sockets:
+        sock.pre_classifier = pre_classifier
+
+    return pre_classifier
+
+
+def serve(config: configparser.ConfigParser, handler: MessageHandler, sockets: [ListeningSocket]) -> dict:
+    """
+    Handle requests with the server core from the configuration until the server is told to stop.
+
+    :param config: The configuration
+    :param handler: The message handler
+    :param sockets: The sockets to handle requests from
+    :return: The statistics that the server core keeps, if any
+    """
+    if config['server']['core'].lower() == 'asyncio':
+        from dhcpkit.ipv6.async_server import serve_with_asyncio
+        serve_with_asyncio(config, handler, sockets)
+        return {}
+    else:
+        return serve_with_threads(config, handler, sockets)
+
+
+def run_worker(config: configparser.ConfigParser, shard: 'WorkerShard') -> dict:
+    """
+    Handle requests in a worker process. The worker creates its own sockets, and only handles the multicast requests
+    of its share of the clients.
+
+    :param config: The configuration
+    :param shard: The share of the clients that this worker handles
+    :return: The statistics of this worker
+    """
+    sockets = get_sockets(config, reuse_port=True)
+    for sock in sockets:
+        if sock.listen_address.is_multicast:
+            sock.shard = shard
+
+    pre_classifier = set_up_pre_classifier(config, sockets)
+    drop_privileges(config['server']['user'], config['server']['group'])
+    handler = get_handler(config)
+
+    logger.info("Python DHCPv6 server {} is ready".format(shard))
+    statistics = serve(config, handler, sockets)
+
+    return {
+        'skipped': shard.skipped,
+        'pre-classification': pre_classifier.counts() if pre_classifier else None,
+        'queue': statistics.get('queue'),
+        'deadlines': statistics.get('deadlines'),
+    }
+
+
+def combine_worker_statistics(results: [dict or None]) -> dict:
+    """
+    Add up the statistics of the worker processes.
+
+    :param results: The statistics of each worker as returned by :func:`run_worker`, or None for failed workers
+    :return: The combined pre-classifier, request queue and deadline statistics, or None where no worker kept them
+    """
+    from dhcpkit.ipv6.deadlines import DeadlineTracker
+    from dhcpkit.ipv6.pre_classification import PreClassifier
+    from dhcpkit.ipv6.scheduling import RequestScheduler
+
+    combined = {
+        'pre-classification': None,
+        'queue': None,
+        'deadlines': None,
+    }
+    create = {
+        'pre-classification': lambda: PreClassifier(b''),
+        'queue': lambda: RequestScheduler({}),
+        'deadlines': DeadlineTracker,
+    }
+
+    for index, result in enumerate(results):
+        if not result:
+            continue
+
+        logger.debug("Worker {} left {} multicast packets to other workers".format(index + 1, result['skipped']))
+
+        for name in combined:
+            if result.get(name):
+                if combined[name] is None:
+                    combined[name] = create[name]()
+                combined[name].add_counts(result[name])
+
+    return combined
+
+
+def run_supervisor(config: configparser.ConfigParser, processes: int) -> int:
+    """
+    Start the worker processes and wait until they stop.
+
+    :param config: The configuration
+    :param processes: The number of worker processes
+    :return: The program exit code
+    """
+    from dhcpkit.ipv6.workers import run_workers
+
+    logger.info("Starting {} worker processes".format(processes))
+
+    results = run_workers(processes, partial(run_worker, config))
+
+    # Add up the statistics of the workers
+    combined = combine_worker_statistics(results)
+
+    logger.info("{} of {} workers stopped normally".format(len([result for result in results if result]), processes))
+
+    if combined['pre-classification']:
+        logger.info("Pre-classification {}".format(combined['pre-classification']))
+    if combined['queue']:
+        logger.info("Request queue {}".format(combined['queue']))
+    if combined['deadlines']:
+        logger.info("Request deadlines {}".format(combined['deadlines']))
+
+    logger.info("Shutting down Python DHCPv6 server v{}".format(dhcpkit.__version__))
+
+    return 0 if all(results) else 1
+
+
+@contextmanager
+def startup_phase(profiler: 'StartupProfiler' or None, name: str):
+    """
+    Context manager for a phase of the startup, which is only recorded when the startup is being profiled.
+
+    :param profiler: The startup profiler, if profiling
+    :param name: The name of the phase
+    """
+    if not profiler:
+        yield
+        return
+
+    with profiler.phase(name):
+        yield
+
+
+def main() -> int:
+    """
+    The main program loop
+
+    :return: The program exit code
+    """
+    args = handle_args()
+    start = time.perf_counter()
+
+    # Keep track of where the startup time goes, but only load the profiler when asked to
+    profiler = None
+    if args.profile_startup:
+        from dhcpkit.startup_profiler import StartupProfiler
+        profiler = StartupProfiler()
+
+    with startup_phase(profiler, 'load configuration'):
+        config = load_config(args.config)
+
+        # Go to the working directory
+        os.chdir(config['server']['working-directory'])
+
+    with startup_phase(profiler, 'set up logging'):
+        set_up_logger(config, args.verbosity)
+
+    logger.info("Starting Python DHCPv6 server v{}".format(dhcpkit.__version__))
+
+    server_core = config['server']['core'].lower()
+    if server_core not in server_cores:
+        logger.critical("Invalid server core: {}".format(server_core))
+        sys.exit(1)
+
+    if server_core == 'asyncio':
+        from dhcpkit.ipv6.async_server import handler_modes
+        if config['server']['handler-mode'].lower() not in handler_modes:
+            logger.critical("Invalid handler mode: {}".format(config['server']['handler-mode']))
+            sys.exit(1)
+
+    try:
+        processes = config['server'].getint('processes')
+        if processes < 1:
+            raise ValueError
+    except ValueError:
+        logger.critical("Invalid number of processes: {}".format(config['server']['processes']))
+        sys.exit(1)
+
+    try:
+        if config['server'].getint('batch-size') < 1:
+            raise ValueError
+    except ValueError:
+        logger.critical("Invalid batch size: {}".format(config['server']['batch-size']))
+        sys.exit(1)
+
+    try:
+        if config['server'].getint('max-relay-depth') < 1:
+            raise ValueError
+    except ValueError:
+        logger.critical("Invalid maximum relay depth: {}".format(config['server']['max-relay-depth']))
+        sys.exit(1)
+
+    if server_core == 'threads':
+        from dhcpkit.ipv6.scheduling import priorities
+        for option_name in ['queue-limit'] + ['queue-limit-' + priority for priority in priorities]:
+            try:
+                if config['server'].getint(option_name) < 1:
+                    raise ValueError
+            except ValueError:
+                logger.critical("Invalid queue limit: {}".format(config['server'][option_name]))
+                sys.exit(1)
+
+    if processes > 1 and not hasattr(socket, 'SO_REUSEPORT'):
+        logger.critical("Multiple processes need SO_REUSEPORT, which this system doesn't support")
+        sys.exit(1)
+
+    with startup_phase(profiler, 'determine interfaces'):
+        determine_interface_configs(config)
+        determine_server_duid(config)
+
+    if args.show_config:
+        config.write(sys.stdout)
+        sys.exit(0)
+
+    with startup_phase(profiler, 'set up codecs'):
+        set_up_codecs(config)
+
+    if profiler:
+        # Profiling doesn't need sockets or privileges, so it can be done without root and on any machine
+        with startup_phase(profiler, 'create message handler'):
+            get_handler(config)
+
+        profiler.stop()
+        print(profiler.report())
+        return 0
+
+    if processes > 1:
+        return run_supervisor(config, processes)
+
+    sockets = get_sockets(config)
+    pre_classifier = set_up_pre_classifier(config, sockets)
+    drop_privileges(config['server']['user'], config['server']['group'])
+    handler = get_handler(config)
 
-                # Add new exception time to the history
-                exception_history.append(now)
+    logger.debug("Startup took {:.1f} ms".format((time.perf_counter() - start) * 1000))
 
-                # Remove exceptions outside the window from the history
-                cutoff = now - exception_window
-                while exception_history and exception_history[0] < cutoff:
-                    exception_history.pop(0)
+    serve(config, handler, sockets)
 
-                # Did we receive too many exceptions shortly after each other?
-                if len(exception_history) > max_exceptions:
-                    logger.critical("Received more than {} exceptions in {} seconds, exiting".format(max_exceptions,
-                                                                                                     exception_window))
-                    stopping = True
+    if pre_classifier:
+        logger.info("Pre-classification {}".format(pre_classifier))
 
     logger.info("Shutting down Python DHCPv6 server v{}".format(dhcpkit.__version__))
 
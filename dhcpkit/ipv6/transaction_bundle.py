@@ -69,8 +69,8 @@ class TransactionBundle:
         :rtype: list[IANAOption or IATAOption]
         """
         # Make a list of requested IANAOptions
-        return [option for option in self.request.options
-                if isinstance(option, (IANAOption, IATAOption)) and option not in self.handled_options]
+        return [option for option in self.request.get_options_of_type((IANAOption, IATAOption))
+                if option not in self.handled_options]
 
     def get_unanswered_iana_options(self) -> [IANAOption]:
         """
@@ -80,8 +80,8 @@ class TransactionBundle:
         :rtype: list[IANAOption]
         """
         # Make a list of requested IANAOptions
-        return [option for option in self.request.options
-                if isinstance(option, IANAOption) and option not in self.handled_options]
+        return [option for option in self.request.get_options_of_type(IANAOption)
+                if option not in self.handled_options]
 
     def get_unanswered_iata_options(self) -> [IATAOption]:
         """
@@ -91,8 +91,8 @@ class TransactionBundle:
         :rtype: list[IATAOption]
         """
         # Make a list of requested IANAOptions
-        return [option for option in self.request.options
-                if isinstance(option, IATAOption) and option not in self.handled_options]
+        return [option for option in self.request.get_options_of_type(IATAOption)
+                if option not in self.handled_options]
 
     def get_unanswered_iapd_options(self) -> [IAPDOption]:
         """
@@ -102,8 +102,8 @@ class TransactionBundle:
         :rtype: list[IAPDOption]
         """
         # Make a list of requested IANAOptions
-        return [option for option in self.request.options
-                if isinstance(option, IAPDOption) and option not in self.handled_options]
+        return [option for option in self.request.get_options_of_type(IAPDOption)
+                if option not in self.handled_options]
 
     @staticmethod
     def split_relay_chain(message: Message) -> (ClientServerMessage, [RelayForwardMessage]):
@@ -115,8 +115,9 @@ class TransactionBundle:
         """
         relay_messages = []
         while isinstance(message, RelayForwardMessage):
-            relay_messages.insert(0, message)
+            relay_messages.append(message)
             message = message.relayed_message
+        relay_messages.reverse()
 
         # Check if we could actually read the message
         if isinstance(message, UnknownMessage):
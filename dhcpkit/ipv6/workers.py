@@ -0,0 +1,177 @@
+"""
+Run the server in multiple worker processes, so that handling requests isn't limited to a single CPU core by the GIL.
+A supervisor process starts the workers, passes signals on to them and collects their statistics when they stop. The
+supervisor keeps its privileges, so that it can signal the workers both before and after they drop theirs.
+
+Each worker creates its own sockets with ``SO_REUSEPORT``, so the kernel spreads the unicast requests over the workers.
+Multicast requests are delivered to every socket that joined the group, so each worker only handles the multicast
+requests of its own share of the clients, based on a hash of the address of the sender.
+"""
+import json
+import logging
+import os
+import signal
+import zlib
+
+logger = logging.getLogger(__name__)
+
+DROP_OTHER_WORKER = 'other-worker'
+
+# The signals that the supervisor passes on to the workers
+forwarded_signals = (signal.SIGHUP, signal.SIGINT, signal.SIGTERM)
+
+
+class WorkerShard:
+    """
+    The share of the clients that a worker process handles.
+
+    :param index: The number of this worker, starting at 0
+    :param count: The total number of workers
+    """
+
+    def __init__(self, index: int, count: int):
+        self.index = index
+        self.count = count
+
+        self.skipped = 0
+        """The number of packets that were left to another worker"""
+
+    def __str__(self):
+        return "worker {} of {}".format(self.index + 1, self.count)
+
+    def owns(self, sender: tuple) -> bool:
+        """
+        Determine whether this worker handles the packets from this sender. The packets from one sender always go to
+        the same worker.
+
+        :param sender: The address of the sender as returned by recvfrom()
+        :return: Whether this worker handles them
+        """
+        if zlib.crc32(sender[0].encode('ascii')) % self.count == self.index:
+            return True
+
+        self.skipped += 1
+        return False
+
+
+def start_worker(worker, shard: WorkerShard, close_fds: [int]) -> (int, int):
+    """
+    Fork a worker process.
+
+    :param worker: The function that the worker process runs, called with the shard and returning statistics
+    :param shard: The share of the clients that the worker handles
+    :param close_fds: File descriptors of the supervisor that the worker must close
+    :return: The process id of the worker and the file descriptor to read its statistics from
+    """
+    statistics_r, statistics_w = os.pipe()
+
+    # Signals that arrive before the worker has reset its signal handlers are held back until it has
+    signal.pthread_sigmask(signal.SIG_BLOCK, forwarded_signals)
+    pid = os.fork()
+    if pid:
+        # This is the supervisor
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, forwarded_signals)
+        os.close(statistics_w)
+        return pid, statistics_r
+
+    # This is the worker, it must never return to the code of the supervisor
+    exit_code = 1
+    try:
+        # The signal handlers of the supervisor don't apply to the worker
+        for signal_nr in forwarded_signals:
+            signal.signal(signal_nr, signal.SIG_DFL)
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, forwarded_signals)
+
+        os.close(statistics_r)
+        for fd in close_fds:
+            os.close(fd)
+
+        statistics = worker(shard)
+
+        with os.fdopen(statistics_w, 'w') as statistics_file:
+            json.dump(statistics, statistics_file)
+
+        exit_code = 0
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else 1
+    except BaseException as e:
+        logger.exception("Worker {} failed: {!r}".format(shard.index + 1, e))
+    finally:
+        logging.shutdown()
+        os._exit(exit_code)
+
+
+def run_workers(count: int, worker) -> [dict or None]:
+    """
+    Start the worker processes and wait until they have all stopped. SIGHUP, SIGINT and SIGTERM are passed on to all
+    workers. When a worker stops without being told to, the other workers are stopped as well.
+
+    :param count: The number of worker processes
+    :param worker: The function that the worker processes run, called with a :class:`WorkerShard` and returning
+                   statistics that can be serialised as JSON
+    :return: The statistics of each worker, or None for workers that failed
+    """
+    workers = {}
+    stopping = False
+
+    def stop_workers(signal_nr: int = signal.SIGTERM):
+        """
+        Pass a signal on to all workers that are still running.
+
+        :param signal_nr: The signal to send
+        """
+        for pid in workers:
+            try:
+                os.kill(pid, signal_nr)
+            except ProcessLookupError:
+                pass
+
+    # noinspection PyUnusedLocal
+    def forward_signal(signal_nr, frame):
+        """
+        Pass a signal that the supervisor received on to the workers.
+        """
+        nonlocal stopping
+        if signal_nr in (signal.SIGINT, signal.SIGTERM):
+            stopping = True
+        stop_workers(signal_nr)
+
+    previous_handlers = {signal_nr: signal.signal(signal_nr, forward_signal)
+                         for signal_nr in forwarded_signals}
+
+    results = [None] * count
+    try:
+        for index in range(count):
+            pid, statistics_fd = start_worker(worker, WorkerShard(index, count),
+                                              close_fds=[fd for worker_index, fd in workers.values()])
+            workers[pid] = (index, statistics_fd)
+            logger.debug("Started worker {} with pid {}".format(index + 1, pid))
+
+        while workers:
+            pid, status = os.waitpid(-1, 0)
+            if pid not in workers:
+                continue
+
+            index, statistics_fd = workers.pop(pid)
+            with os.fdopen(statistics_fd) as statistics_file:
+                statistics = statistics_file.read()
+
+            if statistics:
+                results[index] = json.loads(statistics)
+                logger.debug("Worker {} with pid {} has stopped".format(index + 1, pid))
+            else:
+                logger.error("Worker {} with pid {} has failed".format(index + 1, pid))
+
+            if not stopping:
+                logger.critical("Worker {} stopped unexpectedly, stopping the other workers".format(index + 1))
+                stopping = True
+                stop_workers()
+
+    finally:
+        # Don't leave any workers behind
+        stop_workers()
+
+        for signal_nr, handler in previous_handlers.items():
+            signal.signal(signal_nr, handler)
+
+    return results
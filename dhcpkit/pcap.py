@@ -0,0 +1,191 @@
+"""
+A minimal reader for packet captures in the classic libpcap and in the pcapng format. It is used to feed captured DHCP
+traffic to the protocol parsers, for example in benchmarks and tests. Only the parts of the formats that are necessary
+to extract UDP payloads from Ethernet (optionally VLAN tagged), Linux cooked and raw IPv6 captures are implemented.
+"""
+import struct
+from collections import namedtuple
+from ipaddress import IPv6Address
+
+# Link-layer header types from http://www.tcpdump.org/linktypes.html
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV6 = 229
+
+# Magic numbers
+PCAP_MAGIC = 0xa1b2c3d4
+PCAP_NSEC_MAGIC = 0xa1b23c4d
+PCAPNG_SECTION_HEADER = 0x0a0d0d0a
+PCAPNG_BYTE_ORDER_MAGIC = 0x1a2b3c4d
+
+# The pcapng block types we care about
+PCAPNG_INTERFACE_DESCRIPTION = 0x00000001
+PCAPNG_SIMPLE_PACKET = 0x00000003
+PCAPNG_ENHANCED_PACKET = 0x00000006
+
+ETHERTYPE_IPV6 = 0x86dd
+ETHERTYPE_VLAN = (0x8100, 0x88a8)
+IPV6_EXTENSION_HEADERS = (0, 43, 60)
+IPPROTO_UDP = 17
+
+CapturedPacket = namedtuple('CapturedPacket', ['timestamp', 'link_type', 'data'])
+CapturedPacket.__doc__ = 'A frame as it was stored in a capture file'
+
+UDPDatagram = namedtuple('UDPDatagram', ['timestamp', 'source', 'source_port', 'destination', 'destination_port',
+                                         'hop_limit', 'payload'])
+UDPDatagram.__doc__ = 'A UDP datagram as extracted from a captured frame'
+
+
+def read_capture(filename: str) -> [CapturedPacket]:
+    """
+    Read all captured frames from a pcap or pcapng file.
+
+    :param filename: The name of the capture file
+    :return: A generator of captured packets
+    """
+    with open(filename, 'rb') as capture_file:
+        data = capture_file.read()
+
+    if len(data) < 4:
+        raise ValueError('File is too short to be a packet capture')
+
+    magic = struct.unpack_from('<I', data)[0]
+    if magic == PCAPNG_SECTION_HEADER:
+        yield from _read_pcapng(data)
+    else:
+        yield from _read_pcap(data)
+
+
+def _read_pcap(data: bytes) -> [CapturedPacket]:
+    """
+    Read frames from a classic libpcap capture.
+
+    :param data: The contents of the capture file
+    :return: A generator of captured packets
+    """
+    for byte_order in '<>':
+        magic = struct.unpack_from(byte_order + 'I', data)[0]
+        if magic in (PCAP_MAGIC, PCAP_NSEC_MAGIC):
+            break
+    else:
+        raise ValueError('Unknown capture file format')
+
+    fraction_divider = magic == PCAP_NSEC_MAGIC and 1000000000 or 1000000
+    link_type = struct.unpack_from(byte_order + 'I', data, 20)[0]
+    record_header = struct.Struct(byte_order + 'IIII')
+
+    offset = 24
+    while offset + record_header.size <= len(data):
+        seconds, fraction, captured_length, original_length = record_header.unpack_from(data, offset)
+        offset += record_header.size
+        if offset + captured_length > len(data):
+            raise ValueError('Captured packet exceeds the end of the file')
+
+        yield CapturedPacket(seconds + fraction / fraction_divider, link_type, data[offset:offset + captured_length])
+        offset += captured_length
+
+
+def _read_pcapng(data: bytes) -> [CapturedPacket]:
+    """
+    Read frames from a pcapng capture. Options of the interfaces (like the timestamp resolution) are ignored and the
+    default resolution of microseconds is assumed.
+
+    :param data: The contents of the capture file
+    :return: A generator of captured packets
+    """
+    byte_order = '<'
+    link_types = []
+
+    offset = 0
+    while offset + 12 <= len(data):
+        block_type = struct.unpack_from(byte_order + 'I', data, offset)[0]
+
+        if block_type == PCAPNG_SECTION_HEADER:
+            # Each section can have its own byte order and its own set of interfaces
+            byte_order_magic = struct.unpack_from('<I', data, offset + 8)[0]
+            byte_order = byte_order_magic == PCAPNG_BYTE_ORDER_MAGIC and '<' or '>'
+            link_types = []
+
+        block_length = struct.unpack_from(byte_order + 'I', data, offset + 4)[0]
+        if block_length < 12 or offset + block_length > len(data):
+            raise ValueError('Invalid pcapng block length')
+
+        if block_type == PCAPNG_INTERFACE_DESCRIPTION:
+            link_types.append(struct.unpack_from(byte_order + 'H', data, offset + 8)[0])
+
+        elif block_type == PCAPNG_ENHANCED_PACKET:
+            interface_id, timestamp_high, timestamp_low, captured_length = struct.unpack_from(byte_order + 'IIII',
+                                                                                              data, offset + 8)
+            timestamp = ((timestamp_high << 32) + timestamp_low) / 1000000
+            start = offset + 28
+            yield CapturedPacket(timestamp, link_types[interface_id], data[start:start + captured_length])
+
+        elif block_type == PCAPNG_SIMPLE_PACKET:
+            original_length = struct.unpack_from(byte_order + 'I', data, offset + 8)[0]
+            captured_length = min(original_length, block_length - 16)
+            start = offset + 12
+            yield CapturedPacket(None, link_types[0], data[start:start + captured_length])
+
+        offset += block_length
+
+
+def extract_ipv6_udp(packet: CapturedPacket) -> UDPDatagram or None:
+    """
+    Extract the UDP datagram from a captured frame, if it contains IPv6 and UDP.
+
+    :param packet: The captured packet
+    :return: The UDP datagram or None if the frame does not contain UDP over IPv6
+    """
+    data = packet.data
+
+    if packet.link_type == LINKTYPE_ETHERNET:
+        offset = 12
+        ethertype = struct.unpack_from('!H', data, offset)[0]
+        while ethertype in ETHERTYPE_VLAN:
+            offset += 4
+            ethertype = struct.unpack_from('!H', data, offset)[0]
+        offset += 2
+    elif packet.link_type == LINKTYPE_LINUX_SLL:
+        offset = 16
+        ethertype = struct.unpack_from('!H', data, 14)[0]
+    elif packet.link_type in (LINKTYPE_RAW, LINKTYPE_IPV6):
+        offset = 0
+        ethertype = ETHERTYPE_IPV6
+    else:
+        return None
+
+    if ethertype != ETHERTYPE_IPV6 or len(data) < offset + 40 or data[offset] >> 4 != 6:
+        return None
+
+    next_header = data[offset + 6]
+    hop_limit = data[offset + 7]
+    source = IPv6Address(data[offset + 8:offset + 24])
+    destination = IPv6Address(data[offset + 24:offset + 40])
+    offset += 40
+
+    # Skip the extension headers that can occur in front of UDP
+    while next_header in IPV6_EXTENSION_HEADERS and len(data) >= offset + 2:
+        next_header = data[offset]
+        offset += (data[offset + 1] + 1) * 8
+
+    if next_header != IPPROTO_UDP or len(data) < offset + 8:
+        return None
+
+    source_port, destination_port, udp_length = struct.unpack_from('!HHH', data, offset)
+    payload = data[offset + 8:offset + udp_length]
+
+    return UDPDatagram(packet.timestamp, source, source_port, destination, destination_port, hop_limit, payload)
+
+
+def read_dhcpv6_datagrams(filename: str) -> [UDPDatagram]:
+    """
+    Read all DHCPv6 datagrams (UDP port 546 or 547) from a capture file.
+
+    :param filename: The name of the capture file
+    :return: A generator of UDP datagrams
+    """
+    for packet in read_capture(filename):
+        datagram = extract_ipv6_udp(packet)
+        if datagram and (datagram.source_port in (546, 547) or datagram.destination_port in (546, 547)):
+            yield datagram
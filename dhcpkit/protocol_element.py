@@ -25,27 +25,59 @@ class provides several functions:
     define a minimum and maximum occurrence. Some elements may not occur more
     than once, some elements must occur at least once, etc.
 
+    Elements remember whether they have been validated, and forget it again when one of their properties is
+    assigned a new value, one of their lists is changed or one of the elements they contain is modified. Depending on
+    the :attr:`ProtocolElement.validation_policy` elements that have been validated and haven't been modified since
+    are not validated again.
+
 - Representation:
     The default implementation provides __str__ and __repr__ methods so that
     protocol elements can be printed for debugging and represented as a
     parsable Python string.
 """
 import codecs
-import collections
 import inspect
+import types
 from abc import abstractmethod, ABCMeta
 from collections import ChainMap
 from inspect import Parameter
 from ipaddress import IPv4Address, IPv4Network, IPv6Address, IPv6Network
 from json.encoder import JSONEncoder
+from operator import attrgetter
 
 infinite = 2 ** 31 - 1
 
+# Validation policies
+VALIDATE_STRICT = 'strict'
+VALIDATE_ON_PARSE = 'parse'
+VALIDATE_TRUSTED = 'trusted'
+
+validation_policies = (VALIDATE_STRICT, VALIDATE_ON_PARSE, VALIDATE_TRUSTED)
+
+
+def fields_getter(names: tuple) -> types.FunctionType:
+    """
+    Create a function that returns the values of the given properties of an object as a tuple.
+
+    :param names: The names of the properties
+    :return: A function that takes an object and returns a tuple
+    """
+    if len(names) > 1:
+        return attrgetter(*names)
+    elif len(names) == 1:
+        getter = attrgetter(names[0])
+        return lambda element: (getter(element),)
+    else:
+        return lambda element: ()
+
 
 class AutoMayContainTree(ABCMeta):
     """
     Meta-class that automatically creates a _may_contain class property that is a ChainMap that links all
     parent _may_contain class properties.
+
+    It also determines the properties of the class from the parameters of its constructor, so that comparing,
+    hashing and representing elements doesn't have to inspect the constructor every time.
     """
 
     def __new__(mcs, name, bases, namespace):
@@ -58,6 +90,19 @@ class AutoMayContainTree(ABCMeta):
         # And create our local one with those as lookup targets
         cls._may_contain = ChainMap({}, *parent_may_contains)
 
+        # Lookup tables that are derived from _may_contain when they are needed, see get_element_class and
+        # get_occurrence_limits
+        cls._element_classes = {}
+        cls._occurrence_limits = None
+
+        # Get the signature of the __init__ method to find the properties of this element. This is why the object
+        # properties and __init__ parameters need to match, besides it being good practice for an object that
+        # represents a protocol element anyway... The first parameter is self, and *args and **kwargs are skipped.
+        parameters = list(inspect.signature(cls.__init__).parameters.values())[1:]
+        cls._fields = tuple([parameter.name for parameter in parameters
+                             if parameter.kind not in (Parameter.VAR_POSITIONAL, Parameter.VAR_KEYWORD)])
+        cls._field_values = staticmethod(fields_getter(cls._fields))
+
         return cls
 
 
@@ -74,8 +119,57 @@ class ProtocolElement(metaclass=AutoMayContainTree):
     - The full internal state of the object must be storable as a bytes object with the :func:`save` method
     """
 
-    # This will be set by the meta-class
+    # These will be set by the meta-class
     _may_contain = None
+    _element_classes = None
+    _occurrence_limits = None
+    _fields = ()
+    _field_values = None
+
+    # How to validate elements:
+    # - strict: validate every element when it is parsed and every time it is saved
+    # - parse: validate elements when they are parsed, and when they are saved if they haven't been validated since
+    #   they were created or modified, so every element is validated only once
+    # - trusted: validate elements when they are parsed, and trust the ones that are created by the server itself
+    validation_policy = VALIDATE_STRICT
+
+    # Protocol elements are created in large numbers, so they don't get a __dict__. Subclasses must define __slots__
+    # for their own properties. The _validated slot keeps track of whether this element has been validated and hasn't
+    # been modified since: it is False, True or the contents of the list properties when the element was validated.
+    __slots__ = ('_validated',)
+
+    def __new__(cls, *args, **kwargs):
+        """
+        Create a new element that hasn't been validated yet. This is done here instead of in the constructor because
+        subclasses don't call the constructor of their parent class.
+
+        :param args: The positional arguments for the constructor
+        :param kwargs: The keyword arguments for the constructor
+        :return: The new element
+        """
+        self = super().__new__(cls)
+        object.__setattr__(self, '_validated', False)
+        return self
+
+    def __setattr__(self, name: str, value: object):
+        """
+        Assigning to a property marks the element as modified, so that it will be validated again. Private properties
+        don't count as they are not part of the contents of the element.
+
+        :param name: The name of the property
+        :param value: The new value
+        """
+        if self._validated and name[0] != '_':
+            self.forget_validation()
+        super().__setattr__(name, value)
+
+    def forget_validation(self):
+        """
+        Called when a property of an element that has been validated is about to be assigned a new value. Subclasses
+        can extend this to also forget other state that depends on the contents of the element, or refuse the
+        modification by raising an exception.
+        """
+        object.__setattr__(self, '_validated', False)
 
     def validate(self):
         """
@@ -84,38 +178,120 @@ class ProtocolElement(metaclass=AutoMayContainTree):
         """
         pass
 
+    def list_contents(self) -> tuple:
+        """
+        The contents of the properties of this element that are lists, so that changes made to those lists in place
+        can be detected. Subclasses that store their lists differently can override this.
+
+        :return: A tuple with the contents of each list property
+        """
+        return tuple([tuple(value) for value in self._field_values(self) if isinstance(value, list)])
+
+    def sub_elements(self) -> list:
+        """
+        The elements that this element contains, directly in its properties or in its list properties. Subclasses that
+        store their sub-elements differently can override this.
+
+        :return: The list of sub-elements
+        """
+        elements = []
+        for value in self._field_values(self):
+            if isinstance(value, ProtocolElement):
+                elements.append(value)
+            elif isinstance(value, list):
+                elements.extend([element for element in value if isinstance(element, ProtocolElement)])
+        return elements
+
+    def is_validated(self) -> bool:
+        """
+        Whether this element has been validated and hasn't been modified since. An element is also modified when one
+        of its sub-elements is modified, because validating the sub-element again doesn't check the constraints that
+        this element puts on it, like the uniqueness of IAIDs in a message.
+
+        :return: Whether the element doesn't need to be validated again
+        """
+        validated = self._validated
+        if not validated or (validated is not True and validated != self.list_contents()):
+            return False
+
+        for element in self.sub_elements():
+            if not element.is_validated():
+                return False
+
+        return True
+
+    def validate_once(self):
+        """
+        Validate this element unless it has already been validated and hasn't been modified since. Elements that
+        contain other elements should use this method to validate their sub-elements, and :func:`load_from` should
+        use it to validate the loaded element. In strict mode elements are always validated.
+
+        Assigning to a property of an element marks it as modified. The contents of list properties are remembered
+        when the element is validated, so lists that are changed in place are detected here as well, and so are
+        modified sub-elements. See :meth:`is_validated`.
+        """
+        if self.validation_policy == VALIDATE_STRICT:
+            self.validate()
+            self._validated = True
+            return
+
+        if self.is_validated():
+            return
+
+        self.validate()
+
+        # Remember the lists as they were validated, if there are any
+        self._validated = self.list_contents() or True
+
+    def validate_before_save(self):
+        """
+        Validate this element before saving it, according to the validation policy. This is what :func:`save` and
+        :func:`save_into` should call. With the trusted policy elements that were validated, like the ones that were
+        parsed, are still validated again when they or their sub-elements have been modified.
+        """
+        if self.validation_policy != VALIDATE_TRUSTED or (self._validated and not self.is_validated()):
+            self.validate_once()
+
     def validate_contains(self, elements: [object]):
         """
         Utility method that subclasses can use in their validate method for verifying that all sub-elements are allowed
-        to be contained in this element. Will raise ValueError if validation fails.
+        to be contained in this element. Will raise ValueError if validation fails. Sub-elements that haven't been
+        decoded may be represented by their class.
 
         :param elements: The list of sub-elements
         """
         # Count occurrence
-        occurrence_counters = collections.Counter()
+        occurrence_counters = {}
+        get_element_class = self.get_element_class
         for element in elements:
-            element_class = self.get_element_class(element)
+            element_class = get_element_class(element)
             if element_class is None:
-                raise ValueError("{} cannot contain {}".format(self.__class__.__name__, element.__class__.__name__))
+                element_name = element.__name__ if inspect.isclass(element) else element.__class__.__name__
+                raise ValueError("{} cannot contain {}".format(self.__class__.__name__, element_name))
 
             # Count its occurrence
-            occurrence_counters[element_class] += 1
+            occurrence_counters[element_class] = occurrence_counters.get(element_class, 0) + 1
 
-        # Check max occurrence
-        for element_class, (min_occurrence, max_occurrence) in self._may_contain.items():
-            count = occurrence_counters[element_class]
+        # Check max occurrence of the elements that are present
+        occurrence_limits, required_elements = self.get_occurrence_limits()
+        for element_class, count in occurrence_counters.items():
+            max_occurrence = occurrence_limits[element_class][1]
             if count > max_occurrence:
                 if max_occurrence == 1:
                     raise ValueError("{} may only contain 1 {}".format(self.__class__.__name__, element_class.__name__))
                 else:
                     raise ValueError("{} may only contain {} {}s".format(self.__class__.__name__, max_occurrence,
                                                                          element_class.__name__))
-            elif count < min_occurrence:
+
+        # Check min occurrence of the elements that are required
+        for element_class, min_occurrence in required_elements:
+            count = occurrence_counters.get(element_class, 0)
+            if count < min_occurrence:
                 if min_occurrence == 1:
                     raise ValueError("{} must contain at least 1 {}".format(self.__class__.__name__,
                                                                             element_class.__name__))
                 else:
-                    raise ValueError("{} must contain at least {} {}s".format(self.__class__.__name__, max_occurrence,
+                    raise ValueError("{} must contain at least {} {}s".format(self.__class__.__name__, min_occurrence,
                                                                               element_class.__name__))
 
     @classmethod
@@ -136,11 +312,17 @@ class ProtocolElement(metaclass=AutoMayContainTree):
         of bytes used from the buffer and the instantiated element are returned. The class of the returned element may
         be a subclass of the current class if the parser can determine that the data in the buffer contains a subtype.
 
+        The buffer is wrapped in a :class:`memoryview` so that nested elements can be parsed from the same buffer
+        without copying it. Only the leaf values (addresses, identifiers etc) are copied out of the buffer.
+
         :param buffer: The buffer to read data from
         :param offset: The offset in the buffer where to start reading
         :param length: The amount of data we are allowed to read from the buffer
         :return: The number of bytes used from the buffer and the resulting element
         """
+        if not isinstance(buffer, memoryview):
+            buffer = memoryview(buffer)
+
         element_class = cls.determine_class(buffer, offset=offset)
         element = element_class()
         length = element.load_from(buffer, offset=offset, length=length)
@@ -150,7 +332,9 @@ class ProtocolElement(metaclass=AutoMayContainTree):
     def load_from(self, buffer: bytes, offset: int = 0, length: int = None) -> int:
         """
         Load the internal state of this object from the given buffer. The buffer may contain more data after the
-        structured element is parsed. This data is ignored.
+        structured element is parsed. This data is ignored. The buffer can be a bytes object, a bytearray or a
+        memoryview. Implementations must not keep references to (slices of) the buffer, values taken from it must be
+        converted to immutable objects.
 
         :param buffer: The buffer to read data from
         :param offset: The offset in the buffer where to start reading
@@ -166,6 +350,31 @@ class ProtocolElement(metaclass=AutoMayContainTree):
         :return: The buffer with the data from this element
         """
 
+    def encoded_length(self) -> int:
+        """
+        Determine the number of bytes that :func:`save` and :func:`save_into` produce for this element. Subclasses
+        should override this with an implementation that doesn't actually have to save the element.
+
+        :return: The length of the saved element in bytes
+        """
+        return len(self.save())
+
+    def save_into(self, buffer: bytearray, offset: int = 0) -> int:
+        """
+        Save the internal state of this object into an existing buffer. The buffer must be writable and large enough
+        to hold the element at the given offset, use :func:`encoded_length` to determine how much space is needed.
+        Containers override this method to save their sub-elements into the same buffer, so that a whole message can
+        be serialised without creating intermediate buffers.
+
+        :param buffer: The buffer to write data to
+        :param offset: The offset in the buffer where to start writing
+        :return: The number of bytes written to the buffer
+        """
+        data = self.save()
+        data_length = len(data)
+        buffer[offset:offset + data_length] = data
+        return data_length
+
     def __eq__(self, other: object) -> bool:
         """
         Compare this object to another object. The result will be True if they are of the same class and if the
@@ -178,22 +387,18 @@ class ProtocolElement(metaclass=AutoMayContainTree):
         if type(self) is not type(other):
             return NotImplemented
 
-        # Get the signature of the __init__ method to find the properties we need to compare
-        # This is why the object properties and __init__ parameters need to match, besides it being good practice for
-        # an object that represents a protocol element anyway...
-        signature = inspect.signature(self.__init__)
-
-        # Compare the discovered properties
-        for parameter in signature.parameters.values():
-            # Skip any potential *args and **kwargs in the method signature
-            if parameter.kind in (Parameter.VAR_POSITIONAL, Parameter.VAR_KEYWORD):
-                continue
+        # Compare the properties discovered by the meta-class
+        return self._field_values(self) == other._field_values(other)
 
-            if getattr(self, parameter.name) != getattr(other, parameter.name):
-                return False
+    def __hash__(self) -> int:
+        """
+        Calculate a hash based on the class and the properties of this object, so that objects that are equal have the
+        same hash. Lists are hashed as tuples, so don't change an object while it is used as a dictionary key.
 
-        # Amazing, all properties seem equal
-        return True
+        :return: The hash value
+        """
+        return hash((self.__class__, tuple([tuple(value) if isinstance(value, list) else value
+                                            for value in self._field_values(self)])))
 
     def __repr__(self):
         """
@@ -201,15 +406,8 @@ class ProtocolElement(metaclass=AutoMayContainTree):
 
         :return: Parsable representation of this protocol element
         """
-        # Get the signature of the __init__ method to find the properties we need to extract.
-        # This is why the object properties and __init__ parameters need to match, besides it being good practice for
-        # an object that represents a protocol element anyway...
-        signature = inspect.signature(self.__init__)
-
         # Create a list of string with "parameter=value" for each parameter of __init__
-        options_repr = ['{}={}'.format(parameter.name, repr(getattr(self, parameter.name)))
-                        for parameter in signature.parameters.values()
-                        if parameter.kind not in (Parameter.VAR_POSITIONAL, Parameter.VAR_KEYWORD)]
+        options_repr = ['{}={!r}'.format(name, value) for name, value in zip(self._fields, self._field_values(self))]
 
         # And construct a constructor call to show
         return '{}({})'.format(self.__class__.__name__, ', '.join(options_repr))
@@ -221,11 +419,7 @@ class ProtocolElement(metaclass=AutoMayContainTree):
         :return: Readable representation of this protocol element
         """
         # Use the same strategy as __repr__ but do nice indenting etc.
-        signature = inspect.signature(self.__init__)
-
-        parameter_names = [parameter.name
-                           for parameter in signature.parameters.values()
-                           if parameter.kind not in (Parameter.VAR_POSITIONAL, Parameter.VAR_KEYWORD)]
+        parameter_names = self._fields
 
         if len(parameter_names) == 0:
             # No parameters: inline
@@ -296,6 +490,30 @@ class ProtocolElement(metaclass=AutoMayContainTree):
         """
         cls._may_contain[klass] = (min_occurrence, max_occurrence)
 
+        # The lookup tables of this class and of all its subclasses are now outdated
+        outdated = [cls]
+        while outdated:
+            outdated_class = outdated.pop()
+            outdated_class._element_classes = {}
+            outdated_class._occurrence_limits = None
+            outdated.extend(outdated_class.__subclasses__())
+
+    @classmethod
+    def get_occurrence_limits(cls) -> (dict, list):
+        """
+        Get the flattened contents of _may_contain, and the sub-element classes that have a minimum occurrence.
+
+        :return: A dictionary with (min_occurrence, max_occurrence) per class, and a list of (class, min_occurrence)
+        """
+        if cls._occurrence_limits is None:
+            occurrence_limits = dict(cls._may_contain)
+            required_elements = [(klass, min_occurrence)
+                                 for klass, (min_occurrence, max_occurrence) in occurrence_limits.items()
+                                 if min_occurrence > 0]
+            cls._occurrence_limits = (occurrence_limits, required_elements)
+
+        return cls._occurrence_limits
+
     @classmethod
     def may_contain(cls, element: object) -> bool:
         """
@@ -309,22 +527,29 @@ class ProtocolElement(metaclass=AutoMayContainTree):
     @classmethod
     def get_element_class(cls, element: object) -> type:
         """
-        Get the class this element is classified as, for occurrence counting.
+        Get the class this element is classified as, for occurrence counting. This is the most specific class in the
+        MRO of the element that is in _may_contain. The result is cached per class of element.
 
-        :param element: Some element
-        :return: The class it classifies as
+        :param element: Some element, or the class of an element
+        :return: The class it classifies as, or None if this class may not contain it
         """
-        # This class has its own list of what it may contain: check it
-        for klass, (min_occurrence, max_occurrence) in cls._may_contain.items():
-            if max_occurrence < 1:
-                # May not contain this, stop looking
-                return None
+        element_type = element if isinstance(element, type) else type(element)
+        try:
+            return cls._element_classes[element_type]
+        except KeyError:
+            pass
+
+        element_class = None
+        for klass in element_type.__mro__:
+            limits = cls._may_contain.get(klass)
+            if limits is not None:
+                # The most specific class decides, also when its maximum occurrence is 0
+                if limits[1] >= 1:
+                    element_class = klass
+                break
 
-            if inspect.isclass(element):
-                if issubclass(element, klass):
-                    return klass
-            elif isinstance(element, klass):
-                return klass
+        cls._element_classes[element_type] = element_class
+        return element_class
 
 
 class JSONProtocolElementEncoder(JSONEncoder):
@@ -353,15 +578,8 @@ class JSONProtocolElementEncoder(JSONEncoder):
             return str(o)
 
         if isinstance(o, ProtocolElement):
-            # Get the signature of the __init__ method to find the properties we need to extract.
-            # This is why the object properties and __init__ parameters need to match, besides it being good practice
-            # for an object that represents a protocol element anyway...
-            signature = inspect.signature(o.__init__)
-
-            # Create a dictionary for the parameter of __init__
-            options_repr = {parameter.name: getattr(o, parameter.name)
-                            for parameter in signature.parameters.values()
-                            if parameter.kind not in (Parameter.VAR_POSITIONAL, Parameter.VAR_KEYWORD)}
+            # Create a dictionary for the parameters of __init__
+            options_repr = dict(zip(o._fields, o._field_values(o)))
 
             # And construct a constructor call to show
             return {o.__class__.__name__: options_repr}
@@ -1,17 +1,133 @@
 """
-Base class for pkg_resources based registries
+Base class for entry point based registries. The entry points are found with :mod:`importlib.metadata`, or read from a
+precomputed index file if the ``DHCPKIT_REGISTRY_INDEX`` environment variable points to one. Each entry point is only
+imported when its name is first looked up.
 """
 import collections
+import importlib
+import json
 import logging
+import os
+import re
+import threading
 
-import pkg_resources
+try:
+    from importlib import metadata as importlib_metadata
+except ImportError:
+    # Python < 3.8
+    importlib_metadata = None
 
 logger = logging.getLogger(__name__)
 
+# The environment variable that points to the index file
+INDEX_ENVIRONMENT_VARIABLE = 'DHCPKIT_REGISTRY_INDEX'
+
+# The version of the format of the index file
+INDEX_VERSION = 1
+
+# The entry points of all groups, found when the first registry is created
+_entry_point_groups = None
+
+
+def find_entry_points() -> {str: [(str, str)]}:
+    """
+    Find the entry points of all installed distributions.
+
+    :return: The names and object references of the entry points per group, in the order they were found
+    """
+    groups = collections.OrderedDict()
+    if importlib_metadata is not None:
+        for distribution in importlib_metadata.distributions():
+            for entry_point in distribution.entry_points:
+                groups.setdefault(entry_point.group, []).append((entry_point.name, entry_point.value))
+    else:
+        import pkg_resources
+        for distribution in pkg_resources.working_set:
+            for group, entry_points in distribution.get_entry_map().items():
+                for entry_point in entry_points.values():
+                    value = entry_point.module_name
+                    if entry_point.attrs:
+                        value += ':' + '.'.join(entry_point.attrs)
+                    groups.setdefault(group, []).append((entry_point.name, value))
+
+    return groups
+
+
+def read_index(filename: str) -> {str: [(str, str)]}:
+    """
+    Read the entry points from an index file created by :func:`write_index`.
+
+    :param filename: The name of the index file
+    :return: The names and object references of the entry points per group
+    """
+    with open(filename, encoding='utf-8') as index_file:
+        index = json.load(index_file)
+
+    if index.get('version') != INDEX_VERSION:
+        raise ValueError("Unsupported registry index version {}".format(index.get('version')))
+
+    return collections.OrderedDict((group, [tuple(entry_point) for entry_point in entry_points])
+                                   for group, entry_points in index['groups'].items())
+
+
+def write_index(filename: str, prefix: str = 'dhcpkit.'):
+    """
+    Write the entry points of the installed distributions to an index file, so that registries don't have to look for
+    them when the server starts. The index must be written again when distributions with entry points are installed or
+    removed.
+
+    :param filename: The name of the index file
+    :param prefix: Only write the entry point groups with names that start with this prefix
+    """
+    groups = collections.OrderedDict((group, entry_points) for group, entry_points in find_entry_points().items()
+                                     if group.startswith(prefix))
+
+    with open(filename, 'w', encoding='utf-8') as index_file:
+        json.dump({'version': INDEX_VERSION, 'groups': groups}, index_file, indent=2)
+
+
+def get_entry_points(group: str) -> [(str, str)]:
+    """
+    Get the entry points of a group, from the index file if there is one and from the installed distributions otherwise.
+    The installed distributions are only scanned once for all groups.
+
+    :param group: The entry point group
+    :return: The names and object references of the entry points
+    """
+    global _entry_point_groups
+    if _entry_point_groups is None:
+        index_filename = os.environ.get(INDEX_ENVIRONMENT_VARIABLE)
+        if index_filename:
+            try:
+                _entry_point_groups = read_index(index_filename)
+            except (OSError, ValueError, KeyError) as e:
+                logger.error("Registry index {} could not be read, ignoring it: {}".format(index_filename, e))
+
+        if _entry_point_groups is None:
+            _entry_point_groups = find_entry_points()
+
+    return _entry_point_groups.get(group, [])
+
+
+def load_object(reference: str) -> object:
+    """
+    Import the object that an entry point refers to.
+
+    :param reference: The object reference, like ``package.module:Class``
+    :return: The object
+    """
+    module_name, separator, attributes = re.sub(r'\s*\[.*\]\s*$', '', reference).partition(':')
+    loaded_object = importlib.import_module(module_name.strip())
+    if attributes:
+        for attribute in attributes.strip().split('.'):
+            loaded_object = getattr(loaded_object, attribute)
+    return loaded_object
+
 
 class Registry(collections.UserDict):
     """
-    Base class for registries
+    Base class for registries. The :attr:`data` dictionary only contains the entry points that have been loaded, so
+    code that uses it directly for speed must fall back to the registry itself for names that it doesn't contain.
     """
 
     entry_point = 'dhcpkit.NONE'
@@ -19,29 +135,92 @@ class Registry(collections.UserDict):
 
     def __init__(self):
         """
-        A custom dictionary that initialises itself with the entry points from pkg_resources
+        A custom dictionary that initialises itself with the entry points in the group
         """
         super().__init__()
 
-        # Try all the entry points
-        entry_points = pkg_resources.iter_entry_points(group=self.entry_point)
-        for entry_point in entry_points:
+        self.entry_points = collections.OrderedDict()
+        """The object references of the entry points that haven't been loaded yet"""
+
+        self.lock = threading.RLock()
+        """Makes sure that other threads wait while an entry point is being loaded"""
+
+        for name, reference in get_entry_points(self.entry_point):
             # If the name is a string with an integer then convert it to a real integer
             try:
-                name = int(entry_point.name)
+                name = int(name)
             except ValueError:
-                name = entry_point.name
+                pass
 
-            if name in self.data:
-                logger.warning("Multiple entry points found for {} {}, using {}".format(
-                    self.__class__.__name__, name, self.data[name]))
+            if name in self.entry_points:
+                if self.entry_points[name] != reference:
+                    logger.warning("Multiple entry points found for {} {}, using {}".format(
+                        self.__class__.__name__, name, self.entry_points[name]))
                 continue
 
+            self.entry_points[name] = reference
+
+    def __missing__(self, name):
+        with self.lock:
+            # Another thread may have loaded it while we were waiting
+            if name in self.data:
+                return self.data[name]
+
+            reference = self.entry_points.get(name)
+            if reference is None:
+                raise KeyError(name)
+
             try:
                 # Load the entry point and store it
-                self.data[name] = entry_point.load()
-            except ImportError:
-                # Ok, this one isn't working, skip it
-                logger.error("Entry points {} for {} could not be loaded".format(
-                    entry_point, self.__class__.__name__))
-                continue
+                loaded_object = load_object(reference)
+            except (ImportError, AttributeError):
+                # Ok, this one isn't working, it will be tried again on the next lookup
+                logger.error("Entry point {} = {} for {} could not be loaded".format(
+                    name, reference, self.__class__.__name__))
+                raise KeyError(name)
+
+            # Store it before forgetting the reference, so the name is always in one of them for __contains__
+            self.data[name] = loaded_object
+            del self.entry_points[name]
+            return loaded_object
+
+    def __contains__(self, name):
+        return name in self.data or name in self.entry_points
+
+    def __iter__(self):
+        self.load_all()
+        return iter(self.data)
+
+    def __len__(self):
+        self.load_all()
+        return len(self.data)
+
+    def load_all(self):
+        """
+        Load all entry points that haven't been loaded yet.
+        """
+        for name in list(self.entry_points):
+            try:
+                self[name]
+            except KeyError:
+                pass
+
+
+def create_index():
+    """
+    Function to be called from the command line to write the entry points of the installed distributions to an index
+    file.
+
+    :return: exit code
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Write an index of the DHCPKit entry points, to be used with the {} environment variable".format(
+            INDEX_ENVIRONMENT_VARIABLE),
+    )
+    parser.add_argument("destination", help="the index file to write")
+    args = parser.parse_args()
+
+    write_index(args.destination)
+    return 0
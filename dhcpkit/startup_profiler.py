@@ -0,0 +1,198 @@
+"""
+Measure where the time goes while a program starts: how long each phase of the startup takes, and which modules are
+imported during it and how long importing them takes. This is like running Python with ``-X importtime``, but it can be
+switched on from the command line of the program and it groups the imports by startup phase.
+"""
+import sys
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from importlib.abc import MetaPathFinder
+
+
+class TimedLoader:
+    """
+    Wrapper around a module loader that measures how long executing the module takes.
+
+    :param loader: The original loader
+    :param timer: The import timer to report to
+    """
+
+    def __init__(self, loader, timer: 'ImportTimer'):
+        self.loader = loader
+        self.timer = timer
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+    def create_module(self, spec):
+        """
+        Let the original loader create the module.
+
+        :param spec: The module spec
+        :return: The new module, or None for the default module creation
+        """
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        """
+        Let the original loader execute the module, and measure how long that takes.
+
+        :param module: The module to execute
+        """
+        # Don't leave the wrapper behind in the module
+        module.__loader__ = self.loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self.loader
+
+        with self.timer.timing(module.__name__):
+            self.loader.exec_module(module)
+
+
+class ImportTimer(MetaPathFinder):
+    """
+    Meta path finder that doesn't find any modules itself, but wraps the loaders that the other finders find so that
+    the time it takes to import each module is recorded. Like ``-X importtime`` it records the time including the
+    imports done by the module and the time spent in the module itself.
+    """
+
+    def __init__(self):
+        self.import_times = OrderedDict()
+        """The cumulative and self time in seconds per imported module, in the order the imports finished"""
+
+        self.nested_times = []
+
+    def install(self):
+        """
+        Start measuring imports.
+        """
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        """
+        Stop measuring imports.
+        """
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target=None):
+        """
+        Ask the other finders for the module spec and wrap its loader.
+
+        :param fullname: The full name of the module
+        :param path: The search path
+        :param target: The module object to re-use, if any
+        :return: The module spec or None
+        """
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+
+            if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                spec.loader = TimedLoader(spec.loader, self)
+
+            return spec
+
+        return None
+
+    @contextmanager
+    def timing(self, module_name: str):
+        """
+        Context manager that records the time it takes to import a module.
+
+        :param module_name: The name of the module being imported
+        """
+        self.nested_times.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            cumulative = time.perf_counter() - start
+            nested = self.nested_times.pop()
+            if self.nested_times:
+                self.nested_times[-1] += cumulative
+
+            self.import_times[module_name] = (cumulative, cumulative - nested)
+
+
+class StartupProfiler:
+    """
+    Record the duration of the phases of starting a program and the modules that are imported in each phase.
+
+    :param measure_imports: Whether to measure the time of each import, which adds a little overhead to every import
+    """
+
+    def __init__(self, measure_imports: bool = True):
+        self.start = time.perf_counter()
+        """The moment the profiler was created"""
+
+        self.preloaded_modules = len(sys.modules)
+        """The number of modules that were already imported when the profiler was created"""
+
+        self.phases = []
+        """The name, duration in seconds and newly imported modules of each phase"""
+
+        self.import_timer = ImportTimer() if measure_imports else None
+        if self.import_timer:
+            self.import_timer.install()
+
+    def stop(self):
+        """
+        Stop measuring imports.
+        """
+        if self.import_timer:
+            self.import_timer.uninstall()
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Context manager that records one phase of the startup.
+
+        :param name: The name of the phase
+        """
+        modules_before = set(sys.modules)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            new_modules = [module_name for module_name in sys.modules if module_name not in modules_before]
+            self.phases.append((name, duration, new_modules))
+
+    @property
+    def total_time(self) -> float:
+        """
+        The time since the profiler was created, in seconds.
+
+        :return: The total time
+        """
+        return time.perf_counter() - self.start
+
+    def report(self, slowest: int = 15) -> str:
+        """
+        Describe where the time went.
+
+        :param slowest: The number of slowest imports to show
+        :return: A human readable report
+        """
+        name_width = max([len(name) for name, duration, new_modules in self.phases] + [5])
+        lines = ["Startup phases ({} modules were imported before profiling started):".format(self.preloaded_modules)]
+        for name, duration, new_modules in self.phases:
+            lines.append("  {:<{width}}  {:8.1f} ms  {:4d} imports".format(name, duration * 1000, len(new_modules),
+                                                                         width=name_width))
+        lines.append("  {:<{width}}  {:8.1f} ms".format('total', self.total_time * 1000, width=name_width))
+
+        if self.import_timer and self.import_timer.import_times:
+            import_times = sorted(self.import_timer.import_times.items(), key=lambda item: item[1][1], reverse=True)
+            module_width = max(len(module_name) for module_name, times in import_times[:slowest])
+            lines.append("Slowest imports (self, cumulative):")
+            for module_name, (cumulative, self_time) in import_times[:slowest]:
+                lines.append("  {:<{width}}  {:8.1f} ms  {:8.1f} ms".format(module_name, self_time * 1000,
+                                                                            cumulative * 1000, width=module_width))
+
+        return '\n'.join(lines)
@@ -2,6 +2,7 @@
 Utility functions
 """
 
+import functools
 import re
 
 
@@ -47,6 +48,33 @@ def camelcase_to_dash(camelcase: str) -> str:
 # section 3.1 of :rfc:`1035` [10].  A domain name, or list of domain
 # names, in DHCP MUST NOT be stored in compressed form, as described in
 # section 4.1.4 of :rfc:`1035`.
+#
+# The same domain names are seen over and over again, so the results of decoding and encoding them are kept in bounded
+# caches. The caches only ever contain bytes, strings and tuples so that callers can't modify the cached values.
+
+# The maximum number of entries in each of the domain name caches
+domain_name_cache_size = 1024
+
+
+@functools.lru_cache(maxsize=domain_name_cache_size)
+def _decode_labels(labels: bytes) -> str:
+    """
+    Convert a sequence of labels that has already been checked to a domain name.
+
+    :param labels: The labels, without the terminating zero-length label
+    :return: The domain name
+    """
+    # Replace each length byte with a dot and decode all labels at once
+    domain_name = bytearray(labels)
+    position = 0
+    while position < len(domain_name):
+        label_length = domain_name[position]
+        domain_name[position] = 0x2e
+        position += label_length + 1
+
+    return str(domain_name[1:], 'ascii')
+
+
 def parse_domain_bytes(buffer: bytes, offset: int = 0, length: int = None, allow_relative: bool = False) -> (int, str):
     """
     Extract a single domain name.
@@ -60,38 +88,69 @@ def parse_domain_bytes(buffer: bytes, offset: int = 0, length: int = None, allow
     my_offset = 0
     max_offset = length or (len(buffer) - offset)
 
-    current_labels = []
+    # Only look at the length bytes to find the end of the domain name
     while max_offset > my_offset:
         label_length = buffer[offset + my_offset]
-        my_offset += 1
 
         # End of a sequence of labels
         if label_length == 0:
-            domain_name = '.'.join(current_labels)
-            return my_offset, domain_name
+            domain_name = _decode_labels(bytes(buffer[offset:offset + my_offset]))
+            return my_offset + 1, domain_name
 
         if label_length > 63:
             raise ValueError('Domain List contains label with invalid length')
 
         # Check if we stay below the max offset
-        if my_offset + label_length > max_offset:
+        my_offset += label_length + 1
+        if my_offset > max_offset:
             raise ValueError('Invalid encoded domain name, exceeds available buffer')
 
-        # New label
-        current_label_bytes = buffer[offset + my_offset:offset + my_offset + label_length]
-        my_offset += label_length
-
-        current_label = current_label_bytes.decode('ascii')
-        current_labels.append(current_label)
-
     if allow_relative:
         # We have reached the end of the data and we allow relative labels: we're done
-        domain_name = '.'.join(current_labels)
+        domain_name = _decode_labels(bytes(buffer[offset:offset + my_offset]))
         return my_offset, domain_name
 
     raise ValueError('Domain name must end with a 0-length label')
 
 
+@functools.lru_cache(maxsize=domain_name_cache_size)
+def _decode_domain_list(domain_list: bytes) -> (int, tuple):
+    """
+    Extract a list of domain names from a buffer that contains nothing else, in a single pass over the buffer.
+
+    :param domain_list: The encoded domain names
+    :return: The number of bytes used and the extracted domain names
+    """
+    max_offset = len(domain_list)
+
+    # Replace each length byte with a dot, so that every domain name can be decoded at once when its end is found
+    labels = bytearray(domain_list)
+    domain_names = []
+    start = my_offset = 0
+    while max_offset > my_offset:
+        label_length = labels[my_offset]
+
+        # End of a sequence of labels
+        if label_length == 0:
+            domain_names.append(str(labels[start + 1:my_offset], 'ascii'))
+            my_offset += 1
+            start = my_offset
+            continue
+
+        if label_length > 63:
+            raise ValueError('Domain List contains label with invalid length')
+
+        labels[my_offset] = 0x2e
+        my_offset += label_length + 1
+        if my_offset > max_offset:
+            raise ValueError('Invalid encoded domain name, exceeds available buffer')
+
+    if start != max_offset:
+        raise ValueError('Domain name must end with a 0-length label')
+
+    return my_offset, tuple(domain_names)
+
+
 def parse_domain_list_bytes(buffer: bytes, offset: int = 0, length: int = None) -> (int, list):
     """
     Extract a list of domain names.
@@ -101,29 +160,21 @@ def parse_domain_list_bytes(buffer: bytes, offset: int = 0, length: int = None)
     :param length: The amount of data we are allowed to read from the buffer
     :return: The number of bytes used from the buffer and the extracted domain names
     """
-    my_offset = 0
     max_offset = length or (len(buffer) - offset)
 
-    domain_names = []
-    while max_offset > my_offset:
-        domain_name_len, domain_name = parse_domain_bytes(buffer,
-                                                          offset=offset + my_offset, length=max_offset - my_offset)
-        domain_names.append(domain_name)
-        my_offset += domain_name_len
-
-    return my_offset, domain_names
+    my_offset, domain_names = _decode_domain_list(bytes(buffer[offset:offset + max_offset]))
+    return my_offset, list(domain_names)
 
 
-def encode_domain(domain_name: str, allow_relative: bool = False) -> bytes:
+@functools.lru_cache(maxsize=domain_name_cache_size)
+def _encode_domain(domain_name: str, allow_relative: bool) -> bytes:
     """
-    Encode a single domain name as a sequence of bytes
+    Encode a single domain name as a sequence of bytes, see :func:`encode_domain`.
 
     :param domain_name: The domain name
     :param allow_relative: Assume that domain names that don't end with a period are relative and encode them as such
     :return: The encoded domain name as bytes
     """
-    buffer = bytearray()
-
     # Be nice: strip trailing dots
     if allow_relative:
         if domain_name.endswith('.'):
@@ -138,20 +189,43 @@ def encode_domain(domain_name: str, allow_relative: bool = False) -> bytes:
         domain_name = domain_name.rstrip('.')
         end_with_zero = True
 
-    domain_name_parts = domain_name.split('.')
-    for label in domain_name_parts:
+    # Copy the whole name at once, ending FQDN domain names with a 0-length label, and then fill in the length bytes
+    domain_name = domain_name.encode('ascii')
+    buffer = bytearray(b'.' + domain_name + b'\x00' if end_with_zero else b'.' + domain_name)
+    position = 0
+    for label in domain_name.split(b'.'):
         label_length = len(label)
         if label_length < 1 or label_length > 63:
             raise ValueError('Domain name contains label with invalid length')
 
-        buffer.append(label_length)
-        buffer.extend(label.encode('ascii'))
+        buffer[position] = label_length
+        position += label_length + 1
+
+    return bytes(buffer)
+
+
+def encode_domain(domain_name: str, allow_relative: bool = False) -> bytes:
+    """
+    Encode a single domain name as a sequence of bytes
+
+    :param domain_name: The domain name
+    :param allow_relative: Assume that domain names that don't end with a period are relative and encode them as such
+    :return: The encoded domain name as bytes
+    """
+    return _encode_domain(domain_name, allow_relative)
+
 
-    if end_with_zero:
-        # End FQDN domain name with a 0-length label
-        buffer.append(0)
+@functools.lru_cache(maxsize=domain_name_cache_size)
+def _encode_domain_list(domain_names: tuple) -> bytes:
+    """
+    Encode a tuple of domain names to a sequence of bytes.
 
-    return buffer
+    :param domain_names: The domain names
+    :return: The encoded domain names as bytes
+    """
+    # Don't fill the cache for single domain names with the names in lists
+    encode = _encode_domain.__wrapped__
+    return b''.join([encode(domain_name, False) for domain_name in domain_names])
 
 
 def encode_domain_list(domain_names: [str]) -> bytes:
@@ -161,7 +235,12 @@ def encode_domain_list(domain_names: [str]) -> bytes:
     :param domain_names: The list of domain names
     :return: The encoded domain names as bytes
     """
-    buffer = bytearray()
-    for domain_name in domain_names:
-        buffer.extend(encode_domain(domain_name))
-    return buffer
+    return _encode_domain_list(tuple(domain_names))
+
+
+def clear_domain_name_caches():
+    """
+    Forget all domain names that have been decoded or encoded.
+    """
+    for cached_function in (_decode_labels, _decode_domain_list, _encode_domain, _encode_domain_list):
+        cached_function.cache_clear()
@@ -41,7 +41,7 @@ extensions = [
 
 # InterSphinx mappings
 intersphinx_mapping = {
-    'python': ('https://docs.python.org/3.4', None),
+    'python': ('https://docs.python.org/3.5', None),
 }
 
 # Add any paths that contain templates here, relative to this directory.
@@ -267,6 +267,8 @@ man_pages = [
     #    (master_doc, 'dhcpkit', 'DHCPKit Documentation', [author], 3),
     ('man/ipv6-dhcpd', 'ipv6-dhcpd', 'IPv6 DHCP server', [author], 8),
     ('man/ipv6-dhcpd.ini', 'ipv6-dhcpd.ini', 'IPv6 DHCP server configuration', [author], 5),
+    ('man/ipv6-dhcp-replay', 'ipv6-dhcp-replay', 'Replay captured requests through an IPv6 DHCP server handler',
+     [author], 8),
 ]
 
 # If true, show URL addresses after external links.
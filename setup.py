@@ -44,20 +44,21 @@ setup(
         'Operating System :: POSIX',
         'Operating System :: Unix',
         'Programming Language :: Python :: 3 :: Only',
-        'Programming Language :: Python :: 3.4',
         'Programming Language :: Python :: 3.5',
         'Topic :: Internet',
         'Topic :: System :: Networking',
         'Topic :: System :: Systems Administration',
     ],
 
-    packages=find_packages(exclude=['tests', 'tests.*']),
+    packages=find_packages(exclude=['tests', 'tests.*', 'benchmarks', 'benchmarks.*']),
     include_package_data=True,
     entry_points={
         'console_scripts': [
             'ipv6-dhcpd = dhcpkit.ipv6.server:run',
+            'ipv6-dhcp-replay = dhcpkit.ipv6.replay:run',
             'ipv6-dhcp-build-shelf = dhcpkit.ipv6.option_handlers.shelf:create_shelf_from_csv',
             'ipv6-dhcp-build-sqlite = dhcpkit.ipv6.option_handlers.sqlite:create_sqlite_from_csv',
+            'ipv6-dhcp-build-registry-index = dhcpkit.registry:create_index',
         ],
         'dhcpkit.ipv6.messages': [
             '1 = dhcpkit.ipv6.messages:SolicitMessage',
@@ -133,6 +134,7 @@ setup(
         ],
     },
 
+    python_requires='>=3.5',
     install_requires=[
         'netifaces',
     ],
@@ -4,7 +4,7 @@ Test the ClientServerMessage implementation
 import unittest
 
 from dhcpkit.ipv6.duids import EnterpriseDUID
-from dhcpkit.ipv6.messages import ClientServerMessage, SolicitMessage
+from dhcpkit.ipv6.messages import ClientServerMessage, SolicitMessage, LazyOptionsMixin, Message
 from dhcpkit.ipv6.options import ClientIdOption, ElapsedTimeOption, IANAOption, IATAOption, UnknownOption
 from tests.ipv6.messages import test_message
 from tests.ipv6.messages.test_unknown_message import unknown_packet
@@ -80,6 +80,42 @@ class ClientServerMessageTestCase(test_message.MessageTestCase):
         found_option = self.message.get_option_of_type(UnknownOption)
         self.assertIsNone(found_option)
 
+    def parse_lazy(self, packet: bytes) -> ClientServerMessage:
+        LazyOptionsMixin.lazy_option_decoding = True
+        try:
+            return Message.parse(packet)[1]
+        finally:
+            LazyOptionsMixin.lazy_option_decoding = False
+
+    def test_lazy_decoding(self):
+        message = self.parse_lazy(self.packet_fixture)
+
+        # Nothing has been decoded yet
+        self.assertTrue(all(type(entry) is tuple for entry in message._options))
+
+        # Only the requested option gets decoded
+        client_id = message.get_option_of_type(ClientIdOption)
+        self.assertEqual(client_id, self.message_fixture.get_option_of_type(ClientIdOption))
+        self.assertEqual(len(message._decoded_options()), 1)
+
+        # Undecoded options are saved from the original bytes
+        self.assertEqual(message.save(), self.packet_fixture)
+
+        # Accessing the options decodes all of them
+        self.assertEqual(message.options, self.message_fixture.options)
+        self.assertEqual(message._decoded_options(), message.options)
+
+    def test_lazy_validate_IAID_uniqueness(self):
+        iana = IANAOption(iaid=b'test').save()
+        self.parse_lazy(self.packet_fixture + iana)
+
+        with self.assertRaisesRegex(ValueError, 'not unique'):
+            self.parse_lazy(self.packet_fixture + iana + iana)
+
+    def test_lazy_option_overflow(self):
+        with self.assertRaisesRegex(ValueError, 'longer than .* buffer'):
+            self.parse_lazy(self.packet_fixture + bytes.fromhex('00080004'))
+
     def test_load_from_wrong_buffer(self):
         message = self.message_class()
         with self.assertRaisesRegex(ValueError, 'buffer does not contain'):
@@ -3,7 +3,7 @@ Test the Message implementation
 """
 import unittest
 
-from dhcpkit.ipv6.messages import Message, UnknownMessage
+from dhcpkit.ipv6.messages import Message, UnknownMessage, LazyOptionsMixin
 
 
 class MessageTestCase(unittest.TestCase):
@@ -25,12 +25,47 @@ class MessageTestCase(unittest.TestCase):
     def test_parse(self):
         self.assertEqual(self.message, self.message_fixture)
 
+    def test_parse_memoryview(self):
+        # Parse from a mutable buffer and make sure the parsed message doesn't refer to it
+        buffer = bytearray(self.packet_fixture)
+        length, message = Message.parse(memoryview(buffer))
+        buffer[:] = bytes(len(buffer))
+        self.assertEqual(length, len(self.packet_fixture))
+        self.assertEqual(message, self.message_fixture)
+
+    def test_parse_lazy(self):
+        LazyOptionsMixin.lazy_option_decoding = True
+        try:
+            length, message = Message.parse(self.packet_fixture)
+        finally:
+            LazyOptionsMixin.lazy_option_decoding = False
+
+        # Saving without touching the options, and then comparing which decodes everything
+        self.assertEqual(length, len(self.packet_fixture))
+        self.assertEqual(message.save(), self.packet_fixture)
+        self.assertEqual(message, self.message_fixture)
+
     def test_save_parsed(self):
         self.assertEqual(self.packet_fixture, self.message.save())
 
     def test_save_fixture(self):
         self.assertEqual(self.packet_fixture, self.message_fixture.save())
 
+    def test_encoded_length(self):
+        self.assertEqual(self.message_fixture.encoded_length(), len(self.packet_fixture))
+        self.assertEqual(self.message.encoded_length(), len(self.packet_fixture))
+
+    def test_save_into(self):
+        # Save at an offset in a larger buffer and make sure nothing outside the element is touched
+        buffer = bytearray(b'\xff' * (len(self.packet_fixture) + 4))
+        written = self.message_fixture.save_into(buffer, 2)
+        self.assertEqual(written, len(self.packet_fixture))
+        self.assertEqual(buffer, b'\xff\xff' + self.packet_fixture + b'\xff\xff')
+
+    def test_slots(self):
+        # Messages are created in large numbers, they shouldn't carry a __dict__
+        self.assertFalse(hasattr(self.message, '__dict__'))
+
     def test_validate(self):
         # This should be ok
         self.message.validate()
@@ -2,9 +2,11 @@
 Test the RelayServerMessage implementation
 """
 from ipaddress import IPv6Address
+import struct
 import unittest
 
-from dhcpkit.ipv6.messages import RelayServerMessage, RelayForwardMessage, UnknownMessage, Message
+from dhcpkit.ipv6 import HOP_COUNT_LIMIT
+from dhcpkit.ipv6.messages import RelayServerMessage, RelayForwardMessage, UnknownMessage, Message, parse_relay_chain
 from dhcpkit.ipv6.options import RelayMessageOption
 from tests.ipv6.messages import test_message
 
@@ -128,6 +130,59 @@ class RelayServerMessageTestCase(test_message.MessageTestCase):
         self.assertIsNone(self.message.inner_message)
         self.assertIsNone(self.message.inner_relay_message)
 
+    def test_load_from_wrong_buffer(self):
+        message = self.message_class()
+        with self.assertRaisesRegex(ValueError, 'buffer does not contain'):
+            message.load_from(bytes.fromhex('ff') + bytes(33))
+
+    def test_load_chain_from(self):
+        message = self.message_class()
+        length, inner_message, relay_messages = message.load_chain_from(self.packet_fixture)
+        self.assertEqual(length, len(self.packet_fixture))
+        self.assertEqual(message, self.message_fixture)
+        self.assertEqual(inner_message, self.message_fixture.inner_message)
+
+        # The relay messages start with the one closest to the client
+        self.assertIs(relay_messages[-1], message)
+        self.assertIs(relay_messages[0], message.inner_relay_message)
+        for relay_message, relayed_message in zip(relay_messages[1:], relay_messages):
+            self.assertIs(relay_message.relayed_message, relayed_message)
+
+    def test_parse_relay_chain(self):
+        length, inner_message, relay_messages = parse_relay_chain(self.packet_fixture)
+        self.assertEqual(length, len(self.packet_fixture))
+        self.assertEqual(relay_messages[-1], self.message_fixture)
+        self.assertIs(relay_messages[0].relayed_message, inner_message)
+
+    def wrap_packet(self, packet: bytes, depth: int) -> bytes:
+        # Wrap the packet in relay messages of the same type with only a relay message option
+        for _ in range(depth):
+            packet = struct.pack('!BB32xHH', self.message_class.message_type, 0, 9, len(packet)) + packet
+        return packet
+
+    def test_max_relay_depth(self):
+        # The fixture plus its nested relay messages make up the whole chain
+        fixture_depth = len(parse_relay_chain(self.packet_fixture)[2])
+
+        for max_depth in (HOP_COUNT_LIMIT, fixture_depth + 2):
+            packet = self.wrap_packet(self.packet_fixture, max_depth - fixture_depth)
+            length, inner_message, relay_messages = parse_relay_chain(packet, max_depth=max_depth)
+            self.assertEqual(len(relay_messages), max_depth)
+            self.assertEqual(relay_messages[fixture_depth - 1], self.message_fixture)
+
+            packet = self.wrap_packet(self.packet_fixture, max_depth - fixture_depth + 1)
+            with self.assertRaisesRegex(ValueError, 'deeper than {} relay messages'.format(max_depth)):
+                parse_relay_chain(packet, max_depth=max_depth)
+
+        # The default is the hop count limit
+        with self.assertRaisesRegex(ValueError, 'deeper than {} relay messages'.format(HOP_COUNT_LIMIT)):
+            parse_relay_chain(self.wrap_packet(self.packet_fixture, HOP_COUNT_LIMIT - fixture_depth + 1))
+
+    def test_truncated_relay_message_option(self):
+        packet = self.wrap_packet(self.packet_fixture, 1)
+        with self.assertRaisesRegex(ValueError, 'longer than the available buffer'):
+            Message.parse(packet[:-1])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -25,12 +25,63 @@ class OptionTestCase(unittest.TestCase):
     def test_parse(self):
         self.assertEqual(self.option, self.option_object)
 
+    def test_parse_memoryview(self):
+        # Parse from a mutable buffer and make sure the parsed option doesn't refer to it
+        buffer = bytearray(self.option_bytes)
+        length, option = Option.parse(memoryview(buffer))
+        buffer[:] = bytes(len(buffer))
+        self.assertEqual(length, len(self.option_bytes))
+        self.assertEqual(option, self.option_object)
+
     def test_save_parsed(self):
         self.assertEqual(self.option_bytes, self.option.save())
 
     def test_save_fixture(self):
         self.assertEqual(self.option_bytes, self.option_object.save())
 
+    def test_encoded_length(self):
+        self.assertEqual(self.option_object.encoded_length(), len(self.option_bytes))
+        self.assertEqual(self.option.encoded_length(), len(self.option_bytes))
+
+    def test_save_into(self):
+        # Save at an offset in a larger buffer and make sure nothing outside the element is touched
+        buffer = bytearray(b'\xff' * (len(self.option_bytes) + 4))
+        written = self.option_object.save_into(buffer, 2)
+        self.assertEqual(written, len(self.option_bytes))
+        self.assertEqual(buffer, b'\xff\xff' + self.option_bytes + b'\xff\xff')
+
+    def test_freeze(self):
+        self.option_object.freeze()
+        self.assertEqual(self.option_object.save(), self.option_bytes)
+        self.assertEqual(self.option_object.encoded_length(), len(self.option_bytes))
+        self.test_save_into()
+
+        # Frozen options are immutable, even when assigning the same value
+        field_name = self.option_object._fields[0]
+        with self.assertRaisesRegex(AttributeError, 'frozen'):
+            setattr(self.option_object, field_name, getattr(self.option_object, field_name))
+
+        # Lists can't be changed in place either, and the options inside a frozen option are frozen as well
+        for value in self.option_object._field_values(self.option_object):
+            if isinstance(value, list):
+                with self.assertRaisesRegex(AttributeError, 'frozen'):
+                    value.append(None)
+                with self.assertRaisesRegex(AttributeError, 'frozen'):
+                    value.clear()
+
+            for element in (value if isinstance(value, list) else [value]):
+                if isinstance(element, Option):
+                    self.assertIsNotNone(element._saved)
+
+        self.assertEqual(self.option_object.save(), self.option_bytes)
+
+        # Only the frozen option is frozen, not other options with the same contents
+        setattr(self.option, field_name, getattr(self.option, field_name))
+
+    def test_slots(self):
+        # Options are created in large numbers, they shouldn't carry a __dict__
+        self.assertFalse(hasattr(self.option, '__dict__'))
+
     def test_validate(self):
         # This should be ok
         self.option.validate()
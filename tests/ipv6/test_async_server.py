@@ -0,0 +1,172 @@
+"""
+Test the asyncio based server core
+"""
+import asyncio
+import configparser
+import socket
+import threading
+import unittest
+from ipaddress import IPv6Address
+from unittest.mock import Mock
+
+from dhcpkit.ipv6.async_server import AsyncServer, HANDLER_EXECUTOR, HANDLER_INLINE
+from dhcpkit.ipv6.exceptions import DroppedPacketError
+from dhcpkit.ipv6.listening_socket import ListeningSocket
+from dhcpkit.ipv6.message_handlers import MessageHandler
+from tests.ipv6.messages.test_relay_forward_message import relayed_solicit_message
+from tests.ipv6.messages.test_relay_reply_message import relayed_advertise_message
+
+
+class ReplyingHandler(MessageHandler):
+    """
+    A message handler that always gives the same reply, and remembers the threads it was called from
+    """
+
+    def handle_reload(self):
+        self.threads = set()
+        self.reloads = getattr(self, 'reloads', -1) + 1
+
+    def handle(self, received_message, received_over_multicast):
+        self.threads.add(threading.current_thread())
+        return relayed_advertise_message
+
+
+class FailingHandler(MessageHandler):
+    """
+    A message handler that always fails
+    """
+
+    def handle(self, received_message, received_over_multicast):
+        raise RuntimeError("Oops")
+
+
+class CoroutineHandler(ReplyingHandler):
+    """
+    A message handler that is a coroutine
+    """
+
+    async def handle(self, received_message, received_over_multicast):
+        await asyncio.sleep(0)
+        return relayed_advertise_message
+
+
+class AsyncServerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.config = configparser.ConfigParser()
+
+        self.listening_socket = Mock(spec=ListeningSocket)
+        self.listening_socket.listen_address = IPv6Address('ff02::1:2')
+        self.listening_socket.decode_request.return_value = relayed_solicit_message
+
+        # The server creates a datagram endpoint for the socket, which closes it when the server stops
+        self.listening_socket.listen_socket = socket.socket(socket.AF_INET6, socket.SOCK_DGRAM)
+        self.listening_socket.listen_socket.bind(('::1', 0))
+        self.addCleanup(self.listening_socket.listen_socket.close)
+
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def serve(self, server: AsyncServer, requests: int = 1):
+        """
+        Let the server handle some requests and stop it.
+
+        :param server: The server
+        :param requests: The number of requests to give it
+        """
+
+        async def run():
+            serving = self.loop.create_task(server.serve(handle_signals=False))
+            await asyncio.sleep(0)
+
+            for request in range(requests):
+                server.request_received(self.listening_socket, b'request', ('fe80::1', 546, 0, 1))
+
+            server.stop()
+            await serving
+
+        self.loop.run_until_complete(run())
+
+    def test_bad_handler_mode(self):
+        with self.assertRaisesRegex(ValueError, 'Handler mode'):
+            AsyncServer(self.config, ReplyingHandler(self.config), [], handler_mode='magic')
+
+    def test_inline(self):
+        handler = ReplyingHandler(self.config)
+        self.serve(AsyncServer(self.config, handler, [self.listening_socket], handler_mode=HANDLER_INLINE), 3)
+
+        self.listening_socket.decode_request.assert_called_with(b'request', ('fe80::1', 546, 0, 1))
+        self.assertEqual(self.listening_socket.send_reply.call_count, 3)
+        self.listening_socket.send_reply.assert_called_with(relayed_advertise_message)
+        self.assertEqual(handler.threads, {threading.current_thread()})
+
+    def test_executor(self):
+        handler = ReplyingHandler(self.config)
+        server = AsyncServer(self.config, handler, [self.listening_socket], handler_mode=HANDLER_EXECUTOR)
+        self.serve(server, 3)
+
+        # All requests are finished before the server stops
+        self.assertEqual(self.listening_socket.send_reply.call_count, 3)
+        self.assertNotIn(threading.current_thread(), handler.threads)
+        self.assertEqual(server.pending, set())
+        self.assertIsNone(server.executor)
+
+    def test_coroutine(self):
+        server = AsyncServer(self.config, CoroutineHandler(self.config), [self.listening_socket],
+                             handler_mode=HANDLER_INLINE)
+        self.assertTrue(server.handler_is_coroutine)
+        self.serve(server, 2)
+
+        self.assertEqual(self.listening_socket.send_reply.call_count, 2)
+
+    def test_dropped(self):
+        self.listening_socket.decode_request.side_effect = DroppedPacketError('other-server', ('fe80::1', 546, 0, 1))
+        handler = ReplyingHandler(self.config)
+        self.serve(AsyncServer(self.config, handler, [self.listening_socket], handler_mode=HANDLER_INLINE))
+
+        self.assertEqual(handler.threads, set())
+        self.listening_socket.send_reply.assert_not_called()
+
+    def check_failing_handler(self, handler_mode: str):
+        server = AsyncServer(self.config, FailingHandler(self.config), [self.listening_socket],
+                             handler_mode=handler_mode, max_exceptions=1)
+        with self.assertLogs('dhcpkit.ipv6.async_server', 'ERROR') as logs:
+            self.serve(server, 3)
+
+        # Handler failures are logged but don't count as server failures
+        self.assertEqual(len(logs.output), 3)
+        self.assertEqual(server.exception_history, [])
+        self.listening_socket.send_reply.assert_not_called()
+
+    def test_failing_inline_handler(self):
+        self.check_failing_handler(HANDLER_INLINE)
+
+    def test_failing_executor_handler(self):
+        self.check_failing_handler(HANDLER_EXECUTOR)
+
+    def test_too_many_exceptions(self):
+        self.listening_socket.decode_request.side_effect = RuntimeError("Oops")
+        server = AsyncServer(self.config, ReplyingHandler(self.config), [self.listening_socket], max_exceptions=2)
+
+        async def run():
+            serving = self.loop.create_task(server.serve(handle_signals=False))
+            await asyncio.sleep(0)
+
+            for request in range(3):
+                server.request_received(self.listening_socket, b'request', ('fe80::1', 546, 0, 1))
+
+            await serving
+
+        with self.assertLogs('dhcpkit.ipv6.async_server', 'ERROR') as logs:
+            self.loop.run_until_complete(asyncio.wait_for(run(), 5))
+
+        self.assertIn('exiting', logs.output[-1])
+
+    def test_reload(self):
+        handler = ReplyingHandler(self.config)
+        server = AsyncServer(self.config, handler, [self.listening_socket])
+        server.reload()
+        self.assertEqual(handler.reloads, 1)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,135 @@
+"""
+Test receiving and sending packets in batches
+"""
+import socket
+import time
+import unittest
+from unittest.mock import patch
+
+from dhcpkit.ipv6 import batched_io
+from dhcpkit.ipv6.batched_io import BatchReceiver, SockAddrIn6, decode_sockaddr, encode_sockaddr, send_batch
+
+
+class SockAddrTestCase(unittest.TestCase):
+    def test_round_trip(self):
+        sockaddr = SockAddrIn6()
+        encode_sockaddr(('fe80::1%eth0', 546, 5, 42), sockaddr)
+        self.assertEqual(sockaddr.sin6_family, socket.AF_INET6)
+        self.assertEqual(decode_sockaddr(sockaddr), ('fe80::1', 546, 5, 42))
+
+        encode_sockaddr(('2001:db8::1', 547), sockaddr)
+        self.assertEqual(decode_sockaddr(sockaddr), ('2001:db8::1', 547, 0, 0))
+
+
+class BatchedIOTestCase(unittest.TestCase):
+    def setUp(self):
+        self.receiving_socket = socket.socket(socket.AF_INET6, socket.SOCK_DGRAM)
+        self.receiving_socket.bind(('::1', 0))
+        self.addCleanup(self.receiving_socket.close)
+
+        self.sending_socket = socket.socket(socket.AF_INET6, socket.SOCK_DGRAM)
+        self.sending_socket.bind(('::1', 0))
+        self.addCleanup(self.sending_socket.close)
+
+        self.destination = self.receiving_socket.getsockname()
+        self.packets = [(b'packet ' + bytes([number]) + b'\x00 with a zero byte', self.destination)
+                        for number in range(5)]
+        self.expected = [(data, self.sending_socket.getsockname()) for data, destination in self.packets]
+
+    def receive(self, receiver: BatchReceiver) -> [(bytes, tuple)]:
+        """
+        Receive a batch and check that the packets have plausible arrival times.
+
+        :param receiver: The receiver to receive the batch with
+        :return: The packets and the addresses of their senders
+        """
+        before = time.time()
+        packets = receiver.receive()
+        for pkt, sender, arrival in packets:
+            self.assertLess(before - arrival, 5)
+            self.assertLessEqual(arrival, time.time())
+
+        return [(pkt, sender) for pkt, sender, arrival in packets]
+
+    def check_batches(self):
+        """
+        Send the packets in one batch and receive them in batches of three.
+        """
+        sent = send_batch(self.sending_socket, self.packets)
+        self.assertEqual(sent, [len(data) for data, destination in self.packets])
+
+        receiver = BatchReceiver(self.receiving_socket, batch_size=3)
+        self.assertEqual(self.receive(receiver), self.expected[:3])
+        self.assertEqual(self.receive(receiver), self.expected[3:])
+
+        # Nothing left, and the receiver doesn't block
+        self.assertEqual(receiver.receive(), [])
+
+    @unittest.skipUnless(batched_io.libc_recvmmsg, "recvmmsg and sendmmsg are not available")
+    def test_mmsg(self):
+        self.assertTrue(BatchReceiver(self.receiving_socket).use_mmsg)
+        self.check_batches()
+
+    def test_fallback(self):
+        with patch.object(batched_io, 'libc_recvmmsg', None), patch.object(batched_io, 'libc_sendmmsg', None):
+            self.assertFalse(BatchReceiver(self.receiving_socket).use_mmsg)
+            self.check_batches()
+
+    @unittest.skipUnless(batched_io.SO_TIMESTAMPNS, "the kernel doesn't record arrival times")
+    def test_kernel_timestamps(self):
+        receiver = BatchReceiver(self.receiving_socket)
+        self.assertTrue(receiver.timestamps)
+
+        # The arrival time is recorded by the kernel, not when the packet is picked up
+        send_batch(self.sending_socket, self.packets[:1])
+        time.sleep(0.1)
+        (pkt, sender, arrival), = receiver.receive()
+        self.assertGreater(time.time() - arrival, 0.09)
+
+    @unittest.skipUnless(batched_io.SO_TIMESTAMPNS, "the kernel doesn't record arrival times")
+    def test_fallback_kernel_timestamps(self):
+        with patch.object(batched_io, 'libc_recvmmsg', None):
+            self.test_kernel_timestamps()
+
+    def test_without_timestamps(self):
+        with patch.object(batched_io, 'SO_TIMESTAMPNS', None):
+            self.assertFalse(BatchReceiver(self.receiving_socket).timestamps)
+            self.check_batches()
+
+    def test_send_buffers(self):
+        # Packets can be sent from parts of writable buffers, like the reply buffers
+        buffer = bytearray(1000)
+        packets = []
+        for number, (data, destination) in enumerate(self.packets):
+            buffer[number * 100:number * 100 + len(data)] = data
+            packets.append((memoryview(buffer)[number * 100:number * 100 + len(data)], destination))
+
+        sent = send_batch(self.sending_socket, packets)
+        self.assertEqual(sent, [len(data) for data, destination in self.packets])
+
+        receiver = BatchReceiver(self.receiving_socket, batch_size=10)
+        self.assertEqual(self.receive(receiver), self.expected)
+
+    def test_send_nothing(self):
+        self.assertEqual(send_batch(self.sending_socket, []), [])
+
+    def check_send_failure(self):
+        # The packet to an interface that doesn't exist fails, the others are still sent
+        packets = [self.packets[0], (b'lost', ('fe80::1', 547, 0, 99999)), self.packets[1]]
+        with self.assertLogs('dhcpkit.ipv6.batched_io', 'ERROR'):
+            sent = send_batch(self.sending_socket, packets)
+
+        self.assertEqual(sent, [len(self.packets[0][0]), -1, len(self.packets[1][0])])
+        self.assertEqual(self.receive(BatchReceiver(self.receiving_socket)), self.expected[:2])
+
+    @unittest.skipUnless(batched_io.libc_sendmmsg, "sendmmsg is not available")
+    def test_mmsg_send_failure(self):
+        self.check_send_failure()
+
+    def test_fallback_send_failure(self):
+        with patch.object(batched_io, 'libc_sendmmsg', None):
+            self.check_send_failure()
+
+
+if __name__ == '__main__':  # pragma: no cover
+    unittest.main()
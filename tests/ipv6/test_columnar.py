@@ -0,0 +1,100 @@
+"""
+Test decoding messages into columns
+"""
+import glob
+import os
+import unittest
+
+from dhcpkit.ipv6.columnar import decode_columns, has_option, numpy
+from dhcpkit.ipv6.messages import Message, RelayServerMessage, ClientServerMessage, carries_iaid
+from dhcpkit.ipv6.options import ClientIdOption, OptionRequestOption, OPTION_ORO, OPTION_RAPID_COMMIT
+from dhcpkit.pcap import read_dhcpv6_datagrams
+from tests.ipv6.messages.test_relay_forward_message import relayed_solicit_packet
+from tests.ipv6.messages.test_solicit_message import solicit_packet
+from tests.ipv6.messages.test_unknown_message import unknown_packet
+
+pcaps_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'pcaps')
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class ColumnarTestCase(unittest.TestCase):
+    def setUp(self):
+        self.payloads = [solicit_packet, relayed_solicit_packet]
+        for filename in sorted(glob.glob(os.path.join(pcaps_dir, '*'))):
+            self.payloads.extend([datagram.payload for datagram in read_dhcpv6_datagrams(filename)])
+
+    def assertRowMatches(self, columns: dict, row: int, payload: bytes):
+        message = Message.parse(payload)[1]
+        self.assertTrue(columns['valid'][row])
+        self.assertEqual(columns['message_type'][row], message.message_type)
+
+        relay_depth = 0
+        if isinstance(message, RelayServerMessage):
+            self.assertEqual(columns['hop_count'][row], message.hop_count)
+            relay_message = message
+            while isinstance(message, RelayServerMessage):
+                relay_depth += 1
+                relay_message = message
+                message = message.relayed_message
+
+            self.assertEqual(bytes(columns['link_address'][row]), relay_message.link_address.packed)
+            self.assertEqual(bytes(columns['peer_address'][row]), relay_message.peer_address.packed)
+        self.assertEqual(columns['relay_depth'][row], relay_depth)
+
+        self.assertIsInstance(message, ClientServerMessage)
+        self.assertEqual(columns['inner_message_type'][row], message.message_type)
+        self.assertEqual(columns['transaction_id'][row], int.from_bytes(message.transaction_id, 'big'))
+
+        client_id = message.get_option_of_type(ClientIdOption)
+        self.assertEqual(columns['client_duid'][row], client_id.duid.save() if client_id else None)
+
+        option_types = {option.option_type for option in message.options}
+        for option_type in (OPTION_ORO, OPTION_RAPID_COMMIT):
+            self.assertEqual(has_option(columns, option_type)[row], option_type in option_types)
+
+        iaids = [(option.option_type, int.from_bytes(option.iaid, 'big'))
+                 for option in message.options if carries_iaid(type(option))]
+        start, end = columns['iaid_offsets'][row:row + 2]
+        self.assertEqual(list(zip(columns['iaid_option_types'][start:end], columns['iaids'][start:end])), iaids)
+
+        oro = message.get_option_of_type(OptionRequestOption)
+        start, end = columns['requested_option_offsets'][row:row + 2]
+        self.assertEqual(list(columns['requested_options'][start:end]), oro.requested_options if oro else [])
+
+    def test_decode(self):
+        columns = decode_columns(self.payloads)
+        for row, payload in enumerate(self.payloads):
+            self.assertRowMatches(columns, row, payload)
+
+    def test_unusual(self):
+        # An unknown message, broken messages and one with an IA_NA option that is too short for an IAID
+        payloads = [unknown_packet, b'', relayed_solicit_packet[:40], solicit_packet + b'\x00\x03\x00\x00',
+                    solicit_packet] + self.payloads
+        columns = decode_columns(payloads)
+
+        self.assertEqual(list(columns['valid'][:5]), [True, False, False, False, True])
+        self.assertEqual(columns['message_type'][0], 255)
+        self.assertEqual(columns['inner_message_type'][0], 255)
+        self.assertEqual(columns['relay_depth'][0], 0)
+
+        # Nothing is left of what the vectorised decoder found in the broken ones
+        self.assertFalse(columns['option_presence'][1:4].any())
+        self.assertIsNone(columns['client_duid'][3])
+        self.assertEqual(list(columns['iaid_offsets'][:5]), [0, 0, 0, 0, 0])
+        self.assertEqual(list(columns['requested_option_offsets'][:4]), [0, 0, 0, 0])
+
+        for row, payload in enumerate(payloads[4:], start=4):
+            self.assertRowMatches(columns, row, payload)
+
+    def test_empty(self):
+        columns = decode_columns([])
+        self.assertEqual(len(columns['valid']), 0)
+        self.assertEqual(list(columns['iaid_offsets']), [0])
+
+    def test_has_option_range(self):
+        with self.assertRaisesRegex(ValueError, 'below 256'):
+            has_option(decode_columns([]), 256)
+
+
+if __name__ == '__main__':
+    unittest.main()
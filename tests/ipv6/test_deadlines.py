@@ -0,0 +1,94 @@
+"""
+Test the deadlines for handling requests
+"""
+import copy
+import unittest
+from ipaddress import IPv6Address
+
+from dhcpkit.ipv6.deadlines import DeadlineTracker, request_deadline
+from dhcpkit.ipv6.listening_socket import wrap_message
+from dhcpkit.ipv6.messages import Message, ReleaseMessage
+from dhcpkit.ipv6.options import ElapsedTimeOption
+from tests.ipv6.messages.test_advertise_message import advertise_message
+from tests.ipv6.messages.test_relay_forward_message import relayed_solicit_message
+from tests.ipv6.messages.test_request_message import request_message
+from tests.ipv6.messages.test_solicit_message import solicit_message
+
+
+def wrapped(message: Message):
+    return wrap_message(message, IPv6Address('fe80::1'), IPv6Address('2001:db8::1'), b'eth0')
+
+
+class RequestDeadlineTestCase(unittest.TestCase):
+    def test_first_transmission(self):
+        # Solicit with an elapsed time of 0: the client retransmits after the initial timeout
+        self.assertAlmostEqual(request_deadline(wrapped(solicit_message), 1000.0), 1001.1)
+
+        # Relayed messages get the deadline of the message of the client
+        self.assertAlmostEqual(request_deadline(wrapped(relayed_solicit_message), 1000.0), 1001.1)
+
+    def test_elapsed_time(self):
+        # Request with an elapsed time of 1.04 seconds
+        self.assertAlmostEqual(request_deadline(wrapped(request_message), 1000.0), 1000.0 + 2.04 * 1.1)
+
+    def test_maximum_timeout(self):
+        message = copy.deepcopy(request_message)
+        message.get_option_of_type(ElapsedTimeOption).elapsed_time = 6000
+        self.assertAlmostEqual(request_deadline(wrapped(message), 1000.0), 1000.0 + 30 * 1.1)
+
+    def test_no_elapsed_time(self):
+        self.assertAlmostEqual(request_deadline(wrapped(ReleaseMessage()), 1000.0), 1001.1)
+
+    def test_no_deadline(self):
+        self.assertIsNone(request_deadline(wrapped(advertise_message), 1000.0))
+
+
+class DeadlineTrackerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tracker = DeadlineTracker()
+
+    def test_picked_up(self):
+        self.assertTrue(self.tracker.picked_up(1000.0, 1002.0, now=1000.5))
+        self.assertTrue(self.tracker.picked_up(1000.0, None, now=1010.0))
+        self.assertFalse(self.tracker.picked_up(1000.0, 1002.0, now=1003.0))
+
+        self.assertEqual(self.tracker.expired_waiting, 1)
+        self.assertEqual(self.tracker.expired_handling, 0)
+        self.assertEqual(self.tracker.waited, 3)
+        self.assertAlmostEqual(self.tracker.total_wait, 13.5)
+        self.assertAlmostEqual(self.tracker.max_wait, 10.0)
+
+    def test_reply_ready(self):
+        self.assertTrue(self.tracker.reply_ready(1002.0, now=1001.0))
+        self.assertTrue(self.tracker.reply_ready(None, now=1010.0))
+        self.assertFalse(self.tracker.reply_ready(1002.0, now=1003.0))
+
+        self.assertEqual(self.tracker.expired_waiting, 0)
+        self.assertEqual(self.tracker.expired_handling, 1)
+
+    def test_add_counts(self):
+        self.tracker.picked_up(1000.0, 1000.001, now=1000.004)
+        self.tracker.reply_ready(1000.001, now=1000.005)
+
+        other = DeadlineTracker()
+        other.picked_up(1000.0, None, now=1000.002)
+
+        total = DeadlineTracker()
+        total.add_counts(self.tracker.counts())
+        total.add_counts(other.counts())
+        self.assertEqual(str(total),
+                         "expired 1 while waiting, 1 while being handled; waited 3.0 ms on average, 4.0 ms at most")
+
+    def test_str(self):
+        self.assertEqual(str(self.tracker),
+                         "expired 0 while waiting, 0 while being handled; waited 0.0 ms on average, 0.0 ms at most")
+
+        self.tracker.picked_up(1000.0, None, now=1000.002)
+        self.tracker.picked_up(1000.0, 1000.001, now=1000.004)
+        self.tracker.reply_ready(1000.001, now=1000.005)
+        self.assertEqual(str(self.tracker),
+                         "expired 1 while waiting, 1 while being handled; waited 3.0 ms on average, 4.0 ms at most")
+
+
+if __name__ == '__main__':  # pragma: no cover
+    unittest.main()
@@ -1,9 +1,11 @@
 """
 Test the included DUID types
 """
+import copy
+import pickle
 import unittest
 
-from dhcpkit.ipv6.duids import DUID, LinkLayerTimeDUID, LinkLayerDUID, EnterpriseDUID, UnknownDUID
+from dhcpkit.ipv6.duids import DUID, LinkLayerTimeDUID, LinkLayerDUID, EnterpriseDUID, UnknownDUID, set_duid_pool_size
 
 
 class UnknownDUIDTestCase(unittest.TestCase):
@@ -36,6 +38,25 @@ class UnknownDUIDTestCase(unittest.TestCase):
         saved_bytes = self.duid_object.save()
         self.assertEqual(saved_bytes, self.duid_bytes)
 
+    def test_canonical_bytes(self):
+        self.assertEqual(self.duid_object.canonical_bytes(), self.duid_bytes)
+        self.assertEqual(self.duid_object.canonical_hex(), self.duid_bytes.hex())
+        self.assertEqual(self.duid_object.encoded_length(), len(self.duid_bytes))
+
+        buffer = bytearray(len(self.duid_bytes) + 2)
+        self.assertEqual(self.duid_object.save_into(buffer, offset=2), len(self.duid_bytes))
+        self.assertEqual(buffer[2:], self.duid_bytes)
+
+    def test_parsed_canonical_bytes(self):
+        buffer = bytes(10) + self.duid_bytes
+        parsed_object = DUID.parse(buffer, offset=10, length=len(self.duid_bytes))[1]
+        self.assertIsInstance(parsed_object._saved, bytes)
+        self.assertEqual(parsed_object.canonical_bytes(), self.duid_bytes)
+
+        # Equal DUIDs must have equal hashes, whether their wire format is known or not
+        self.assertEqual(parsed_object, self.duid_object)
+        self.assertEqual(hash(parsed_object), hash(self.duid_object))
+
 
 class LinkLayerTimeDUIDTestCase(UnknownDUIDTestCase):
     def setUp(self):
@@ -159,6 +180,63 @@ class LinkLayerDUIDTestCase(UnknownDUIDTestCase):
         with self.assertRaisesRegex(ValueError, 'cannot be longer than 126 bytes'):
             bad_duid_object.validate()
 
+    def test_modify(self):
+        parsed_object = DUID.parse(self.duid_bytes, length=len(self.duid_bytes))[1]
+        self.assertEqual(parsed_object.canonical_hex(), '000300013431c43cb2f1')
+
+        parsed_object.hardware_type = 2
+        self.assertEqual(parsed_object.canonical_bytes(), bytes.fromhex('000300023431c43cb2f1'))
+        self.assertEqual(parsed_object.canonical_hex(), '000300023431c43cb2f1')
+        self.assertNotEqual(parsed_object, self.duid_object)
+
+    def test_unsaveable_hash(self):
+        bad_duid_object = LinkLayerDUID(-1, b'demo')
+        self.assertEqual(hash(bad_duid_object), hash(LinkLayerDUID(-1, b'demo')))
+
+
+class DUIDPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        set_duid_pool_size(2)
+        self.duid_bytes = [bytes.fromhex('00030001' + '3431c43cb2f{}'.format(index)) for index in range(3)]
+
+    def tearDown(self):
+        set_duid_pool_size(0)
+
+    def parse(self, duid_bytes: bytes) -> DUID:
+        return DUID.parse(duid_bytes, length=len(duid_bytes))[1]
+
+    def test_interning(self):
+        duid = self.parse(self.duid_bytes[0])
+        self.assertIs(self.parse(self.duid_bytes[0]), duid)
+        self.assertIsNot(self.parse(self.duid_bytes[1]), duid)
+        self.assertIs(LinkLayerDUID.parse(self.duid_bytes[0], length=len(self.duid_bytes[0]))[1], duid)
+
+    def test_bounded(self):
+        duids = [self.parse(duid_bytes) for duid_bytes in self.duid_bytes[:2]]
+
+        # Using the first one makes the second one the least recently used
+        self.assertIs(self.parse(self.duid_bytes[0]), duids[0])
+        self.parse(self.duid_bytes[2])
+        self.assertIs(self.parse(self.duid_bytes[0]), duids[0])
+        self.assertIsNot(self.parse(self.duid_bytes[1]), duids[1])
+
+    def test_immutable(self):
+        duid = self.parse(self.duid_bytes[0])
+        with self.assertRaisesRegex(AttributeError, 'shared through the DUID pool'):
+            duid.hardware_type = 2
+
+        for copied in (copy.copy(duid), copy.deepcopy(duid), pickle.loads(pickle.dumps(duid))):
+            self.assertEqual(copied, duid)
+            copied.hardware_type = 2
+            self.assertEqual(copied.canonical_bytes(), bytes.fromhex('000300023431c43cb2f0'))
+
+    def test_disabled(self):
+        set_duid_pool_size(0)
+        self.assertIsNot(self.parse(self.duid_bytes[0]), self.parse(self.duid_bytes[0]))
+
+        with self.assertRaisesRegex(ValueError, 'pool size'):
+            set_duid_pool_size(-1)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -2,16 +2,21 @@
 Test the behaviour of listening sockets.
 """
 import logging
-from socket import AF_INET, AF_INET6, IPPROTO_UDP, IPPROTO_TCP
+from socket import AF_INET, AF_INET6, IPPROTO_UDP, IPPROTO_TCP, MSG_DONTWAIT
 from ipaddress import IPv6Address
 import unittest
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
 from dhcpkit.ipv6 import SERVER_PORT, All_DHCP_Relay_Agents_and_Servers, CLIENT_PORT
-from dhcpkit.ipv6.exceptions import ListeningSocketError, InvalidPacketError
+from dhcpkit.ipv6.batched_io import send_batch
+from dhcpkit.ipv6.exceptions import ListeningSocketError, InvalidPacketError, DroppedPacketError
 from dhcpkit.ipv6.listening_socket import ListeningSocket
-from dhcpkit.ipv6.messages import RelayForwardMessage, UnknownMessage, RelayReplyMessage, Message
-from dhcpkit.ipv6.options import InterfaceIdOption, RelayMessageOption
+from dhcpkit.ipv6.messages import RelayForwardMessage, UnknownMessage, RelayReplyMessage, Message, AdvertiseMessage
+from dhcpkit.ipv6.options import InterfaceIdOption, RelayMessageOption, UnknownOption
+from dhcpkit.ipv6.pre_classification import PreClassifier
+from dhcpkit.ipv6.scheduling import PRIORITY_HIGH, PRIORITY_LOW, RequestScheduler
+from dhcpkit.ipv6.server import queue_packets
+from dhcpkit.ipv6.workers import WorkerShard
 from tests.ipv6.messages.test_advertise_message import advertise_message, advertise_packet
 from tests.ipv6.messages.test_relay_forward_message import relayed_solicit_packet, relayed_solicit_message
 from tests.ipv6.messages.test_relay_reply_message import relayed_advertise_message, relayed_advertise_packet
@@ -53,13 +58,17 @@ class MockSocket:
         """
         self.incoming_queue.append((packet, sender))
 
-    def recvfrom(self, bufsize: int) -> (bytes, (str, int, int, int)):
+    def recvfrom(self, bufsize: int, flags: int = 0) -> (bytes, (str, int, int, int)):
         """
         Pretend that this message was "received"
 
         :param bufsize: Length to truncate the packet to
+        :param flags: Flags, only MSG_DONTWAIT is supported
         :return:
         """
+        if not self.incoming_queue and flags & MSG_DONTWAIT:
+            raise BlockingIOError
+
         packet, sender = self.incoming_queue.pop()
         return packet[:bufsize], sender
 
@@ -71,6 +80,9 @@ class MockSocket:
         :param sender: The sender of the packet
         :type sender: (str, int, int, int)
         """
+        # Like a real socket we copy the data, the caller may reuse the buffer
+        packet = bytes(packet)
+
         if self.pretend_sendto_fails:
             # Oops, we lost a byte
             packet = packet[:-1]
@@ -323,6 +335,20 @@ class ListeningSocketTestCase(unittest.TestCase):
         with self.assertRaisesRegex(InvalidPacketError, r"Invalid packet from \('2001:db8::babe', 546, 0, 42\)"):
             listening_socket.recv_request()
 
+    def test_receive_truncated_message(self):
+        multicast_socket = MockSocket(AF_INET6, IPPROTO_UDP, All_DHCP_Relay_Agents_and_Servers, SERVER_PORT, 42, 1608)
+        link_local_socket = MockSocket(AF_INET6, IPPROTO_UDP, 'fe80::1%eth0', SERVER_PORT, 42, 1608)
+
+        # noinspection PyTypeChecker
+        listening_socket = ListeningSocket('eth0', multicast_socket, link_local_socket,
+                                           global_address=IPv6Address('2001:db8::1'))
+
+        # Empty packets, truncated option headers and truncated relayed options
+        for packet in (b'', b'\x01abc\x00', b'\x01abc\x00\x01', relayed_solicit_packet[:37]):
+            multicast_socket.add_to_incoming_queue(packet, ('2001:db8::babe', 546, 0, 42))
+            with self.assertRaises(InvalidPacketError):
+                listening_socket.recv_request()
+
     def test_receive_unknown_message_type(self):
         multicast_socket = MockSocket(AF_INET6, IPPROTO_UDP, All_DHCP_Relay_Agents_and_Servers, SERVER_PORT, 42, 1608)
         link_local_socket = MockSocket(AF_INET6, IPPROTO_UDP, 'fe80::1%eth0', SERVER_PORT, 42, 1608)
@@ -342,6 +368,159 @@ class ListeningSocketTestCase(unittest.TestCase):
         self.assertIsInstance(received_message.relayed_message, UnknownMessage)
         self.assertEqual(received_message.relayed_message.message_type, 255)
 
+    def test_receive_pre_classified(self):
+        global_unicast_socket = MockSocket(AF_INET6, IPPROTO_UDP, '2001:db8::1', SERVER_PORT, 42, 1608)
+
+        # noinspection PyTypeChecker
+        listening_socket = ListeningSocket('eth0', global_unicast_socket)
+        listening_socket.pre_classifier = PreClassifier(b'\x00\x03\x00\x01\x00\x24\x36\x2f\xfe\x60')
+
+        global_unicast_socket.add_to_incoming_queue(relayed_advertise_packet, ('2001:db8::babe', 547, 0, 42))
+        with self.assertRaisesRegex(DroppedPacketError, r"from \('2001:db8::babe', 547, 0, 42\): server-to-client"):
+            listening_socket.recv_request()
+
+        global_unicast_socket.add_to_incoming_queue(relayed_solicit_packet, ('2001:db8::babe', 547, 0, 42))
+        received_message = listening_socket.recv_request()
+        self.assertEqual(received_message.relayed_message, relayed_solicit_message)
+
+        self.assertEqual(listening_socket.pre_classifier.accepted, 1)
+        self.assertEqual(listening_socket.pre_classifier.dropped['server-to-client'], 1)
+
+    def test_receive_other_worker(self):
+        multicast_socket = MockSocket(AF_INET6, IPPROTO_UDP, All_DHCP_Relay_Agents_and_Servers, SERVER_PORT, 42, 1608)
+        link_local_socket = MockSocket(AF_INET6, IPPROTO_UDP, 'fe80::1%eth0', SERVER_PORT, 42, 1608)
+
+        # noinspection PyTypeChecker
+        listening_socket = ListeningSocket('eth0', multicast_socket, link_local_socket,
+                                           global_address=IPv6Address('2001:db8::1'))
+
+        # Of two workers exactly one handles the packets of this sender
+        shards = [WorkerShard(index, 2) for index in range(2)]
+        for shard in shards:
+            listening_socket.shard = shard
+            multicast_socket.add_to_incoming_queue(solicit_packet, ('fe80::babe', 546, 0, 42))
+            try:
+                received_message = listening_socket.recv_request()
+                self.assertEqual(received_message.relayed_message, solicit_message)
+            except DroppedPacketError as e:
+                self.assertEqual(e.reason, 'other-worker')
+
+        self.assertEqual(sorted(shard.skipped for shard in shards), [0, 1])
+
+    def test_receive_batch(self):
+        global_unicast_socket = MockSocket(AF_INET6, IPPROTO_UDP, '2001:db8::1', SERVER_PORT, 42, 1608)
+
+        # noinspection PyTypeChecker
+        listening_socket = ListeningSocket('eth0', global_unicast_socket)
+
+        for number in range(1, 6):
+            global_unicast_socket.add_to_incoming_queue(solicit_packet, ('2001:db8::{}'.format(number), 546, 0, 42))
+
+        # The socket is drained without blocking, in batches of at most the batch size
+        self.assertEqual(len(listening_socket.recv_packets(3)), 3)
+        packets = listening_socket.recv_packets(3)
+        self.assertEqual(len(packets), 2)
+        self.assertEqual(listening_socket.recv_packets(3), [])
+
+        pkt, sender, arrival = packets[0]
+        received_message = listening_socket.decode_request(pkt, sender)
+        self.assertEqual(received_message.relayed_message, solicit_message)
+
+    def test_receive_batch_with_malformed_packets(self):
+        global_unicast_socket = MockSocket(AF_INET6, IPPROTO_UDP, '2001:db8::1', SERVER_PORT, 42, 1608)
+
+        # noinspection PyTypeChecker
+        listening_socket = ListeningSocket('eth0', global_unicast_socket)
+
+        for packet in (solicit_packet, b'', b'\x01abc\x00\x01', solicit_packet, relayed_solicit_packet[:37]):
+            global_unicast_socket.add_to_incoming_queue(packet, ('2001:db8::babe', 546, 0, 42))
+
+        # The malformed packets are dropped without affecting the rest of the batch or counting as exceptions
+        scheduler = RequestScheduler({PRIORITY_HIGH: 10, PRIORITY_LOW: 10})
+        with self.assertLogs(level=logging.WARNING) as logs:
+            failures = queue_packets(listening_socket, listening_socket.recv_packets(10), scheduler, True)
+        self.assertEqual(failures, 0)
+        self.assertEqual(len(logs.output), 3)
+
+        requests = scheduler.get(10)
+        self.assertEqual(len(requests), 2)
+        for request in requests:
+            self.assertEqual(request.message.relayed_message, solicit_message)
+
+    def test_send_batch(self):
+        global_unicast_socket = MockSocket(AF_INET6, IPPROTO_UDP, '2001:db8::1', SERVER_PORT, 42, 1608)
+
+        # noinspection PyTypeChecker
+        listening_socket = ListeningSocket('eth0', global_unicast_socket)
+
+        outgoing_messages = [
+            RelayReplyMessage(hop_count=0,
+                              link_address=IPv6Address('2001:db8::1'),
+                              peer_address=IPv6Address('2001:db8::babe'),
+                              options=[
+                                  RelayMessageOption(relayed_message=advertise_message)
+                              ]),
+            RelayReplyMessage(hop_count=0,
+                              link_address=IPv6Address('2001:db8::2'),
+                              peer_address=IPv6Address('2001:db8::babe'),
+                              options=[
+                                  RelayMessageOption(relayed_message=advertise_message)
+                              ]),
+            RelayReplyMessage(hop_count=0,
+                              link_address=IPv6Address('2001:db8::1'),
+                              peer_address=IPv6Address('2001:db8::cafe'),
+                              options=[
+                                  RelayMessageOption(relayed_message=advertise_message)
+                              ]),
+        ]
+
+        # The invalid reply in the middle doesn't stop the others
+        with self.assertLogs(level=logging.DEBUG) as logged:
+            self.assertEqual(listening_socket.send_replies(outgoing_messages), [True, False, True])
+
+        self.assertEqual(global_unicast_socket.outgoing_queue, [
+            (advertise_packet, ('2001:db8::babe', CLIENT_PORT, 0, 42)),
+            (advertise_packet, ('2001:db8::cafe', CLIENT_PORT, 0, 42)),
+        ])
+
+        log_output = '\n'.join(logged.output)
+        self.assertRegex(log_output, r'link-address does not match')
+        self.assertRegex(log_output, r'Sent AdvertiseMessage to 2001:db8::cafe')
+
+    def test_send_batch_without_copying(self):
+        global_unicast_socket = MockSocket(AF_INET6, IPPROTO_UDP, '2001:db8::1', SERVER_PORT, 42, 1608)
+
+        # noinspection PyTypeChecker
+        listening_socket = ListeningSocket('eth0', global_unicast_socket)
+
+        outgoing_messages = [
+            RelayReplyMessage(hop_count=0,
+                              link_address=IPv6Address('2001:db8::1'),
+                              peer_address=IPv6Address('2001:db8::babe'),
+                              options=[
+                                  RelayMessageOption(relayed_message=advertise_message)
+                              ]),
+            RelayReplyMessage(hop_count=0,
+                              link_address=IPv6Address('2001:db8::1'),
+                              peer_address=IPv6Address('2001:db8::cafe'),
+                              options=[
+                                  RelayMessageOption(relayed_message=relayed_advertise_message)
+                              ]),
+        ]
+
+        with patch('dhcpkit.ipv6.listening_socket.send_batch', wraps=send_batch) as mock_send_batch:
+            self.assertEqual(listening_socket.send_replies(outgoing_messages), [True, True])
+
+        # The replies are sent straight from their own reply buffers, without overwriting each other
+        (first_packet, first_destination), (second_packet, second_destination) = mock_send_batch.call_args[0][1]
+        self.assertIsInstance(first_packet, memoryview)
+        self.assertIsNot(first_packet.obj, second_packet.obj)
+
+        self.assertEqual(global_unicast_socket.outgoing_queue, [
+            (advertise_packet, ('2001:db8::babe', CLIENT_PORT, 0, 42)),
+            (relayed_advertise_packet, ('2001:db8::cafe', SERVER_PORT, 0, 42)),
+        ])
+
     def test_send_direct(self):
         multicast_socket = MockSocket(AF_INET6, IPPROTO_UDP, All_DHCP_Relay_Agents_and_Servers, SERVER_PORT, 42, 1608)
         link_local_socket = MockSocket(AF_INET6, IPPROTO_UDP, 'fe80::1%eth0', SERVER_PORT, 42, 1608)
@@ -409,6 +588,74 @@ class ListeningSocketTestCase(unittest.TestCase):
         self.assertRegex(log_output, r'to fe80::babe')
         self.assertRegex(log_output, r'could not be sent')
 
+    def test_send_too_large(self):
+        multicast_socket = MockSocket(AF_INET6, IPPROTO_UDP, All_DHCP_Relay_Agents_and_Servers, SERVER_PORT, 42, 1608)
+        link_local_socket = MockSocket(AF_INET6, IPPROTO_UDP, 'fe80::1%eth0', SERVER_PORT, 42, 1608)
+
+        # noinspection PyTypeChecker
+        listening_socket = ListeningSocket('eth0', multicast_socket, link_local_socket,
+                                           global_address=IPv6Address('2001:db8::1'))
+
+        huge_message = AdvertiseMessage(transaction_id=advertise_message.transaction_id,
+                                        options=advertise_message.options + [
+                                            UnknownOption(65000, bytes(40000)),
+                                            UnknownOption(65001, bytes(40000)),
+                                        ])
+        outgoing_message = RelayReplyMessage(hop_count=0,
+                                             link_address=IPv6Address('2001:db8::1'),
+                                             peer_address=IPv6Address('fe80::babe'),
+                                             options=[
+                                                 InterfaceIdOption(interface_id=b'eth0'),
+                                                 RelayMessageOption(relayed_message=huge_message)
+                                             ])
+
+        with self.assertRaisesRegex(ValueError, 'too large'):
+            listening_socket.send_reply(outgoing_message)
+
+        # Nothing should have been sent
+        with self.assertRaises(IndexError):
+            link_local_socket.read_from_outgoing_queue()
+
+        # And the reply buffer can still be used for normal replies
+        outgoing_message.relayed_message = advertise_message
+        self.assertTrue(listening_socket.send_reply(outgoing_message))
+        sent_packet, recipient = link_local_socket.read_from_outgoing_queue()
+        self.assertEqual(sent_packet, advertise_packet)
+
+    def test_send_too_large_relayed(self):
+        multicast_socket = MockSocket(AF_INET6, IPPROTO_UDP, All_DHCP_Relay_Agents_and_Servers, SERVER_PORT, 42, 1608)
+        link_local_socket = MockSocket(AF_INET6, IPPROTO_UDP, 'fe80::1%eth0', SERVER_PORT, 42, 1608)
+
+        # noinspection PyTypeChecker
+        listening_socket = ListeningSocket('eth0', multicast_socket, link_local_socket,
+                                           global_address=IPv6Address('2001:db8::1'))
+
+        # The relayed message starts beyond the end of the reply buffer
+        relayed_reply = RelayReplyMessage(hop_count=0,
+                                          link_address=IPv6Address('2001:db8::2'),
+                                          peer_address=IPv6Address('fe80::babe'),
+                                          options=[
+                                              UnknownOption(65000, bytes(65510)),
+                                              RelayMessageOption(relayed_message=advertise_message)
+                                          ])
+        outgoing_message = RelayReplyMessage(hop_count=1,
+                                             link_address=IPv6Address('2001:db8::1'),
+                                             peer_address=IPv6Address('fe80::1'),
+                                             options=[
+                                                 InterfaceIdOption(interface_id=b'eth0'),
+                                                 RelayMessageOption(relayed_message=relayed_reply)
+                                             ])
+
+        with self.assertRaisesRegex(ValueError, 'too large'):
+            listening_socket.send_reply(outgoing_message)
+
+        with self.assertLogs('dhcpkit.ipv6.listening_socket', 'ERROR'):
+            self.assertEqual(listening_socket.send_replies([outgoing_message]), [False])
+
+        # Nothing should have been sent
+        with self.assertRaises(IndexError):
+            link_local_socket.read_from_outgoing_queue()
+
     def test_send_relayed(self):
         multicast_socket = MockSocket(AF_INET6, IPPROTO_UDP, All_DHCP_Relay_Agents_and_Servers, SERVER_PORT, 42, 1608)
         link_local_socket = MockSocket(AF_INET6, IPPROTO_UDP, 'fe80::1%eth0', SERVER_PORT, 42, 1608)
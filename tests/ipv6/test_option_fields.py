@@ -0,0 +1,114 @@
+"""
+Test the generated option codecs
+"""
+import unittest
+from ipaddress import IPv6Address, IPv6Network
+
+from dhcpkit.ipv6.extensions.dns import RecursiveNameServersOption, DomainSearchListOption
+from dhcpkit.ipv6.extensions.prefix_delegation import IAPDOption, IAPrefixOption
+from dhcpkit.ipv6.extensions.remote_id import RemoteIdOption
+from dhcpkit.ipv6.extensions.sol_max_rt import SolMaxRTOption
+from dhcpkit.ipv6.option_fields import generate_codec, UIntField, IPv6AddressField, RemainingBytesField, \
+    OptionsField, BytesField, VariableField
+from dhcpkit.ipv6.options import Option, UserClassOption, VendorClassOption, StatusCodeOption
+
+
+@generate_codec(UIntField('number', 2), IPv6AddressField('address'), RemainingBytesField('data'))
+class DemoOption(Option):
+    option_type = 65000
+
+    def __init__(self, number: int = 0, address: IPv6Address = None, data: bytes = b''):
+        self.number = number
+        self.address = address
+        self.data = data
+
+
+class OptionFieldsTestCase(unittest.TestCase):
+    def test_generated_codec(self):
+        option_bytes = bytes.fromhex('fde80015' '1234' '20010db8000000000000000000000001' '414243')
+        option_object = DemoOption(0x1234, IPv6Address('2001:db8::1'), b'ABC')
+
+        option = DemoOption()
+        length = option.load_from(option_bytes)
+        self.assertEqual(length, len(option_bytes))
+        self.assertEqual(option, option_object)
+        self.assertEqual(option.save(), option_bytes)
+        self.assertEqual(DemoOption.codec_struct.size, 22)
+
+    def test_too_short(self):
+        with self.assertRaisesRegex(ValueError, 'length of at least 18'):
+            DemoOption().load_from(bytes.fromhex('fde80002' '1234'))
+
+    def test_longer_than_buffer(self):
+        with self.assertRaisesRegex(ValueError, 'longer than .* buffer'):
+            DemoOption().load_from(bytes.fromhex('fde80020' '1234' '20010db8000000000000000000000001'))
+
+    def test_variable_field_not_last(self):
+        with self.assertRaisesRegex(ValueError, 'Only the last field'):
+            generate_codec(OptionsField('options', Option), BytesField('iaid', 4))
+
+    def test_incomplete_variable_field(self):
+        class DecodeOnlyField(VariableField):
+            def decode(self, buffer: bytes, offset: int, length: int) -> bytes:
+                return bytes(buffer[offset:offset + length])
+
+        with self.assertRaisesRegex(TypeError, 'abstract'):
+            DecodeOnlyField('data')
+
+    def test_user_class(self):
+        option_bytes = bytes.fromhex('000f000b' '0003414243' '00024445' '0000')
+        length, option = Option.parse(option_bytes)
+        self.assertEqual(option, UserClassOption([b'ABC', b'DE', b'']))
+        self.assertEqual(option.save(), option_bytes)
+
+    def test_vendor_class(self):
+        option_bytes = bytes.fromhex('00100009' '00009d10' '0003414243')
+        length, option = Option.parse(option_bytes)
+        self.assertEqual(option, VendorClassOption(40208, [b'ABC']))
+        self.assertEqual(option.save(), option_bytes)
+
+    def test_status_code(self):
+        option_bytes = bytes.fromhex('000d0005' '0002') + 'Föo'.encode('utf-8')[:3]
+        length, option = Option.parse(option_bytes)
+        self.assertEqual(option, StatusCodeOption(2, 'Fö'))
+        self.assertEqual(option.save(), option_bytes)
+
+    def test_extensions(self):
+        options = [
+            RecursiveNameServersOption([IPv6Address('2001:db8::1'), IPv6Address('2001:db8::2')]),
+            DomainSearchListOption(['example.com', 'example.net']),
+            RemoteIdOption(40208, b'remote'),
+            SolMaxRTOption(3600),
+        ]
+        for option in options:
+            option_bytes = option.save()
+            length, parsed = Option.parse(option_bytes)
+            self.assertEqual(length, len(option_bytes))
+            self.assertEqual(parsed, option)
+
+    def test_save_into(self):
+        options = [
+            DemoOption(0x1234, IPv6Address('2001:db8::1'), b'ABC'),
+            UserClassOption([b'ABC', b'DE', b'']),
+            VendorClassOption(40208, [b'ABC']),
+            RecursiveNameServersOption([IPv6Address('2001:db8::1'), IPv6Address('2001:db8::2')]),
+            DomainSearchListOption(['example.com', 'example.net']),
+            SolMaxRTOption(3600),
+            IAPDOption(b'test', 1800, 3600, [
+                IAPrefixOption(IPv6Network('2001:db8:1::/48'), 3600, 7200, [StatusCodeOption(0, 'Ok')]),
+            ]),
+        ]
+
+        # All options are saved one after the other into the same buffer
+        expected = b''.join([option.save() for option in options])
+        buffer = bytearray(sum([option.encoded_length() for option in options]))
+        offset = 0
+        for option in options:
+            offset += option.save_into(buffer, offset)
+
+        self.assertEqual(offset, len(expected))
+        self.assertEqual(buffer, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
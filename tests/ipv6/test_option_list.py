@@ -0,0 +1,125 @@
+"""
+Test the OptionList implementation
+"""
+import copy
+import pickle
+import unittest
+
+from dhcpkit.ipv6.duids import LinkLayerDUID
+from dhcpkit.ipv6.messages import SolicitMessage
+from dhcpkit.ipv6.option_list import OptionList
+from dhcpkit.ipv6.options import ClientIdOption, ElapsedTimeOption, IANAOption, IATAOption, Option, StatusCodeOption, \
+    UnknownOption
+
+
+class OptionListTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client_id = ClientIdOption(LinkLayerDUID(hardware_type=1, link_layer_address=bytes(6)))
+        self.elapsed_time = ElapsedTimeOption(0)
+        self.ia1 = IANAOption(b'0001')
+        self.ia2 = IANAOption(b'0002')
+        self.options = OptionList([self.client_id, self.ia1, self.elapsed_time, self.ia2])
+
+    def assertIndexConsistent(self):
+        # Compare the lookups with plain scans of the list
+        for klass in (ClientIdOption, ElapsedTimeOption, IANAOption, IATAOption, StatusCodeOption, Option):
+            expected = [option for option in self.options if isinstance(option, klass)]
+            self.assertEqual(self.options.get_options_of_type(klass), expected)
+            self.assertIs(self.options.get_option_of_type(klass), expected[0] if expected else None)
+
+    def test_lookup(self):
+        self.assertEqual(self.options.get_options_of_type(IANAOption), [self.ia1, self.ia2])
+        self.assertIs(self.options.get_option_of_type(ElapsedTimeOption), self.elapsed_time)
+        self.assertIsNone(self.options.get_option_of_type(StatusCodeOption))
+        self.assertIndexConsistent()
+
+    def test_lookup_tuple(self):
+        self.assertEqual(self.options.get_options_of_type((ElapsedTimeOption, ClientIdOption)),
+                         [self.client_id, self.elapsed_time])
+        self.assertIs(self.options.get_option_of_type((IANAOption, ElapsedTimeOption)), self.ia1)
+        self.assertIsNone(self.options.get_option_of_type((IATAOption, StatusCodeOption)))
+
+    def test_lookup_returns_copy(self):
+        self.options.get_options_of_type(IANAOption).clear()
+        self.assertEqual(self.options.get_options_of_type(IANAOption), [self.ia1, self.ia2])
+
+    def test_append(self):
+        self.assertIndexConsistent()
+        ia3 = IANAOption(b'0003')
+        self.options.append(ia3)
+        self.options.append(StatusCodeOption())
+        self.assertEqual(self.options.get_options_of_type(IANAOption), [self.ia1, self.ia2, ia3])
+        self.assertIndexConsistent()
+
+        self.options.extend([IATAOption(b'0004')])
+        self.options += [IANAOption(b'0005')]
+        self.assertIndexConsistent()
+
+    def test_insert(self):
+        self.assertIndexConsistent()
+        ia0 = IANAOption(b'0000')
+        self.options.insert(0, ia0)
+        self.assertIs(self.options.get_option_of_type(IANAOption), ia0)
+        self.assertIndexConsistent()
+
+        for index in (2, -1, -100, 100):
+            self.options.insert(index, IANAOption(str(index).encode().ljust(4)))
+            self.assertIndexConsistent()
+
+    def test_remove(self):
+        self.assertIndexConsistent()
+
+        # Removal is by equality, like with normal lists
+        self.options.remove(IANAOption(b'0001'))
+        self.assertEqual(self.options.get_options_of_type(IANAOption), [self.ia2])
+        self.assertIndexConsistent()
+
+        self.assertIs(self.options.pop(), self.ia2)
+        self.assertIsNone(self.options.get_option_of_type(IANAOption))
+        self.assertIndexConsistent()
+
+        del self.options[0]
+        self.assertIndexConsistent()
+
+        with self.assertRaises(ValueError):
+            self.options.remove(self.ia1)
+
+    def test_untracked_changes(self):
+        self.assertIndexConsistent()
+        self.options[1] = UnknownOption(65535)
+        self.assertIndexConsistent()
+        self.options[:0] = [IATAOption(b'0003')]
+        self.assertIndexConsistent()
+        del self.options[:2]
+        self.assertIndexConsistent()
+        self.options.reverse()
+        self.assertIndexConsistent()
+        self.options *= 2
+        self.assertIndexConsistent()
+        self.options.clear()
+        self.assertIndexConsistent()
+
+    def test_copy(self):
+        self.assertIndexConsistent()
+        for copied in (copy.copy(self.options), copy.deepcopy(self.options), pickle.loads(pickle.dumps(self.options))):
+            self.assertIsInstance(copied, OptionList)
+            self.assertEqual(copied, self.options)
+            self.assertEqual(copied.get_options_of_type(IANAOption), [self.ia1, self.ia2])
+
+    def test_containers(self):
+        message = SolicitMessage(options=[self.client_id])
+        self.assertIsInstance(message.options, OptionList)
+        message.options.append(self.ia1)
+        self.assertIs(message.get_option_of_type(IANAOption), self.ia1)
+
+        message.options = [self.elapsed_time]
+        self.assertIsInstance(message.options, OptionList)
+        self.assertIsNone(message.get_option_of_type(IANAOption))
+
+        ia = IANAOption(b'0003', options=[StatusCodeOption()])
+        self.assertIsInstance(ia.options, OptionList)
+        self.assertIsNotNone(ia.get_option_of_type(StatusCodeOption))
+
+
+if __name__ == '__main__':
+    unittest.main()
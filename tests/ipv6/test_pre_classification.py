@@ -0,0 +1,95 @@
+"""
+Test the classification of packets before they are decoded
+"""
+import struct
+import unittest
+
+from dhcpkit.ipv6 import HOP_COUNT_LIMIT
+from dhcpkit.ipv6.messages import RelayForwardMessage
+from dhcpkit.ipv6.options import ServerIdOption
+from dhcpkit.ipv6.pre_classification import PreClassifier, DROP_HOP_LIMIT, DROP_OTHER_SERVER, \
+    DROP_SERVER_TO_CLIENT, DROP_UNKNOWN_MESSAGE
+from tests.ipv6.messages.test_advertise_message import advertise_packet
+from tests.ipv6.messages.test_relay_forward_message import relayed_solicit_packet
+from tests.ipv6.messages.test_relay_reply_message import relayed_advertise_packet
+from tests.ipv6.messages.test_request_message import request_message, request_packet
+from tests.ipv6.messages.test_solicit_message import solicit_packet
+from tests.ipv6.messages.test_unknown_message import unknown_packet
+
+
+def relay_forward(packet: bytes, hop_count: int = 0) -> bytes:
+    """
+    Wrap a packet in a relay-forward message with only a relay message option
+
+    :param packet: The packet to wrap
+    :param hop_count: The hop count of the relay message
+    :return: The relay-forward packet
+    """
+    return struct.pack('!BB32xHH', RelayForwardMessage.message_type, hop_count, 9, len(packet)) + packet
+
+
+class PreClassifierTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server_duid = bytes(request_message.get_option_of_type(ServerIdOption).duid.save())
+        self.classifier = PreClassifier(self.server_duid)
+
+    def test_accept(self):
+        for packet in (solicit_packet, relayed_solicit_packet, request_packet, relay_forward(request_packet)):
+            self.assertIsNone(self.classifier.classify(packet))
+
+        self.assertEqual(self.classifier.accepted, 4)
+        self.assertEqual(sum(self.classifier.dropped.values()), 0)
+
+    def test_server_to_client(self):
+        for packet in (advertise_packet, relayed_advertise_packet, relay_forward(advertise_packet)):
+            self.assertEqual(self.classifier.classify(packet), DROP_SERVER_TO_CLIENT)
+
+        self.assertEqual(self.classifier.dropped[DROP_SERVER_TO_CLIENT], 3)
+        self.assertEqual(self.classifier.accepted, 0)
+
+    def test_unknown_message(self):
+        self.assertEqual(self.classifier.classify(unknown_packet), DROP_UNKNOWN_MESSAGE)
+        self.assertEqual(self.classifier.classify(relay_forward(unknown_packet)), DROP_UNKNOWN_MESSAGE)
+
+    def test_other_server(self):
+        classifier = PreClassifier(self.server_duid[:-1] + b'\x00')
+        self.assertEqual(classifier.classify(request_packet), DROP_OTHER_SERVER)
+        self.assertEqual(classifier.classify(relay_forward(request_packet)), DROP_OTHER_SERVER)
+
+        # Messages without a server-id are for every server
+        self.assertIsNone(classifier.classify(solicit_packet))
+        self.assertEqual(str(classifier), "accepted 1, dropped 2 other-server")
+
+    def test_hop_limit(self):
+        self.assertIsNone(self.classifier.classify(relay_forward(solicit_packet, HOP_COUNT_LIMIT)))
+        self.assertEqual(self.classifier.classify(relay_forward(solicit_packet, HOP_COUNT_LIMIT + 1)), DROP_HOP_LIMIT)
+
+        packet = solicit_packet
+        for hop_count in range(HOP_COUNT_LIMIT):
+            packet = relay_forward(packet, hop_count)
+        self.assertIsNone(self.classifier.classify(packet))
+        self.assertEqual(self.classifier.classify(relay_forward(packet, 0)), DROP_HOP_LIMIT)
+
+    def test_max_relay_depth(self):
+        classifier = PreClassifier(b'', max_relay_depth=2)
+        packet = relay_forward(relay_forward(solicit_packet))
+        self.assertIsNone(classifier.classify(packet))
+        self.assertEqual(classifier.classify(relay_forward(packet)), DROP_HOP_LIMIT)
+
+    def test_damaged(self):
+        # Damaged packets are left for the decoder to reject
+        for packet in (b'', b'\x0c', relay_forward(solicit_packet)[:-1], request_packet[:-1], request_packet[:10]):
+            self.assertIsNone(self.classifier.classify(packet))
+
+    def test_add_counts(self):
+        self.classifier.classify(solicit_packet)
+        self.classifier.classify(advertise_packet)
+
+        total = PreClassifier(b'')
+        total.add_counts(self.classifier.counts())
+        total.add_counts(self.classifier.counts())
+        self.assertEqual(str(total), "accepted 2, dropped 2 server-to-client")
+
+
+if __name__ == '__main__':
+    unittest.main()
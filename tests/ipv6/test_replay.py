@@ -0,0 +1,82 @@
+"""
+Test replaying captured requests through a message handler
+"""
+import logging
+import os
+import unittest
+from ipaddress import IPv6Address
+
+from dhcpkit.ipv6.message_handlers.standard import StandardMessageHandler
+from dhcpkit.ipv6.messages import ReplyMessage
+from dhcpkit.ipv6.options import ClientIdOption, ServerIdOption
+from dhcpkit.ipv6.pre_classification import PreClassifier
+from dhcpkit.ipv6.replay import Replayer, describe_reply, find_server_duid, percentile, split_datagrams
+from dhcpkit.ipv6.server import ServerConfigParser
+from dhcpkit.pcap import read_dhcpv6_datagrams
+
+pcaps_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'pcaps')
+
+config_template = '''
+[server]
+duid = {}
+
+[option RecursiveNameServers]
+dns-servers = 2001:4860:4860::8888
+'''
+
+
+class ReplayTestCase(unittest.TestCase):
+    def setUp(self):
+        self.datagrams = list(read_dhcpv6_datagrams(os.path.join(pcaps_dir, 'eth4-2.pcapng')))
+        self.server_duid = find_server_duid(self.datagrams)
+
+        config = ServerConfigParser()
+        config.read_string(config_template.format(self.server_duid.hex()))
+        self.handler = StandardMessageHandler(config)
+
+    def test_find_server_duid(self):
+        self.assertEqual(self.server_duid.hex(), '000100011d1d49cf00137265ca42')
+
+    def test_split_datagrams(self):
+        requests, replies = split_datagrams(self.datagrams)
+        self.assertTrue(requests)
+        self.assertTrue(all(request.destination_port == 547 for request in requests))
+        self.assertEqual(sum(len(captured) for captured in replies.values()),
+                         len(self.datagrams) - len(requests))
+
+    def test_replay(self):
+        requests, replies = split_datagrams(self.datagrams)
+
+        replayer = Replayer(self.handler, b'eth0', IPv6Address('::'), PreClassifier(self.server_duid))
+        replayer.captured_replies = replies
+        with self.assertLogs(level=logging.INFO):
+            for request in requests:
+                replayer.replay(request)
+
+        handled = sum(len(statistics.latencies) for statistics in replayer.statistics.values())
+        self.assertEqual(handled, len(requests))
+        self.assertEqual(replayer.pre_classifier.accepted + sum(replayer.pre_classifier.dropped.values()), handled)
+        self.assertFalse(any(statistics.errors for statistics in replayer.statistics.values()))
+
+        # Every captured reply was compared
+        compared = sum(statistics.matching + statistics.different for statistics in replayer.statistics.values())
+        self.assertGreater(compared, 0)
+        self.assertEqual(len(replayer.differences), sum(statistics.different
+                                                        for statistics in replayer.statistics.values()))
+
+    def test_describe_reply(self):
+        reply = ReplyMessage(options=[ServerIdOption(duid=None), ClientIdOption(duid=None)])
+        self.assertEqual(describe_reply(reply), ('ReplyMessage', ['ClientIdOption', 'ServerIdOption']))
+        self.assertEqual(describe_reply(None), ('no reply', []))
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile(values, 1.0), 100)
+        self.assertEqual(percentile(values, 0.0), 1)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+"""
+Test the replies to Information-Request messages that are created from templates
+"""
+import threading
+import unittest
+from ipaddress import IPv6Address
+
+from dhcpkit.ipv6.duids import LinkLayerDUID
+from dhcpkit.ipv6.extensions.dns import OPTION_DNS_SERVERS, OPTION_DOMAIN_LIST
+from dhcpkit.ipv6.message_handlers.standard import StandardMessageHandler
+from dhcpkit.ipv6.messages import InformationRequestMessage, RelayForwardMessage, ReplyMessage
+from dhcpkit.ipv6.option_handlers import CopyOptionHandler
+from dhcpkit.ipv6.options import ClientIdOption, ElapsedTimeOption, InterfaceIdOption, OptionRequestOption, \
+    RelayMessageOption, ServerIdOption, VendorClassOption
+from dhcpkit.ipv6.reply_templates import ReplyTemplate
+from dhcpkit.ipv6.server import ServerConfigParser
+
+config_template = '''
+[server]
+duid = 000300010024362ffe60
+
+[option RecursiveNameServers]
+dns-servers = 2001:4860:4860::8888 2001:4860:4860::8844
+
+[option DomainSearchList]
+domain-names = example.com example.net
+
+[option inf-max-rt]
+INF_MAX_RT = 20
+'''
+
+
+def relayed_information_request(requested_options: [int] or None, link_address: str) -> RelayForwardMessage:
+    """
+    Create an Information-Request like the server would pass it to the handler.
+
+    :param requested_options: The options to put in the OptionRequestOption, if any
+    :param link_address: The link address of the relay
+    :return: The relayed request
+    """
+    options = [
+        ElapsedTimeOption(elapsed_time=0),
+        ClientIdOption(duid=LinkLayerDUID(hardware_type=1, link_layer_address=bytes.fromhex('3431c43cb2f1'))),
+    ]
+    if requested_options is not None:
+        options.append(OptionRequestOption(requested_options))
+
+    return RelayForwardMessage(link_address=IPv6Address(link_address), peer_address=IPv6Address('fe80::1'), options=[
+        InterfaceIdOption(interface_id=b'eth0'),
+        RelayMessageOption(relayed_message=InformationRequestMessage(b'\x01\x02\x03', options=options)),
+    ])
+
+
+class ReplyTemplateTestCase(unittest.TestCase):
+    def setUp(self):
+        config = ServerConfigParser()
+        config.read_string(config_template)
+        self.handler = StandardMessageHandler(config)
+
+        self.full_handler = StandardMessageHandler(config)
+        self.full_handler.reply_templates = None
+
+    def check_same_reply(self, relayed_request: RelayForwardMessage):
+        reply = self.handler.handle(relayed_request, received_over_multicast=True)
+        expected = self.full_handler.handle(relayed_request, received_over_multicast=True)
+        self.assertEqual(reply.save(), expected.save())
+
+    def test_same_reply(self):
+        for requested_options in (None, [], [OPTION_DNS_SERVERS], [OPTION_DOMAIN_LIST, OPTION_DNS_SERVERS]):
+            for link_address in ('::', '2001:db8::1'):
+                relayed_request = relayed_information_request(requested_options, link_address)
+                self.check_same_reply(relayed_request)
+
+                # The second time the template is used
+                self.check_same_reply(relayed_request)
+
+        self.assertEqual(len(self.handler.reply_templates), 8)
+
+    def test_least_recently_used(self):
+        self.handler.max_reply_templates = 2
+        for link_address in ('2001:db8::1', '2001:db8::2', '2001:db8::1', '2001:db8::3'):
+            self.check_same_reply(relayed_information_request(None, link_address))
+
+        # The template for the second link was used least recently, so it was discarded
+        self.assertEqual(list(self.handler.reply_templates), [(None, IPv6Address('2001:db8::1')),
+                                                              (None, IPv6Address('2001:db8::3'))])
+
+    def test_concurrent_requests(self):
+        self.handler.max_reply_templates = 4
+        requests = [relayed_information_request([OPTION_DNS_SERVERS], '2001:db8::{:x}'.format(link))
+                    for link in range(1, 17)]
+        expected = [self.full_handler.handle(request, received_over_multicast=True).save() for request in requests]
+        errors = []
+
+        def handle_all():
+            try:
+                for request, expected_reply in zip(requests * 10, expected * 10):
+                    reply = self.handler.handle(request, received_over_multicast=True)
+                    self.assertEqual(reply.save(), expected_reply)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=handle_all) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(self.handler.reply_templates), 4)
+
+    def test_template_options(self):
+        relayed_request = relayed_information_request([OPTION_DNS_SERVERS], '2001:db8::1')
+        reply = self.handler.handle(relayed_request, received_over_multicast=True)
+        response = reply.relayed_message
+
+        self.assertIsInstance(response, ReplyMessage)
+        self.assertEqual(response.transaction_id, b'\x01\x02\x03')
+        self.assertIs(response.get_option_of_type(ClientIdOption),
+                      relayed_request.relayed_message.get_option_of_type(ClientIdOption))
+        self.assertEqual(response.get_option_of_type(ServerIdOption).duid, self.handler.server_duid)
+        self.assertEqual(reply.get_option_of_type(InterfaceIdOption).interface_id, b'eth0')
+
+    def test_other_server(self):
+        relayed_request = relayed_information_request(None, '::')
+        relayed_request.relayed_message.options.append(ServerIdOption(
+            duid=LinkLayerDUID(hardware_type=1, link_layer_address=bytes.fromhex('002436ef1d89'))
+        ))
+        self.assertIsNone(self.handler.handle(relayed_request, received_over_multicast=True))
+
+    def test_not_templatable(self):
+        self.handler.option_handlers.insert(-3, CopyOptionHandler(VendorClassOption))
+        self.handler.init_reply_templates()
+        self.assertIsNone(self.handler.reply_templates)
+
+        # The full pipeline is used
+        self.full_handler.option_handlers.insert(-3, CopyOptionHandler(VendorClassOption))
+        self.check_same_reply(relayed_information_request(None, '::'))
+
+    def test_foreign_client_id(self):
+        client_id = ClientIdOption(duid=self.handler.server_duid)
+        response = ReplyMessage(options=[ClientIdOption(duid=self.handler.server_duid)])
+        self.assertIsNone(ReplyTemplate.from_response(response, client_id))
+
+        response = ReplyMessage(options=[client_id, client_id])
+        self.assertIsNone(ReplyTemplate.from_response(response, client_id))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+"""
+Test the bounded priority queue for requests
+"""
+import threading
+import unittest
+from ipaddress import IPv6Address
+
+from dhcpkit.ipv6.listening_socket import wrap_message
+from dhcpkit.ipv6.scheduling import PRIORITY_HIGH, PRIORITY_LOW, RequestScheduler, request_priority
+from tests.ipv6.messages.test_relay_forward_message import relayed_solicit_message
+from tests.ipv6.messages.test_request_message import request_message
+from tests.ipv6.messages.test_solicit_message import solicit_message
+
+
+class RequestPriorityTestCase(unittest.TestCase):
+    def test_request_priority(self):
+        def wrapped(message):
+            return wrap_message(message, IPv6Address('fe80::1'), IPv6Address('2001:db8::1'), b'eth0')
+
+        self.assertEqual(request_priority(wrapped(request_message)), PRIORITY_HIGH)
+        self.assertEqual(request_priority(wrapped(solicit_message)), PRIORITY_LOW)
+
+        # Relayed messages are classified by the message of the client
+        self.assertEqual(request_priority(wrapped(relayed_solicit_message)), PRIORITY_LOW)
+
+
+class RequestSchedulerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = RequestScheduler({PRIORITY_HIGH: 3, PRIORITY_LOW: 2})
+
+    def test_priority_order(self):
+        self.scheduler.put('solicit 1', PRIORITY_LOW)
+        self.scheduler.put('renew 1', PRIORITY_HIGH)
+        self.scheduler.put('solicit 2', PRIORITY_LOW)
+        self.scheduler.put('renew 2', PRIORITY_HIGH)
+
+        self.assertEqual(len(self.scheduler), 4)
+        self.assertEqual(self.scheduler.get(3), ['renew 1', 'renew 2', 'solicit 1'])
+        self.assertEqual(self.scheduler.get(3), ['solicit 2'])
+
+    def test_limits(self):
+        with self.assertLogs('dhcpkit.ipv6.scheduling', 'WARNING') as logs:
+            admitted = [self.scheduler.put(number, PRIORITY_LOW) for number in range(5)]
+
+        # A full queue without lower priority requests drops new requests
+        self.assertEqual(admitted, [True, True, False, False, False])
+        self.assertEqual(self.scheduler.accepted, 2)
+        self.assertEqual(self.scheduler.dropped, {PRIORITY_HIGH: 0, PRIORITY_LOW: 3})
+        self.assertEqual(str(self.scheduler), "accepted 2, dropped 3 low priority")
+
+        # Only warn once per priority class
+        self.assertEqual(len(logs.output), 1)
+
+        # When the queue has drained the server has caught up
+        with self.assertLogs('dhcpkit.ipv6.scheduling', 'INFO') as logs:
+            self.assertEqual(len(self.scheduler.get(10)), 2)
+        self.assertIn('drained', logs.output[0])
+        self.assertEqual(self.scheduler.shedding, set())
+
+    def test_mixed_overload(self):
+        scheduler = RequestScheduler({PRIORITY_HIGH: 3, PRIORITY_LOW: 3}, capacity=4)
+        with self.assertLogs('dhcpkit.ipv6.scheduling', 'WARNING') as logs:
+            # Fill the low priority queue
+            admitted = [scheduler.put('solicit {}'.format(number), PRIORITY_LOW) for number in range(4)]
+            self.assertEqual(admitted, [True, True, True, False])
+
+            # Then the high priority queue, past its own limit
+            admitted = [scheduler.put('renew {}'.format(number), PRIORITY_HIGH) for number in range(5)]
+            self.assertEqual(admitted, [True, True, True, False, False])
+
+        # When the queue as a whole is full high priority requests push out the waiting low priority ones, oldest
+        # first, but the high priority class never grows beyond its own limit
+        self.assertEqual(scheduler.accepted, 6)
+        self.assertEqual(scheduler.dropped, {PRIORITY_HIGH: 2, PRIORITY_LOW: 3})
+        self.assertEqual(len(logs.output), 2)
+        self.assertEqual(scheduler.get(10), ['renew 0', 'renew 1', 'renew 2', 'solicit 2'])
+
+    def test_total_limit(self):
+        scheduler = RequestScheduler({PRIORITY_HIGH: 3, PRIORITY_LOW: 3}, capacity=4)
+        self.assertEqual(scheduler.capacity, 4)
+        self.assertEqual(self.scheduler.capacity, 5)
+
+        with self.assertLogs('dhcpkit.ipv6.scheduling', 'WARNING'):
+            for number in range(3):
+                self.assertTrue(scheduler.put('renew {}'.format(number), PRIORITY_HIGH))
+            self.assertTrue(scheduler.put('solicit 1', PRIORITY_LOW))
+
+            # The low priority queue is below its own limit, but the queue as a whole is full
+            self.assertFalse(scheduler.put('solicit 2', PRIORITY_LOW))
+
+            # The high priority queue is at its own limit, so it doesn't push out the low priority request
+            self.assertFalse(scheduler.put('renew 3', PRIORITY_HIGH))
+
+        self.assertEqual(scheduler.dropped, {PRIORITY_HIGH: 1, PRIORITY_LOW: 1})
+        self.assertEqual(scheduler.get(10), ['renew 0', 'renew 1', 'renew 2', 'solicit 1'])
+
+    def test_nothing_dropped(self):
+        self.scheduler.put('renew', PRIORITY_HIGH)
+        self.assertEqual(str(self.scheduler), "accepted 1, dropped none")
+
+    def test_add_counts(self):
+        for number in range(3):
+            self.scheduler.put(number, PRIORITY_LOW)
+
+        total = RequestScheduler({})
+        total.add_counts(self.scheduler.counts())
+        total.add_counts(self.scheduler.counts())
+        self.assertEqual(str(total), "accepted 4, dropped 2 low priority")
+
+    def test_close(self):
+        self.scheduler.put('solicit', PRIORITY_LOW)
+        self.scheduler.close()
+
+        # Waiting requests are still handed out, new ones are refused
+        self.assertFalse(self.scheduler.put('renew', PRIORITY_HIGH))
+        self.assertEqual(self.scheduler.get(), ['solicit'])
+        self.assertEqual(self.scheduler.get(), [])
+        self.assertEqual(self.scheduler.dropped, {PRIORITY_HIGH: 0, PRIORITY_LOW: 0})
+
+    def test_wait(self):
+        results = []
+        worker = threading.Thread(target=lambda: results.append(self.scheduler.get()))
+        worker.start()
+
+        self.scheduler.put('renew', PRIORITY_HIGH)
+        worker.join(5)
+        self.assertEqual(results, [['renew']])
+
+        # Closing wakes up waiting workers
+        worker = threading.Thread(target=lambda: results.append(self.scheduler.get()))
+        worker.start()
+        self.scheduler.close()
+        worker.join(5)
+        self.assertEqual(results, [['renew'], []])
+
+
+if __name__ == '__main__':  # pragma: no cover
+    unittest.main()
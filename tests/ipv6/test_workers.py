@@ -0,0 +1,147 @@
+"""
+Test running the server in multiple worker processes
+"""
+import os
+import signal
+import threading
+import time
+import unittest
+
+from dhcpkit.ipv6.deadlines import DeadlineTracker
+from dhcpkit.ipv6.pre_classification import PreClassifier
+from dhcpkit.ipv6.scheduling import PRIORITY_HIGH, PRIORITY_LOW, RequestScheduler
+from dhcpkit.ipv6.server import combine_worker_statistics
+from dhcpkit.ipv6.workers import WorkerShard, run_workers
+from tests.ipv6.messages.test_advertise_message import advertise_packet
+from tests.ipv6.messages.test_solicit_message import solicit_packet
+
+
+def report_shard(shard: WorkerShard) -> dict:
+    """
+    A worker that waits until it is told to stop and then reports which shard it got
+
+    :param shard: The shard of the worker
+    :return: The index and count of the shard
+    """
+    signal.pthread_sigmask(signal.SIG_BLOCK, [signal.SIGTERM])
+    signal.sigwait([signal.SIGTERM])
+    return {'index': shard.index, 'count': shard.count, 'pid': os.getpid()}
+
+
+def report_statistics(shard: WorkerShard) -> dict:
+    """
+    A worker that waits until it is told to stop and then reports statistics like a server worker does, with counts
+    that depend on its index
+
+    :param shard: The shard of the worker
+    :return: The statistics of the worker
+    """
+    signal.pthread_sigmask(signal.SIG_BLOCK, [signal.SIGTERM])
+    signal.sigwait([signal.SIGTERM])
+
+    pre_classifier = PreClassifier(b'')
+    pre_classifier.classify(solicit_packet)
+    for number in range(shard.index):
+        pre_classifier.classify(advertise_packet)
+
+    scheduler = RequestScheduler({PRIORITY_HIGH: 1, PRIORITY_LOW: 1})
+    for number in range(shard.index + 2):
+        scheduler.put(number, PRIORITY_LOW)
+
+    deadline_tracker = DeadlineTracker()
+    deadline_tracker.picked_up(1000.0, 1001.0, now=1000.0 + shard.index + 0.5)
+    deadline_tracker.reply_ready(1001.0, now=1002.0)
+
+    return {
+        'skipped': shard.index,
+        'pre-classification': pre_classifier.counts(),
+        'queue': scheduler.counts(),
+        'deadlines': deadline_tracker.counts(),
+    }
+
+
+def fail_first(shard: WorkerShard) -> dict:
+    """
+    A worker that fails if it is the first one, and otherwise waits until it is stopped
+
+    :param shard: The shard of the worker
+    :return: Nothing, it never finishes normally
+    """
+    if shard.index == 0:
+        raise RuntimeError("Oops")
+
+    time.sleep(60)
+
+
+class WorkerShardTestCase(unittest.TestCase):
+    def test_owns(self):
+        shards = [WorkerShard(index, 3) for index in range(3)]
+        senders = [('fe80::{:x}'.format(number), 546, 0, 1) for number in range(1, 301)]
+
+        for sender in senders:
+            # Every sender belongs to exactly one shard, every time
+            owners = [shard for shard in shards if shard.owns(sender)]
+            self.assertEqual(len(owners), 1)
+            self.assertTrue(owners[0].owns(sender))
+
+        # The senders are spread over all shards, and each shard counts what it leaves to the others
+        self.assertEqual(sum(shard.skipped for shard in shards), 2 * len(senders))
+        for shard in shards:
+            self.assertLess(shard.skipped, len(senders))
+
+    def test_str(self):
+        self.assertEqual(str(WorkerShard(1, 4)), 'worker 2 of 4')
+
+
+class RunWorkersTestCase(unittest.TestCase):
+    def test_run_workers(self):
+        # Tell the supervisor to stop when the workers are running
+        stopper = threading.Timer(1.0, os.kill, (os.getpid(), signal.SIGTERM))
+        stopper.start()
+        self.addCleanup(stopper.cancel)
+
+        with self.assertLogs('dhcpkit.ipv6.workers', 'DEBUG'):
+            results = run_workers(3, report_shard)
+
+        self.assertEqual([(result['index'], result['count']) for result in results], [(0, 3), (1, 3), (2, 3)])
+        self.assertNotIn(os.getpid(), [result['pid'] for result in results])
+
+    def test_combined_statistics(self):
+        # Tell the supervisor to stop when the workers are running
+        stopper = threading.Timer(1.0, os.kill, (os.getpid(), signal.SIGTERM))
+        stopper.start()
+        self.addCleanup(stopper.cancel)
+
+        with self.assertLogs('dhcpkit', 'DEBUG'):
+            results = run_workers(3, report_statistics)
+            combined = combine_worker_statistics(results + [None])
+
+        self.assertEqual(str(combined['pre-classification']), "accepted 3, dropped 3 server-to-client")
+        self.assertEqual(combined['queue'].counts(), {'accepted': 3, 'dropped': {PRIORITY_HIGH: 0, PRIORITY_LOW: 6}})
+
+        deadlines = combined['deadlines'].counts()
+        self.assertEqual(deadlines['expired-waiting'], 2)
+        self.assertEqual(deadlines['expired-handling'], 3)
+        self.assertEqual(deadlines['waited'], 3)
+        self.assertAlmostEqual(deadlines['total-wait'], 4.5)
+        self.assertAlmostEqual(deadlines['max-wait'], 2.5)
+
+    def test_combined_statistics_without_counters(self):
+        # The asyncio core doesn't keep queue and deadline statistics
+        combined = combine_worker_statistics([{'skipped': 0, 'pre-classification': None,
+                                               'queue': None, 'deadlines': None}])
+        self.assertEqual(combined, {'pre-classification': None, 'queue': None, 'deadlines': None})
+
+    def test_failing_worker(self):
+        start = time.monotonic()
+        with self.assertLogs('dhcpkit.ipv6.workers', 'ERROR') as logs:
+            results = run_workers(2, fail_first)
+
+        # The other worker is stopped when the first one fails
+        self.assertEqual(results, [None, None])
+        self.assertLess(time.monotonic() - start, 30)
+        self.assertTrue(any('stopped unexpectedly' in line for line in logs.output))
+
+
+if __name__ == '__main__':  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,41 @@
+"""
+Test reading packet captures
+"""
+import os
+import unittest
+
+from dhcpkit.ipv6.messages import Message, RelayForwardMessage, RelayReplyMessage
+from dhcpkit.pcap import read_capture, extract_ipv6_udp, read_dhcpv6_datagrams, LINKTYPE_ETHERNET, CapturedPacket
+
+pcaps_dir = os.path.join(os.path.dirname(__file__), '..', 'pcaps')
+
+
+class PcapTestCase(unittest.TestCase):
+    def test_read_pcapng(self):
+        packets = list(read_capture(os.path.join(pcaps_dir, 'avm-client.pcapng')))
+        self.assertEqual(len(packets), 11)
+        for packet in packets:
+            self.assertEqual(packet.link_type, LINKTYPE_ETHERNET)
+
+    def test_read_dhcpv6(self):
+        datagrams = list(read_dhcpv6_datagrams(os.path.join(pcaps_dir, 'eth4-3.pcap')))
+        self.assertEqual(len(datagrams), 12)
+
+        for datagram in datagrams:
+            self.assertEqual(datagram.destination_port, 547)
+            length, message = Message.parse(datagram.payload)
+            self.assertEqual(length, len(datagram.payload))
+            self.assertIsInstance(message, (RelayForwardMessage, RelayReplyMessage))
+
+    def test_not_ipv6(self):
+        # An ARP packet
+        packet = CapturedPacket(0, LINKTYPE_ETHERNET, bytes(12) + bytes.fromhex('0806') + bytes(28))
+        self.assertIsNone(extract_ipv6_udp(packet))
+
+    def test_unknown_link_type(self):
+        packet = CapturedPacket(0, 12345, bytes(60))
+        self.assertIsNone(extract_ipv6_udp(packet))
+
+
+if __name__ == '__main__':
+    unittest.main()
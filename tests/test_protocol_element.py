@@ -1,9 +1,16 @@
 """
 Test whether the basic stuff of ProtocolElement works as intended
 """
+import json
 import unittest
+from unittest.mock import patch
 
-from dhcpkit.protocol_element import ProtocolElement
+from dhcpkit.ipv6.messages import LazyOptionsMixin, Message
+from dhcpkit.ipv6.options import ClientIdOption, IANAOption
+from dhcpkit.protocol_element import ProtocolElement, JSONProtocolElementEncoder, VALIDATE_STRICT, VALIDATE_ON_PARSE, \
+    VALIDATE_TRUSTED
+from tests.ipv6.messages.test_relay_forward_message import relayed_solicit_packet
+from tests.ipv6.messages.test_solicit_message import solicit_packet
 
 
 class DemoElementBase(ProtocolElement):
@@ -140,6 +147,144 @@ ExactlyOneContainerElement.add_may_contain(DemoElement, 1, 1)
 ExactlyTwoContainerElement.add_may_contain(DemoElement, 2, 2)
 
 
+class CountingDemoElement(DemoElementBase):
+    """
+    Sub-element that counts how often it is validated
+    """
+
+    def __init__(self, value: int = 0):
+        self.value = value
+
+        # Private, so counting doesn't mark the element as modified
+        self._validation_count = 0
+
+    def validate(self):
+        """
+        Count, and refuse negative values
+        """
+        self._validation_count += 1
+        if self.value < 0:
+            raise ValueError("Value must not be negative")
+
+
+class ValidationPolicyTestCase(unittest.TestCase):
+    def tearDown(self):
+        ProtocolElement.validation_policy = VALIDATE_STRICT
+
+    def test_strict(self):
+        element = CountingDemoElement()
+        element.validate_once()
+        element.validate_once()
+        element.validate_before_save()
+        self.assertEqual(element._validation_count, 3)
+
+    def test_on_parse(self):
+        ProtocolElement.validation_policy = VALIDATE_ON_PARSE
+
+        element = CountingDemoElement()
+        element.validate_before_save()
+        element.validate_once()
+        self.assertEqual(element._validation_count, 1)
+
+        # Modifying the element means it has to be validated again
+        element.value = 1
+        element.validate_once()
+        element.validate_before_save()
+        self.assertEqual(element._validation_count, 2)
+
+    def test_on_parse_list_changed_in_place(self):
+        ProtocolElement.validation_policy = VALIDATE_ON_PARSE
+
+        container = MaxOneContainerElement(elements=[DemoElement()])
+        container.validate_before_save()
+
+        # Changing the list without assigning to the property is detected as well
+        container.elements.append(DemoElement())
+        self.assertRaisesRegex(ValueError, 'may only contain 1', container.validate_before_save)
+
+        container.elements.pop()
+        container.validate_before_save()
+
+    def test_on_parse_message_options_changed_in_place(self):
+        ProtocolElement.validation_policy = VALIDATE_ON_PARSE
+
+        message = Message.parse(solicit_packet)[1]
+        message.save()
+
+        # A second client-id is not allowed
+        message.options.append(message.get_option_of_type(ClientIdOption))
+        self.assertRaisesRegex(ValueError, 'may only contain 1', message.save)
+
+        # Also when the options are decoded lazily
+        with patch.object(LazyOptionsMixin, 'lazy_option_decoding', True):
+            message = Message.parse(solicit_packet)[1]
+        message.get_option_of_type(ClientIdOption)
+        message.save()
+
+        message.options.append(message.get_option_of_type(ClientIdOption))
+        self.assertRaisesRegex(ValueError, 'may only contain 1', message.save)
+
+    def check_sub_element_modified(self):
+        message = Message.parse(solicit_packet)[1]
+        message.options.append(IANAOption(iaid=b'\x00\x00\x00\x01'))
+        message.save()
+
+        # Validating the modified IA option on its own doesn't check whether its IAID is unique in the message
+        message.get_options_of_type(IANAOption)[1].iaid = message.get_option_of_type(IANAOption).iaid
+        self.assertRaisesRegex(ValueError, 'not unique', message.save)
+
+        # Also when the modified element is nested deeper, in a relayed message
+        relay_message = Message.parse(relayed_solicit_packet)[1]
+        relay_message.save()
+
+        inner_message = relay_message.inner_message
+        inner_message.options.append(inner_message.get_option_of_type(ClientIdOption))
+        self.assertRaisesRegex(ValueError, 'may only contain 1', relay_message.save)
+
+    def test_on_parse_sub_element_modified(self):
+        ProtocolElement.validation_policy = VALIDATE_ON_PARSE
+        self.check_sub_element_modified()
+
+    def test_trusted_sub_element_modified(self):
+        ProtocolElement.validation_policy = VALIDATE_TRUSTED
+        self.check_sub_element_modified()
+
+    def test_trusted(self):
+        ProtocolElement.validation_policy = VALIDATE_TRUSTED
+
+        element = CountingDemoElement(value=-1)
+        element.validate_before_save()
+        self.assertEqual(element._validation_count, 0)
+
+        # Explicit validation still happens
+        self.assertRaisesRegex(ValueError, 'not be negative', element.validate_once)
+
+    def test_failed_validation(self):
+        ProtocolElement.validation_policy = VALIDATE_ON_PARSE
+
+        element = CountingDemoElement(value=-1)
+        self.assertRaisesRegex(ValueError, 'not be negative', element.validate_once)
+        self.assertRaisesRegex(ValueError, 'not be negative', element.validate_once)
+        self.assertEqual(element._validation_count, 2)
+
+    def count_parse_validations(self) -> int:
+        with patch.object(ClientIdOption, 'validate', autospec=True,
+                          side_effect=ClientIdOption.validate) as mock_validate:
+            message = Message.parse(relayed_solicit_packet)[1]
+            message.save()
+            return mock_validate.call_count
+
+    def test_parse_and_save_message(self):
+        # The client-id is validated when parsed, by each message that contains it and when saving
+        self.assertGreater(self.count_parse_validations(), 2)
+
+        ProtocolElement.validation_policy = VALIDATE_ON_PARSE
+        self.assertEqual(self.count_parse_validations(), 1)
+
+        ProtocolElement.validation_policy = VALIDATE_TRUSTED
+        self.assertEqual(self.count_parse_validations(), 1)
+
+
 class ElementOccurrenceTestCase(unittest.TestCase):
     def test_bad(self):
         container = AnythingContainerElement(elements=[BadDemoElement()])
@@ -222,6 +367,46 @@ class ElementOccurrenceTestCase(unittest.TestCase):
         container = ExactlyTwoContainerElement(elements=[DemoElement(), DemoElement(), DemoElement()])
         self.assertRaisesRegex(ValueError, 'may only contain 2 DemoElements', container.validate)
 
+    def test_most_specific_class(self):
+        class SpecificDemoElement(DemoElement):
+            pass
+
+        class SpecificContainerElement(AnythingContainerElement):
+            pass
+
+        SpecificContainerElement.add_may_contain(SpecificDemoElement, 2)
+        self.assertIs(SpecificContainerElement.get_element_class(DemoElement()), DemoElement)
+        self.assertIs(SpecificContainerElement.get_element_class(SpecificDemoElement()), SpecificDemoElement)
+        self.assertIs(SpecificContainerElement.get_element_class(SpecificDemoElement), SpecificDemoElement)
+        self.assertIsNone(SpecificContainerElement.get_element_class(BadDemoElement()))
+
+        container = SpecificContainerElement(elements=[DemoElement(), SpecificDemoElement()])
+        self.assertRaisesRegex(ValueError, 'must contain at least 2 SpecificDemoElements', container.validate)
+
+    def test_add_may_contain_later(self):
+        class LaterDemoElement(DemoElement):
+            pass
+
+        class LaterContainerElement(ContainerElementBase):
+            pass
+
+        class SpecificLaterContainerElement(LaterContainerElement):
+            pass
+
+        # Looking it up caches the result, which must be forgotten by the subclass when the parent is extended
+        self.assertFalse(SpecificLaterContainerElement.may_contain(LaterDemoElement))
+        LaterContainerElement.add_may_contain(DemoElement, 0, 1)
+        self.assertTrue(SpecificLaterContainerElement.may_contain(LaterDemoElement))
+
+        container = SpecificLaterContainerElement(elements=[LaterDemoElement(), DemoElement()])
+        self.assertRaisesRegex(ValueError, 'may only contain 1 DemoElement', container.validate)
+
+        # And the subclass can forbid it again
+        SpecificLaterContainerElement.add_may_contain(LaterDemoElement, 0, 0)
+        self.assertFalse(SpecificLaterContainerElement.may_contain(LaterDemoElement))
+        self.assertTrue(SpecificLaterContainerElement.may_contain(DemoElement))
+        self.assertTrue(LaterContainerElement.may_contain(LaterDemoElement))
+
     def test_compare(self):
         container1 = AnythingContainerElement(elements=[DemoElement(), DemoElement()])
         container2 = AnythingContainerElement(elements=[DemoElement(), DemoElement()])
@@ -230,6 +415,35 @@ class ElementOccurrenceTestCase(unittest.TestCase):
         self.assertEqual(container1, container2)
         self.assertNotEqual(container1, container3)
 
+    def test_fields(self):
+        self.assertEqual(DemoElement._fields, ())
+        self.assertEqual(OneParameterDemoElement._fields, ('one',))
+        self.assertEqual(ThreeParameterDemoElement._fields, ('one', 'two', 'three'))
+        self.assertEqual(AnythingContainerElement._fields, ('elements',))
+
+    def test_hash(self):
+        container1 = AnythingContainerElement(elements=[DemoElement(), TwoParameterDemoElement(1608, DemoElement())])
+        container2 = AnythingContainerElement(elements=[DemoElement(), TwoParameterDemoElement(1608, DemoElement())])
+        container3 = AnythingContainerElement(elements=[DemoElement(), TwoParameterDemoElement(1609, DemoElement())])
+
+        self.assertEqual(hash(container1), hash(container2))
+        self.assertNotEqual(hash(container1), hash(container3))
+        self.assertNotEqual(hash(DemoElement()), hash(BadDemoElement()))
+        self.assertEqual(len({container1, container2, container3}), 2)
+
+    def test_json(self):
+        element = ThreeParameterDemoElement(1608, 'Something', [DemoElement(), OneParameterDemoElement(b'\x00\xff')])
+        self.assertEqual(json.loads(json.dumps(element, cls=JSONProtocolElementEncoder)), {
+            'ThreeParameterDemoElement': {
+                'one': 1608,
+                'two': 'Something',
+                'three': [
+                    {'DemoElement': {}},
+                    {'OneParameterDemoElement': {'one': 'hex:00ff'}},
+                ]
+            }
+        })
+
     def test_repr(self):
         element = TwoParameterDemoElement(1608, DemoElement())
         self.assertEqual(repr(element), "TwoParameterDemoElement(one=1608, two=DemoElement())")
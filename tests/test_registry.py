@@ -0,0 +1,137 @@
+"""
+Test the lazy loading of entry points by registries
+"""
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from dhcpkit import registry
+from dhcpkit.ipv6.messages import SolicitMessage
+from dhcpkit.registry import Registry, load_object, read_index, write_index
+
+
+class ExampleRegistry(Registry):
+    entry_point = 'dhcpkit.tests.example'
+
+
+example_entry_points = {
+    'dhcpkit.tests.example': [
+        ('1', 'dhcpkit.ipv6.messages:SolicitMessage'),
+        ('broken', 'dhcpkit.ipv6.messages:DoesNotExist'),
+        ('1', 'dhcpkit.ipv6.messages:AdvertiseMessage'),
+    ]
+}
+
+
+class RegistryTestCase(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.object(registry, '_entry_point_groups', example_entry_points)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        with self.assertLogs('dhcpkit.registry', 'WARNING'):
+            self.registry = ExampleRegistry()
+
+    def test_nothing_loaded_yet(self):
+        self.assertEqual(self.registry.data, {})
+        self.assertEqual(list(self.registry.entry_points), [1, 'broken'])
+        self.assertIn(1, self.registry)
+        self.assertNotIn(2, self.registry)
+
+    def test_load_on_lookup(self):
+        self.assertIs(self.registry[1], SolicitMessage)
+        self.assertEqual(self.registry.data, {1: SolicitMessage})
+        self.assertNotIn(1, self.registry.entry_points)
+
+    def test_missing(self):
+        self.assertIsNone(self.registry.get(2))
+        with self.assertRaises(KeyError):
+            self.registry[2]
+
+    def test_broken(self):
+        with self.assertLogs('dhcpkit.registry', 'ERROR'):
+            self.assertIsNone(self.registry.get('broken'))
+
+        # It is tried again on the next lookup
+        self.assertIn('broken', self.registry.entry_points)
+        with self.assertLogs('dhcpkit.registry', 'ERROR'):
+            self.assertIsNone(self.registry.get('broken'))
+
+    def test_concurrent_lookup(self):
+        loading = threading.Event()
+
+        def slow_load(reference):
+            loading.set()
+            time.sleep(0.1)
+            return load_object(reference)
+
+        results = []
+        with patch.object(registry, 'load_object', side_effect=slow_load) as mock_load_object:
+            thread = threading.Thread(target=lambda: results.append(self.registry.get(1)))
+            thread.start()
+
+            # Look it up while the other thread is still loading it
+            loading.wait()
+            results.append(self.registry.get(1))
+            thread.join()
+
+        self.assertEqual(results, [SolicitMessage, SolicitMessage])
+        self.assertEqual(mock_load_object.call_count, 1)
+
+    def test_load_all(self):
+        with self.assertLogs('dhcpkit.registry', 'ERROR'):
+            self.assertEqual(len(self.registry), 1)
+            self.assertEqual(dict(self.registry), {1: SolicitMessage})
+
+
+class IndexTestCase(unittest.TestCase):
+    def setUp(self):
+        handle, self.filename = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, self.filename)
+
+    def test_round_trip(self):
+        write_index(self.filename)
+        groups = read_index(self.filename)
+        self.assertTrue(all(group.startswith('dhcpkit.') for group in groups))
+        self.assertIn(('1', 'dhcpkit.ipv6.messages:SolicitMessage'), groups['dhcpkit.ipv6.messages'])
+
+    def test_bad_version(self):
+        with open(self.filename, 'w') as index_file:
+            index_file.write('{"version": 0, "groups": {}}')
+        with self.assertRaisesRegex(ValueError, 'version'):
+            read_index(self.filename)
+
+    def test_environment(self):
+        with open(self.filename, 'w') as index_file:
+            index_file.write('{"version": 1, "groups": {"dhcpkit.tests.example": [["1", "os:path"]]}}')
+
+        with patch.object(registry, '_entry_point_groups', None), \
+                patch.dict(os.environ, {registry.INDEX_ENVIRONMENT_VARIABLE: self.filename}):
+            self.assertIs(ExampleRegistry()[1], os.path)
+
+    def test_unreadable_index(self):
+        with patch.object(registry, '_entry_point_groups', None), \
+                patch.object(registry, 'find_entry_points', return_value=example_entry_points), \
+                patch.dict(os.environ, {registry.INDEX_ENVIRONMENT_VARIABLE: self.filename + '.missing'}):
+            with self.assertLogs('dhcpkit.registry', 'ERROR'):
+                self.assertEqual(registry.get_entry_points('dhcpkit.tests.example'),
+                                 example_entry_points['dhcpkit.tests.example'])
+
+
+class LoadObjectTestCase(unittest.TestCase):
+    def test_module(self):
+        self.assertIs(load_object('os'), os)
+
+    def test_attributes(self):
+        self.assertIs(load_object('os:path.join'), os.path.join)
+
+    def test_extras(self):
+        self.assertIs(load_object('os:path [extra]'), os.path)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    unittest.main()
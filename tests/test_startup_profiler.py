@@ -0,0 +1,69 @@
+"""
+Test the startup profiler
+"""
+import importlib
+import sys
+import unittest
+
+from dhcpkit.startup_profiler import StartupProfiler, TimedLoader
+
+
+class StartupProfilerTestCase(unittest.TestCase):
+    def setUp(self):
+        # Use a module that nothing else imports, and make sure it is imported again
+        sys.modules.pop('colorsys', None)
+
+        self.profiler = StartupProfiler()
+        self.addCleanup(self.profiler.stop)
+
+    def test_phases(self):
+        with self.profiler.phase('nothing'):
+            pass
+        with self.profiler.phase('import'):
+            importlib.import_module('colorsys')
+
+        self.assertEqual([name for name, duration, new_modules in self.profiler.phases], ['nothing', 'import'])
+        self.assertEqual(self.profiler.phases[0][2], [])
+        self.assertEqual(self.profiler.phases[1][2], ['colorsys'])
+
+    def test_import_times(self):
+        with self.profiler.phase('import'):
+            module = importlib.import_module('colorsys')
+        self.profiler.stop()
+
+        self.assertIn('colorsys', self.profiler.import_timer.import_times)
+        cumulative, self_time = self.profiler.import_timer.import_times['colorsys']
+        self.assertGreaterEqual(cumulative, self_time)
+        self.assertGreater(self_time, 0)
+
+        # The wrapper must not stay behind
+        self.assertNotIsInstance(module.__loader__, TimedLoader)
+        self.assertNotIsInstance(module.__spec__.loader, TimedLoader)
+
+    def test_stop(self):
+        self.profiler.stop()
+        self.assertNotIn(self.profiler.import_timer, sys.meta_path)
+
+        importlib.import_module('colorsys')
+        self.assertNotIn('colorsys', self.profiler.import_timer.import_times)
+
+    def test_report(self):
+        with self.profiler.phase('import'):
+            importlib.import_module('colorsys')
+
+        report = self.profiler.report()
+        self.assertRegex(report, r'import\s+[0-9.]+ ms\s+1 imports')
+        self.assertRegex(report, r'total\s+[0-9.]+ ms')
+        self.assertRegex(report, r'colorsys\s+[0-9.]+ ms\s+[0-9.]+ ms')
+
+    def test_without_import_times(self):
+        profiler = StartupProfiler(measure_imports=False)
+        with profiler.phase('import'):
+            importlib.import_module('colorsys')
+
+        self.assertIsNone(profiler.import_timer)
+        self.assertNotIn('Slowest imports', profiler.report())
+
+
+if __name__ == '__main__':  # pragma: no cover
+    unittest.main()
@@ -3,7 +3,8 @@ Test the encoding and parsing of domain names
 """
 import unittest
 
-from dhcpkit.utils import parse_domain_bytes, encode_domain, parse_domain_list_bytes, encode_domain_list
+from dhcpkit.utils import parse_domain_bytes, encode_domain, parse_domain_list_bytes, encode_domain_list, \
+    clear_domain_name_caches
 
 
 class DomainNameTestCase(unittest.TestCase):
@@ -24,6 +25,11 @@ class DomainNameTestCase(unittest.TestCase):
         self.assertEqual(offset, len(self.good_domain_bytes))
         self.assertEqual(domain_name, self.good_domain_name)
 
+    def test_parse_memoryview(self):
+        offset, domain_name = parse_domain_bytes(memoryview(self.good_domain_bytes))
+        self.assertEqual(offset, len(self.good_domain_bytes))
+        self.assertEqual(domain_name, self.good_domain_name)
+
     def test_parse_relative(self):
         offset, domain_name = parse_domain_bytes(self.good_relative_domain_bytes, allow_relative=True)
         self.assertEqual(offset, len(self.good_relative_domain_bytes))
@@ -52,6 +58,27 @@ class DomainNameTestCase(unittest.TestCase):
     def test_parse_unending(self):
         self.assertRaisesRegex(ValueError, 'must end with a 0-length label', parse_domain_bytes, self.unending_bytes)
 
+    def test_parse_offset(self):
+        buffer = memoryview(b'\xff\xff' + self.good_domain_bytes + b'\xff')
+        offset, domain_name = parse_domain_bytes(buffer, offset=2, length=len(self.good_domain_bytes))
+        self.assertEqual(offset, len(self.good_domain_bytes))
+        self.assertEqual(domain_name, self.good_domain_name)
+
+    def test_parse_non_ascii(self):
+        self.assertRaises(UnicodeDecodeError, parse_domain_bytes, b'\x0410w\xff\x00')
+
+    def test_cached(self):
+        clear_domain_name_caches()
+        for _ in range(2):
+            self.assertEqual(parse_domain_bytes(self.good_domain_bytes)[1], self.good_domain_name)
+            self.assertEqual(encode_domain(self.good_domain_name), self.good_domain_bytes)
+            self.assertEqual(encode_domain(self.good_domain_name, allow_relative=True),
+                             self.good_relative_domain_bytes)
+
+        # Errors are not cached
+        for _ in range(2):
+            self.assertRaisesRegex(ValueError, 'label with invalid length', encode_domain, self.oversized_label_name)
+
 
 class DomainNameListTestCase(unittest.TestCase):
     def setUp(self):
@@ -67,6 +94,17 @@ class DomainNameListTestCase(unittest.TestCase):
         domain_bytes = encode_domain_list(self.good_domains_list)
         self.assertEqual(domain_bytes, self.good_domains_bytes)
 
+    def test_parse_bad(self):
+        self.assertRaisesRegex(ValueError, 'must end with a 0-length label',
+                               parse_domain_list_bytes, self.good_domains_bytes[:-1])
+
+    def test_cached_lists_are_separate(self):
+        offset, domain_names = parse_domain_list_bytes(self.good_domains_bytes)
+        domain_names.append('example.com')
+
+        offset, domain_names = parse_domain_list_bytes(self.good_domains_bytes)
+        self.assertListEqual(domain_names, self.good_domains_list)
+
 
 if __name__ == '__main__':
     unittest.main()